@@ -0,0 +1,95 @@
+"""Micro-benchmark of compiled extraction rules against per-element xpath"""
+
+import argparse
+import re
+import timeit
+
+from lxml import html  # type: ignore
+
+from flight_arbitrage.extraction import load_rules
+
+LISTING = (
+    '<li data-test-id="offer-listing">'
+    '<span data-test-id="departure-time">{hour}:00am - 1:05pm</span>'
+    '<div data-test-id="layovers">1 stop (1h 5m in SLC)</div>'
+    '<span class="uitk-lockup-price">${price:,}</span>'
+    "</li>"
+)
+
+
+def synthetic_page(listings: int) -> str:
+    """
+    Builds a results page with the given number of listings
+
+    :param listings: number of offer listings on the page
+    :return: html of the page
+    """
+    body = "".join(
+        LISTING.format(hour=i % 12 + 1, price=100 + i * 7)
+        for i in range(listings)
+    )
+    return f"<html><body><ul>{body}</ul></body></html>"
+
+
+def per_element(tree, rules) -> list:
+    """
+    The legacy approach: xpath strings and chained replaces per listing
+
+    :param tree: parsed page
+    :param rules: extraction rules supplying the xpath strings
+    :return: parsed listing tuples
+    """
+    offers = []
+    for listing in tree.xpath(rules.xpath("offerings")):
+        price = listing.xpath("." + rules.xpath("price"))
+        layovers = listing.xpath("." + rules.xpath("layovers"))
+        departure = listing.xpath("." + rules.xpath("departure_time"))
+        offers.append(
+            (
+                float(
+                    price[0]
+                    .text_content()[1:]
+                    .replace(",", "")
+                    .replace(".", "")
+                ),
+                [
+                    stop.strip("()")
+                    for stop in re.findall(
+                        r"\(.*?\)", layovers[0].text_content()
+                    )
+                ],
+                departure[0].text_content().split("-")[0].strip(),
+            )
+        )
+    return offers
+
+
+def main() -> None:
+    """
+    Runs the benchmark and prints milliseconds per page
+
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--listings", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rules = load_rules()
+    page = synthetic_page(args.listings)
+    tree = html.fromstring(page)
+
+    timings = {
+        "per-element xpath": lambda: per_element(tree, rules),
+        "compiled rules": lambda: rules.extract_tree(tree),
+        "compiled rules + html parse": lambda: rules.extract(page),
+    }
+    print(f"{args.listings} listings, {args.repeat} repeats")
+    for name, function in timings.items():
+        seconds = min(timeit.repeat(function, number=args.repeat, repeat=3))
+        print(f"{name:<30} {seconds / args.repeat * 1000:8.3f} ms/page")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,104 @@
+"""Import-time benchmark of the package entry points"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import List
+
+HEAVY = ("selenium", "requests", "bs4", "tqdm")
+
+STATEMENTS = {
+    "flight_arbitrage.hidden_city": "import flight_arbitrage.hidden_city",
+    "flight_arbitrage.extraction": "import flight_arbitrage.extraction",
+    "flight_arbitrage.cli": "import flight_arbitrage.cli",
+    "eager browser stack": (
+        "import flight_arbitrage.hidden_city, selenium.webdriver, "
+        "requests, bs4, tqdm"
+    ),
+}
+
+
+def import_microseconds(statement: str) -> int:
+    """
+    Cumulative import time of a statement in a fresh interpreter
+
+    :param statement: python import statement
+    :return: microseconds spent importing, excluding interpreter startup
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True,
+    )
+    before = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "pass"],
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True,
+    )
+    return top_level_total(completed.stderr) - top_level_total(before.stderr)
+
+
+def top_level_total(importtime: str) -> int:
+    """
+    Sums the cumulative times of top-level imports in -X importtime output
+
+    :param importtime: stderr of python -X importtime
+    :return: microseconds
+    """
+    total = 0
+    for line in importtime.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.replace("import time:", "").split("|")
+        if not name.startswith("  "):
+            total += int(cumulative)
+    return total
+
+
+def loaded_heavy(statement: str) -> List[str]:
+    """
+    Heavy dependencies loaded by a statement
+
+    :param statement: python import statement
+    :return: names of the heavy modules that ended up imported
+    """
+    check = (
+        f"{statement}\nimport sys\n"
+        f"print(' '.join(m for m in {HEAVY!r} if m in sys.modules))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", check],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return completed.stdout.split()
+
+
+def main() -> None:
+    """
+    Runs the benchmark and prints the median import time per entry point
+
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for name, statement in STATEMENTS.items():
+        timings = [import_microseconds(statement) for _ in range(args.repeat)]
+        heavy = ", ".join(loaded_heavy(statement)) or "none"
+        print(
+            f"{name:<32} {statistics.median(timings) / 1000:8.1f} ms"
+            f"   heavy modules: {heavy}"
+        )
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,149 @@
+"""Load test of OneWay searches against the local mock flight search site"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, redirect_stderr, redirect_stdout
+import io
+import os
+import resource
+import tempfile
+import time
+from typing import Optional
+
+from flight_arbitrage.coalesce import SingleFlight
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import HUBS, MockSite, SiteArchive, SiteConfig
+from flight_arbitrage.pipeline import ParsePool
+from flight_arbitrage.report import percentile
+
+ORIGINS = ("JFK", "LAX", "BOS", "SEA", "MIA", "PHX", "MSP", "SFO")
+
+
+def search(
+    number: int,
+    airports_file: str,
+    archive: SiteArchive,
+    parse_pool: Optional[ParsePool],
+    coalescer: Optional[SingleFlight],
+) -> int:
+    """
+    Runs one route search against the mock site
+
+    :param number: route number, picks the origin and hub
+    :param airports_file: candidate airport list
+    :param archive: archive fetching from the mock site
+    :param parse_pool: parse workers, None to parse in the search thread
+    :param coalescer: shares pages between concurrent searches, if given
+    :return: number of arbitrages found
+    """
+    flight = OneWay(
+        ORIGINS[number % len(ORIGINS)],
+        HUBS[number % len(HUBS)],
+        f"07/{10 + number // len(ORIGINS) % 18:02d}/2021",
+        archive=archive,
+        parse_pool=parse_pool,
+        coalescer=coalescer,
+    )
+    return len(
+        flight.find_arbitrage(
+            override=True,
+            override_filename=airports_file,
+            web_browser="replay",
+            page_source=True,
+        )
+    )
+
+
+def main() -> None:
+    """
+    Searches routes in parallel against the mock site and prints a report
+
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--routes", type=int, default=16)
+    # fewer distinct routes than routes models users asking the same thing
+    parser.add_argument("--distinct", type=int, default=0)
+    parser.add_argument("--candidates", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--listings", type=int, default=60)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--coalesce", action="store_true")
+    args = parser.parse_args()
+
+    config = SiteConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        listings=args.listings,
+        failure_rate=args.failure_rate,
+        seed=args.seed,
+    )
+
+    with ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        airports_file = os.path.join(directory, "airports.txt")
+        with open(airports_file, "w") as file:
+            file.write(
+                "\n".join(
+                    f"C{number:02d}" for number in range(args.candidates)
+                )
+            )
+
+        site = stack.enter_context(MockSite(config))
+        archive = SiteArchive(site.url)
+        parse_pool = (
+            stack.enter_context(ParsePool(workers=args.parse_workers))
+            if args.parse_workers
+            else None
+        )
+        coalescer = SingleFlight() if args.coalesce else None
+
+        start = time.perf_counter()
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                found = sum(
+                    executor.map(
+                        lambda number: search(
+                            number % (args.distinct or args.routes),
+                            airports_file,
+                            archive,
+                            parse_pool,
+                            coalescer,
+                        ),
+                        range(args.routes),
+                    )
+                )
+        seconds = time.perf_counter() - start
+
+    latencies = [latency * 1000 for latency in archive.latencies]
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+
+    print(
+        f"{args.routes} routes x {args.candidates} candidates, "
+        f"{args.workers} workers, {args.parse_workers} parse workers, "
+        f"{args.latency * 1000:.0f}+{args.jitter * 1000:.0f} ms latency"
+    )
+    print(f"{'pages':<30} {len(latencies):8d}")
+    print(f"{'failed pages':<30} {archive.errors:8d}")
+    print(f"{'arbitrages':<30} {found:8d}")
+    print(f"{'throughput':<30} {len(latencies) / seconds:8.1f} pages/s")
+    for share in (0.5, 0.9, 0.99):
+        print(
+            f"{f'p{share * 100:.0f} page latency':<30} "
+            f"{percentile(latencies, share):8.1f} ms"
+        )
+    print(f"{'peak rss':<30} {memory:8.1f} MB")
+    if coalescer is not None:
+        print(f"{'coalesced lookups':<30} {coalescer.shared:8d}")
+    if args.parse_workers:
+        print(f"{'peak rss of a parse worker':<30} {children:8.1f} MB")
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,85 @@
+"""Benchmark of the snapshot store: size, single page reads and re-parsing"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_extraction import synthetic_page
+from flight_arbitrage.extraction import load_rules
+from flight_arbitrage.snapshots import CODEC_GZIP, SnapshotStore
+
+
+def main() -> None:
+    """
+    Fills a temporary store and prints its size and read timings
+
+    :return: nothing
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--listings", type=int, default=60)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument(
+        "--gzip", action="store_true", help="use gzip even if zstd exists"
+    )
+    args = parser.parse_args()
+
+    rules = load_rules()
+    pages = [
+        synthetic_page(args.listings + number % 7) for number in range(32)
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = SnapshotStore(
+            directory, codec=CODEC_GZIP if args.gzip else None
+        )
+
+        start = time.perf_counter()
+        raw = 0
+        for number in range(args.pages):
+            page = pages[number % len(pages)]
+            raw += len(page)
+            store.append("JFK", f"A{number % 500}", "07/10/2021", page)
+        append_seconds = time.perf_counter() - start
+
+        stored = os.path.getsize(store.blocks_path) + os.path.getsize(
+            store.index_path
+        )
+        entries = list(store.entries())
+        sample = random.Random(0).sample(
+            entries, min(args.reads, len(entries))
+        )
+
+        start = time.perf_counter()
+        for entry in sample:
+            store.read(entry)
+        read_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for entry in sample:
+            store.offers(entry, rules)
+        parse_seconds = time.perf_counter() - start
+        store.close()
+
+    codec = "gzip" if store.codec == CODEC_GZIP else "zstd"
+    print(f"{args.pages} pages of ~{args.listings} listings, {codec} blocks")
+    print(f"{'raw html':<30} {raw / 1024 / 1024:8.1f} MB")
+    print(
+        f"{'stored':<30} {stored / 1024 / 1024:8.1f} MB"
+        f"   ({raw / stored:.1f}x smaller)"
+    )
+    print(f"{'append':<30} {append_seconds / args.pages * 1000:8.3f} ms/page")
+    print(
+        f"{'random read':<30} {read_seconds / len(sample) * 1000:8.3f} ms/page"
+    )
+    print(
+        f"{'random read + re-parse':<30} "
+        f"{parse_seconds / len(sample) * 1000:8.3f} ms/page"
+    )
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,56 @@
+"""Deferred imports of heavy, backend-specific dependencies"""
+
+import importlib
+from typing import Any
+
+
+class LazyObject:
+    """Stand-in for a module or module attribute, imported on first use"""
+
+    def __init__(self, module: str, attribute: str = "") -> None:
+        """
+        LazyObject constructor
+
+        :param module: dotted name of the module to import
+        :param attribute: attribute of the module to stand in for, the
+            module itself if empty
+        """
+        object.__setattr__(self, "_lazy_module", module)
+        object.__setattr__(self, "_lazy_attribute", attribute)
+        object.__setattr__(self, "_lazy_resolved", None)
+
+    def _resolve(self) -> Any:
+        """
+        Imports the target on first use
+
+        :return: the module or attribute
+        """
+        resolved = object.__getattribute__(self, "_lazy_resolved")
+        if resolved is None:
+            resolved = importlib.import_module(
+                object.__getattribute__(self, "_lazy_module")
+            )
+            attribute = object.__getattribute__(self, "_lazy_attribute")
+            if attribute:
+                resolved = getattr(resolved, attribute)
+            object.__setattr__(self, "_lazy_resolved", resolved)
+        return resolved
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    # forwarded so unittest.mock.patch can patch attributes of the target
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self._resolve(), name)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        module = object.__getattribute__(self, "_lazy_module")
+        attribute = object.__getattribute__(self, "_lazy_attribute")
+        target = f"{module}.{attribute}" if attribute else module
+        return f"<lazy {target}>"
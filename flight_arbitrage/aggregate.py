@@ -0,0 +1,120 @@
+"""Searching one route on several flight sites at once"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from flight_arbitrage.flight import FlightOptions
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.limits import SearchProgress
+from flight_arbitrage.merge import merge_arbs as merge
+from flight_arbitrage.sites import SiteAdapter
+
+
+class ProviderResult(NamedTuple):
+    """Outcome of searching a route on one site"""
+
+    site: str
+    arbs: list
+    progress: Optional[SearchProgress]
+    error: Optional[Exception]
+    seconds: float
+
+
+def search_site(
+    site: SiteAdapter,
+    origin: str,
+    destination: str,
+    date: str,
+    flight_options: Optional[FlightOptions],
+    search_options: dict,
+) -> ProviderResult:
+    """
+    Searches a route on one site with its own browser
+
+    :param site: site to search
+    :param origin: airport where the flight originates
+    :param destination: airport that is the flight destination
+    :param date: date of flight
+    :param flight_options: collaborators of the search
+    :param search_options: OneWay.find_arbitrage arguments
+    :return: the arbitrages of the site, tagged with its name
+    """
+    start = time.perf_counter()
+    flight = OneWay(origin, destination, date, flight_options, site=site)
+    try:
+        arbs = flight.find_arbitrage(**search_options)
+        error = None
+    except Exception as caught:  # a failed site must not hide the others
+        arbs = []
+        error = caught
+    return ProviderResult(
+        site.name,
+        [dict(arb, provider=site.name) for arb in arbs],
+        flight.progress,
+        error,
+        time.perf_counter() - start,
+    )
+
+
+def fan_out(
+    origin: str,
+    destination: str,
+    date: str,
+    sites: Sequence[SiteAdapter],
+    flight_options: Optional[FlightOptions] = None,
+    **search_options,
+) -> Iterator[ProviderResult]:
+    """
+    Searches a route on every site concurrently
+
+    Results come out as each site finishes, so a slow site never holds
+    back the results of faster ones. Sites still running when the caller
+    stops iterating are left to finish in the background.
+
+    Each site's hidden city tickets are evaluated against that site's own
+    direct fare. Pairing a ticket on one site with a cheaper direct fare
+    on another is out of scope: fares, fees and booking rules differ
+    between sites, so their prices are not compared with each other.
+
+    >>> for result in fan_out('JFK', 'SLC', '07/10/2021', sites, **options):
+    >>>     print(result.site, len(result.arbs))
+
+    :param origin: airport where the flight originates
+    :param destination: airport that is the flight destination
+    :param date: date of flight
+    :param sites: sites to search
+    :param flight_options: collaborators shared by every site, e.g. a page
+        archive or parse pool
+    :param search_options: OneWay.find_arbitrage arguments
+    :return: iterator of the result of each site, fastest first
+    """
+    executor = ThreadPoolExecutor(max_workers=max(len(sites), 1))
+    try:
+        futures = [
+            executor.submit(
+                search_site,
+                site,
+                origin,
+                destination,
+                date,
+                flight_options,
+                search_options,
+            )
+            for site in sites
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False)
+
+
+def merge_arbs(results: Iterable[ProviderResult]) -> List[dict]:
+    """
+    Merges the arbitrages found on several sites, best savings first
+
+    :param results: results of each site
+    :return: the tagged arbitrages of every site, in the same
+        order whichever site finished first
+    """
+    return merge(result.arbs for result in results)
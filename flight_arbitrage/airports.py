@@ -0,0 +1,340 @@
+"""Memory-mapped airport metadata index with fast code lookups"""
+
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+from typing import Sequence, Tuple
+
+MAGIC = b"FAAIRPT\0"
+VERSION = 1
+
+# magic, version, number of records
+HEADER = struct.Struct("<8sII")
+
+# code, country, flags, latitude, longitude, rank, city offset and length
+# into the string table that follows the records
+AIRPORT_RECORD = struct.Struct("<4s2sBxddIIH6x")
+
+FLAG_HUB = 1
+
+# same layout as AIRPORT_RECORD, for zero-copy numpy views
+RECORD_FIELDS = [
+    ("code", "S4"),
+    ("country", "S2"),
+    ("flags", "u1"),
+    ("pad", "V1"),
+    ("latitude", "<f8"),
+    ("longitude", "<f8"),
+    ("rank", "<u4"),
+    ("city_offset", "<u4"),
+    ("city_length", "<u2"),
+    ("tail", "V6"),
+]
+
+AIRPORT_CODE = re.compile(r"^[A-Z0-9]{3,4}$")
+
+
+class Airport(NamedTuple):
+    """Metadata of one airport"""
+
+    code: str
+    city: str
+    country: str
+    latitude: float
+    longitude: float
+    # position in the busiest airports list, 0 if unranked
+    rank: int = 0
+    hub: bool = False
+
+
+def read_ourairports(
+    path: str, kinds: Sequence[str] = ("large_airport", "medium_airport")
+) -> List[Airport]:
+    """
+    Airports with an IATA code from an OurAirports airports.csv file
+
+    :param path: csv file path, as downloaded from ourairports.com/data
+    :param kinds: airport types to keep, large airports are flagged as hubs
+    :return: the airports, unranked
+    """
+    airports = []
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            code = row.get("iata_code", "").strip().upper()
+            if row.get("type") not in kinds or not AIRPORT_CODE.match(code):
+                continue
+            airports.append(
+                Airport(
+                    code,
+                    row.get("municipality", "").strip(),
+                    row.get("iso_country", "").strip(),
+                    float(row["latitude_deg"]),
+                    float(row["longitude_deg"]),
+                    hub=row.get("type") == "large_airport",
+                )
+            )
+    return airports
+
+
+def rank_airports(
+    airports: Iterable[Airport], ranked: Sequence[str]
+) -> List[Airport]:
+    """
+    Ranks airports by their position in a busiest airports list
+
+    :param airports: airports to rank
+    :param ranked: airport codes, busiest first, e.g. the airport list
+        downloaded by Flight.airports_to_search
+    :return: the airports with their rank set, 0 for the ones not listed
+    """
+    ranks: Dict[str, int] = {}
+    for position, code in enumerate(ranked, start=1):
+        ranks.setdefault(code.strip().upper(), position)
+    return [
+        airport._replace(rank=ranks.get(airport.code, 0))
+        for airport in airports
+    ]
+
+
+def build_index(path: str, airports: Iterable[Airport]) -> int:
+    """
+    Writes an airport index file
+
+    Records are sorted by code, so lookups are binary searches over the
+    mapped file, and city names go to a string table after the records.
+    The file is written next to its destination and renamed into place, so
+    processes reading the old index are never handed a partial one.
+
+    :param path: index file path
+    :param airports: airports to index, the last one wins on duplicate codes
+    :return: number of airports indexed
+    """
+    unique = {airport.code: airport for airport in airports}
+    records = []
+    strings = bytearray()
+    for code in sorted(unique):
+        airport = unique[code]
+        encoded_code = code.encode("ascii")
+        country = airport.country.encode("ascii")
+        if len(encoded_code) > 4 or len(country) > 2:
+            raise ValueError(f"{airport} does not fit an index record")
+        city = airport.city.encode("utf-8")[:0xFFFF]
+        records.append(
+            AIRPORT_RECORD.pack(
+                encoded_code,
+                country,
+                FLAG_HUB if airport.hub else 0,
+                airport.latitude,
+                airport.longitude,
+                airport.rank,
+                len(strings),
+                len(city),
+            )
+        )
+        strings += city
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(records)))
+        file.write(b"".join(records))
+        file.write(strings)
+    os.replace(temporary, path)
+    return len(records)
+
+
+class AirportIndex:
+    """
+    Read-only airport metadata index backed by a memory-mapped file
+
+    Opening an index only maps the file, so every process of a sweep can
+    open the same index without parsing anything and the operating system
+    shares its pages between them. Single lookups unpack one record;
+    columns exposes every record as a numpy array over the mapped bytes.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        AirportIndex constructor
+
+        :param path: index file written by build_index
+        """
+        self.path = path
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.count = (
+            HEADER.unpack_from(self.map)
+            if len(self.map) >= HEADER.size
+            else (b"", 0, 0)
+        )
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a version {VERSION} index")
+        self.strings = HEADER.size + self.count * AIRPORT_RECORD.size
+        if len(self.map) < self.strings:
+            self.map.close()
+            raise ValueError(f"{path} is truncated")
+
+    def __enter__(self) -> "AirportIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, str) and self.position(code) >= 0
+
+    def __getitem__(self, code: str) -> Airport:
+        airport = self.get(code)
+        if airport is None:
+            raise KeyError(code)
+        return airport
+
+    def __iter__(self) -> Iterator[Airport]:
+        for position in range(self.count):
+            yield self.record(position)
+
+    def code_at(self, position: int) -> bytes:
+        """
+        Code of the record at a position
+
+        :param position: record number
+        :return: the nul padded code
+        """
+        start = HEADER.size + position * AIRPORT_RECORD.size
+        end = start + 4
+        return self.map[start:end]
+
+    def position(self, code: str) -> int:
+        """
+        Record number of an airport
+
+        :param code: IATA airport code
+        :return: the record number, -1 if the airport is not indexed
+        """
+        try:
+            key = code.upper().encode("ascii").ljust(4, b"\0")
+        except UnicodeEncodeError:
+            return -1
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.code_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.code_at(low) == key:
+            return low
+        return -1
+
+    def record(self, position: int) -> Airport:
+        """
+        Airport of the record at a position
+
+        :param position: record number
+        :return: the airport
+        """
+        (
+            code,
+            country,
+            flags,
+            latitude,
+            longitude,
+            rank,
+            city_offset,
+            city_length,
+        ) = AIRPORT_RECORD.unpack_from(
+            self.map, HEADER.size + position * AIRPORT_RECORD.size
+        )
+        start = self.strings + city_offset
+        end = start + city_length
+        return Airport(
+            code.rstrip(b"\0").decode("ascii"),
+            self.map[start:end].decode("utf-8"),
+            country.rstrip(b"\0").decode("ascii"),
+            latitude,
+            longitude,
+            rank,
+            bool(flags & FLAG_HUB),
+        )
+
+    def get(self, code: str) -> Optional[Airport]:
+        """
+        Metadata of an airport
+
+        :param code: IATA airport code
+        :return: the airport, None if it is not indexed
+        """
+        position = self.position(code)
+        return self.record(position) if position >= 0 else None
+
+    def unknown(self, codes: Iterable[str]) -> List[str]:
+        """
+        Codes missing from the index, for validating airport lists
+
+        :param codes: IATA airport codes
+        :return: the codes that are not indexed, in their given order
+        """
+        return [code for code in codes if code not in self]
+
+    def prioritize(self, codes: Iterable[str]) -> List[str]:
+        """
+        Codes in the order worth searching them when a search may stop early
+
+        Hubs go first, then the busiest airports by rank, then the unranked
+        and unindexed ones, each in their given order.
+
+        :param codes: IATA airport codes
+        :return: the codes, reordered
+        """
+
+        def priority(code: str) -> Tuple[int, int]:
+            airport = self.get(code)
+            if airport is None:
+                return 2, 0
+            return (0 if airport.hub else 1), (airport.rank or sys.maxsize)
+
+        return sorted(codes, key=priority)
+
+    def columns(self):  # type: ignore
+        """
+        Every record as a numpy structured array over the mapped file
+
+        Nothing is copied, so the array stays valid only while the index is
+        open. Fields are named as in RECORD_FIELDS.
+
+        :return: the array, sorted by code
+        """
+        # pylint: disable=import-outside-toplevel
+        try:
+            import numpy
+        except ImportError as error:
+            raise ValueError(
+                "airport columns require the numpy package"
+            ) from error
+        return numpy.frombuffer(
+            self.map,
+            dtype=numpy.dtype(RECORD_FIELDS),
+            count=self.count,
+            offset=HEADER.size,
+        )
+
+    def close(self) -> None:
+        """
+        Unmaps the index file
+
+        :return: nothing
+        """
+        try:
+            self.map.close()
+        except BufferError:
+            # a columns array still points into the map, which is then
+            # released together with the last array
+            pass
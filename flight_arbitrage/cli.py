@@ -0,0 +1,865 @@
+"""Command-line runner for arbitrage sweeps"""
+
+import argparse
+import cProfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+import io
+import os
+import pstats
+import sys
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from flight_arbitrage.airports import (
+    AirportIndex,
+    build_index,
+    rank_airports,
+    read_ourairports,
+)
+from flight_arbitrage.coalesce import SingleFlight
+from flight_arbitrage.columnar import ColumnarStore
+from flight_arbitrage.fingerprints import FingerprintStore
+from flight_arbitrage.geography import GeoFilter
+from flight_arbitrage.flight import Flight, FlightOptions
+from flight_arbitrage.governor import (
+    DomainBudget,
+    RequestGovernor,
+    default_governor,
+    set_default_governor,
+)
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.identities import (
+    Identity,
+    IdentityPool,
+    load_identities,
+)
+from flight_arbitrage.limits import DeepScan, SearchProgress
+from flight_arbitrage.output import FORMATS, open_writer
+from flight_arbitrage.pipeline import ParsePool
+from flight_arbitrage.profiling import PhaseTimer
+from flight_arbitrage.replay import Archive, archived_airports, open_archive
+from flight_arbitrage.report import RunReport, write_reports
+from flight_arbitrage.session import HygienePolicy
+from flight_arbitrage.sites import SiteAdapter, load_site
+from flight_arbitrage.yields import YieldStats
+
+BACKENDS = ("firefox", "chrome", "edge", "safari")
+
+
+class Route(NamedTuple):
+    """A one-way route to search"""
+
+    origin: str
+    destination: str
+    date: str
+
+
+class RouteResult(NamedTuple):
+    """Outcome of searching one route"""
+
+    route: Route
+    arbs: list
+    timer: PhaseTimer
+    profile: Optional[cProfile.Profile]
+    error: Optional[Exception]
+    progress: Optional[SearchProgress] = None
+    # site searched, empty when the sweep searches a single site
+    provider: str = ""
+    report: Optional[RunReport] = None
+
+    @property
+    def label(self) -> str:
+        """
+        Route and site for messages
+
+        :return: e.g. 'JFK SLC 07/10/2021 on expedia'
+        """
+        route = " ".join(self.route)
+        return f"{route} on {self.provider}" if self.provider else route
+
+
+def read_routes(path: str) -> List[Route]:
+    """
+    Reads routes from a file with one 'origin destination date' per line
+
+    Fields may be separated by commas or whitespace, blank lines and lines
+    starting with '#' are skipped.
+
+    :param path: routes file path
+    :return: the routes in file order
+    """
+    routes = []
+    with open(path, "r") as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            fields = line.replace(",", " ").split()
+            if len(fields) != 3:
+                raise ValueError(
+                    f"{path}:{number}: expected origin, destination and "
+                    f"date but got {line!r}"
+                )
+            routes.append(Route(*fields))
+
+    return routes
+
+
+def cached_airports(cache_dir: str, refresh: bool = False) -> str:
+    """
+    Downloads the airport list once into the cache directory
+
+    :param cache_dir: cache directory
+    :param refresh: download again even if the list is cached
+    :return: path of the cached airport list
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, "airports.txt")
+    if refresh or not os.path.exists(path):
+        airports = Flight.airports_to_search(governor=default_governor())
+        with open(path, "w") as file:
+            file.write("\n".join(airports) + "\n")
+    return path
+
+
+def airport_list_file(
+    airports: str,
+    cache_dir: str,
+    archive: Optional[Archive] = None,
+    refresh: bool = False,
+    sites: Optional[List[SiteAdapter]] = None,
+) -> str:
+    """
+    Candidate airport list of a run
+
+    Replays never download: they use the cached list if there is one and
+    the destinations of the archived pages otherwise.
+
+    :param airports: custom airport list file, used if given
+    :param cache_dir: cache directory
+    :param archive: archive the pages are replayed from, None if the run
+        loads live pages
+    :param refresh: download the list again, for runs loading live pages
+    :param sites: sites of the searches whose pages were archived
+    :return: path of the airport list
+    """
+    if airports:
+        return airports
+    if archive is None:
+        return cached_airports(cache_dir, refresh=refresh)
+
+    cached = os.path.join(cache_dir, "airports.txt")
+    if os.path.exists(cached):
+        return cached
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, "replayed-airports.txt")
+    with open(path, "w") as file:
+        file.write("\n".join(archived_airports(archive, sites)) + "\n")
+    return path
+
+
+def cached_index(
+    cache_dir: str, source: str, airports_file: str, refresh: bool = False
+) -> str:
+    """
+    Builds the airport metadata index once into the cache directory
+
+    The index is rebuilt when the OurAirports data or the airport list it
+    was ranked by changed since it was written.
+
+    :param cache_dir: cache directory
+    :param source: OurAirports airports.csv file
+    :param airports_file: airport list, busiest first, giving the ranks
+    :param refresh: build again even if the index is up to date
+    :return: path of the cached index
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, "airports.idx")
+    built = os.path.getmtime(path) if os.path.exists(path) else None
+    if (
+        refresh
+        or built is None
+        or built < os.path.getmtime(source)
+        or built < os.path.getmtime(airports_file)
+    ):
+        with open(airports_file, "r") as file:
+            ranked = [line.strip() for line in file if line.strip()]
+        build_index(path, rank_airports(read_ourairports(source), ranked))
+    return path
+
+
+def start_profile() -> Optional[cProfile.Profile]:
+    """
+    Starts profiling the calling thread
+
+    From Python 3.12 only one profiler can be active at a time, so routes
+    searched while another worker's route is profiled go unprofiled.
+
+    :return: the running profile, None if another profiler is active
+    """
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return None
+    return profile
+
+
+def run_route(
+    route: Route,
+    args: argparse.Namespace,
+    airports_file: str,
+    shared: FlightOptions = FlightOptions(),
+    site: Optional[SiteAdapter] = None,
+) -> RouteResult:
+    """
+    Searches a single route with its own browser
+
+    :param route: route to search
+    :param args: parsed command-line arguments
+    :param airports_file: airport list to iterate through
+    :param shared: page archive, parse workers, stores and filters of the
+        sweep
+    :param site: site to search, defaults to the bundled expedia site
+    :return: the arbitrages, timings and profile of the route, whose rows
+        are tagged with the site when the sweep searches several sites
+    """
+    flight = OneWay(
+        route.origin,
+        route.destination,
+        route.date,
+        shared,
+        governor=default_governor() if args.rate else None,
+        hygiene=hygiene_policy(args),
+        site=site,
+        in_browser=args.in_browser,
+        tabs=args.tabs,
+        deep_scan=(
+            DeepScan(rounds=args.deep_scan, seconds=args.deep_scan_seconds)
+            if args.deep_scan
+            else None
+        ),
+    )
+
+    profile = start_profile() if args.profile else None
+    try:
+        arbs = flight.find_arbitrage(
+            override=True,
+            override_filename=airports_file,
+            web_browser="replay" if args.replay else args.backend,
+            driver=args.driver,
+            headless=args.headless,
+            tries=args.tries,
+            page_source=args.page_source,
+            deadline=args.deadline,
+            max_pages=args.max_pages,
+        )
+        error = None
+    except Exception as caught:  # a failed route must not stop the sweep
+        arbs = []
+        error = caught
+    finally:
+        if profile is not None:
+            profile.disable()
+
+    provider = site.name if site is not None and len(args.sites) > 1 else ""
+    rows = [
+        (
+            dict(arb, date=route.date, provider=provider)
+            if provider
+            else dict(arb, date=route.date)
+        )
+        for arb in arbs
+    ]
+    return RouteResult(
+        route,
+        rows,
+        flight.timer,
+        profile,
+        error,
+        flight.progress,
+        provider,
+        flight.report,
+    )
+
+
+def profile_report(
+    timer: PhaseTimer, profiles: List[cProfile.Profile], path: str
+) -> str:
+    """
+    Dumps merged cProfile stats and formats the timing report
+
+    :param timer: merged phase timings of every route
+    :param profiles: cProfile profiles of every route
+    :param path: file to dump the pstats data to
+    :return: the report text
+    """
+    output = io.StringIO()
+    output.write("per-phase timing\n")
+    output.write(timer.report() + "\n\n")
+
+    if profiles:
+        stats = pstats.Stats(profiles[0], stream=output)
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+        output.write(f"cProfile data written to {path}\n")
+        stats.sort_stats("cumulative").print_stats(25)
+
+    return output.getvalue()
+
+
+def add_browser_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the browser and page reading options
+
+    :param parser: parser of a command
+    :return: nothing
+    """
+    parser.add_argument("-b", "--backend", choices=BACKENDS, default="firefox")
+    parser.add_argument("--driver", default="", help="browser driver path")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument(
+        "--page-source",
+        action="store_true",
+        help="parse whole page sources instead of per-element lookups",
+    )
+
+
+def add_airport_list_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the candidate airport list options
+
+    :param parser: parser of a command
+    :return: nothing
+    """
+    parser.add_argument(
+        "--airports", default="", help="custom airport list file"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=os.path.join(os.path.expanduser("~"), ".flight_arbitrage"),
+        help="directory for the downloaded airport list",
+    )
+
+
+def identities_file(path: str) -> List[Identity]:
+    """
+    Reads the identities of an --identities file
+
+    :param path: identities file path
+    :return: the identities
+    """
+    try:
+        return load_identities(path)
+    except (OSError, ValueError) as error:
+        raise argparse.ArgumentTypeError(str(error)) from error
+
+
+def add_session_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the request pacing and browser hygiene options
+
+    :param parser: parser of a command
+    :return: nothing
+    """
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="page loads per second shared by all workers, "
+        "0 keeps the fixed sleep between pages",
+    )
+    parser.add_argument(
+        "--reset-every",
+        type=int,
+        default=0,
+        help="clear cookies, storage and cache every N pages",
+    )
+    parser.add_argument(
+        "--restart-rss-mb",
+        type=float,
+        default=0.0,
+        help="restart a browser whose memory grows beyond this",
+    )
+    parser.add_argument(
+        "--identities",
+        type=identities_file,
+        default=[],
+        metavar="PATH",
+        help="json list of proxies, user agents and cookie jars to run "
+        "browser sessions under, moving away from slow or blocked ones",
+    )
+
+
+def hygiene_policy(args: argparse.Namespace) -> Optional[HygienePolicy]:
+    """
+    Browser hygiene asked for on the command line
+
+    :param args: parsed command-line arguments
+    :return: the policy, None if no hygiene option is set
+    """
+    if not (args.reset_every or args.restart_rss_mb):
+        return None
+    return HygienePolicy(
+        reset_every=args.reset_every, restart_rss_mb=args.restart_rss_mb
+    )
+
+
+def add_dataset_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Adds the columnar dataset export options
+
+    :param parser: parser of a command
+    :return: nothing
+    """
+    parser.add_argument(
+        "--dataset",
+        default="",
+        metavar="DIR",
+        help="append every scraped offer and arbitrage to parquet files "
+        "under DIR, partitioned by day and origin (needs pyarrow)",
+    )
+    parser.add_argument(
+        "--dataset-batch",
+        type=int,
+        default=10000,
+        metavar="ROWS",
+        help="rows per parquet row group of --dataset",
+    )
+
+
+def identity_pool(args: argparse.Namespace) -> Optional[IdentityPool]:
+    """
+    Identity pool of the --identities file
+
+    :param args: parsed command-line arguments
+    :return: the pool, None without --identities
+    """
+    return IdentityPool(args.identities) if args.identities else None
+
+
+def pace_requests(args: argparse.Namespace) -> Optional[RequestGovernor]:
+    """
+    Installs the request governor asked for with --rate
+
+    :param args: parsed command-line arguments
+    :return: the governor shared by every browser, None without --rate
+    """
+    if not args.rate:
+        return None
+    set_default_governor(
+        RequestGovernor(default_budget=DomainBudget(rate=args.rate))
+    )
+    return default_governor()
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments
+
+    :param argv: arguments, defaults to sys.argv
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="flight-arbitrage",
+        description="Search hidden city arbitrage for a file of routes",
+    )
+    parser.add_argument(
+        "routes", help="file with one 'origin destination date' per line"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="parallel browsers"
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="write results in route and site order instead of as routes "
+        "finish, so the output does not depend on the number of workers",
+    )
+    add_browser_arguments(parser)
+    parser.add_argument(
+        "--in-browser",
+        action="store_true",
+        help="collect every listing of a page with one script run in the "
+        "browser, implies --page-source",
+    )
+    parser.add_argument(
+        "--tabs",
+        type=int,
+        default=0,
+        help="keep N candidate pages loading in background tabs of each "
+        "browser while one is read, ignored with --record, --replay and "
+        "--coalesce",
+    )
+    parser.add_argument(
+        "--deep-scan",
+        type=int,
+        default=0,
+        metavar="ROUNDS",
+        help="press 'show more' or scroll each results page up to ROUNDS "
+        "times for listings beyond the first render, needs --page-source",
+    )
+    parser.add_argument(
+        "--deep-scan-seconds",
+        type=float,
+        default=DeepScan().seconds,
+        help="seconds each page may spend on its deep scan",
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="parse page sources in N processes while browsers keep "
+        "loading pages, needs --page-source",
+    )
+    parser.add_argument(
+        "--fingerprints",
+        default="",
+        metavar="PATH",
+        help="only evaluate and output routes whose offers changed since "
+        "the last run sharing this fingerprint file, needs --page-source",
+    )
+    parser.add_argument(
+        "--yields",
+        default="",
+        metavar="PATH",
+        help="hit-rate statistics file that shrinks each route's candidate "
+        "list toward --target-recall",
+    )
+    parser.add_argument(
+        "--target-recall",
+        type=float,
+        default=0.95,
+        help="share of the expected arbitrage the candidates must cover",
+    )
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help="routes searched at the same time share the pages they both "
+        "need, needs --page-source",
+    )
+    parser.add_argument(
+        "--coalesce-ttl",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="keep sharing a page this long after it was loaded",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=0.0,
+        metavar="SECONDS",
+        help="stop each route after this long and keep its partial results",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        default=0,
+        help="candidate pages to load per route at most",
+    )
+    parser.add_argument(
+        "--site",
+        action="append",
+        default=[],
+        metavar="SITE",
+        help="flight site to search, a bundled site name or a site rules "
+        "json file, repeat to search every route on several sites at once "
+        "(default: expedia)",
+    )
+    parser.add_argument("--tries", type=int, default=3)
+    add_airport_list_arguments(parser)
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="download the airport list and rebuild the airport index",
+    )
+    parser.add_argument(
+        "--airport-data",
+        default="",
+        metavar="CSV",
+        help="OurAirports airports.csv to build the airport metadata index "
+        "from, routes with airports missing from it are rejected",
+    )
+    parser.add_argument(
+        "--geo-filter",
+        action="store_true",
+        help="skip candidate airports that do not lie beyond the "
+        "destination, needs --airport-data",
+    )
+    parser.add_argument(
+        "--max-bearing",
+        type=float,
+        default=90.0,
+        help="largest angle in degrees between the destination and a "
+        "candidate, seen from the origin, kept by --geo-filter",
+    )
+    add_session_arguments(parser)
+    archives = parser.add_mutually_exclusive_group()
+    archives.add_argument(
+        "--record",
+        default="",
+        metavar="ARCHIVE",
+        help="save every page loaded to a compressed page archive, a "
+        "'.gz' file or else a snapshot store directory",
+    )
+    archives.add_argument(
+        "--replay",
+        default="",
+        metavar="ARCHIVE",
+        help="serve pages from a recorded archive instead of a browser",
+    )
+    parser.add_argument(
+        "-f", "--format", choices=sorted(FORMATS), default="jsonl"
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="output file, '-' for stdout"
+    )
+    parser.add_argument(
+        "--profile",
+        default="",
+        metavar="PATH",
+        help="dump cProfile stats to PATH and print a timing report; with "
+        "several workers, routes overlapping a profiled one may go "
+        "unprofiled",
+    )
+    parser.add_argument(
+        "--report",
+        default="",
+        metavar="PATH",
+        help="write per-airport load and wait times, listings, retries and "
+        "arbitrages of every route to PATH, html for '.html' paths and "
+        "json otherwise",
+    )
+    add_dataset_arguments(parser)
+    args = parser.parse_args(argv)
+    args.page_source = args.page_source or args.in_browser
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.tabs < 0:
+        parser.error("--tabs cannot be negative")
+    if args.deep_scan < 0:
+        parser.error("--deep-scan cannot be negative")
+    if args.dataset_batch < 1:
+        parser.error("--dataset-batch must be at least 1")
+    if args.deep_scan and not args.page_source:
+        parser.error("--deep-scan needs --page-source")
+    if args.parse_workers and not args.page_source:
+        parser.error("--parse-workers needs --page-source")
+    if args.fingerprints and not args.page_source:
+        parser.error("--fingerprints needs --page-source")
+    if args.coalesce and not args.page_source:
+        parser.error("--coalesce needs --page-source")
+    if not 0.0 < args.target_recall <= 1.0:
+        parser.error("--target-recall must be in (0, 1]")
+    if args.geo_filter and not args.airport_data:
+        parser.error("--geo-filter needs --airport-data")
+    try:
+        args.sites = [load_site(site) for site in args.site or [""]]
+    except (OSError, ValueError) as error:
+        parser.error(f"--site: {error}")
+    names = [site.name for site in args.sites]
+    if len(set(names)) < len(names):
+        parser.error("--site: every site must have a different name")
+
+    return args
+
+
+def sweep(
+    routes: List[Route],
+    args: argparse.Namespace,
+    airports_file: str,
+    shared: FlightOptions = FlightOptions(),
+) -> Tuple[int, PhaseTimer, List[cProfile.Profile]]:
+    """
+    Searches every route and streams results as routes finish
+
+    Each route is searched on every site of the sweep as a separate job,
+    so results of fast sites are written without waiting for slow ones,
+    unless --ordered holds them back until every earlier job is written.
+    The run reports of every job are written to the --report file once
+    the sweep ends.
+
+    :param routes: routes to search
+    :param args: parsed command-line arguments
+    :param airports_file: airport list to iterate through
+    :param shared: resources shared by every route
+    :return: number of failed routes, merged timings and profiles
+    """
+    failures = 0
+    timer = PhaseTimer()
+    profiles = []
+    reports = []
+
+    with open_writer(args.format, args.output) as writer:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = [
+                executor.submit(
+                    run_route,
+                    route,
+                    args,
+                    airports_file,
+                    shared,
+                    site,
+                )
+                for route in routes
+                for site in args.sites
+            ]
+            for future in futures if args.ordered else as_completed(futures):
+                result = future.result()
+                timer.merge(result.timer)
+                if result.profile is not None:
+                    profiles.append(result.profile)
+                if result.report is not None:
+                    reports.append(result.report)
+                if result.error is not None:
+                    failures += 1
+                    print(
+                        f"route {result.label} failed: {result.error}",
+                        file=sys.stderr,
+                    )
+                elif result.progress and not result.progress.complete:
+                    print(
+                        f"route {result.label} stopped at its "
+                        f"{result.progress.stopped} after "
+                        f"{result.progress.searched} of "
+                        f"{result.progress.candidates} candidates",
+                        file=sys.stderr,
+                    )
+                writer.write(result.arbs)
+
+    if args.report:
+        write_reports(
+            sorted(reports, key=lambda report: (report.route, report.site)),
+            args.report,
+        )
+    return failures, timer, profiles
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Entry point of the flight-arbitrage command
+
+    :param argv: arguments, defaults to sys.argv
+    :return: exit status
+    """
+    args = parse_args(argv)
+    routes = read_routes(args.routes)
+
+    pace_requests(args)
+
+    path = args.record or args.replay
+    if path and args.replay and not os.path.exists(path):
+        print(f"page archive {path} does not exist", file=sys.stderr)
+        return 2
+
+    with ExitStack() as stack:
+        archive = open_archive(path, args.sites) if path else None
+        if archive is not None:
+            stack.callback(archive.close)
+        airports_file = airport_list_file(
+            args.airports,
+            args.cache_dir,
+            archive if args.replay else None,
+            refresh=args.refresh,
+            sites=args.sites,
+        )
+        parse_pool = (
+            stack.enter_context(
+                ParsePool(
+                    [site.rules for site in args.sites],
+                    workers=args.parse_workers,
+                )
+            )
+            if args.parse_workers
+            else None
+        )
+        fingerprints = (
+            stack.enter_context(FingerprintStore(args.fingerprints))
+            if args.fingerprints
+            else None
+        )
+        index = (
+            stack.enter_context(
+                AirportIndex(
+                    cached_index(
+                        args.cache_dir,
+                        args.airport_data,
+                        airports_file,
+                        refresh=args.refresh,
+                    )
+                )
+            )
+            if args.airport_data
+            else None
+        )
+        if index is not None:
+            unknown = index.unknown(
+                sorted({code for route in routes for code in route[:2]})
+            )
+            if unknown:
+                print(
+                    f"unknown airports: {', '.join(unknown)}", file=sys.stderr
+                )
+                return 2
+
+        geo_filter = (
+            GeoFilter(index, max_angle=args.max_bearing)
+            if index is not None and args.geo_filter
+            else None
+        )
+        yields = (
+            stack.enter_context(
+                YieldStats(args.yields, target_recall=args.target_recall)
+            )
+            if args.yields
+            else None
+        )
+        coalescer = (
+            SingleFlight(ttl=args.coalesce_ttl) if args.coalesce else None
+        )
+        dataset = (
+            stack.enter_context(
+                ColumnarStore(args.dataset, batch_rows=args.dataset_batch)
+            )
+            if args.dataset
+            else None
+        )
+        identities = identity_pool(args)
+        failures, timer, profiles = sweep(
+            routes,
+            args,
+            airports_file,
+            FlightOptions(
+                archive=archive,
+                parse_pool=parse_pool,
+                fingerprints=fingerprints,
+                yields=yields,
+                geo_filter=geo_filter,
+                coalescer=coalescer,
+                dataset=dataset,
+                identities=identities,
+            ),
+        )
+
+    if geo_filter is not None:
+        print(geo_filter.report(), file=sys.stderr)
+    if yields is not None:
+        print(yields.report(), file=sys.stderr)
+    if coalescer is not None:
+        print(coalescer.report(), file=sys.stderr)
+    if identities is not None:
+        print(identities.report(), file=sys.stderr)
+
+    if args.profile:
+        print(profile_report(timer, profiles, args.profile), file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Single-flight coalescing of identical concurrent page lookups"""
+
+from concurrent.futures import Future
+import threading
+import time
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time and shares its result
+
+    The first caller of a key runs the call; callers asking for the same
+    key while it runs wait for it and get the same result, or the same
+    exception. Results may be kept for ttl seconds after the call ends, so
+    bursts of lookups that miss each other by moments share a page load
+    too. Failures are never kept.
+
+    >>> pages = SingleFlight(ttl=60)
+    >>> offers = pages.do(('JFK', 'ORD', '07/10/2021'), fetch_offers)
+    """
+
+    def __init__(self, ttl: float = 0.0) -> None:
+        """
+        SingleFlight constructor
+
+        :param ttl: seconds a result is shared after its call ended, 0 to
+            share results of calls in flight only
+        """
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # in flight and kept calls, with the monotonic time they expire at
+        self.calls: Dict[Hashable, Tuple["Future", float]] = {}
+        self.runs = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        """
+        Result of a call, shared with concurrent callers of the same key
+
+        :param key: identity of the call, e.g. a route
+        :param call: makes the result when no call of the key is shared
+        :return: the result of the call
+        """
+        with self.lock:
+            now = time.monotonic()
+            future, expires = self.calls.get(key, (None, 0.0))
+            if future is not None and expires and now > expires:
+                future = None
+            if future is None:
+                for stale in [
+                    kept
+                    for kept, (_, until) in self.calls.items()
+                    if until and now > until
+                ]:
+                    del self.calls[stale]
+                leader = True
+                future = Future()
+                self.calls[key] = (future, 0.0)
+                self.runs += 1
+            else:
+                leader = False
+                self.shared += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as error:
+            with self.lock:
+                del self.calls[key]
+            future.set_exception(error)
+            raise
+
+        with self.lock:
+            if self.ttl:
+                self.calls[key] = (future, time.monotonic() + self.ttl)
+            else:
+                del self.calls[key]
+        future.set_result(result)
+        return result
+
+    def report(self) -> str:
+        """
+        Lookups served by a shared call
+
+        :return: one line summary
+        """
+        total = self.runs + self.shared
+        return (
+            f"coalesced {self.shared} of {total} page lookups, "
+            f"{self.runs} pages loaded"
+        )
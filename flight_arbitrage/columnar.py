@@ -0,0 +1,279 @@
+"""Partitioned parquet datasets of scraped offers and arbitrages"""
+
+from datetime import datetime, timezone
+import os
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from flight_arbitrage.extraction import Offer
+
+TABLES = ("offers", "arbs")
+
+# arbitrage record keys and the columns they are stored in
+ARB_COLUMNS = {
+    "airport destination": "destination",
+    "this destination": "airport",
+    "base price": "base_price",
+    "this ticket price": "ticket_price",
+    "eval price": "eval_price",
+    "savings": "savings",
+}
+
+
+def load_pyarrow() -> Any:
+    """
+    Imports pyarrow and its parquet module
+
+    :return: the pyarrow module
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        import pyarrow  # type: ignore
+        import pyarrow.dataset  # type: ignore
+        import pyarrow.parquet  # type: ignore
+    except ImportError as error:
+        raise ValueError(
+            "columnar datasets require the pyarrow package"
+        ) from error
+    return pyarrow
+
+
+def schemas(pyarrow: Any) -> Dict[str, Any]:
+    """
+    Column types of every table, without the partition columns
+
+    Fixed schemas keep the files of every run readable as one dataset,
+    whatever the first rows of a file happened to hold.
+
+    :param pyarrow: the pyarrow module
+    :return: schema of each table
+    """
+    scraped = [
+        ("scraped_at", pyarrow.timestamp("s", tz="UTC")),
+        ("site", pyarrow.string()),
+        ("destination", pyarrow.string()),
+        ("travel_date", pyarrow.date32()),
+        ("airport", pyarrow.string()),
+    ]
+    return {
+        "offers": pyarrow.schema(
+            scraped
+            + [
+                ("price", pyarrow.float64()),
+                ("stops", pyarrow.list_(pyarrow.string())),
+                ("departure", pyarrow.string()),
+            ]
+        ),
+        "arbs": pyarrow.schema(
+            scraped
+            + [
+                (column, pyarrow.float64())
+                for column in ARB_COLUMNS.values()
+                if column not in ("destination", "airport")
+            ]
+        ),
+    }
+
+
+class ColumnarStore:
+    """
+    Appends scraped offers and arbitrages to hive-partitioned parquet
+
+    Rows land under <root>/<table>/day=<YYYY-MM-DD>/origin=<IATA>/, one
+    file per run and partition, where day is the UTC day the page was
+    scraped and origin the airport the searched route leaves from. Rows
+    are buffered per partition and written as a row group every
+    batch_rows rows, so a long sweep or monitor never holds more than a
+    batch per partition in memory. The files of a day are finished once
+    rows of a later day arrive or the store closes, since a parquet file
+    is readable only after its footer is written.
+
+    Months of runs are then scanned without loading them into Python
+    objects, reading only the partitions and columns a query needs:
+
+    >>> arbs = open_dataset('history', 'arbs')
+    >>> arbs.to_table(filter=pyarrow.dataset.field('origin') == 'JFK')
+    """
+
+    def __init__(
+        self,
+        root: str,
+        batch_rows: int = 10000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        ColumnarStore constructor
+
+        :param root: dataset directory, created if missing
+        :param batch_rows: rows per row group
+        :param clock: returns the current time, as time.time
+        """
+        if batch_rows < 1:
+            raise ValueError("batch_rows must be at least 1")
+        self.pyarrow = load_pyarrow()
+        self.schemas = schemas(self.pyarrow)
+        self.root = root
+        self.batch_rows = batch_rows
+        self.clock = clock
+        # names this run's files, so runs never write to the same file
+        self.run = (
+            datetime.fromtimestamp(clock(), timezone.utc).strftime(
+                "%Y%m%dT%H%M%S"
+            )
+            + f"-{uuid.uuid4().hex[:8]}"
+        )
+        self.lock = threading.Lock()
+        self.buffers: Dict[Tuple[str, str, str], List[dict]] = {}
+        self.writers: Dict[Tuple[str, str, str], Any] = {}
+        self.rows = {table: 0 for table in TABLES}
+
+    def __enter__(self) -> "ColumnarStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def record(
+        self,
+        flight: Any,
+        airport: str,
+        offers: Sequence[Offer],
+        arbs: List[dict],
+    ) -> None:
+        """
+        Adds the offers and arbitrages of one candidate airport's page
+
+        :param flight: the searching Flight, for its route and site
+        :param airport: candidate airport of the page
+        :param offers: offers parsed from the page, empty if the listings
+            were read as browser elements
+        :param arbs: arbitrage records found on the page
+        :return: nothing
+        """
+        now = datetime.fromtimestamp(self.clock(), timezone.utc)
+        common = {
+            "scraped_at": now.replace(microsecond=0),
+            "site": flight.site.name,
+            "destination": flight.going_to,
+            "travel_date": datetime.strptime(flight.date, "%m/%d/%Y").date(),
+            "airport": airport,
+        }
+        offer_rows = [
+            dict(
+                common,
+                price=offer.price,
+                stops=list(offer.stops) if offer.stops is not None else None,
+                departure=offer.departure,
+            )
+            for offer in offers
+        ]
+        arb_rows = [
+            dict(
+                common,
+                **{
+                    column: arb[key]
+                    for key, column in ARB_COLUMNS.items()
+                    if column not in common
+                },
+            )
+            for arb in arbs
+        ]
+        day = now.date().isoformat()
+        with self.lock:
+            self.add(("offers", day, flight.leaving_from), offer_rows)
+            self.add(("arbs", day, flight.leaving_from), arb_rows)
+
+    def add(self, partition: Tuple[str, str, str], rows: List[dict]) -> None:
+        """
+        Buffers rows of a partition, writing full batches
+
+        Call with the lock held.
+
+        :param partition: table, day and origin
+        :param rows: rows of the table's schema
+        :return: nothing
+        """
+        if not rows:
+            return
+        # the files of earlier days will not be appended to again
+        for done in set(self.buffers) | set(self.writers):
+            if done[1] < partition[1]:
+                self.finish(done)
+        buffer = self.buffers.setdefault(partition, [])
+        buffer.extend(rows)
+        self.rows[partition[0]] += len(rows)
+        while len(buffer) >= self.batch_rows:
+            self.flush(partition, buffer[: self.batch_rows])
+            del buffer[: self.batch_rows]
+
+    def flush(self, partition: Tuple[str, str, str], rows: List[dict]) -> None:
+        """
+        Writes rows as a row group of the partition's file of this run
+
+        :param partition: table, day and origin
+        :param rows: rows of the table's schema
+        :return: nothing
+        """
+        table, day, origin = partition
+        writer = self.writers.get(partition)
+        if writer is None:
+            directory = os.path.join(
+                self.root, table, f"day={day}", f"origin={origin}"
+            )
+            os.makedirs(directory, exist_ok=True)
+            writer = self.pyarrow.parquet.ParquetWriter(
+                os.path.join(directory, f"part-{self.run}.parquet"),
+                self.schemas[table],
+            )
+            self.writers[partition] = writer
+        writer.write_table(
+            self.pyarrow.Table.from_pylist(rows, schema=self.schemas[table])
+        )
+
+    def finish(self, partition: Tuple[str, str, str]) -> None:
+        """
+        Writes the buffered rows of a partition and closes its file
+
+        :param partition: table, day and origin
+        :return: nothing
+        """
+        rows = self.buffers.pop(partition, [])
+        if rows:
+            self.flush(partition, rows)
+        writer = self.writers.pop(partition, None)
+        if writer is not None:
+            writer.close()
+
+    def close(self) -> None:
+        """
+        Writes every buffered row and closes the files of the run
+
+        :return: nothing
+        """
+        with self.lock:
+            for partition in set(self.buffers) | set(self.writers):
+                self.finish(partition)
+
+
+def open_dataset(root: str, table: str = "arbs") -> Any:
+    """
+    Opens a table of a columnar store for scanning
+
+    :param root: dataset directory of a ColumnarStore
+    :param table: 'offers' or 'arbs'
+    :return: a pyarrow dataset with the day and origin partition columns
+    """
+    if table not in TABLES:
+        raise ValueError(f"unknown table {table}, expected one of {TABLES}")
+    pyarrow = load_pyarrow()
+    partitioning = pyarrow.schema(
+        [("day", pyarrow.string()), ("origin", pyarrow.string())]
+    )
+    return pyarrow.dataset.dataset(
+        os.path.join(root, table),
+        schema=pyarrow.unify_schemas([schemas(pyarrow)[table], partitioning]),
+        format="parquet",
+        partitioning=pyarrow.dataset.partitioning(partitioning, flavor="hive"),
+    )
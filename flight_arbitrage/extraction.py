@@ -0,0 +1,386 @@
+"""Compiled, versioned extraction rules for flight results pages"""
+
+import json
+from functools import lru_cache
+from pathlib import Path
+import re
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from flight_arbitrage._lazy import LazyObject
+
+# lxml is only needed once a page is parsed, so it loads on first use
+if TYPE_CHECKING:
+    from lxml import etree, html  # type: ignore
+else:  # pylint: disable=invalid-name
+    etree = LazyObject("lxml.etree")
+    html = LazyObject("lxml.html")
+
+RULES_DIRECTORY = Path(__file__).parent / "rules"
+DEFAULT_RULES = "expedia"
+
+FIELDS = ("offerings", "price", "layovers", "departure_time")
+
+# optional selector of the button that loads more listings into the page
+SHOW_MORE = "show_more"
+
+# looks up the elements matching a selector rule within a context node
+SELECT_FUNCTION = """
+const select = (selector, context) => {
+  if (selector.css) {
+    return Array.from(context.querySelectorAll(selector.css));
+  }
+  const found = document.evaluate(
+    selector.xpath, context, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+  );
+  const nodes = [];
+  for (let i = 0; i < found.snapshotLength; i++) {
+    nodes.push(found.snapshotItem(i));
+  }
+  return nodes;
+};
+"""
+
+# collects the field texts of every listing in the browser, so a page costs
+# one webdriver round trip instead of one per listing field; listings before
+# the index given as the first script argument are skipped
+LISTINGS_SCRIPT = (
+    """
+const selectors = %s;
+"""
+    + SELECT_FUNCTION
+    + """
+const text = (selector, listing) => {
+  const node = select(selector, listing)[0];
+  if (!node) {
+    return null;
+  }
+  return node.textContent.split(/\\s+/).filter(Boolean).join(" ");
+};
+return JSON.stringify(
+  select(selectors.offerings, document)
+    .slice(arguments[0] || 0)
+    .map((listing) => selectors.fields.map((field) => text(field, listing)))
+);
+"""
+)
+
+# html of the listings from the index given as the first script argument
+# on, so pages that grew are not fetched and parsed whole again
+LISTINGS_HTML_SCRIPT = (
+    """
+const offerings = %s;
+"""
+    + SELECT_FUNCTION
+    + """
+return select(offerings, document)
+  .slice(arguments[0] || 0)
+  .map((listing) => listing.outerHTML)
+  .join("");
+"""
+)
+
+# asks the page for more listings by pressing its "show more" button, or by
+# scrolling to the bottom for pages that load listings lazily; returns
+# whether there was anything to press or scroll
+EXPAND_SCRIPT = """
+const showMore = %s;
+let button = null;
+if (showMore && showMore.css) {
+  button = document.querySelector(showMore.css);
+} else if (showMore) {
+  button = document.evaluate(
+    showMore.xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null
+  ).singleNodeValue;
+}
+if (button) {
+  button.scrollIntoView();
+  button.click();
+  return true;
+}
+const page = document.scrollingElement || document.documentElement;
+const below = page.scrollHeight - page.scrollTop - window.innerHeight;
+window.scrollTo(0, page.scrollHeight);
+return below > 1;
+"""
+
+
+class Offer(NamedTuple):
+    """A single listing parsed from a results page"""
+
+    price: Optional[float]
+    stops: Optional[Tuple[str, ...]]
+    departure: Optional[str]
+
+
+def compile_selector(selector: Dict[str, str]) -> "etree.XPath":
+    """
+    Compiles a selector rule into a reusable lxml XPath object
+
+    :param selector: mapping with either an 'xpath' or a 'css' key
+    :return: the compiled selector
+    """
+    if "xpath" in selector:
+        return etree.XPath(selector["xpath"])
+
+    if "css" in selector:
+        # pylint: disable=import-outside-toplevel
+        try:
+            from lxml.cssselect import CSSSelector  # type: ignore
+        except ImportError as error:
+            raise ValueError(
+                "css selectors require the cssselect package"
+            ) from error
+        return CSSSelector(selector["css"])
+
+    raise ValueError(f"selector {selector} needs an 'xpath' or 'css' key")
+
+
+class ExtractionRules:
+    """Selectors and patterns compiled once and applied to whole pages"""
+
+    def __init__(
+        self,
+        name: str,
+        version: int,
+        selectors: Dict[str, Dict[str, str]],
+        patterns: Dict[str, str],
+    ) -> None:
+        """
+        ExtractionRules constructor
+
+        :param name: name of the site the rules apply to
+        :param version: version of the rule set
+        :param selectors: selector rules for each field in FIELDS, plus an
+            optional SHOW_MORE rule for the button loading more listings
+        :param patterns: regular expressions for price, stops and departure
+        """
+        missing = [field for field in FIELDS if field not in selectors]
+        if missing:
+            raise ValueError(f"rules {name} are missing selectors {missing}")
+
+        self.name = name
+        self.version = version
+        self.selectors = selectors
+        self.patterns = patterns
+
+        # listing fields are looked up relative to each listing element
+        relative = {"offerings": selectors["offerings"]}
+        for field in FIELDS[1:]:
+            relative[field] = dict(selectors[field])
+            if "xpath" in relative[field]:
+                relative[field]["xpath"] = "." + relative[field]["xpath"]
+        self.compiled = {
+            field: compile_selector(selector)
+            for field, selector in relative.items()
+        }
+        self.script = LISTINGS_SCRIPT % json.dumps(
+            {
+                "offerings": relative["offerings"],
+                "fields": [relative[field] for field in FIELDS[1:]],
+            }
+        )
+        self.html_script = LISTINGS_HTML_SCRIPT % json.dumps(
+            relative["offerings"]
+        )
+        self.expand_script = EXPAND_SCRIPT % json.dumps(
+            selectors.get(SHOW_MORE)
+        )
+
+        self.price_pattern = re.compile(patterns["price"])
+        self.stops_pattern = re.compile(patterns["stops"])
+        self.departure_pattern = re.compile(patterns["departure"])
+
+    def __repr__(self) -> str:
+        return f"ExtractionRules(name={self.name!r}, version={self.version})"
+
+    # compiled xpaths cannot be pickled, so rules travel in serialised form
+    def __reduce__(self):
+        return rules_from_dict, (self.to_dict(),)
+
+    def to_dict(self) -> dict:
+        """
+        Serialised form of the rules, as read by rules_from_dict
+
+        :return: mapping with name, version, selectors and patterns keys
+        """
+        return {
+            "name": self.name,
+            "version": self.version,
+            "selectors": self.selectors,
+            "patterns": self.patterns,
+        }
+
+    def xpath(self, field: str) -> str:
+        """
+        Absolute xpath string for a field, as used by selenium lookups
+
+        :param field: one of FIELDS
+        :return: the xpath string
+        """
+        selector = self.selectors[field]
+        if "xpath" not in selector:
+            raise ValueError(f"field {field} of {self!r} is not an xpath")
+        return selector["xpath"]
+
+    def parse_price(self, text: str) -> float:
+        """
+        Converts listing price text such as '$1,234' into a number
+
+        :param text: price text from the page
+        :return: the price
+        """
+        digits = self.price_pattern.sub("", text)
+        if not digits:
+            raise ValueError(f"no price found in {text!r}")
+        return float(digits)
+
+    def parse_stops(self, text: str) -> Tuple[str, ...]:
+        """
+        Finds the layover airports in listing layover text
+
+        :param text: layover text such as '1 stop (1h 5m in ORD)'
+        :return: the layover descriptions in page order
+        """
+        return tuple(stop.strip() for stop in self.stops_pattern.findall(text))
+
+    def parse_departure(self, text: str) -> str:
+        """
+        Extracts the departure time from listing time text
+
+        :param text: time text such as '6:00am - 9:15am'
+        :return: the departure time
+        """
+        match = self.departure_pattern.match(text)
+        return match.group(1).strip() if match else text.strip()
+
+    def _field_text(self, listing, field: str) -> Optional[str]:
+        """
+        Text of the first element matching a field within a listing
+
+        :param listing: lxml listing element
+        :param field: one of FIELDS
+        :return: whitespace-normalised text, or None if the field is missing
+        """
+        found = self.compiled[field](listing)
+        if not found:
+            return None
+        return " ".join(found[0].text_content().split())
+
+    def extract_tree(self, tree, start: int = 0) -> List[Offer]:
+        """
+        Parses every listing of an already parsed page
+
+        :param tree: lxml document or element
+        :param start: index of the first listing to parse, e.g. the count
+            of listings read before the page loaded more
+        :return: one offer per listing, with None for missing fields
+        """
+        return [
+            self.offer(
+                self._field_text(listing, "price"),
+                self._field_text(listing, "layovers"),
+                self._field_text(listing, "departure_time"),
+            )
+            for listing in self.compiled["offerings"](tree)[start:]
+        ]
+
+    def offer(
+        self,
+        price_text: Optional[str],
+        layover_text: Optional[str],
+        departure_text: Optional[str],
+    ) -> Offer:
+        """
+        Parses the field texts of one listing
+
+        :param price_text: price text, None if the field is missing
+        :param layover_text: layover text, None if the field is missing
+        :param departure_text: time text, None if the field is missing
+        :return: the offer, with None for missing fields
+        """
+        try:
+            price = self.parse_price(price_text) if price_text else None
+        except ValueError:
+            price = None
+
+        return Offer(
+            price=price,
+            stops=(
+                None
+                if layover_text is None
+                else self.parse_stops(layover_text)
+            ),
+            departure=(
+                None
+                if departure_text is None
+                else self.parse_departure(departure_text)
+            ),
+        )
+
+    def extract_script(self, result: Optional[str]) -> List[Offer]:
+        """
+        Parses the result of running script in a browser
+
+        :param result: json array with the price, layover and time texts of
+            every listing
+        :return: one offer per listing, with None for missing fields
+        """
+        return [self.offer(*texts) for texts in json.loads(result or "[]")]
+
+    def extract_html(self, listings: Optional[str]) -> List[Offer]:
+        """
+        Parses the listings returned by html_script
+
+        :param listings: html of the listings, one after the other
+        :return: one offer per listing, with None for missing fields
+        """
+        if not listings or not listings.strip():
+            return []
+        return self.extract_tree(
+            html.fragment_fromstring(listings, create_parent="div")
+        )
+
+    def extract(self, page_source: str, start: int = 0) -> List[Offer]:
+        """
+        Parses price, layovers and departure for a whole page in one pass
+
+        :param page_source: html of a results page
+        :param start: index of the first listing to parse
+        :return: one offer per listing, with None for missing fields
+        """
+        if not page_source or not page_source.strip():
+            return []
+        return self.extract_tree(html.fromstring(page_source), start)
+
+
+def rules_from_dict(data: dict) -> ExtractionRules:
+    """
+    Builds extraction rules from their serialised form
+
+    :param data: mapping with name, version, selectors and patterns keys
+    :return: compiled extraction rules
+    """
+    try:
+        return ExtractionRules(
+            name=data["name"],
+            version=int(data["version"]),
+            selectors=data["selectors"],
+            patterns=data["patterns"],
+        )
+    except KeyError as error:
+        raise ValueError(f"rules are missing the key {error}") from error
+
+
+@lru_cache(maxsize=None)
+def load_rules(path: str = "") -> ExtractionRules:
+    """
+    Loads and compiles a rules file, once per process
+
+    :param path: rules json file path, defaults to the bundled expedia rules
+    :return: compiled extraction rules
+    """
+    rules_file = (
+        Path(path) if path else RULES_DIRECTORY / f"{DEFAULT_RULES}.json"
+    )
+    with open(rules_file, "r") as file:
+        return rules_from_dict(json.load(file))
@@ -0,0 +1,67 @@
+"""Direct fares and the savings of hidden city fares against them"""
+
+import json
+from collections import defaultdict
+from typing import DefaultDict, List, Tuple
+
+from flight_arbitrage.extraction import Offer
+
+
+def base_fare(offers: List[Offer]) -> Tuple[float, DefaultDict[str, set]]:
+    """
+    Picks the base fare from the offers of a direct route page
+
+    :param offers: offers parsed from the page, cheapest first
+    :return: the price (if a flight is found) and the flights
+    """
+    departure_dict: DefaultDict[str, set] = defaultdict(set)
+    for offer in offers:
+        if offer.departure is None or offer.price is None:
+            continue
+
+        departure_dict[offer.departure].add(offer.price)
+
+        return offer.price, departure_dict
+
+    return -1.0, departure_dict
+
+
+def evaluate_fare(
+    base: float,
+    departure_dict: DefaultDict[str, set],
+    ticket_price: float,
+    departure_value: str,
+) -> Tuple[float, float]:
+    """
+    Compares a hidden city fare with the direct fare it replaces
+
+    :param base: price of the cheapest direct ticket
+    :param departure_dict: direct ticket prices keyed by departure time
+    :param ticket_price: price of the hidden city ticket
+    :param departure_value: departure time of the hidden city ticket
+    :return: the direct price compared against and the savings
+    """
+    if not departure_dict[departure_value]:
+        return base, base - ticket_price
+
+    evaluation_price = min(departure_dict[departure_value])
+    return evaluation_price, evaluation_price - ticket_price
+
+
+def fare_context(base: float, departure_dict: DefaultDict[str, set]) -> str:
+    """
+    Direct fares in fingerprint form, since every evaluation depends on
+    them as much as on the page evaluated
+
+    :param base: price of the cheapest direct ticket
+    :param departure_dict: direct ticket prices keyed by departure time
+    :return: canonical json of the direct fares
+    """
+    return json.dumps(
+        [
+            base,
+            sorted(
+                (key, sorted(value)) for key, value in departure_dict.items()
+            ),
+        ]
+    )
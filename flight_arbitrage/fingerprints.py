@@ -0,0 +1,177 @@
+"""Content fingerprints of result pages for incremental sweeps"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional
+
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.sites import DEFAULT_SITE
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on windows
+    fcntl = None  # type: ignore
+
+
+def fingerprint(offers: Iterable[Offer], *context: str) -> str:
+    """
+    Hash of a set of offers, independent of their order on the page
+
+    :param offers: parsed offers of a page
+    :param context: further values the evaluation depends on, e.g. the
+        fingerprint of the direct route page
+    :return: hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for value in context:
+        digest.update(value.encode("utf-8") + b"\0")
+    for line in sorted(json.dumps(offer) for offer in offers):
+        digest.update(line.encode("utf-8") + b"\n")
+    return digest.hexdigest()
+
+
+def route_key(
+    origin: str, destination: str, date: str, site: str = DEFAULT_SITE
+) -> str:
+    """
+    Store key of a one-way search
+
+    :param origin: origin airport
+    :param destination: destination airport
+    :param date: flight date
+    :param site: name of the site searched, left out of the key for the
+        default site
+    :return: the key
+    """
+    key = f"{origin} {destination} {date}"
+    return key if site == DEFAULT_SITE else f"{site} {key}"
+
+
+def page_key(
+    origin: str,
+    hub: str,
+    destination: str,
+    date: str,
+    site: str = DEFAULT_SITE,
+) -> str:
+    """
+    Store key of a candidate page evaluated for a hidden city search
+
+    The same page is evaluated against the direct fare of each hub it is
+    searched for, so the hub is part of the key.
+
+    :param origin: origin airport
+    :param hub: destination of the search, where the traveller gets off
+    :param destination: final destination of the candidate ticket
+    :param date: flight date
+    :param site: name of the site searched
+    :return: the key
+    """
+    return f"{route_key(origin, destination, date, site)} via {hub}"
+
+
+def merge_json(path: str, merge: Callable[[dict], None]) -> dict:
+    """
+    Updates a json file shared by concurrent runs
+
+    The file is locked while it is read, merged and written back, so
+    updates of runs saving at the same time are not lost.
+
+    :param path: json file path, created if missing
+    :param merge: updates the saved content in place
+    :return: the merged content
+    """
+    with open(path, "a+") as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        file.seek(0)
+        content = file.read()
+        saved = json.loads(content) if content else {}
+        merge(saved)
+        file.seek(0)
+        file.truncate()
+        json.dump(saved, file, sort_keys=True)
+        file.flush()
+    return saved
+
+
+class FingerprintStore:
+    """
+    Last seen fingerprint of every route page, kept in a local json file
+
+    Fingerprints are updated in memory as routes are evaluated and merged
+    into the file on save, so runs sharing the file only overwrite the
+    routes they evaluated themselves.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        FingerprintStore constructor, loads the saved fingerprints
+
+        :param path: json file path, created on the first save
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.fingerprints: Dict[str, str] = {}
+        self.updated: Dict[str, str] = {}
+
+        if os.path.exists(path):
+            with open(path, "r") as file:
+                content = file.read()
+            self.fingerprints = json.loads(content) if content else {}
+
+    def __enter__(self) -> "FingerprintStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.save()
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Fingerprint of a route
+
+        :param key: route key
+        :return: the last fingerprint, None if the route is new
+        """
+        with self.lock:
+            return self.fingerprints.get(key)
+
+    def changed(self, key: str, value: str) -> bool:
+        """
+        Whether a route page differs from the last time it was evaluated
+
+        :param key: route key
+        :param value: current fingerprint of the page
+        :return: True for new or changed routes
+        """
+        return self.get(key) != value
+
+    def update(self, fingerprints: Dict[str, str]) -> None:
+        """
+        Records the fingerprints of evaluated routes
+
+        :param fingerprints: fingerprints keyed by route key
+        :return: nothing
+        """
+        with self.lock:
+            self.fingerprints.update(fingerprints)
+            self.updated.update(fingerprints)
+
+    def save(self) -> None:
+        """
+        Merges the updated fingerprints into the file
+
+        :return: nothing
+        """
+        with self.lock:
+            if not self.updated:
+                return
+            self.fingerprints = merge_json(
+                self.path, lambda saved: saved.update(self.updated)
+            )
+            self.updated = {}
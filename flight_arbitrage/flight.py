@@ -1,25 +1,147 @@
 """Creates flight data scraping object"""
 
+import sys
 import time
-from typing import List, Union
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Union
 
-import requests
-from bs4 import BeautifulSoup  # type: ignore
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options as ChromeOptions
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
+from flight_arbitrage._lazy import LazyObject
+from flight_arbitrage.extraction import ExtractionRules, Offer
+from flight_arbitrage.governor import (
+    RequestGovernor,
+    browser_throttled,
+    looks_throttled,
+)
+from flight_arbitrage.limits import DeepScan, SearchProgress
+from flight_arbitrage.profiling import PhaseTimer
+from flight_arbitrage.report import RunReport
+from flight_arbitrage.sites import SiteAdapter, load_site
+
+# selenium, requests and bs4 are slow to import and only needed by the
+# browser and airport list code paths, so they load on first use, as do
+# the optional collaborators of a search, which are built by their callers
+if TYPE_CHECKING:
+    import requests
+    from bs4 import BeautifulSoup  # type: ignore
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options as ChromeOptions
+    from selenium.webdriver.firefox.options import Options as FirefoxOptions
+
+    from flight_arbitrage.coalesce import SingleFlight
+    from flight_arbitrage.columnar import ColumnarStore
+    from flight_arbitrage.fingerprints import FingerprintStore
+    from flight_arbitrage.geography import GeoFilter
+    from flight_arbitrage.identities import (
+        Identity,
+        IdentityBrowser,
+        IdentityPool,
+        chrome_arguments,
+        firefox_preferences,
+    )
+    from flight_arbitrage.pipeline import ParsePool
+    from flight_arbitrage.replay import (
+        Archive,
+        RecordingBrowser,
+        ReplayBrowser,
+    )
+    from flight_arbitrage.session import HygienePolicy, ManagedBrowser
+    from flight_arbitrage.yields import YieldStats
+else:  # pylint: disable=invalid-name
+    requests = LazyObject("requests")
+    BeautifulSoup = LazyObject("bs4", "BeautifulSoup")
+    webdriver = LazyObject("selenium.webdriver")
+    ChromeOptions = LazyObject("selenium.webdriver.chrome.options", "Options")
+    FirefoxOptions = LazyObject(
+        "selenium.webdriver.firefox.options", "Options"
+    )
+
+    IdentityBrowser = LazyObject(
+        "flight_arbitrage.identities", "IdentityBrowser"
+    )
+    chrome_arguments = LazyObject(
+        "flight_arbitrage.identities", "chrome_arguments"
+    )
+    firefox_preferences = LazyObject(
+        "flight_arbitrage.identities", "firefox_preferences"
+    )
+    RecordingBrowser = LazyObject(
+        "flight_arbitrage.replay", "RecordingBrowser"
+    )
+    ReplayBrowser = LazyObject("flight_arbitrage.replay", "ReplayBrowser")
+    ManagedBrowser = LazyObject("flight_arbitrage.session", "ManagedBrowser")
+
+
+class FlightOptions(NamedTuple):
+    """Optional collaborators and settings of a search, all off by default"""
+
+    # page extraction rules, defaults to the site's rules
+    rules: Optional[ExtractionRules] = None
+    # paces page loads, if None a fixed sleep follows every page
+    governor: Optional[RequestGovernor] = None
+    # keeps the browser session's memory bounded with periodic resets and
+    # restarts, if None the session is left alone
+    hygiene: Optional["HygienePolicy"] = None
+    # page archive that browsers record every page to, or that the 'replay'
+    # browser serves pages from
+    archive: Optional["Archive"] = None
+    # worker processes parsing page sources while the browser loads the
+    # next page, if None pages are parsed in turn
+    parse_pool: Optional["ParsePool"] = None
+    # skips evaluating page-source results whose offers did not change
+    # since they were last evaluated
+    fingerprints: Optional["FingerprintStore"] = None
+    # hit-rate statistics that pick the candidate airports worth searching
+    # and learn from every completed search
+    yields: Optional["YieldStats"] = None
+    # drops candidate airports that do not lie beyond going_to before any
+    # page is loaded
+    geo_filter: Optional["GeoFilter"] = None
+    # flight search site to search, defaults to the bundled expedia site
+    site: Optional[SiteAdapter] = None
+    # shares the parsed pages of identical route lookups between
+    # concurrent page-source searches
+    coalescer: Optional["SingleFlight"] = None
+    # collect the listings of a page with one script run in the browser
+    # instead of reading the page source
+    in_browser: bool = False
+    # candidate pages kept loading in background tabs while one is read,
+    # 0 loads one page at a time
+    tabs: int = 0
+    # keep the browser open after a search for the next one, close_browser
+    # quits it
+    warm: bool = False
+    # budget for pressing "show more" or scrolling results pages for
+    # listings beyond the first render, None reads the first render only
+    deep_scan: Optional[DeepScan] = None
+    # columnar store every evaluated page's offers and arbitrages are
+    # appended to
+    dataset: Optional["ColumnarStore"] = None
+    # proxies, user agents and cookie jars that browser sessions are run
+    # under, if None browsers connect as they are
+    identities: Optional["IdentityPool"] = None
 
 
 class Flight:
     """Handle browser scraping"""
 
-    def __init__(self, leaving_from: str, going_to: str, date: str) -> None:
+    def __init__(
+        self,
+        leaving_from: str,
+        going_to: str,
+        date: str,
+        options: Optional[FlightOptions] = None,
+        **overrides,
+    ) -> None:
         """
         Flight constructor
 
+        >>> Flight('JFK', 'SLC', '07/10/2021', shared, tabs=3)
+
         :param leaving_from: airport where the flight originates
         :param going_to: airport that is the flight destination
         :param date: date of flight
+        :param options: collaborators and settings of the search, e.g.
+            shared by every search of a sweep
+        :param overrides: FlightOptions fields to set on top of options
         """
         self.leaving_from = leaving_from
         self.going_to = going_to
@@ -30,41 +152,83 @@ class Flight:
             webdriver.Firefox,
             webdriver.Safari,
             webdriver.Edge,
+            ManagedBrowser,
+            IdentityBrowser,
+            RecordingBrowser,
+            ReplayBrowser,
             None,
         ] = None
 
-        self.price = '//span[@class="uitk-lockup-price"]'
-        self.layovers = '//div[@data-test-id="layovers"]'
-        self.offerings = '//li[@data-test-id="offer-listing"]'
-        self.departure_time = '//span[@data-test-id="departure-time"]'
+        options = options if options is not None else FlightOptions()
+        try:
+            self.options = options._replace(**overrides)
+        except ValueError as error:
+            raise TypeError(f"unknown flight options: {error}") from error
+        # how far the last search got through its candidates
+        self.progress: Optional[SearchProgress] = None
+        # cheapest direct fare found by the last search, -1.0 if none
+        self.fare: Optional[float] = None
+        # per-airport timings and yields of the last search
+        self.report: Optional[RunReport] = None
+        self.replaying = False
+        self.timer = PhaseTimer()
+        self.site = (
+            self.options.site if self.options.site is not None else load_site()
+        )
+        self.rules = (
+            self.options.rules
+            if self.options.rules is not None
+            else self.site.rules
+        )
+        self.price = self.rules.xpath("price")
+        self.layovers = self.rules.xpath("layovers")
+        self.offerings = self.rules.xpath("offerings")
+        self.departure_time = self.rules.xpath("departure_time")
 
-    def open_chrome(self, driver: str = "", headless: bool = False) -> None:
+    def open_chrome(
+        self,
+        driver: str = "",
+        headless: bool = False,
+        identity: Optional["Identity"] = None,
+    ) -> None:
         """
         Open the chrome browser
 
         :param driver: chrome driver file path
         :param headless: headless browser mode
+        :param identity: proxy and user agent to open the browser with
         :return: nothing
         """
-        if headless:
+        if headless or identity is not None:
             options = ChromeOptions()
-            options.add_argument("--headless")
+            if headless:
+                options.add_argument("--headless")
+            if identity is not None:
+                for argument in chrome_arguments(identity):
+                    options.add_argument(argument)
             self.browser = webdriver.Chrome(
                 executable_path=driver, options=options
             )
         else:
             self.browser = webdriver.Chrome(executable_path=driver)
 
-    def open_firefox(self, headless: bool = False) -> None:
+    def open_firefox(
+        self, headless: bool = False, identity: Optional["Identity"] = None
+    ) -> None:
         """
         Open the firefox browser
 
         :param headless: headless browser mode
+        :param identity: proxy and user agent to open the browser with
         :return: nothing
         """
-        if headless:
+        if headless or identity is not None:
             options = FirefoxOptions()
-            options.add_argument("--headless")
+            if headless:
+                options.add_argument("--headless")
+            if identity is not None:
+                for name, value in firefox_preferences(identity).items():
+                    options.set_preference(name, value)
             self.browser = webdriver.Firefox(options=options)
         else:
             self.browser = webdriver.Firefox()
@@ -80,7 +244,8 @@ class Flight:
         if headless:
             print(
                 "sorry, headless is not available with "
-                "safari in selenium at this moment"
+                "safari in selenium at this moment",
+                file=sys.stderr,
             )
         self.browser = webdriver.Safari(executable_path=driver)
 
@@ -95,7 +260,8 @@ class Flight:
         if headless:
             print(
                 "sorry, headless is not available with edge in "
-                "selenium at this moment (well it kinda is)"
+                "selenium at this moment (well it kinda is)",
+                file=sys.stderr,
             )
         self.browser = webdriver.Edge(executable_path=driver)
 
@@ -108,34 +274,230 @@ class Flight:
         """
         Opens a browser based on user-defined parameters
 
+        :param web_browser: web browser to open
+        :param driver: web browser driver file path
+        :param headless: headless browser mode
+        :return: nothing
+        """
+        if self.options.warm and self.browser is not None:
+            return
+
+        self.launch(web_browser=web_browser, driver=driver, headless=headless)
+
+        if self.options.hygiene is not None:
+            self.browser = ManagedBrowser(
+                factory=lambda: self.relaunch(web_browser, driver, headless),
+                policy=self.options.hygiene,
+                browser=self.browser,
+            )
+
+        if not self.replaying:
+            time.sleep(2)
+
+    def release_browser(self) -> None:
+        """
+        Quits the browser at the end of a search, unless it is kept warm
+
+        :return: nothing
+        """
+        if not self.options.warm:
+            self.close_browser()
+
+    def close_browser(self) -> None:
+        """
+        Quits the browser
+
+        :return: nothing
+        """
+        if self.browser is not None:
+            self.browser.quit()
+
+    def relaunch(self, web_browser: str, driver: str, headless: bool):
+        """
+        Opens a fresh browser without replacing the one in use
+
+        :param web_browser: web browser to open
+        :param driver: web browser driver file path
+        :param headless: headless browser mode
+        :return: the new selenium webdriver
+        """
+        current = self.browser
+        self.launch(web_browser=web_browser, driver=driver, headless=headless)
+        fresh, self.browser = self.browser, current
+        return fresh
+
+    def launch(
+        self,
+        web_browser: str = "firefox",
+        driver: str = "",
+        headless: bool = False,
+    ) -> None:
+        """
+        Dispatches to the open method of a web browser
+
         :param web_browser: web browser to open
         :param driver: web browser driver file path
         :param headless: headless browser mode
         :return: nothing
         """
         web_browser = web_browser.lower()
+        if web_browser == "replay":
+            if self.options.archive is None:
+                raise ValueError("the replay browser needs a page archive")
+            self.browser = ReplayBrowser(self.options.archive)
+            self.replaying = True
+            return
+
+        if self.options.identities is not None:
+            self.browser = IdentityBrowser(
+                self.options.identities,
+                lambda identity: self.open_as(
+                    identity, web_browser, driver, headless
+                ),
+            )
+        else:
+            self.browser = self.open_as(None, web_browser, driver, headless)
+
+        if self.options.archive is not None:
+            self.browser = RecordingBrowser(self.browser, self.options.archive)
+
+    def open_as(
+        self,
+        identity: Optional["Identity"],
+        web_browser: str,
+        driver: str,
+        headless: bool,
+    ):
+        """
+        Opens a browser without replacing the one in use
+
+        :param identity: proxy and user agent of the browser, only chrome
+            and firefox take one
+        :param web_browser: web browser to open
+        :param driver: web browser driver file path
+        :param headless: headless browser mode
+        :return: the new selenium webdriver
+        """
+        current = self.browser
+        options = {"identity": identity} if identity is not None else {}
         if web_browser == "chrome":
-            self.open_chrome(driver=driver, headless=headless)
+            self.open_chrome(driver=driver, headless=headless, **options)
+        elif web_browser == "firefox":
+            self.open_firefox(headless=headless, **options)
+        elif options:
+            raise ValueError(
+                "proxies and user agents are only available with chrome "
+                "and firefox"
+            )
         elif web_browser == "edge":
             self.open_edge(driver=driver, headless=headless)
-        elif web_browser == "firefox":
-            self.open_firefox(headless=headless)
         elif web_browser == "safari":
             self.open_safari(driver=driver, headless=headless)
         else:
             raise Exception(f"web browser {web_browser} is not available")
+        opened, self.browser = self.browser, current
+        return opened
 
-        time.sleep(2)
+    def load(self, url: str) -> None:
+        """
+        Loads a page in the browser, paced by the request governor
+
+        :param url: url to load
+        :return: nothing
+        """
+        assert (
+            self.browser is not None
+        ), "browser variable is the wrong data type"
+
+        # replayed pages come from disk, there is no site to be polite to
+        if self.options.governor is None or self.replaying:
+            self.browser.get(url)
+            return
+
+        self.options.governor.acquire(url)
+        self.browser.get(url)
+        self.options.governor.observe(url, browser_throttled(self.browser))
+
+    def read_offers(self, start: int = 0) -> List[Offer]:
+        """
+        Parses the listings of the current page as rendered right now
+
+        In-browser extraction runs one script collecting the text of every
+        listing field, so the page costs a single webdriver round trip.
+        Otherwise the page source is parsed, except for listings read from
+        a start, whose html alone is fetched and parsed. Replayed pages have
+        no browser to run scripts in and are parsed from their source.
+
+        :param start: index of the first listing to read, listings before
+            it were read already
+        :return: the parsed offers
+        """
+        assert (
+            self.browser is not None
+        ), "browser variable is the wrong data type"
+
+        if self.options.in_browser and not self.replaying:
+            return self.rules.extract_script(
+                self.browser.execute_script(
+                    self.rules.script, *([start] if start else [])
+                )
+            )
+        if start and not self.replaying:
+            return self.rules.extract_html(
+                self.browser.execute_script(self.rules.html_script, start)
+            )
+        return self.rules.extract(self.browser.page_source, start)
+
+    def expand_offers(self, offers: List[Offer]) -> List[Offer]:
+        """
+        Loads more listings into the current page within the deep scan
+        budget
+
+        Each round presses the page's "show more" button, or scrolls to the
+        bottom, and reads only the listings added after the ones already
+        read, so a page is never parsed field by field twice. Rounds stop
+        once the budget is spent or a round adds nothing.
+
+        :param offers: offers of the first render
+        :return: the offers with the ones loaded since appended
+        """
+        if self.options.deep_scan is None or self.replaying or not offers:
+            return offers
+        assert (
+            self.browser is not None
+        ), "browser variable is the wrong data type"
+
+        offers = list(offers)
+        with self.timer.phase("deep scan"):
+            started = time.perf_counter()
+            for _ in range(self.options.deep_scan.rounds):
+                if (
+                    time.perf_counter() - started
+                    >= self.options.deep_scan.seconds
+                ):
+                    break
+                if not self.browser.execute_script(self.rules.expand_script):
+                    break
+                time.sleep(self.options.deep_scan.settle)
+                added = self.read_offers(start=len(offers))
+                if not added:
+                    break
+                offers.extend(added)
+                self.timer.tally("expanded", len(added))
+        return offers
 
     @staticmethod
     def airports_to_search(
-        override: bool = False, override_filename: str = "airports.txt"
+        override: bool = False,
+        override_filename: str = "airports.txt",
+        governor: Optional[RequestGovernor] = None,
     ) -> List[str]:
         """
         Creates list of airports to iterate through
 
         :param override: indicating whether the user will use a custom file
         :param override_filename: the path/filename of the custom airport list
+        :param governor: request governor pacing the airport list download
         :return: a list of airports to iterate through
         """
         if override:
@@ -148,7 +510,13 @@ class Flight:
             "airports_in_the_United_States"
         )
         try:
+            if governor is not None:
+                governor.acquire(url)
             response = requests.get(url)
+            if governor is not None:
+                governor.observe(
+                    url, looks_throttled(status_code=response.status_code)
+                )
             if response.status_code == 200:
                 response_text = response.text
             else:
@@ -0,0 +1,218 @@
+"""Great-circle filtering of hidden city candidate airports"""
+
+import threading
+from typing import TYPE_CHECKING, Iterable, List, NamedTuple, Tuple
+
+from flight_arbitrage._lazy import LazyObject
+from flight_arbitrage.airports import AirportIndex
+
+# numpy is an optional dependency, only loaded once a filter is built
+if TYPE_CHECKING:
+    import numpy
+else:  # pylint: disable=invalid-name
+    numpy = LazyObject("numpy")
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine(latitude, longitude, other_latitude, other_longitude):
+    """
+    Great-circle distance, element-wise over numpy arrays or scalars
+
+    :param latitude: start latitudes in degrees
+    :param longitude: start longitudes in degrees
+    :param other_latitude: end latitudes in degrees
+    :param other_longitude: end longitudes in degrees
+    :return: distances in kilometers
+    """
+    phi, other_phi = numpy.radians(latitude), numpy.radians(other_latitude)
+    half_dphi = (other_phi - phi) / 2.0
+    half_dlambda = numpy.radians(other_longitude - longitude) / 2.0
+    cosines = numpy.cos(phi) * numpy.cos(other_phi)
+    chord = numpy.sin(half_dphi) ** 2 + cosines * numpy.sin(half_dlambda) ** 2
+    return 2.0 * EARTH_RADIUS_KM * numpy.arcsin(numpy.sqrt(chord))
+
+
+def bearing(latitude, longitude, other_latitude, other_longitude):
+    """
+    Initial great-circle bearing, element-wise over numpy arrays or scalars
+
+    :param latitude: start latitudes in degrees
+    :param longitude: start longitudes in degrees
+    :param other_latitude: end latitudes in degrees
+    :param other_longitude: end longitudes in degrees
+    :return: bearings in degrees clockwise from north, in [0, 360)
+    """
+    phi, other_phi = numpy.radians(latitude), numpy.radians(other_latitude)
+    dlambda = numpy.radians(other_longitude - longitude)
+    cos_other = numpy.cos(other_phi)
+    east = numpy.sin(dlambda) * cos_other
+    north = numpy.cos(phi) * numpy.sin(other_phi) - numpy.sin(
+        phi
+    ) * cos_other * numpy.cos(dlambda)
+    return numpy.degrees(numpy.arctan2(east, north)) % 360.0
+
+
+class FilterStats(NamedTuple):
+    """Candidates seen and dropped by a geographic filter"""
+
+    candidates: int = 0
+    kept: int = 0
+    # closer to the origin than the hub is
+    too_close: int = 0
+    # too far off the direction of the hub
+    off_course: int = 0
+    # not in the airport index, kept since they cannot be judged
+    unknown: int = 0
+
+
+class GeoFilter:
+    """
+    Drops hidden city candidates that do not lie beyond the hub
+
+    A hidden city ticket through the hub is only plausible for final
+    destinations at least min_ratio times as far from the origin as the
+    hub is, and whose bearing from the origin is within max_angle degrees
+    of the hub's. Distances and bearings of every candidate are computed
+    in one pass over the columns of the airport index, before any page is
+    loaded. Queries whose origin or hub is not indexed are left unfiltered.
+    """
+
+    def __init__(
+        self,
+        index: AirportIndex,
+        max_angle: float = 90.0,
+        min_ratio: float = 1.0,
+    ) -> None:
+        """
+        GeoFilter constructor
+
+        :param index: airport metadata index with the coordinates
+        :param max_angle: largest bearing difference to the hub in degrees
+        :param min_ratio: smallest distance relative to the hub distance
+        """
+        try:
+            numpy.ndarray  # pylint: disable=pointless-statement
+        except ImportError as error:
+            raise ValueError("geographic filtering requires numpy") from error
+        self.index = index
+        self.max_angle = max_angle
+        self.min_ratio = min_ratio
+        self.lock = threading.Lock()
+        self.stats = FilterStats()
+
+    def coordinates(
+        self, codes: List[str]
+    ) -> Tuple["numpy.ndarray", "numpy.ndarray", "numpy.ndarray"]:
+        """
+        Coordinates of airports, looked up with one search over the index
+
+        :param codes: IATA airport codes
+        :return: latitudes, longitudes and a mask of the indexed codes
+        """
+        columns = self.index.columns()
+        keys = numpy.array(
+            [code.upper().encode("ascii", "replace") for code in codes],
+            dtype="S4",
+        )
+        if columns.size == 0:
+            return (
+                numpy.zeros(len(codes)),
+                numpy.zeros(len(codes)),
+                numpy.zeros(len(codes), dtype=bool),
+            )
+        positions = numpy.minimum(
+            numpy.searchsorted(columns["code"], keys), len(columns) - 1
+        )
+        found = columns["code"][positions] == keys
+        return (
+            columns["latitude"][positions],
+            columns["longitude"][positions],
+            found,
+        )
+
+    def apply(
+        self, origin: str, hub: str, candidates: Iterable[str]
+    ) -> List[str]:
+        """
+        Candidates that lie beyond the hub
+
+        :param origin: airport the search starts from
+        :param hub: destination the hidden city tickets lay over at
+        :param candidates: candidate final destinations
+        :return: the plausible candidates, in their given order
+        """
+        return self.query(origin, hub, candidates)[0]
+
+    def query(
+        self, origin: str, hub: str, candidates: Iterable[str]
+    ) -> Tuple[List[str], FilterStats]:
+        """
+        Candidates that lie beyond the hub, and what was dropped
+
+        :param origin: airport the search starts from
+        :param hub: destination the hidden city tickets lay over at
+        :param candidates: candidate final destinations
+        :return: the plausible candidates, in their given order, and the
+            counts of this query, which are added to the totals
+        """
+        candidates = list(candidates)
+        (origin_lat, hub_lat), (origin_lon, hub_lon), ends = self.coordinates(
+            [origin, hub]
+        )
+        if not candidates or not ends.all():
+            stats = FilterStats(len(candidates), len(candidates))
+            self.count(stats)
+            return candidates, stats
+
+        latitudes, longitudes, found = self.coordinates(candidates)
+        hub_distance = haversine(origin_lat, origin_lon, hub_lat, hub_lon)
+        distances = haversine(origin_lat, origin_lon, latitudes, longitudes)
+        turn = numpy.abs(
+            bearing(origin_lat, origin_lon, latitudes, longitudes)
+            - bearing(origin_lat, origin_lon, hub_lat, hub_lon)
+        )
+        turn = numpy.minimum(turn, 360.0 - turn)
+
+        too_close = found & (distances < self.min_ratio * hub_distance)
+        off_course = found & ~too_close & (turn > self.max_angle)
+        keep = ~(too_close | off_course)
+
+        stats = FilterStats(
+            len(candidates),
+            int(keep.sum()),
+            int(too_close.sum()),
+            int(off_course.sum()),
+            int((~found).sum()),
+        )
+        self.count(stats)
+        return [
+            candidate
+            for candidate, kept in zip(candidates, keep.tolist())
+            if kept
+        ], stats
+
+    def count(self, stats: FilterStats) -> None:
+        """
+        Adds the outcome of one query to the totals
+
+        :param stats: counts of the query
+        :return: nothing
+        """
+        with self.lock:
+            self.stats = FilterStats(
+                *(total + count for total, count in zip(self.stats, stats))
+            )
+
+    def report(self) -> str:
+        """
+        Candidates dropped by the queries filtered so far
+
+        :return: one line summary
+        """
+        stats = self.stats
+        return (
+            f"geographic filter kept {stats.kept} of {stats.candidates} "
+            f"candidates, dropped {stats.too_close} closer than the hub and "
+            f"{stats.off_course} off course, {stats.unknown} not indexed"
+        )
@@ -0,0 +1,407 @@
+"""Rate-limit-aware request governor shared by every browser and backend"""
+
+import json
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None  # type: ignore
+
+THROTTLE_PATTERN = re.compile(
+    r"captcha|access denied|unusual traffic|too many requests|"
+    r"are you a robot|bot or not",
+    re.IGNORECASE,
+)
+THROTTLE_STATUS = frozenset({403, 429, 503})
+
+# markup that never shows as text, e.g. the reCAPTCHA script a results page
+# embeds, so block page wording is only looked for in the visible text
+HIDDEN_MARKUP = re.compile(
+    r"<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->|<[^>]*>",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+# title and the start of the visible text of the page a browser shows, all
+# a block page needs to be recognized, in one small round trip
+THROTTLE_SCRIPT = (
+    "var text = document.body ? document.body.innerText || '' : '';"
+    "return document.title + '\\n' + text.slice(0, arguments[0]);"
+)
+THROTTLE_TEXT_LENGTH = 2000
+
+
+class DomainBudget(NamedTuple):
+    """Request budget of a single domain"""
+
+    rate: float = 0.5
+    burst: float = 2.0
+    min_rate: float = 0.05
+
+
+def looks_throttled(
+    status_code: Optional[int] = None, page_source: Optional[str] = None
+) -> bool:
+    """
+    Decides whether a response shows the site is throttling us
+
+    :param status_code: http status code, if known
+    :param page_source: html of the response, if known; only its title and
+        visible text are looked at
+    :return: whether the response looks throttled
+    """
+    if status_code in THROTTLE_STATUS:
+        return True
+    if isinstance(page_source, str):
+        text = HIDDEN_MARKUP.sub(" ", page_source)
+        return THROTTLE_PATTERN.search(text) is not None
+    return False
+
+
+def browser_throttled(browser: Any) -> bool:
+    """
+    Decides whether the page a webdriver shows looks throttled
+
+    Only the title and the start of the visible text are fetched, rather
+    than the whole page source.
+
+    :param browser: selenium webdriver that loaded the page
+    :return: whether the page looks throttled
+    """
+    text = browser.execute_script(THROTTLE_SCRIPT, THROTTLE_TEXT_LENGTH)
+    return looks_throttled(page_source=text if isinstance(text, str) else None)
+
+
+def domain_of(url: str) -> str:
+    """
+    Domain used to look up the budget of a url
+
+    :param url: request url
+    :return: the lower-cased host name
+    """
+    return (urlsplit(url).hostname or url).lower()
+
+
+class TokenBucket:
+    """Token bucket shared by the threads of one process"""
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        TokenBucket constructor
+
+        :param rate: tokens added per second
+        :param burst: maximum number of stored tokens
+        :param clock: monotonic clock in seconds
+        """
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Takes tokens, going into debt if the bucket is empty
+
+        :param tokens: number of tokens to take
+        :return: seconds the caller has to wait before using them
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    def adjust(
+        self, change: Callable[[float], float], drain: bool = False
+    ) -> float:
+        """
+        Changes the refill rate based on its current value, in one step
+
+        :param change: function of the current rate giving the new one
+        :param drain: also empty the bucket, so the next request waits a
+            full interval
+        :return: the new rate
+        """
+        with self.lock:
+            self.rate = change(self.rate)
+            if drain:
+                self.tokens = min(self.tokens, 0.0)
+            return self.rate
+
+
+class SharedTokenBucket:
+    """Token bucket whose state lives in a locked file for many processes"""
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        burst: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        SharedTokenBucket constructor
+
+        :param path: state file shared by every process
+        :param rate: tokens added per second, unless the file has a rate
+        :param burst: maximum number of stored tokens
+        :param clock: wall clock in seconds, shared across processes
+        """
+        if fcntl is None:
+            raise ValueError("shared buckets need fcntl file locking")
+
+        self.path = path
+        self.burst = burst
+        self.clock = clock
+        self.initial_rate = rate
+
+    def _update(self, change: Callable[[dict], Any]) -> Any:
+        """
+        Applies a change to the state file under an exclusive lock
+
+        :param change: function editing the refilled state in place
+        :return: whatever the change function returns
+        """
+        with open(self.path, "a+") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                file.seek(0)
+                content = file.read()
+                now = self.clock()
+                state = (
+                    json.loads(content)
+                    if content
+                    else {
+                        "rate": self.initial_rate,
+                        "tokens": self.burst,
+                        "updated": now,
+                    }
+                )
+                state["tokens"] = min(
+                    self.burst,
+                    state["tokens"]
+                    + max(0.0, now - state["updated"]) * state["rate"],
+                )
+                state["updated"] = now
+
+                result = change(state)
+
+                file.seek(0)
+                file.truncate()
+                file.write(json.dumps(state))
+                file.flush()
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+        return result
+
+    @property
+    def rate(self) -> float:
+        """
+        Current refill rate shared by every process
+
+        :return: tokens added per second
+        """
+        return self._update(lambda state: state["rate"])
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Takes tokens, going into debt if the bucket is empty
+
+        :param tokens: number of tokens to take
+        :return: seconds the caller has to wait before using them
+        """
+
+        def take(state: dict) -> float:
+            state["tokens"] -= tokens
+            return max(0.0, -state["tokens"] / state["rate"])
+
+        return self._update(take)
+
+    def adjust(
+        self, change: Callable[[float], float], drain: bool = False
+    ) -> float:
+        """
+        Changes the refill rate for every process based on its current
+        value, under one lock so no other process changes it in between
+
+        :param change: function of the current rate giving the new one
+        :param drain: also empty the bucket, so the next request waits a
+            full interval
+        :return: the new rate
+        """
+
+        def update(state: dict) -> float:
+            state["rate"] = change(state["rate"])
+            if drain:
+                state["tokens"] = min(state["tokens"], 0.0)
+            return state["rate"]
+
+        return self._update(update)
+
+
+BucketType = Union[TokenBucket, SharedTokenBucket]
+
+
+class RequestGovernor:
+    """Paces requests per domain and backs off when a site throttles"""
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, DomainBudget]] = None,
+        default_budget: DomainBudget = DomainBudget(),
+        state_directory: str = "",
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+        backoff: float = 0.5,
+        recovery: float = 0.05,
+    ) -> None:
+        """
+        RequestGovernor constructor
+
+        :param budgets: request budgets keyed by domain
+        :param default_budget: budget of domains not in budgets
+        :param state_directory: share buckets across processes through
+            files in this directory, process-local if empty
+        :param sleep: function used to wait
+        :param clock: monotonic clock of process-local buckets
+        :param backoff: factor applied to the rate when throttled
+        :param recovery: fraction of the budget rate regained per success
+        """
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.state_directory = state_directory
+        self.sleep = sleep
+        self.clock = clock
+        self.backoff = backoff
+        self.recovery = recovery
+
+        self.buckets: Dict[str, BucketType] = {}
+        self.lock = threading.Lock()
+
+        if state_directory:
+            os.makedirs(state_directory, exist_ok=True)
+
+    def budget(self, domain: str) -> DomainBudget:
+        """
+        Budget of a domain, matching parent domains too
+
+        :param domain: host name
+        :return: the request budget
+        """
+        parts = domain.split(".")
+        for i in range(len(parts)):
+            budget = self.budgets.get(".".join(parts[i:]))
+            if budget is not None:
+                return budget
+        return self.default_budget
+
+    def bucket(self, domain: str) -> BucketType:
+        """
+        Token bucket of a domain, created on first use
+
+        :param domain: host name
+        :return: the token bucket
+        """
+        with self.lock:
+            if domain not in self.buckets:
+                budget = self.budget(domain)
+                if self.state_directory:
+                    self.buckets[domain] = SharedTokenBucket(
+                        os.path.join(self.state_directory, f"{domain}.json"),
+                        rate=budget.rate,
+                        burst=budget.burst,
+                    )
+                else:
+                    self.buckets[domain] = TokenBucket(
+                        rate=budget.rate, burst=budget.burst, clock=self.clock
+                    )
+            return self.buckets[domain]
+
+    def acquire(self, url: str) -> float:
+        """
+        Blocks until a request to the url fits in its domain budget
+
+        :param url: url about to be requested
+        :return: seconds spent waiting
+        """
+        wait = self.bucket(domain_of(url)).reserve()
+        if wait > 0:
+            self.sleep(wait)
+        return wait
+
+    def observe(self, url: str, throttled: bool) -> float:
+        """
+        Adapts the domain rate to a response: multiplicative decrease when
+        throttled, additive increase back towards the budget otherwise
+
+        :param url: url that was requested
+        :param throttled: whether the response showed throttling
+        :return: the new rate of the domain
+        """
+        domain = domain_of(url)
+        budget = self.budget(domain)
+        bucket = self.bucket(domain)
+
+        if throttled:
+            return bucket.adjust(
+                lambda rate: max(budget.min_rate, rate * self.backoff),
+                drain=True,
+            )
+        return bucket.adjust(
+            lambda rate: min(budget.rate, rate + budget.rate * self.recovery)
+        )
+
+    def rate(self, url: str) -> float:
+        """
+        Current request rate allowed for the domain of a url
+
+        :param url: any url of the domain
+        :return: requests per second
+        """
+        return self.bucket(domain_of(url)).rate
+
+
+_DEFAULT_GOVERNOR: Optional[RequestGovernor] = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_governor() -> RequestGovernor:
+    """
+    The governor shared by everything in this process
+
+    :return: the process-wide request governor
+    """
+    global _DEFAULT_GOVERNOR  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        if _DEFAULT_GOVERNOR is None:
+            _DEFAULT_GOVERNOR = RequestGovernor()
+        return _DEFAULT_GOVERNOR
+
+
+def set_default_governor(governor: Optional[RequestGovernor]) -> None:
+    """
+    Replaces the process-wide governor, e.g. with budgets from a config
+
+    :param governor: the new governor, or None to reset to defaults
+    :return: nothing
+    """
+    global _DEFAULT_GOVERNOR  # pylint: disable=global-statement
+    with _DEFAULT_LOCK:
+        _DEFAULT_GOVERNOR = governor
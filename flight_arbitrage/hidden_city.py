@@ -1,57 +1,93 @@
 """Find arbitrage in plane ticket prices"""
 
-import re
+import sys
 import time
-from typing import Tuple, DefaultDict, List, Union, Optional
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Tuple,
+    DefaultDict,
+    List,
+    Union,
+    Optional,
+)
 from collections import defaultdict
 
-from tqdm import tqdm  # type: ignore
-from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
-
+from flight_arbitrage._lazy import LazyObject
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.fares import base_fare, evaluate_fare, fare_context
+from flight_arbitrage.fingerprints import fingerprint, page_key, route_key
 from flight_arbitrage.flight import Flight
-
-ElementType = Optional[
-    Union[
-        webdriver.remote.webelement.WebElement,
-        webdriver.firefox.webelement.FirefoxWebElement,
-    ]
-]
-ElementsType = Union[
-    List[webdriver.remote.webelement.WebElement],
-    List[webdriver.firefox.webelement.FirefoxWebElement],
-]
-
-
-class OneWay(Flight):
+from flight_arbitrage.limits import SearchLimits, SearchProgress
+from flight_arbitrage.merge import merge_arbs
+from flight_arbitrage.pages import PageLoadError, candidate_pages
+from flight_arbitrage.report import RunReport
+
+# parse-only and cached paths never touch selenium or tqdm
+if TYPE_CHECKING:
+    from tqdm import tqdm  # type: ignore
+    from selenium.common import exceptions
+    from selenium.webdriver.firefox.webelement import FirefoxWebElement
+    from selenium.webdriver.remote.webelement import WebElement
+else:
+    tqdm = LazyObject("tqdm", "tqdm")
+    exceptions = LazyObject("selenium.common.exceptions")
+
+ElementType = Optional[Union["WebElement", "FirefoxWebElement"]]
+ElementsType = Union[List["WebElement"], List["FirefoxWebElement"]]
+
+
+class OneWay(Flight):  # pylint: disable=too-many-public-methods
     """Find arbitrage opportunities in one-way flights"""
 
     def generate_browser(self) -> None:
         """
-        Opens a browser and goes to the expedia flights website
+        Opens a browser and goes to the flight search site
 
         :return: nothing
         """
-        url = (
-            f"https://www.expedia.com/Flights-Search?trip=oneway&leg1="
-            f"from:{self.leaving_from},to:{self.going_to},"
-            f"departure:{self.date}"
-            f"TANYT&passengers=adults:1,children:0,seniors:0,infantinlap:Y"
-            f"&options=cabinclass%3Aeconomy&mode=search"
-        )
+        url = self.search_url(self.going_to)
 
         assert (
             self.browser is not None
         ), "browser variable is the wrong data type"
 
         try:
-            self.browser.get(url)
+            self.load(url)
         except Exception as error:
             raise ValueError(
                 f"error opening up browser with error: {error}"
             ) from error
 
-        time.sleep(2)
+        self.pause(2)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Waits for a page to render, skipped when replaying an archive
+
+        :param seconds: seconds to wait
+        :return: nothing
+        """
+        if not self.replaying:
+            time.sleep(seconds)
+
+    def search_url(
+        self,
+        destination: str,
+        origin: Optional[str] = None,
+        date: Optional[str] = None,
+    ) -> str:
+        """
+        Url of the site's one-way search results for a route
+
+        :param destination: airport the ticket flies to
+        :param origin: airport the ticket flies from, defaults to leaving_from
+        :param date: date of flight, defaults to date
+        :return: the search url
+        """
+        return self.site.search_url(
+            origin or self.leaving_from, destination, date or self.date
+        )
 
     @staticmethod
     def retrieve_element_by_xpath(base_object, context: str) -> ElementType:
@@ -66,13 +102,13 @@ class OneWay(Flight):
 
         try:
             searching = base_object.find_element_by_xpath(context)
-        except NoSuchElementException:
+        except exceptions.NoSuchElementException:
             pass
 
         return searching
 
     @staticmethod
-    def empty_list() -> List[webdriver.firefox.webelement.FirefoxWebElement]:
+    def empty_list() -> List["FirefoxWebElement"]:
         """
         Creates an empty list due to
             mypy issue: https://github.com/python/mypy/issues/6463
@@ -98,8 +134,8 @@ class OneWay(Flight):
         searching: ElementsType = self.empty_list()
 
         try:
-            searching = base_object.find_element_by_xpath(context)
-        except NoSuchElementException:
+            searching = base_object.find_elements_by_xpath(context)
+        except exceptions.NoSuchElementException:
             pass
 
         return searching
@@ -123,7 +159,7 @@ class OneWay(Flight):
             )
 
             try_count += 1
-            time.sleep(1)
+            self.pause(1)
 
         if not search and tries == 3:
             return -1.0, departure_dict
@@ -142,18 +178,205 @@ class OneWay(Flight):
                 if not search_price:
                     continue
 
-                return_price = float(
-                    search_price.text[1:].replace(",", "").replace(".", "")
+                return_price = self.rules.parse_price(search_price.text)
+                departure_location = self.rules.parse_departure(
+                    search_departure.text
                 )
-                departure_location = search_departure.text.split("-")[
-                    0
-                ].strip()
                 departure_dict[departure_location].add(return_price)
 
                 return return_price, departure_dict
 
         return -1.0, departure_dict
 
+    def cheapest_page_flight(
+        self, tries: int = 3
+    ) -> Tuple[float, DefaultDict[str, set]]:
+        """
+        Finds the cheapest flight by parsing the whole page source at once
+
+        :param tries: number of retries to load the site
+        :return: the price (if a flight is found) and the flights
+        """
+        return base_fare(self.page_offers(tries=tries))
+
+    def page_offers(self, tries: int = 3) -> List[Offer]:
+        """
+        Parses every listing on the current page in a single pass
+
+        :param tries: number of retries to wait for listings to render
+        :return: the parsed offers, empty if none rendered
+        """
+        assert (
+            self.browser is not None
+        ), "browser variable is the wrong data type"
+
+        offers = self.read_offers()
+
+        try_count = 0
+        while not self.site.ready(offers) and try_count < tries:
+            self.timer.tally("retries")
+            self.pause(1)
+            offers = self.read_offers()
+
+            try_count += 1
+
+        return self.expand_offers(offers)
+
+    def listing_elements(self, tries: int = 3) -> ElementsType:
+        """
+        Looks up the listing elements of the current page through selenium
+
+        :param tries: number of retries to wait for listings to render
+        :return: the listing elements, empty if none rendered
+        """
+        try_count = 0
+        search = self.retrieve_elements_by_xpath(self.browser, self.offerings)
+
+        while not search and try_count < tries:
+            self.timer.tally("retries")
+            search = self.retrieve_elements_by_xpath(
+                self.browser, self.offerings
+            )
+
+            try_count += 1
+            self.pause(1)
+
+        return search
+
+    def arbitrage_record(
+        self,
+        airport: str,
+        base: float,
+        departure_dict: DefaultDict[str, set],
+        ticket_price: float,
+        departure_value: str,
+    ) -> dict:
+        """
+        Builds the arbitrage entry for a hidden city ticket
+
+        :param airport: final destination of the hidden city ticket
+        :param base: price of the cheapest direct ticket
+        :param departure_dict: direct ticket prices keyed by departure time
+        :param ticket_price: price of the hidden city ticket
+        :param departure_value: departure time of the hidden city ticket
+        :return: the arbitrage opportunity and metadata about it
+        """
+        evaluation_price, savings = evaluate_fare(
+            base, departure_dict, ticket_price, departure_value
+        )
+
+        return {
+            "airport destination": self.going_to,
+            "airport source": self.leaving_from,
+            "base price": base,
+            "this ticket price": ticket_price,
+            "eval price": evaluation_price,
+            "this destination": airport,
+            "savings": savings,
+        }
+
+    def evaluate_elements(
+        self,
+        airport: str,
+        search: ElementsType,
+        base: float,
+        departure_dict: DefaultDict[str, set],
+    ) -> Tuple[list, List[float], int]:
+        """
+        Evaluates the selenium listing elements of one airport
+
+        :param airport: airport whose results page is loaded
+        :param search: listing elements of the page
+        :param base: price of the cheapest direct ticket
+        :param departure_dict: direct ticket prices keyed by departure time
+        :return: arbitrages, listing prices and count of unusable listings
+        """
+        arbs = []
+        lowest_ticket = []
+        bad_count = 0
+        for search_object in search:
+            new_searches = self.retrieve_element_by_xpath(
+                search_object, "." + self.layovers
+            )
+            if not new_searches:
+                bad_count += 1
+                continue
+            stops = self.rules.parse_stops(new_searches.text)
+
+            price_found = self.retrieve_element_by_xpath(
+                search_object, "." + self.price
+            )
+            if not price_found:
+                bad_count += 1
+                continue
+
+            ticket_price = self.rules.parse_price(price_found.text)
+            if ticket_price < base and self.going_to in stops:
+                print("arbitrage with destination:", airport, file=sys.stderr)
+
+                departure = self.retrieve_element_by_xpath(
+                    search_object, "." + self.departure_time
+                )
+                if not departure:
+                    continue
+                departure_value = self.rules.parse_departure(departure.text)
+
+                arbs.append(
+                    self.arbitrage_record(
+                        airport,
+                        base,
+                        departure_dict,
+                        ticket_price,
+                        departure_value,
+                    )
+                )
+            lowest_ticket.append(ticket_price)
+
+        return arbs, lowest_ticket, bad_count
+
+    def evaluate_offers(
+        self,
+        airport: str,
+        offers: List[Offer],
+        base: float,
+        departure_dict: DefaultDict[str, set],
+    ) -> Tuple[list, List[float], int]:
+        """
+        Evaluates the parsed offers of one airport
+
+        :param airport: airport whose results page was parsed
+        :param offers: offers parsed from the page
+        :param base: price of the cheapest direct ticket
+        :param departure_dict: direct ticket prices keyed by departure time
+        :return: arbitrages, listing prices and count of unusable listings
+        """
+        arbs = []
+        lowest_ticket = []
+        bad_count = 0
+        for offer in offers:
+            if offer.stops is None or offer.price is None:
+                bad_count += 1
+                continue
+
+            if offer.price < base and self.going_to in offer.stops:
+                print("arbitrage with destination:", airport, file=sys.stderr)
+
+                if offer.departure is None:
+                    continue
+
+                arbs.append(
+                    self.arbitrage_record(
+                        airport,
+                        base,
+                        departure_dict,
+                        offer.price,
+                        offer.departure,
+                    )
+                )
+            lowest_ticket.append(offer.price)
+
+        return arbs, lowest_ticket, bad_count
+
     def find_arbitrage(
         self,
         override: bool = False,
@@ -162,17 +385,31 @@ class OneWay(Flight):
         driver: str = "",
         headless: bool = False,
         tries: int = 3,
+        page_source: bool = False,
+        deadline: float = 0.0,
+        max_pages: int = 0,
     ) -> list:
         """
         Iterates through all possible arbitrage opportunities
 
+        A search bounded by a deadline or page budget visits hubs and the
+        busiest candidates first, if a geographic filter indexes them, then
+        the ones with the best hit rates, if yield statistics are kept, stops
+        loading pages once a limit is reached and returns the arbitrage of
+        the pages loaded so far. progress tells how far it got.
+
         :param override: boolean as to whether a custom airport list is needed
         :param override_filename: custom airport list text file
         :param web_browser: web browser to use
         :param driver: web browser selenium driver path
         :param headless: boolean to decide to open a browser in headless mode
         :param tries: number of tries to load the website content
-        :return: list of arbitrage opportunities and metadata about each
+        :param page_source: parse each page source in one pass instead of
+            looking up every listing field through selenium, always on for
+            in-browser extraction
+        :param deadline: seconds the search may take, 0 for no limit
+        :param max_pages: candidate pages to load at most, 0 for no limit
+        :return: arbitrage records, best savings first
 
         >>> arbitrage = OneWay('JFK', 'SLC', '07/10/2021')
         >>> a = arbitrage.find_arbitrage(headless=True)
@@ -180,10 +417,20 @@ class OneWay(Flight):
         >>> for d in a:
         >>>     print(d)
         """
-        self.open_browser(
-            web_browser=web_browser, driver=driver, headless=headless
+        limits = SearchLimits(deadline, max_pages)
+        page_source = page_source or self.options.in_browser
+        self.report = RunReport(
+            (self.leaving_from, self.going_to, self.date),
+            self.site.name,
+            self.timer,
         )
-        self.generate_browser()
+        with self.timer.phase("open browser"):
+            self.open_browser(
+                web_browser=web_browser, driver=driver, headless=headless
+            )
+            # coalesced searches load the direct route page when it is due
+            if not (page_source and self.options.coalescer is not None):
+                self.generate_browser()
 
         # have to have the below assert --> related to mypy issue:
         #   https://github.com/python/mypy/issues/5528
@@ -191,112 +438,258 @@ class OneWay(Flight):
             self.browser is not None
         ), "browser variable is the wrong data type"
 
-        airports = self.airports_to_search(
-            override=override, override_filename=override_filename
+        with self.timer.phase("airport list"):
+            airports = self.candidate_airports(
+                override, override_filename, limits.bounded
+            )
+        with self.timer.phase("base fare"):
+            if page_source and self.options.coalescer is not None:
+                base, departure_dict = base_fare(
+                    self.route_offers(self.going_to, tries)
+                )
+            elif page_source:
+                base, departure_dict = self.cheapest_page_flight(tries=tries)
+            else:
+                base, departure_dict = self.cheapest_flight()
+        self.fare = base
+        partials = []
+
+        total = sum(airport != self.leaving_from for airport in airports)
+        candidates = limits.take(
+            airport
+            for airport in tqdm(airports)
+            if airport != self.leaving_from
         )
-        base, departure_dict = self.cheapest_flight()
-        arbs = []
+        pages = candidate_pages(self, candidates, tries, page_source)
 
-        for airport in tqdm(airports):
-            if airport == self.leaving_from:
-                continue
+        base_context = (
+            fare_context(base, departure_dict)
+            if self.options.fingerprints is not None
+            else ""
+        )
+        evaluated: Dict[str, str] = {}
+        visited = []
 
-            url = (
-                f"https://www.expedia.com/Flights-Search?trip="
-                f"oneway&leg1=from:{self.leaving_from},"
-                f"to:{airport},departure:{self.date}"
-                f"TANYT&passengers=adults:1,children:0,seniors:0,"
-                f"infantinlap:Y&options=cabinclass%3Aeconomy&mode=search"
+        try:
+            for airport, found in pages:
+                if page_source and self.options.fingerprints is not None:
+                    key = page_key(
+                        self.leaving_from,
+                        self.going_to,
+                        airport,
+                        self.date,
+                        self.site.name,
+                    )
+                    value = fingerprint(found, base_context)  # type: ignore
+                    if not self.options.fingerprints.changed(key, value):
+                        print(
+                            f"done with airport: {airport} | "
+                            f"unchanged since the last run",
+                            file=sys.stderr,
+                        )
+                        continue
+                    evaluated[key] = value
+
+                visited.append(airport)
+                partials.append(
+                    self.evaluate_airport(
+                        airport, found, base, departure_dict, page_source
+                    )
+                )
+        except PageLoadError as error:
+            print(
+                f"error opening up browser with error: {error}",
+                file=sys.stderr,
+            )
+            self.progress = SearchProgress(total, 0, "page load error")
+            self.report.finish(self.timer, self.progress)
+            return []
+
+        # every page handed out has been evaluated once pages is exhausted
+        arbs = merge_arbs(partials)
+        self.progress = limits.progress(total)
+        self.report.finish(self.timer, self.progress)
+        self.release_browser()
+        if self.options.fingerprints is not None:
+            self.options.fingerprints.update(evaluated)
+        if self.options.yields is not None:
+            self.options.yields.record(
+                self.leaving_from,
+                self.going_to,
+                visited,
+                [arb["this destination"] for arb in arbs],
+            )
+
+        return arbs
+
+    def candidate_airports(
+        self, override: bool, override_filename: str, bounded: bool
+    ) -> List[str]:
+        """
+        Airports worth a page load, after the geographic filter and the
+        yield statistics had their say
+
+        :param override: boolean as to whether a custom airport list is needed
+        :param override_filename: custom airport list text file
+        :param bounded: the search may stop early, so the best candidates
+            go first
+        :return: the candidates in the order to search them
+        """
+        airports = self.airport_list(override, override_filename)
+        geo_filter, yields = self.options.geo_filter, self.options.yields
+        if geo_filter is not None:
+            airports, stats = geo_filter.query(
+                self.leaving_from, self.going_to, airports
+            )
+            if self.report is not None:
+                self.report.filtered(stats)
+            if bounded:
+                airports = geo_filter.index.prioritize(airports)
+        if yields is not None:
+            plan = yields.plan(
+                self.leaving_from,
+                self.going_to,
+                [a for a in airports if a != self.leaving_from],
+            )
+            print(
+                f"searching {len(plan.searched)} of "
+                f"{len(plan.searched) + len(plan.skipped)} candidate "
+                f"airports, expected recall {plan.expected_recall:.0%}",
+                file=sys.stderr,
             )
+            airports = plan.searched
+            if bounded:
+                airports.sort(
+                    key=lambda airport: -yields.rate(  # type: ignore
+                        self.leaving_from, self.going_to, airport
+                    )
+                )
+        return airports
 
+    def airport_list(
+        self, override: bool, override_filename: str
+    ) -> List[str]:
+        """
+        Airports the search may visit, before any filtering
+
+        :param override: boolean as to whether a custom airport list is needed
+        :param override_filename: custom airport list text file
+        :return: the airport list
+        """
+        return self.airports_to_search(
+            override=override,
+            override_filename=override_filename,
+            governor=self.options.governor,
+        )
+
+    def load_airport(self, airport: str) -> None:
+        """
+        Loads the results page of a hidden city candidate
+
+        :param airport: final destination of the tickets to list
+        :return: nothing
+        """
+        with self.timer.phase("page load"):
             try:
-                self.browser.get(url)
+                self.load(self.search_url(airport))
             except Exception as error:
-                print(f"error opening up browser with error: {error}")
-                return []
+                raise PageLoadError(error) from error
 
-            time.sleep(2)
+            self.pause(2)
 
-            try_count = 0
-            search = self.retrieve_elements_by_xpath(
-                self.browser, self.offerings
-            )
+    def route_offers(self, destination: str, tries: int) -> List[Offer]:
+        """
+        Loads and parses the results page of a route from leaving_from
 
-            while not search and try_count < tries:
-                search = self.retrieve_elements_by_xpath(
-                    self.browser, self.offerings
-                )
+        With a coalescer, searches asking for the same route at the same
+        time share one page load and its offers.
 
-                try_count += 1
-                time.sleep(1)
+        :param destination: airport the tickets fly to
+        :param tries: number of tries to wait for listings to render
+        :return: the offers on the page
+        """
 
-            lowest_ticket = []
-            bad_count = 0
-            for search_object in search:
-                new_searches = self.retrieve_element_by_xpath(
-                    search_object, "." + self.layovers
-                )
-                if not new_searches:
-                    bad_count += 1
-                    continue
-                find_all = re.findall(r"\(.*?\)", new_searches.text)
-                stops = [location.strip("()") for location in find_all]
+        def fetch() -> List[Offer]:
+            with self.timer.scope(destination):
+                self.load_airport(destination)
+                with self.timer.phase("listings"):
+                    return self.page_offers(tries=tries)
 
-                price_found = self.retrieve_element_by_xpath(
-                    search_object, "." + self.price
-                )
-                if not price_found:
-                    bad_count += 1
-                    continue
+        if self.options.coalescer is None:
+            return fetch()
+        key = route_key(
+            self.leaving_from, destination, self.date, self.site.name
+        )
+        return list(self.options.coalescer.do(key, fetch))
 
-                ticket_price = float(
-                    price_found.text[1:].replace(",", "").replace(".", "")
-                )
-                if ticket_price < base and self.going_to in stops:
-                    print("arbitrage with destination:", airport)
+    def pace(self) -> None:
+        """
+        Stays polite between page loads unless the governor paces them
 
-                    departure = self.retrieve_element_by_xpath(
-                        search_object, "." + self.departure_time
-                    )
-                    if not departure:
-                        continue
-                    departure_value = departure.text.split("-")[0].strip()
-
-                    evaluation_price = base
-                    if not departure_dict[departure_value]:
-                        savings = base - ticket_price
-                    else:
-                        evaluation_price = min(departure_dict[departure_value])
-                        savings = (
-                            min(departure_dict[departure_value]) - ticket_price
-                        )
-                    arbs.append(
-                        {
-                            "airport destination": self.going_to,
-                            "airport source": self.leaving_from,
-                            "base price": base,
-                            "this ticket price": ticket_price,
-                            "eval price": evaluation_price,
-                            "this destination": airport,
-                            "savings": savings,
-                        }
-                    )
-                lowest_ticket.append(ticket_price)
+        :return: nothing
+        """
+        # the governor paces the next page load, otherwise stay polite
+        if self.options.governor is None:
+            with self.timer.phase("pacing"):
+                self.pause(2)
 
-            if search and len(search) != bad_count:
-                print(
-                    f"done with airport: {airport} | "
-                    f"cheapest ticket with layovers: {min(lowest_ticket)}"
+    def evaluate_airport(
+        self,
+        airport: str,
+        found: Union[List[Offer], ElementsType],
+        base: float,
+        departure_dict: DefaultDict[str, set],
+        page_source: bool,
+    ) -> list:
+        """
+        Evaluates the listings of one airport and reports on them
+
+        :param airport: final destination of the listed tickets
+        :param found: parsed offers or listing elements of the page
+        :param base: price of the cheapest direct ticket
+        :param departure_dict: direct ticket prices keyed by departure time
+        :param page_source: found holds parsed offers
+        :return: the arbitrage opportunities of the airport
+        """
+        if page_source:
+            offers: List[Offer] = found  # type: ignore
+            listings = len(offers)
+            with self.timer.phase("evaluation"):
+                airport_arbs, lowest_ticket, bad_count = self.evaluate_offers(
+                    airport, offers, base, departure_dict
                 )
-            else:
-                print(
-                    f"done with airport: {airport} | "
-                    f"no available flights from {self.leaving_from}"
-                    f" to {airport}"
+        else:
+            search: ElementsType = found  # type: ignore
+            listings = len(search) if search else 0
+            with self.timer.phase("evaluation"):
+                (
+                    airport_arbs,
+                    lowest_ticket,
+                    bad_count,
+                ) = self.evaluate_elements(
+                    airport, search, base, departure_dict
                 )
 
-            time.sleep(2)
-
-        self.browser.quit()
+        if listings and listings != bad_count:
+            print(
+                f"done with airport: {airport} | "
+                f"cheapest ticket with layovers: {min(lowest_ticket)}",
+                file=sys.stderr,
+            )
+        else:
+            print(
+                f"done with airport: {airport} | "
+                f"no available flights from {self.leaving_from}"
+                f" to {airport}",
+                file=sys.stderr,
+            )
+        if self.report is not None:
+            self.report.evaluated(
+                airport, listings, bad_count, len(airport_arbs)
+            )
+        if self.options.dataset is not None:
+            self.options.dataset.record(
+                self, airport, found if page_source else [], airport_arbs
+            )
 
-        return arbs
+        return airport_arbs
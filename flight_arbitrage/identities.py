@@ -0,0 +1,586 @@
+"""Proxy, user agent and cookie jar identities of browser and http sessions"""
+
+import json
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Set,
+)
+from urllib.parse import urlsplit
+
+from flight_arbitrage._lazy import LazyObject
+from flight_arbitrage.fingerprints import merge_json
+from flight_arbitrage.governor import browser_throttled, looks_throttled
+
+if TYPE_CHECKING:
+    import requests
+else:  # pylint: disable=invalid-name
+    requests = LazyObject("requests")
+
+
+class Identity(NamedTuple):
+    """What a session looks like to the site"""
+
+    name: str
+    # proxy url, e.g. 'http://10.0.0.2:3128' or 'socks5://10.0.0.3:1080',
+    # empty to connect directly
+    proxy: str = ""
+    # user agent header, empty for the browser's own
+    user_agent: str = ""
+    # json cookie jar kept between sessions, empty to keep no cookies
+    cookies: str = ""
+
+
+class IdentityHealth(NamedTuple):
+    """Outcomes of the pages loaded with one identity"""
+
+    pages: int = 0
+    failures: int = 0
+    # moving average of the seconds a successful page took
+    latency: float = 0.0
+    # failed or throttled pages in a row
+    strikes: int = 0
+    # clock time until which the identity is left to cool down
+    blocked_until: float = 0.0
+
+
+def load_identities(path: str) -> List[Identity]:
+    """
+    Reads identities from a json list of objects
+
+    Each object may have 'name', 'proxy', 'user_agent' and 'cookies' keys,
+    unnamed identities are named after their proxy.
+
+    :param path: identities file path
+    :return: the identities in file order
+    """
+    with open(path, "r") as file:
+        entries = json.load(file)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must hold a non-empty list of identities")
+
+    identities = []
+    for number, entry in enumerate(entries, start=1):
+        unknown = set(entry) - set(Identity._fields)
+        if unknown:
+            raise ValueError(
+                f"identity {number} of {path} has unknown keys: "
+                f"{', '.join(sorted(unknown))}"
+            )
+        name = entry.get("name") or entry.get("proxy") or f"direct {number}"
+        identities.append(Identity(**dict(entry, name=name)))
+    names = [identity.name for identity in identities]
+    if len(set(names)) < len(names):
+        raise ValueError(f"every identity of {path} needs a different name")
+    return identities
+
+
+class IdentityPool:
+    """
+    Hands identities to sessions, healthiest and least busy first
+
+    Every page loaded with an identity is reported back with its latency
+    and whether it failed or looked throttled. An identity's score is its
+    smoothed success rate, (successes + 1) / (pages + 2), divided by
+    1 + latency / latency_scale, so blocked and slow identities sink.
+    A failed or throttled page also benches the identity for a cooldown
+    that doubles with every further strike, and sessions holding a
+    benched identity, or one scoring below switch_ratio of the best idle
+    one, switch to another before their next page.
+
+    >>> pool = IdentityPool(load_identities('identities.json'))
+    >>> flight = OneWay('JFK', 'SLC', '07/10/2021', identities=pool)
+    """
+
+    def __init__(
+        self,
+        identities: List[Identity],
+        cooldown: float = 60.0,
+        max_cooldown: float = 3600.0,
+        latency_scale: float = 5.0,
+        switch_ratio: float = 0.5,
+        smoothing: float = 0.3,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        IdentityPool constructor
+
+        :param identities: identities to hand out, at least one
+        :param cooldown: seconds an identity is benched after its first
+            failed or throttled page in a row
+        :param max_cooldown: longest bench, however many strikes
+        :param latency_scale: page seconds that halve an identity's score
+        :param switch_ratio: share of the best idle identity's score below
+            which a session switches identity
+        :param smoothing: weight of the latest page in the latency average
+        :param clock: returns the current time, as time.monotonic
+        """
+        if not identities:
+            raise ValueError("an identity pool needs at least one identity")
+        self.identities = list(identities)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.latency_scale = latency_scale
+        self.switch_ratio = switch_ratio
+        self.smoothing = smoothing
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.health: Dict[str, IdentityHealth] = {
+            identity.name: IdentityHealth() for identity in identities
+        }
+        self.in_use: Dict[str, int] = {
+            identity.name: 0 for identity in identities
+        }
+        self.switches = 0
+
+    def score(self, identity: Identity) -> float:
+        """
+        Health score of an identity
+
+        :param identity: identity of the pool
+        :return: score between 0 and 1, higher is healthier
+        """
+        health = self.health[identity.name]
+        success = (health.pages - health.failures + 1) / (health.pages + 2)
+        return success / (1.0 + health.latency / self.latency_scale)
+
+    def available(self, identity: Identity) -> bool:
+        """
+        Whether an identity is not cooling down
+
+        :param identity: identity of the pool
+        :return: False while the identity is benched
+        """
+        return self.health[identity.name].blocked_until <= self.clock()
+
+    def acquire(self) -> Identity:
+        """
+        Picks the identity for a new session
+
+        Identities that are not benched are ranked by score shared among
+        the sessions already using them. If every identity is benched, the
+        one back soonest is picked.
+
+        :return: the identity, to be released when the session ends
+        """
+        with self.lock:
+            candidates = [
+                identity
+                for identity in self.identities
+                if self.available(identity)
+            ]
+            if candidates:
+                identity = max(
+                    candidates,
+                    key=lambda item: (
+                        self.score(item) / (1 + self.in_use[item.name]),
+                        -self.health[item.name].pages,
+                    ),
+                )
+            else:
+                identity = min(
+                    self.identities,
+                    key=lambda item: self.health[item.name].blocked_until,
+                )
+            self.in_use[identity.name] += 1
+            return identity
+
+    def release(self, identity: Identity) -> None:
+        """
+        Ends the use of an identity by a session
+
+        :param identity: identity handed out by acquire
+        :return: nothing
+        """
+        with self.lock:
+            self.in_use[identity.name] = max(0, self.in_use[identity.name] - 1)
+
+    def observe(self, identity: Identity, seconds: float, ok: bool) -> None:
+        """
+        Records the outcome of a page loaded with an identity
+
+        :param identity: identity the page was loaded with
+        :param seconds: time the page took
+        :param ok: False if the page failed or looked throttled
+        :return: nothing
+        """
+        with self.lock:
+            health = self.health[identity.name]
+            if ok:
+                latency = (
+                    seconds
+                    if health.pages == health.failures
+                    else health.latency
+                    + self.smoothing * (seconds - health.latency)
+                )
+                health = health._replace(
+                    pages=health.pages + 1, latency=latency, strikes=0
+                )
+            else:
+                strikes = health.strikes + 1
+                bench = min(
+                    self.max_cooldown, self.cooldown * 2 ** (strikes - 1)
+                )
+                health = health._replace(
+                    pages=health.pages + 1,
+                    failures=health.failures + 1,
+                    strikes=strikes,
+                    blocked_until=self.clock() + bench,
+                )
+            self.health[identity.name] = health
+
+    def should_switch(self, identity: Identity) -> bool:
+        """
+        Whether a session should move to another identity
+
+        :param identity: identity the session holds
+        :return: True if the identity is benched, or scores below
+            switch_ratio of the best idle identity
+        """
+        with self.lock:
+            if not self.available(identity):
+                return any(
+                    self.available(other)
+                    for other in self.identities
+                    if other != identity
+                )
+            idle = [
+                self.score(other)
+                for other in self.identities
+                if other != identity
+                and not self.in_use[other.name]
+                and self.available(other)
+            ]
+            return bool(idle) and self.score(
+                identity
+            ) < self.switch_ratio * max(idle)
+
+    def report(self) -> str:
+        """
+        Health of every identity, healthiest first
+
+        :return: one line per identity
+        """
+        with self.lock:
+            ranked = sorted(self.identities, key=self.score, reverse=True)
+            lines = [f"identity switches: {self.switches}"]
+            for identity in ranked:
+                health = self.health[identity.name]
+                lines.append(
+                    f"{identity.name}: score {self.score(identity):.2f}, "
+                    f"{health.pages} pages, {health.failures} failed, "
+                    f"{health.latency * 1000:.0f} ms"
+                    + ("" if self.available(identity) else ", cooling down")
+                )
+        return "\n".join(lines)
+
+
+def chrome_arguments(identity: Identity) -> List[str]:
+    """
+    Chrome command-line switches of an identity
+
+    :param identity: identity of the session
+    :return: switches to add to the chrome options
+    """
+    arguments = []
+    if identity.proxy:
+        arguments.append(f"--proxy-server={identity.proxy}")
+    if identity.user_agent:
+        arguments.append(f"--user-agent={identity.user_agent}")
+    return arguments
+
+
+def firefox_preferences(identity: Identity) -> Dict[str, Any]:
+    """
+    Firefox preferences of an identity
+
+    :param identity: identity of the session
+    :return: preferences to set on the firefox options
+    """
+    preferences: Dict[str, Any] = {}
+    if identity.user_agent:
+        preferences["general.useragent.override"] = identity.user_agent
+    if identity.proxy:
+        parts = urlsplit(identity.proxy)
+        if not parts.hostname or not parts.port:
+            raise ValueError(f"proxy {identity.proxy} needs a host and port")
+        # manual proxy configuration
+        preferences["network.proxy.type"] = 1
+        if parts.scheme.startswith("socks"):
+            preferences["network.proxy.socks"] = parts.hostname
+            preferences["network.proxy.socks_port"] = parts.port
+            preferences["network.proxy.socks_version"] = (
+                4 if parts.scheme == "socks4" else 5
+            )
+            preferences["network.proxy.socks_remote_dns"] = True
+        else:
+            for protocol in ("http", "ssl"):
+                preferences[f"network.proxy.{protocol}"] = parts.hostname
+                preferences[f"network.proxy.{protocol}_port"] = parts.port
+    return preferences
+
+
+def read_jar(path: str) -> List[dict]:
+    """
+    Cookies of a json cookie jar
+
+    :param path: cookie jar path, may be empty or missing
+    :return: cookies in selenium's form, with name, value and domain
+    """
+    if not path:
+        return []
+    try:
+        with open(path, "r") as file:
+            return list(json.load(file).values())
+    except (OSError, ValueError):
+        return []
+
+
+def save_jar(path: str, cookies: List[dict]) -> None:
+    """
+    Merges cookies into a json cookie jar shared by sessions
+
+    :param path: cookie jar path
+    :param cookies: cookies in selenium's form
+    :return: nothing
+    """
+    if not path or not cookies:
+        return
+    merge_json(
+        path,
+        lambda saved: saved.update(
+            {
+                " ".join(
+                    (
+                        cookie.get("domain", ""),
+                        cookie.get("path", "/"),
+                        cookie["name"],
+                    )
+                ): cookie
+                for cookie in cookies
+            }
+        ),
+    )
+
+
+def matches_host(cookie: dict, host: str) -> bool:
+    """
+    Whether a cookie is sent to a host
+
+    :param cookie: cookie in selenium's form
+    :param host: host name of a url
+    :return: True for the cookie's domain and its subdomains
+    """
+    domain = cookie.get("domain", "").lstrip(".").lower()
+    return bool(domain) and (host == domain or host.endswith("." + domain))
+
+
+class IdentityBrowser:
+    """
+    Browser wrapper that runs a session under identities of a pool
+
+    Every page load is timed, checked for throttling and reported to the
+    pool. Before a page load, a session whose identity is benched or
+    falling behind switches: its cookies are saved, its browser quits and
+    a browser with a fresh identity takes over. The cookie jar of an
+    identity is restored on the first page of every host, so its cookies
+    apply from the next page on. Every attribute other than get and quit
+    is forwarded to the current browser.
+    """
+
+    def __init__(
+        self, pool: IdentityPool, factory: Callable[[Identity], Any]
+    ) -> None:
+        """
+        IdentityBrowser constructor, opens the first browser
+
+        :param pool: identities to run the session under
+        :param factory: opens a browser with the proxy and user agent of
+            an identity
+        """
+        self._pool = pool
+        self._factory = factory
+        self._restored: Set[str] = set()
+        self.switches = 0
+        self.identity = pool.acquire()
+        self._browser: Any = None
+        self._browser = self._open(self.identity)
+
+    def _open(self, identity: Identity) -> Any:
+        """
+        Opens a browser, releasing the identity if that fails
+
+        :param identity: identity handed out by the pool
+        :return: the browser
+        """
+        try:
+            return self._factory(identity)
+        except Exception:
+            self._pool.release(identity)
+            raise
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._browser, name)
+
+    @property
+    def browser(self) -> Any:
+        """
+        Browser opened with the current identity
+
+        :return: the webdriver
+        """
+        return self._browser
+
+    def get(self, url: str) -> None:
+        """
+        Loads a page, switching identity first if the pool says so
+
+        :param url: page url
+        :return: nothing
+        """
+        if self._pool.should_switch(self.identity):
+            self.switch()
+
+        started = time.perf_counter()
+        try:
+            self._browser.get(url)
+        except Exception:
+            self._pool.observe(
+                self.identity, time.perf_counter() - started, False
+            )
+            raise
+        seconds = time.perf_counter() - started
+        throttled = browser_throttled(self._browser)
+        self._pool.observe(self.identity, seconds, not throttled)
+
+        host = (urlsplit(url).hostname or "").lower()
+        if self.identity.cookies and host and host not in self._restored:
+            self._restored.add(host)
+            for cookie in read_jar(self.identity.cookies):
+                if matches_host(cookie, host):
+                    try:
+                        self._browser.add_cookie(cookie)
+                    except Exception:  # pylint: disable=broad-except
+                        continue
+
+    def save_cookies(self) -> None:
+        """
+        Saves the cookies of the current page to the identity's jar
+
+        :return: nothing
+        """
+        if not self.identity.cookies:
+            return
+        try:
+            cookies = self._browser.get_cookies()
+        except Exception:  # pylint: disable=broad-except
+            return
+        save_jar(self.identity.cookies, cookies)
+
+    def end(self) -> None:
+        """
+        Saves cookies, quits the browser and releases the identity
+
+        :return: nothing
+        """
+        self.save_cookies()
+        try:
+            self._browser.quit()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        self._pool.release(self.identity)
+
+    def switch(self) -> None:
+        """
+        Moves the session to the best identity the pool has to offer
+
+        :return: nothing
+        """
+        self.end()
+        self.identity = self._pool.acquire()
+        self._browser = self._open(self.identity)
+        self._restored = set()
+        self.switches += 1
+        with self._pool.lock:
+            self._pool.switches += 1
+
+    def quit(self) -> None:
+        """
+        Ends the session
+
+        :return: nothing
+        """
+        self.end()
+
+
+def http_session(identity: Identity) -> "requests.Session":
+    """
+    Requests session with the proxy, user agent and cookies of an identity
+
+    A session with a proxy ignores proxy environment variables, so the
+    identity alone decides where requests leave from.
+
+    :param identity: identity of the session
+    :return: the session
+    """
+    session = requests.Session()
+    if identity.proxy:
+        session.trust_env = False
+        session.proxies = {"http": identity.proxy, "https": identity.proxy}
+    if identity.user_agent:
+        session.headers["User-Agent"] = identity.user_agent
+    for cookie in read_jar(identity.cookies):
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain", ""),
+            path=cookie.get("path", "/"),
+        )
+    return session
+
+
+def fetch(
+    pool: IdentityPool, url: str, timeout: float = 30.0
+) -> "requests.Response":
+    """
+    Gets a url with the best identity of a pool and reports how it went
+
+    :param pool: identities to pick from
+    :param url: url to get
+    :param timeout: seconds to wait for a response
+    :return: the response, error statuses included
+    """
+    identity = pool.acquire()
+    started = time.perf_counter()
+    try:
+        with http_session(identity) as session:
+            response = session.get(url, timeout=timeout)
+            save_jar(
+                identity.cookies,
+                [
+                    {
+                        "name": cookie.name,
+                        "value": cookie.value,
+                        "domain": cookie.domain,
+                        "path": cookie.path,
+                    }
+                    for cookie in session.cookies
+                ],
+            )
+    except requests.RequestException:
+        pool.observe(identity, time.perf_counter() - started, False)
+        raise
+    finally:
+        pool.release(identity)
+    pool.observe(
+        identity,
+        time.perf_counter() - started,
+        not looks_throttled(response.status_code, response.text),
+    )
+    return response
@@ -0,0 +1,208 @@
+"""Hidden city search over itineraries of several one-way legs"""
+
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple
+
+from flight_arbitrage._lazy import LazyObject
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.fares import base_fare, evaluate_fare
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.legs import Leg, LegCache, LegOption, pairings
+from flight_arbitrage.limits import SearchLimits
+
+if TYPE_CHECKING:
+    from tqdm import tqdm  # type: ignore
+else:
+    tqdm = LazyObject("tqdm", "tqdm")
+
+
+class MultiLeg(OneWay):
+    """
+    Find hidden city arbitrage over itineraries of several one-way legs
+
+    Hidden city tickets cannot be booked as one round trip, since skipping
+    a segment cancels the rest of the booking, so every leg is bought as
+    its own one-way ticket. Each distinct leg search is scraped once into a
+    LegCache and every pairing of leg options is evaluated from the cache.
+    """
+
+    def __init__(
+        self,
+        legs: Sequence[Tuple[str, str, str]],
+        cache: Optional[LegCache] = None,
+        **kwargs,
+    ) -> None:
+        """
+        MultiLeg constructor
+
+        :param legs: (origin, destination, date) of each leg, in order
+        :param cache: leg cache to share with other searches, by default a
+            new cache fetching through this object's browser
+        :param kwargs: further Flight constructor arguments
+        """
+        if not legs:
+            raise ValueError("an itinerary needs at least one leg")
+
+        self.legs = [Leg(*leg) for leg in legs]
+        super().__init__(*self.legs[0], **kwargs)
+
+        self.cache = cache if cache is not None else LegCache(self.fetch_leg)
+        self.tries = 3
+        self.limits = SearchLimits()
+
+    def fetch_leg(self, leg: Leg) -> List[Offer]:
+        """
+        Loads and parses the results page of a leg
+
+        :param leg: leg to search
+        :return: the parsed offers
+        """
+        self.load(self.search_url(leg.destination, leg.origin, leg.date))
+        self.pause(2)
+
+        return self.page_offers(tries=self.tries)
+
+    def leg_options(self, leg: Leg, airports: List[str]) -> List[LegOption]:
+        """
+        The direct ticket of a leg and every cheaper hidden city ticket
+
+        :param leg: leg to fly
+        :param airports: candidate final destinations of hidden city tickets
+        :return: the options, empty if the leg has no direct fare
+        """
+        base, departure_dict = base_fare(self.cache.offers(leg))
+        if base < 0:
+            return []
+
+        options = [LegOption(leg, leg.destination, base, base, base, 0.0)]
+        for airport in airports:
+            if airport in (leg.origin, leg.destination):
+                continue
+            # leg pages shared through the cache only cost a page once
+            if self.limits.reached(self.cache.fetches):
+                break
+            self.limits.pages += 1
+
+            for offer in self.cache.offers(Leg(leg.origin, airport, leg.date)):
+                if (
+                    offer.price is None
+                    or offer.stops is None
+                    or offer.departure is None
+                ):
+                    continue
+
+                if offer.price < base and leg.destination in offer.stops:
+                    evaluation_price, savings = evaluate_fare(
+                        base, departure_dict, offer.price, offer.departure
+                    )
+                    options.append(
+                        LegOption(
+                            leg,
+                            airport,
+                            offer.price,
+                            base,
+                            evaluation_price,
+                            savings,
+                        )
+                    )
+
+        return options
+
+    def find_arbitrage(  # pylint: disable=duplicate-code
+        self,
+        override: bool = False,
+        override_filename: str = "airports.txt",
+        web_browser: str = "firefox",
+        driver: str = "",
+        headless: bool = False,
+        tries: int = 3,
+        page_source: bool = True,
+        deadline: float = 0.0,
+        max_pages: int = 0,
+    ) -> list:
+        """
+        Evaluates hidden city options of every leg and all their pairings
+
+        A deadline or page budget ends the leg searches early, the pairings
+        are then made from the options found so far. Legs without a direct
+        fare are listed as incomplete rather than dropping the itinerary.
+
+        :param override: boolean as to whether a custom airport list is needed
+        :param override_filename: custom airport list text file
+        :param web_browser: web browser to use
+        :param driver: web browser selenium driver path
+        :param headless: boolean to decide to open a browser in headless mode
+        :param tries: number of tries to load the website content
+        :param page_source: must be True, legs are cached as parsed pages
+        :param deadline: seconds the search may take, 0 for no limit
+        :param max_pages: leg pages to load at most, 0 for no limit
+        :return: itineraries with a hidden city leg, largest savings first
+
+        >>> trip = RoundTrip('JFK', 'SLC', '07/10/2021', '07/17/2021')
+        >>> for itinerary in trip.find_arbitrage(headless=True)[:5]:
+        >>>     print(itinerary['savings'], itinerary['legs'])
+        """
+        if not page_source:
+            raise ValueError("multi-leg searches always parse page sources")
+
+        self.tries = tries
+        self.limits = SearchLimits(deadline, max_pages)
+        with self.timer.phase("open browser"):
+            self.open_browser(
+                web_browser=web_browser, driver=driver, headless=headless
+            )
+
+        assert (
+            self.browser is not None
+        ), "browser variable is the wrong data type"
+
+        try:
+            with self.timer.phase("airport list"):
+                airports = self.airport_list(override, override_filename)
+
+            options_per_leg = []
+            for leg in tqdm(self.legs):
+                with self.timer.phase("legs"):
+                    options_per_leg.append(self.leg_options(leg, airports))
+        finally:
+            self.release_browser()
+
+        self.progress = self.limits.progress(
+            sum(
+                airport not in (leg.origin, leg.destination)
+                for leg in self.legs
+                for airport in airports
+            )
+        )
+
+        with self.timer.phase("evaluation"):
+            return pairings(self.legs, options_per_leg)
+
+
+class RoundTrip(MultiLeg):
+    """Find hidden city arbitrage for a trip out to a hub and back"""
+
+    def __init__(
+        self,
+        origin: str,
+        destination: str,
+        outbound_date: str,
+        return_date: str,
+        **kwargs,
+    ) -> None:
+        """
+        RoundTrip constructor
+
+        :param origin: airport where the trip starts and ends
+        :param destination: airport that is the outbound destination
+        :param outbound_date: date of the outbound flight
+        :param return_date: date of the return flight
+        :param kwargs: further MultiLeg constructor arguments
+        """
+        super().__init__(
+            [
+                (origin, destination, outbound_date),
+                (destination, origin, return_date),
+            ],
+            **kwargs,
+        )
+        self.return_date = return_date
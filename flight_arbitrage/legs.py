@@ -0,0 +1,137 @@
+"""Flight legs: a scrape-once cache of their offers and their pairings"""
+
+import itertools
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from flight_arbitrage.extraction import Offer
+
+
+class Leg(NamedTuple):
+    """A one-way ticket search: origin, destination and date"""
+
+    origin: str
+    destination: str
+    date: str
+
+
+class LegCache:
+    """
+    Offers of every distinct leg, fetched at most once
+
+    Itineraries that share a leg, or hidden city candidates that share a
+    ticket search, read the same cached offers, so page loads scale with
+    the number of distinct legs rather than with the number of
+    combinations evaluated.
+    """
+
+    def __init__(self, fetch: Callable[[Leg], List[Offer]]) -> None:
+        """
+        LegCache constructor
+
+        :param fetch: loads and parses the results page of a leg
+        """
+        self.fetch = fetch
+        self.pages: Dict[Leg, List[Offer]] = {}
+        self.fetches = 0
+        self.hits = 0
+
+    def __contains__(self, leg: object) -> bool:
+        return leg in self.pages
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def offers(self, leg: Leg) -> List[Offer]:
+        """
+        Offers of a leg, fetching its page on first use
+
+        :param leg: leg to look up
+        :return: the offers parsed from the leg's results page
+        """
+        if leg in self.pages:
+            self.hits += 1
+        else:
+            self.pages[leg] = self.fetch(leg)
+            self.fetches += 1
+        return self.pages[leg]
+
+
+class LegOption(NamedTuple):
+    """A way to fly one leg: the direct ticket or a hidden city ticket"""
+
+    leg: Leg
+    ticket_destination: str
+    price: float
+    base: float
+    eval_price: float
+    savings: float
+
+
+def leg_record(leg: Leg, option: Optional[LegOption]) -> Dict[str, Any]:
+    """
+    Result row of one leg of an itinerary
+
+    :param leg: leg flown
+    :param option: ticket chosen for the leg, None if the leg has no direct
+        fare to compare tickets with
+    :return: the leg's fields, 'complete' telling whether it has a ticket
+    """
+    return {
+        "airport source": leg.origin,
+        "airport destination": leg.destination,
+        "date": leg.date,
+        "this destination": option and option.ticket_destination,
+        "this ticket price": option and option.price,
+        "base price": option and option.base,
+        "eval price": option and option.eval_price,
+        "savings": option.savings if option is not None else 0.0,
+        "complete": option is not None,
+    }
+
+
+def pairings(legs: List[Leg], options_per_leg: List[List[LegOption]]) -> list:
+    """
+    Evaluates every combination of leg options with a hidden city leg
+
+    Legs without options, i.e. without a direct fare, do not void the
+    itinerary: the options of the other legs are still paired, and the
+    itinerary lists the bare leg flagged as incomplete. Prices and savings
+    then only cover the complete legs.
+
+    :param legs: legs of the itinerary, in order
+    :param options_per_leg: options of each leg, in itinerary order
+    :return: itineraries with their savings, largest savings first
+    """
+    # a leg without options still takes its place in every combination
+    choices: List[List[Optional[LegOption]]] = [
+        list(options) if options else [None] for options in options_per_leg
+    ]
+    itineraries: List[Dict[str, Any]] = []
+    for combination in itertools.product(*choices):
+        chosen = [option for option in combination if option is not None]
+        if all(
+            option.ticket_destination == option.leg.destination
+            for option in chosen
+        ):
+            continue
+
+        itineraries.append(
+            {
+                "legs": [
+                    leg_record(leg, option)
+                    for leg, option in zip(legs, combination)
+                ],
+                "base price": sum(option.base for option in chosen),
+                "total price": sum(option.price for option in chosen),
+                "savings": sum(option.savings for option in chosen),
+                "complete": len(chosen) == len(legs),
+            }
+        )
+
+    itineraries.sort(
+        key=lambda itinerary: (
+            -itinerary["savings"],
+            [leg["this destination"] or "" for leg in itinerary["legs"]],
+        )
+    )
+    return itineraries
@@ -0,0 +1,113 @@
+"""Deadlines and page budgets of bounded searches"""
+
+import time
+from typing import Iterable, Iterator, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class SearchProgress(NamedTuple):
+    """How much of its candidate list a search got through"""
+
+    candidates: int
+    searched: int
+    # why the search stopped early, empty if every candidate was searched
+    stopped: str = ""
+
+    @property
+    def complete(self) -> bool:
+        """
+        Whether every candidate was searched
+
+        :return: True for a complete search
+        """
+        return not self.stopped
+
+    @property
+    def share(self) -> float:
+        """
+        Share of the candidates that was searched
+
+        :return: searched over candidates, 1.0 without candidates
+        """
+        return self.searched / self.candidates if self.candidates else 1.0
+
+
+class DeepScan(NamedTuple):
+    """Budget for loading more listings into one results page"""
+
+    # "show more" presses or scrolls per page
+    rounds: int = 3
+    # seconds a page may spend loading more listings
+    seconds: float = 10.0
+    # seconds to wait for listings after each press or scroll
+    settle: float = 1.0
+
+
+class SearchLimits:
+    """
+    Deadline and page budget of one search
+
+    The clock starts when the limits are made. Once a limit is reached no
+    further work is handed out and stopped tells which limit it was; work
+    handed out before then is still finished, so results always match the
+    pages that were actually loaded.
+    """
+
+    def __init__(self, deadline: float = 0.0, max_pages: int = 0) -> None:
+        """
+        SearchLimits constructor
+
+        :param deadline: seconds the search may take, 0 for no limit
+        :param max_pages: pages the search may load, 0 for no limit
+        """
+        self.deadline_at = time.monotonic() + deadline if deadline else 0.0
+        self.max_pages = max_pages
+        self.pages = 0
+        self.stopped = ""
+
+    @property
+    def bounded(self) -> bool:
+        """
+        Whether the search has any limit
+
+        :return: True if a deadline or page budget is set
+        """
+        return bool(self.deadline_at or self.max_pages)
+
+    def reached(self, pages: Optional[int] = None) -> bool:
+        """
+        Checks the limits, recording the first one reached
+
+        :param pages: pages loaded so far, defaults to the pages handed out
+        :return: True once a limit is reached
+        """
+        pages = self.pages if pages is None else pages
+        if not self.stopped:
+            if self.max_pages and pages >= self.max_pages:
+                self.stopped = "page budget"
+            elif self.deadline_at and time.monotonic() >= self.deadline_at:
+                self.stopped = "deadline"
+        return bool(self.stopped)
+
+    def take(self, items: Iterable[T]) -> Iterator[T]:
+        """
+        Hands out items, one page each, until a limit is reached
+
+        :param items: work in the order it should be done
+        :return: iterator of the items within the limits
+        """
+        for item in items:
+            if self.reached():
+                return
+            self.pages += 1
+            yield item
+
+    def progress(self, candidates: int) -> SearchProgress:
+        """
+        Progress of the search
+
+        :param candidates: work the search had in total
+        :return: the progress, with the pages handed out as searched
+        """
+        return SearchProgress(candidates, self.pages, self.stopped)
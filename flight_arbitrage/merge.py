@@ -0,0 +1,67 @@
+"""Order-independent merging of per-airport arbitrage results"""
+
+import json
+from typing import Counter, Dict, Iterable, List, Tuple
+
+
+def canonical(arb: dict) -> str:
+    """
+    Canonical form of an arbitrage record, equal for equal records
+
+    :param arb: arbitrage record
+    :return: json with sorted keys
+    """
+    return json.dumps(arb, sort_keys=True)
+
+
+def arb_order(arb: dict) -> Tuple[float, float, str, str, str]:
+    """
+    Sort key of an arbitrage record, best savings first
+
+    Ties are broken by ticket price, site and candidate airport, and
+    finally by the whole record, so distinct records never tie and the
+    order does not depend on the order they were found in.
+
+    :param arb: arbitrage record
+    :return: the sort key
+    """
+    return (
+        -arb["savings"],
+        arb["this ticket price"],
+        arb.get("provider", ""),
+        arb["this destination"],
+        canonical(arb),
+    )
+
+
+def merge_arbs(partials: Iterable[Iterable[dict]]) -> List[dict]:
+    """
+    Merges partial arbitrage results into one deterministic list
+
+    Partial results, e.g. of each candidate airport's page, may arrive in
+    any order and overlap, as when pages are loaded concurrently, shared
+    between searches or evaluated again. Records hold no flight identity,
+    so equal records on one page are distinct flights at the same fare and
+    are all kept, while a page evaluated again repeats its records: each
+    record is kept as many times as the partial holding it most often, and
+    the records sorted by arb_order. The merge of the same partials is then
+    the same list whatever their order or the number of workers. Savings
+    are computed before merging against the same direct fares, so merging
+    never changes them.
+
+    :param partials: partial lists of arbitrage records
+    :return: the records of every page, once per flight, best savings first
+    """
+    records: Dict[str, dict] = {}
+    counts: Counter[str] = Counter()
+    for partial in partials:
+        found: Counter[str] = Counter()
+        for arb in partial:
+            key = canonical(arb)
+            records.setdefault(key, arb)
+            found[key] += 1
+        counts |= found
+    return sorted(
+        (arb for key, arb in records.items() for _ in range(counts[key])),
+        key=arb_order,
+    )
@@ -0,0 +1,424 @@
+"""Local mock flight search site and proxies for tests and load runs"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote, urlsplit
+from urllib.request import urlopen
+
+from flight_arbitrage.identities import IdentityPool, fetch
+from flight_arbitrage.snapshots import route_of
+
+# layover airports of the generated listings
+HUBS = ("ATL", "DEN", "DFW", "ORD", "SLC")
+
+LISTING = (
+    '<li data-test-id="offer-listing">'
+    '<span data-test-id="departure-time">{departure} - {arrival}</span>'
+    '<div data-test-id="layovers">{layovers}</div>'
+    '<span class="uitk-lockup-price">${price:,}</span>'
+    "</li>"
+)
+
+THROTTLED_PAGE = "<html><body><h1>Too many requests</h1></body></html>"
+
+
+class SiteConfig(NamedTuple):
+    """Behaviour of the mock site"""
+
+    # seconds every response is delayed, plus up to jitter seconds more
+    latency: float = 0.0
+    jitter: float = 0.0
+    # listings per results page, each page gets between half and all
+    listings: int = 30
+    # share of responses that fail with a 503 throttle page
+    failure_rate: float = 0.0
+    # pages and failures are reproducible for a given seed
+    seed: int = 0
+
+
+def clock(minutes: int) -> str:
+    """
+    Time of day as shown on the results page
+
+    :param minutes: minutes after midnight
+    :return: e.g. '7:05am'
+    """
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    suffix = "am" if hour < 12 else "pm"
+    return f"{(hour - 1) % 12 + 1}:{minute:02d}{suffix}"
+
+
+def listing(
+    price: int,
+    layovers: str = "Nonstop",
+    departure: str = "7:30am",
+    arrival: str = "3:00pm",
+) -> str:
+    """
+    Html of one offer listing, also used as a unit test fixture
+
+    :param price: price in dollars
+    :param layovers: layovers text, e.g. '1 stop (SLC)'
+    :param departure: departure time of day
+    :param arrival: arrival time of day
+    :return: the listing html
+    """
+    return LISTING.format(
+        departure=departure, arrival=arrival, layovers=layovers, price=price
+    )
+
+
+def results_page(
+    origin: str, destination: str, date: str, config: SiteConfig
+) -> str:
+    """
+    Results page of a one-way search, the same for the same route and seed
+
+    Direct routes to a hub list nonstop fares, other routes list fares with
+    up to two layovers at the hubs, so hidden city fares through each hub
+    show up on some pages.
+
+    :param origin: origin airport
+    :param destination: destination airport
+    :param date: flight date
+    :param config: site behaviour
+    :return: html of the page
+    """
+    rng = random.Random(f"{config.seed}:{origin}:{destination}:{date}")
+    hubs = [hub for hub in HUBS if hub not in (origin, destination)]
+    listings = []
+    for _ in range(rng.randint(config.listings // 2, config.listings)):
+        departure = rng.randrange(5 * 60, 22 * 60, 5)
+        stops = sorted(rng.sample(hubs, rng.choice((0, 1, 1, 2))))
+        price = rng.randint(60, 500) + 80 * len(stops)
+        if destination in HUBS and not stops:
+            price += 150
+        listings.append(
+            listing(
+                price,
+                (
+                    " ".join(
+                        [f"{len(stops)} stop{'s' if len(stops) > 1 else ''}"]
+                        + [f"({stop})" for stop in stops]
+                    )
+                    if stops
+                    else "Nonstop"
+                ),
+                clock(departure),
+                clock(departure + rng.randint(90, 420)),
+            )
+        )
+    return f"<html><body><ul>{''.join(listings)}</ul></body></html>"
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    """Serves results pages of the search urls built by OneWay"""
+
+    server: "MockSite"
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Answers a search url with its results page
+
+        :return: nothing
+        """
+        route = route_of(unquote(self.path))
+        delay, failed = self.server.draw()
+        time.sleep(delay)
+
+        if route is None:
+            status, body = 404, "<html><body>Not found</body></html>"
+        elif failed:
+            status, body = 503, THROTTLED_PAGE
+        else:
+            status, body = 200, results_page(*route, self.server.config)
+        self.server.count(status)
+
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:  # pylint: disable=arguments-differ
+        """
+        Keeps the request log off stderr
+
+        :return: nothing
+        """
+
+
+class LocalServer(ThreadingHTTPServer):
+    """Http server on a local port, served from a daemon thread"""
+
+    daemon_threads = True
+
+    def __init__(self, handler: type, port: int = 0) -> None:
+        """
+        LocalServer constructor, starts serving right away
+
+        :param handler: request handler class
+        :param port: port to listen on, 0 for any free port
+        """
+        super().__init__(("127.0.0.1", port), handler)
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(
+            target=self.serve_forever, args=(0.05,), daemon=True
+        )
+        self.thread.start()
+
+    def __enter__(self) -> "LocalServer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def url(self) -> str:
+        """
+        Base url of the server
+
+        :return: e.g. 'http://127.0.0.1:8123'
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def close(self) -> None:
+        """
+        Stops serving and closes the socket
+
+        :return: nothing
+        """
+        self.shutdown()
+        self.server_close()
+        self.thread.join()
+
+
+class MockSite(LocalServer):
+    """
+    Mock flight search site on a local port, served from a daemon thread
+
+    >>> with MockSite(SiteConfig(latency=0.2, failure_rate=0.05)) as site:
+    >>>     archive = SiteArchive(site.url)
+    """
+
+    def __init__(
+        self, config: SiteConfig = SiteConfig(), port: int = 0
+    ) -> None:
+        """
+        MockSite constructor, starts serving right away
+
+        :param config: site behaviour
+        :param port: port to listen on, 0 for any free port
+        """
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.served = 0
+        self.failed = 0
+        super().__init__(MockSiteHandler, port)
+
+    def __enter__(self) -> "MockSite":
+        return self
+
+    def draw(self) -> Tuple[float, bool]:
+        """
+        Delay and outcome of the next response
+
+        :return: seconds to wait and whether the response fails
+        """
+        with self.lock:
+            delay = self.config.latency + self.rng.uniform(
+                0.0, self.config.jitter
+            )
+            return delay, self.rng.random() < self.config.failure_rate
+
+    def count(self, status: int) -> None:
+        """
+        Counts a response
+
+        :param status: http status sent
+        :return: nothing
+        """
+        with self.lock:
+            self.served += 1
+            self.failed += status != 200
+
+
+class ProxyConfig(NamedTuple):
+    """Behaviour of a mock proxy"""
+
+    # seconds every forwarded request is delayed
+    latency: float = 0.0
+    # answer every request with the throttle page, as sites do to an
+    # address they have banned
+    blocked: bool = False
+
+
+class MockProxyHandler(BaseHTTPRequestHandler):
+    """Forwards the absolute urls of proxied requests"""
+
+    server: "MockProxy"
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        """
+        Answers a proxied request with the response of its url
+
+        :return: nothing
+        """
+        self.server.count(self.headers.get("User-Agent", ""))
+        time.sleep(self.server.config.latency)
+
+        if self.server.config.blocked:
+            status, data = 429, THROTTLED_PAGE.encode("utf-8")
+        else:
+            try:
+                with urlopen(self.path, timeout=30.0) as response:
+                    status, data = response.status, response.read()
+            except HTTPError as error:
+                status, data = error.code, error.read()
+            except URLError:
+                status, data = 502, b"<html><body>Bad gateway</body></html>"
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:  # pylint: disable=arguments-differ
+        """
+        Keeps the request log off stderr
+
+        :return: nothing
+        """
+
+
+class MockProxy(LocalServer):
+    """
+    Local http proxy stand-in, for testing identity pools
+
+    >>> with MockProxy(ProxyConfig(blocked=True)) as proxy:
+    >>>     identity = Identity('banned', proxy=proxy.url)
+    """
+
+    def __init__(
+        self, config: ProxyConfig = ProxyConfig(), port: int = 0
+    ) -> None:
+        """
+        MockProxy constructor, starts serving right away
+
+        :param config: proxy behaviour
+        :param port: port to listen on, 0 for any free port
+        """
+        self.config = config
+        self.user_agents: List[str] = []
+        super().__init__(MockProxyHandler, port)
+
+    def __enter__(self) -> "MockProxy":
+        return self
+
+    @property
+    def forwarded(self) -> int:
+        """
+        Requests received, blocked ones included
+
+        :return: request count
+        """
+        with self.lock:
+            return len(self.user_agents)
+
+    def count(self, user_agent: str) -> None:
+        """
+        Counts a request
+
+        :param user_agent: user agent header of the request
+        :return: nothing
+        """
+        with self.lock:
+            self.user_agents.append(user_agent)
+
+
+class SiteArchive:
+    """
+    Page archive fetching every page from a mock site
+
+    Used with a ReplayBrowser, OneWay searches run against the mock site
+    over http without starting a browser. Fetch latencies and failed
+    responses are kept for load reports.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        identities: Optional[IdentityPool] = None,
+    ) -> None:
+        """
+        SiteArchive constructor
+
+        :param base_url: base url of the site, e.g. MockSite.url
+        :param timeout: seconds to wait for a response
+        :param identities: fetch every page with an identity of the pool,
+            e.g. through MockProxy stand-ins, instead of directly
+        """
+        self.path = base_url.rstrip("/")
+        self.timeout = timeout
+        self.identities = identities
+        self.lock = threading.Lock()
+        self.latencies: List[float] = []
+        self.errors = 0
+
+    def page(self, url: str) -> Optional[str]:
+        """
+        Fetches the page of a url from the site
+
+        :param url: url as built for the live site
+        :return: the page source, error pages included, None if the site
+            cannot be reached
+        """
+        parts = urlsplit(url)
+        target = f"{self.path}{parts.path}?{parts.query}"
+        start = time.perf_counter()
+        page: Optional[str]
+        try:
+            if self.identities is not None:
+                response = fetch(self.identities, target, self.timeout)
+                page = response.text
+                failed = response.status_code != 200
+            else:
+                with urlopen(target, timeout=self.timeout) as opened:
+                    page = opened.read().decode("utf-8")
+                failed = False
+        except HTTPError as error:
+            # a browser renders error pages like any other page
+            page = error.read().decode("utf-8", "replace")
+            failed = True
+        except OSError:  # unreachable site or proxy
+            page = None
+            failed = True
+
+        with self.lock:
+            self.latencies.append(time.perf_counter() - start)
+            self.errors += failed
+        return page
+
+    def record(self, url: str, page_source: str) -> None:
+        """
+        Pages come from the site, nothing is recorded
+
+        :param url: url that was loaded
+        :param page_source: page source as rendered by the browser
+        :return: nothing
+        """
+
+    def close(self) -> None:
+        """
+        Nothing to close, connections are made per page
+
+        :return: nothing
+        """
@@ -0,0 +1,601 @@
+"""Long-running price monitor of a watchlist of routes"""
+
+import argparse
+from datetime import date as Date, datetime
+from functools import partial
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from typing import (
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from flight_arbitrage.cli import (
+    Route,
+    add_airport_list_arguments,
+    add_browser_arguments,
+    add_dataset_arguments,
+    add_session_arguments,
+    airport_list_file,
+    hygiene_policy,
+    identity_pool,
+    pace_requests,
+    read_routes,
+)
+from flight_arbitrage.columnar import ColumnarStore
+from flight_arbitrage.fingerprints import (
+    FingerprintStore,
+    merge_json,
+    route_key,
+)
+from flight_arbitrage.flight import FlightOptions
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.replay import open_archive
+from flight_arbitrage.sites import load_site
+
+DATE_FORMAT = "%m/%d/%Y"
+
+
+class Schedule(NamedTuple):
+    """How often a watched route is searched again"""
+
+    # bounds of the time between two checks of a route, in seconds
+    min_interval: float = 15 * 60.0
+    max_interval: float = 6 * 60 * 60.0
+    # routes departing further out than this are checked least often
+    horizon_days: float = 30.0
+    # how much a volatile fare shortens the time to its next check
+    volatility_weight: float = 10.0
+    # weight of the latest fare change in the volatility average
+    smoothing: float = 0.5
+
+
+class Watch(NamedTuple):
+    """A watched route and when it is due"""
+
+    route: Route
+    # time.time() of the next check, 0.0 for routes never checked
+    due: float = 0.0
+    # direct fare of the last check, None until one was found
+    fare: Optional[float] = None
+    # moving average of the relative fare change between checks
+    volatility: float = 0.0
+    checks: int = 0
+
+
+def days_left(date: str, now: float) -> float:
+    """
+    Days from now until the departure date
+
+    :param date: date of flight, e.g. '07/10/2021'
+    :param now: time.time() timestamp
+    :return: days, negative once the date has passed
+    """
+    departure = datetime.strptime(date, DATE_FORMAT).date()
+    return float((departure - Date.fromtimestamp(now)).days)
+
+
+def recheck_interval(
+    schedule: Schedule, days: float, volatility: float
+) -> float:
+    """
+    Seconds until a route is searched again
+
+    Routes close to departure and routes whose fare keeps moving are
+    checked more often, the interval shrinks linearly as departure comes
+    within the horizon and is divided by 1 + weight * volatility.
+
+    :param schedule: schedule bounds and weights
+    :param days: days left until departure
+    :param volatility: relative fare change average of the route
+    :return: the interval, within the schedule bounds
+    """
+    proximity = min(max(days, 0.0) / schedule.horizon_days, 1.0)
+    interval = (
+        schedule.max_interval
+        * proximity
+        / (1.0 + schedule.volatility_weight * volatility)
+    )
+    return min(max(interval, schedule.min_interval), schedule.max_interval)
+
+
+def reschedule(
+    watch: Watch, schedule: Schedule, fare: Optional[float], now: float
+) -> Watch:
+    """
+    Updates a watch with the fare of the check that just ended
+
+    :param watch: route checked
+    :param schedule: schedule bounds and weights
+    :param fare: direct fare found, None or negative if none was found
+    :param now: time.time() of the check
+    :return: the watch with its next due time
+    """
+    fare = fare if fare is not None and fare > 0 else None
+    volatility = watch.volatility
+    if fare is not None and watch.fare is not None:
+        change = abs(fare - watch.fare) / watch.fare
+        volatility += schedule.smoothing * (change - volatility)
+
+    interval = recheck_interval(
+        schedule, days_left(watch.route.date, now), volatility
+    )
+    return watch._replace(
+        due=now + interval,
+        fare=fare if fare is not None else watch.fare,
+        volatility=volatility,
+        checks=watch.checks + 1,
+    )
+
+
+class AlertState:
+    """
+    Best savings reported so far for every arbitrage of the watchlist
+
+    An arbitrage is reported when it is new or when its savings beat the
+    best ones reported by at least min_improvement, so the same fare found
+    on every check stays quiet. The state is merged into a json file shared
+    by monitors running side by side.
+    """
+
+    def __init__(self, path: str = "", min_improvement: float = 1.0) -> None:
+        """
+        AlertState constructor, loads the saved state
+
+        :param path: json file path, the state stays in memory if empty
+        :param min_improvement: savings gain that makes a known arbitrage
+            worth reporting again
+        """
+        self.path = path
+        self.min_improvement = min_improvement
+        self.best: Dict[str, float] = {}
+
+        if path and os.path.exists(path):
+            with open(path, "r") as file:
+                content = file.read()
+            self.best = json.loads(content) if content else {}
+
+    @staticmethod
+    def key(route: Route, site: str, airport: str) -> str:
+        """
+        Identity of an arbitrage across checks
+
+        :param route: route searched
+        :param site: name of the site searched
+        :param airport: hidden city destination of the ticket
+        :return: the key
+        """
+        return f"{route_key(*route, site=site)} {airport}"
+
+    def fresh(self, route: Route, site: str, arbs: List[dict]) -> List[dict]:
+        """
+        Picks the new and improved arbitrages of a check and records them
+
+        :param route: route searched
+        :param site: name of the site searched
+        :param arbs: arbitrages found by the check
+        :return: the arbitrages worth reporting
+        """
+        found = []
+        for arb in arbs:
+            key = self.key(route, site, arb["this destination"])
+            best = self.best.get(key)
+            if best is None or arb["savings"] >= best + self.min_improvement:
+                self.best[key] = arb["savings"]
+                found.append(arb)
+
+        if found and self.path:
+            reported = {
+                self.key(route, site, arb["this destination"]): arb["savings"]
+                for arb in found
+            }
+
+            def merge(saved: dict) -> None:
+                for key, savings in reported.items():
+                    saved[key] = max(savings, saved.get(key, savings))
+
+            self.best = merge_json(self.path, merge)
+
+        return found
+
+
+def write_jsonl(path: str, alerts: List[dict]) -> None:
+    """
+    Appends alerts to a json lines file, one json object per line
+
+    :param path: json lines file path, '-' for stdout
+    :param alerts: alerts to write
+    :return: nothing
+    """
+    lines = "".join(
+        json.dumps(alert, sort_keys=True) + "\n" for alert in alerts
+    )
+    if path == "-":
+        sys.stdout.write(lines)
+        sys.stdout.flush()
+        return
+    with open(path, "a") as file:
+        file.write(lines)
+
+
+def post_webhook(url: str, alerts: List[dict], timeout: float = 10.0) -> None:
+    """
+    Posts alerts as json in one request, an unreachable webhook is only
+    reported
+
+    :param url: url the alerts are posted to
+    :param alerts: alerts to post
+    :param timeout: seconds to wait for the webhook
+    :return: nothing
+    """
+    request = Request(
+        url,
+        data=json.dumps({"alerts": alerts}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    try:
+        with urlopen(request, timeout=timeout):
+            pass
+    except (URLError, OSError) as error:
+        print(f"webhook {url} failed: {error}", file=sys.stderr)
+
+
+class Monitor:
+    """
+    Searches a watchlist of routes over and over with one warm browser
+
+    Unlike a sweep run from cron, the browser, page archive and fingerprint
+    store stay open between checks, so a check only pays for the pages it
+    loads. Each route is checked again when the schedule says it is due
+    and only new or improved arbitrages reach the sinks.
+
+    >>> sink = partial(write_jsonl, 'alerts.jsonl')
+    >>> monitor = Monitor(routes, [sink], AlertState())
+    >>> monitor.run()
+    """
+
+    def __init__(
+        self,
+        routes: Sequence[Route],
+        sinks: Sequence[Callable[[List[dict]], None]],
+        state: AlertState,
+        schedule: Schedule = Schedule(),
+        flight_options: Optional[FlightOptions] = None,
+        search_options: Optional[dict] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """
+        Monitor constructor
+
+        :param routes: watchlist
+        :param sinks: called with every batch of alerts, e.g. a partial of
+            write_jsonl or post_webhook
+        :param state: arbitrages reported so far
+        :param schedule: how often routes are checked
+        :param flight_options: collaborators of the searches, e.g. a page
+            archive
+        :param search_options: OneWay.find_arbitrage arguments
+        :param clock: time source, time.time by default
+        """
+        self.watches = [Watch(route) for route in routes]
+        self.sinks = list(sinks)
+        self.state = state
+        self.schedule = schedule
+        self.flight_options = (
+            flight_options if flight_options is not None else FlightOptions()
+        )
+        self.search_options = search_options or {}
+        self.clock = clock
+        self.stop = threading.Event()
+        self.flight: Optional[OneWay] = None
+        self.alerts = 0
+
+    def __enter__(self) -> "Monitor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def search(self, route: Route) -> Tuple[List[dict], Optional[float]]:
+        """
+        Searches a route with the warm browser
+
+        :param route: route to search
+        :return: the arbitrages and the direct fare found
+        """
+        if self.flight is None:
+            self.flight = OneWay(*route, self.flight_options, warm=True)
+        else:
+            # the browser and every shared resource stay, only the route
+            # changes between checks
+            (
+                self.flight.leaving_from,
+                self.flight.going_to,
+                self.flight.date,
+            ) = route
+        # a search that fails before finding the direct fare must not hand
+        # on the fare of the previous route
+        self.flight.fare = None
+        arbs = self.flight.find_arbitrage(**self.search_options)
+        return arbs, self.flight.fare
+
+    def check(self, watch: Watch) -> Watch:
+        """
+        Searches a watched route and emits its new or improved arbitrages
+
+        A failed check is reported and retried after the shortest interval.
+
+        :param watch: route due
+        :return: the watch with its next due time
+        """
+        route = watch.route
+        try:
+            arbs, fare = self.search(route)
+        except Exception as error:  # a failed check must not stop the loop
+            print(f"{' '.join(route)} failed: {error}", file=sys.stderr)
+            return watch._replace(
+                due=self.clock() + self.schedule.min_interval
+            )
+
+        assert self.flight is not None
+        if self.flight.options.fingerprints is not None:
+            self.flight.options.fingerprints.save()
+        site = self.flight.site.name
+        now = self.clock()
+        fresh = self.state.fresh(route, site, arbs)
+        if fresh:
+            seen = datetime.fromtimestamp(now).isoformat(timespec="seconds")
+            alerts = [
+                dict(
+                    arb,
+                    origin=route.origin,
+                    destination=route.destination,
+                    date=route.date,
+                    site=site,
+                    seen=seen,
+                )
+                for arb in fresh
+            ]
+            for sink in self.sinks:
+                sink(alerts)
+            self.alerts += len(alerts)
+
+        return reschedule(watch, self.schedule, fare, now)
+
+    def run(self, checks: int = 0) -> int:
+        """
+        Checks the watchlist until stopped or every route has departed
+
+        :param checks: stop after this many checks, 0 runs until stopped
+        :return: number of checks made
+        """
+        done = 0
+        while not self.stop.is_set() and (not checks or done < checks):
+            now = self.clock()
+            self.watches = [
+                watch
+                for watch in self.watches
+                if days_left(watch.route.date, now) >= 0
+            ]
+            if not self.watches:
+                break
+
+            index = min(
+                range(len(self.watches)),
+                key=lambda number: self.watches[number].due,
+            )
+            wait = self.watches[index].due - now
+            if wait > 0 and self.stop.wait(wait):
+                break
+
+            self.watches[index] = self.check(self.watches[index])
+            done += 1
+
+        return done
+
+    def close(self) -> None:
+        """
+        Quits the warm browser
+
+        :return: nothing
+        """
+        if self.flight is not None:
+            self.flight.close_browser()
+            self.flight = None
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """
+    Parses the command-line arguments
+
+    :param argv: arguments, defaults to sys.argv
+    :return: the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="flight-arbitrage-monitor",
+        description="Watch routes and report new or improved arbitrages",
+    )
+    parser.add_argument(
+        "watchlist", help="file with one 'origin destination date' per line"
+    )
+    add_browser_arguments(parser)
+    parser.add_argument(
+        "--site",
+        default="",
+        help="flight site to search, a bundled site name or a site rules "
+        "json file (default: expedia)",
+    )
+    parser.add_argument(
+        "--alerts",
+        default="alerts.jsonl",
+        metavar="PATH",
+        help="json lines file the alerts are appended to, '-' for stdout",
+    )
+    parser.add_argument(
+        "--webhook", default="", help="url the alerts are also posted to"
+    )
+    parser.add_argument(
+        "--state",
+        default="",
+        metavar="PATH",
+        help="json file of the arbitrages reported so far, so a restarted "
+        "monitor does not report them again",
+    )
+    parser.add_argument(
+        "--min-improvement",
+        type=float,
+        default=1.0,
+        help="savings gain that reports a known arbitrage again",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=Schedule().min_interval,
+        help="shortest time between two checks of a route, in seconds",
+    )
+    parser.add_argument(
+        "--max-interval",
+        type=float,
+        default=Schedule().max_interval,
+        help="longest time between two checks of a route, in seconds",
+    )
+    parser.add_argument(
+        "--horizon-days",
+        type=float,
+        default=Schedule().horizon_days,
+        help="routes departing further out are checked least often",
+    )
+    parser.add_argument(
+        "--checks",
+        type=int,
+        default=0,
+        help="stop after this many checks, 0 runs until interrupted",
+    )
+    parser.add_argument(
+        "--fingerprints",
+        default="",
+        metavar="PATH",
+        help="skip evaluating pages whose offers did not change since the "
+        "last check, needs --page-source",
+    )
+    parser.add_argument("--tries", type=int, default=3)
+    add_session_arguments(parser)
+    parser.add_argument(
+        "--replay",
+        default="",
+        metavar="ARCHIVE",
+        help="serve pages from a recorded archive instead of a browser",
+    )
+    add_airport_list_arguments(parser)
+    add_dataset_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if not 0.0 < args.min_interval <= args.max_interval:
+        parser.error("--min-interval must be positive and <= --max-interval")
+    if args.horizon_days <= 0:
+        parser.error("--horizon-days must be positive")
+    if args.dataset_batch < 1:
+        parser.error("--dataset-batch must be at least 1")
+    if args.fingerprints and not args.page_source:
+        parser.error("--fingerprints needs --page-source")
+    try:
+        args.site = load_site(args.site)
+    except (OSError, ValueError) as error:
+        parser.error(f"--site: {error}")
+
+    return args
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Entry point of the flight-arbitrage-monitor command
+
+    :param argv: arguments, defaults to sys.argv
+    :return: exit status
+    """
+    args = parse_args(argv)
+    routes = read_routes(args.watchlist)
+
+    if args.replay and not os.path.exists(args.replay):
+        print(f"page archive {args.replay} does not exist", file=sys.stderr)
+        return 2
+    governor = pace_requests(args)
+
+    sinks = [partial(write_jsonl, args.alerts)]
+    if args.webhook:
+        sinks.append(partial(post_webhook, args.webhook))
+
+    archive = open_archive(args.replay, [args.site]) if args.replay else None
+    fingerprints = (
+        FingerprintStore(args.fingerprints) if args.fingerprints else None
+    )
+    dataset = (
+        ColumnarStore(args.dataset, batch_rows=args.dataset_batch)
+        if args.dataset
+        else None
+    )
+    monitor = Monitor(
+        routes,
+        sinks,
+        AlertState(args.state, min_improvement=args.min_improvement),
+        schedule=Schedule(
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+            horizon_days=args.horizon_days,
+        ),
+        flight_options=FlightOptions(
+            governor=governor,
+            hygiene=hygiene_policy(args),
+            archive=archive,
+            fingerprints=fingerprints,
+            site=args.site,
+            dataset=dataset,
+            identities=identity_pool(args),
+        ),
+        search_options={
+            "override": True,
+            "override_filename": airport_list_file(
+                args.airports, args.cache_dir, archive, sites=[args.site]
+            ),
+            "web_browser": "replay" if args.replay else args.backend,
+            "driver": args.driver,
+            "headless": args.headless,
+            "tries": args.tries,
+            "page_source": args.page_source,
+        },
+    )
+
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: monitor.stop.set())
+
+    try:
+        with monitor:
+            checks = monitor.run(args.checks)
+    finally:
+        if archive is not None:
+            archive.close()
+        if dataset is not None:
+            dataset.close()
+
+    print(
+        f"{checks} checks, {monitor.alerts} alerts, "
+        f"{len(monitor.watches)} routes still watched",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+
+    sys.exit(main())
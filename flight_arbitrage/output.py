@@ -0,0 +1,188 @@
+"""Streaming writers for arbitrage results"""
+
+from abc import ABC, abstractmethod
+import csv
+import json
+import sys
+from typing import Any, Dict, IO, List, Optional, Type
+
+
+class RowWriter(ABC):
+    """Writes batches of result rows as they are produced"""
+
+    def __init__(self, path: str = "-") -> None:
+        """
+        RowWriter constructor
+
+        :param path: output file path, '-' for standard output
+        """
+        self.path = path
+        self.file: Optional[IO[str]] = None
+
+    def __enter__(self) -> "RowWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def stream(self) -> IO[str]:
+        """
+        Opens the output on first use
+
+        :return: the text stream to write to
+        """
+        if self.file is None:
+            self.file = (
+                sys.stdout
+                if self.path == "-"
+                else open(  # pylint: disable=consider-using-with
+                    self.path, "w", newline=""
+                )
+            )
+        return self.file
+
+    @abstractmethod
+    def write(self, rows: List[dict]) -> None:
+        """
+        Writes a batch of rows
+
+        :param rows: result rows
+        :return: nothing
+        """
+
+    def close(self) -> None:
+        """
+        Flushes and closes the output
+
+        :return: nothing
+        """
+        if self.file is not None:
+            self.file.flush()
+            if self.file is not sys.stdout:
+                self.file.close()
+            self.file = None
+
+
+class JsonlWriter(RowWriter):
+    """One json object per line"""
+
+    def write(self, rows: List[dict]) -> None:
+        """
+        Writes a batch of rows
+
+        :param rows: result rows
+        :return: nothing
+        """
+        stream = self.stream()
+        for row in rows:
+            stream.write(json.dumps(row) + "\n")
+        stream.flush()
+
+
+class CsvWriter(RowWriter):
+    """Comma separated values with a header taken from the first row"""
+
+    def __init__(self, path: str = "-") -> None:
+        """
+        CsvWriter constructor
+
+        :param path: output file path, '-' for standard output
+        """
+        super().__init__(path)
+        self.writer: Optional[csv.DictWriter] = None
+
+    def write(self, rows: List[dict]) -> None:
+        """
+        Writes a batch of rows
+
+        :param rows: result rows
+        :return: nothing
+        """
+        if not rows:
+            return
+        if self.writer is None:
+            self.writer = csv.DictWriter(
+                self.stream(), fieldnames=list(rows[0]), extrasaction="ignore"
+            )
+            self.writer.writeheader()
+        self.writer.writerows(rows)
+        self.stream().flush()
+
+
+class ParquetWriter(RowWriter):
+    """Parquet file written one row group per batch, needs pyarrow"""
+
+    def __init__(self, path: str = "-") -> None:
+        """
+        ParquetWriter constructor
+
+        :param path: output file path
+        """
+        if path == "-":
+            raise ValueError("parquet output needs a file path")
+        try:
+            # pylint: disable=import-outside-toplevel
+            import pyarrow  # type: ignore
+            import pyarrow.parquet  # type: ignore
+        except ImportError as error:
+            raise ValueError(
+                "parquet output requires the pyarrow package"
+            ) from error
+
+        super().__init__(path)
+        self.pyarrow = pyarrow
+        self.writer: Any = None
+
+    def write(self, rows: List[dict]) -> None:
+        """
+        Writes a batch of rows as a row group
+
+        :param rows: result rows
+        :return: nothing
+        """
+        if not rows:
+            return
+        if self.writer is None:
+            table = self.pyarrow.Table.from_pylist(rows)
+            self.writer = self.pyarrow.parquet.ParquetWriter(
+                self.path, table.schema
+            )
+        else:
+            table = self.pyarrow.Table.from_pylist(
+                rows, schema=self.writer.schema
+            )
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        """
+        Finishes the parquet file
+
+        :return: nothing
+        """
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+FORMATS: Dict[str, Type[RowWriter]] = {
+    "jsonl": JsonlWriter,
+    "csv": CsvWriter,
+    "parquet": ParquetWriter,
+}
+
+
+def open_writer(output_format: str, path: str = "-") -> RowWriter:
+    """
+    Creates the writer of an output format
+
+    :param output_format: one of FORMATS
+    :param path: output file path, '-' for standard output
+    :return: the writer
+    """
+    try:
+        writer_class = FORMATS[output_format]
+    except KeyError as error:
+        raise ValueError(
+            f"output format {output_format} is not available"
+        ) from error
+    return writer_class(path)
@@ -0,0 +1,208 @@
+"""Ways of loading the results pages of hidden city candidates"""
+
+from collections import deque
+from concurrent.futures import Future
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Tuple,
+    Union,
+    cast,
+)
+
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.governor import browser_throttled
+from flight_arbitrage.tabs import TabPipeline
+
+if TYPE_CHECKING:
+    from flight_arbitrage.hidden_city import ElementsType, OneWay
+    from flight_arbitrage.session import ManagedBrowser
+
+Pages = Iterator[Tuple[str, Union[List[Offer], "ElementsType"]]]
+
+
+class PageLoadError(Exception):
+    """A results page failed to load, which ends the search"""
+
+
+def candidate_pages(
+    flight: "OneWay", airports: Iterable[str], tries: int, page_source: bool
+) -> Pages:
+    """
+    Loads and reads the page of every candidate the way the flight is set
+    up for
+
+    Pages come out in airport order whichever way they are loaded.
+
+    :param flight: search loading the pages
+    :param airports: candidate final destinations
+    :param tries: number of tries to wait for listings to render
+    :param page_source: parse page sources instead of looking up listing
+        elements
+    :return: iterator of each airport and its offers or elements
+    """
+    # coalesced pages are parsed by whichever search loaded them,
+    # in-browser extraction leaves nothing to parse and deep scans read
+    # pages as they grow
+    pipelined = flight.options.parse_pool is not None and not (
+        flight.options.coalescer is not None
+        or flight.options.in_browser
+        or flight.options.deep_scan
+    )
+    # tab loads bypass get, which records and coalesces page loads
+    tabbed = flight.options.tabs and not (
+        flight.replaying
+        or flight.options.archive is not None
+        or flight.options.coalescer is not None
+    )
+    if tabbed:
+        return tabbed_pages(flight, airports, tries, page_source)
+    if page_source and pipelined:
+        return pipelined_pages(flight, airports, tries)
+    return airport_pages(flight, airports, tries, page_source)
+
+
+def airport_pages(
+    flight: "OneWay", airports: Iterable[str], tries: int, page_source: bool
+) -> Pages:
+    """
+    Loads and reads the page of every airport in turn
+
+    :param flight: search loading the pages
+    :param airports: candidate final destinations
+    :param tries: number of tries to wait for listings to render
+    :param page_source: parse page sources instead of looking up listing
+        elements
+    :return: iterator of each airport and its offers or elements
+    """
+    for airport in airports:
+        if airport == flight.leaving_from:
+            continue
+
+        if page_source:
+            found: Union[List[Offer], "ElementsType"] = flight.route_offers(
+                airport, tries
+            )
+        else:
+            with flight.timer.scope(airport):
+                flight.load_airport(airport)
+                with flight.timer.phase("listings"):
+                    found = flight.listing_elements(tries=tries)
+        yield airport, found
+
+        flight.pace()
+
+
+def tabbed_pages(
+    flight: "OneWay", airports: Iterable[str], tries: int, page_source: bool
+) -> Pages:
+    """
+    Reads the page of every airport while the next ones load in tabs
+
+    :param flight: search loading the pages
+    :param airports: candidate final destinations
+    :param tries: number of tries to wait for listings to render
+    :param page_source: parse page sources instead of looking up listing
+        elements
+    :return: iterator of each airport and its offers or elements
+    """
+    assert (
+        flight.browser is not None
+    ), "browser variable is the wrong data type"
+    governor = flight.options.governor
+
+    def before_open(url: str) -> None:
+        if tabs.opened:
+            flight.pace()
+        if governor is not None:
+            governor.acquire(url)
+
+    # a session kept memory-bounded counts tab loads like any other page
+    session = (
+        cast("ManagedBrowser", flight.browser)
+        if flight.options.hygiene is not None
+        else None
+    )
+    tabs = TabPipeline(
+        flight.browser, flight.options.tabs, before_open, session
+    )
+    pages = tabs.rotate(
+        (airport, flight.search_url(airport))
+        for airport in airports
+        if airport != flight.leaving_from
+    )
+    while True:
+        with flight.timer.phase("tab switch"):
+            try:
+                airport = next(pages, None)
+            except Exception as error:
+                raise PageLoadError(error) from error
+        if airport is None:
+            return
+
+        with flight.timer.scope(airport), flight.timer.phase("listings"):
+            if page_source:
+                found: Union[List[Offer], "ElementsType"] = flight.page_offers(
+                    tries=tries
+                )
+            else:
+                found = flight.listing_elements(tries=tries)
+        if governor is not None:
+            governor.observe(
+                flight.search_url(airport), browser_throttled(flight.browser)
+            )
+        yield airport, found
+
+
+def pipelined_pages(
+    flight: "OneWay", airports: Iterable[str], tries: int
+) -> Iterator[Tuple[str, List[Offer]]]:
+    """
+    Loads pages while the parse pool parses the ones already loaded
+
+    Offers come out in airport order, trailing the page loads by up to the
+    pool's max_pending pages.
+
+    :param flight: search loading the pages
+    :param airports: candidate final destinations
+    :param tries: number of tries to wait for listings to render
+    :return: iterator of each airport and its offers
+    """
+    parse_pool = flight.options.parse_pool
+    assert (
+        parse_pool is not None and flight.browser is not None
+    ), "pipelined pages need a parse pool and a browser"
+
+    pending: Deque[Tuple[str, "Future[List[Offer]]"]] = deque()
+    for airport in airports:
+        if airport == flight.leaving_from:
+            continue
+
+        with flight.timer.scope(airport):
+            flight.load_airport(airport)
+            with flight.timer.phase("listings"):
+                # listings are waited for in the browser, parsing is
+                # handed off
+                flight.listing_elements(tries=tries)
+                source = flight.browser.page_source
+                future = parse_pool.submit(source, flight.rules.name)
+                pending.append((airport, future))
+
+        while len(pending) > parse_pool.max_pending or (
+            pending and pending[0][1].done()
+        ):
+            done, future = pending.popleft()
+            with flight.timer.scope(done), flight.timer.phase("parse wait"):
+                offers = future.result()
+            yield done, offers
+
+        flight.pace()
+
+    while pending:
+        done, future = pending.popleft()
+        with flight.timer.scope(done), flight.timer.phase("parse wait"):
+            offers = future.result()
+        yield done, offers
@@ -0,0 +1,110 @@
+"""Page parsing in worker processes, overlapping with page fetching"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+import os
+import threading
+from typing import Dict, List, Sequence, Union
+
+from flight_arbitrage.extraction import ExtractionRules, Offer
+from flight_arbitrage.extraction import load_rules, rules_from_dict
+
+# rules of a worker process by name, compiled once when the worker starts
+_WORKER: Dict[str, ExtractionRules] = {}
+
+
+def _start_worker(*rules: dict) -> None:
+    """
+    Compiles the extraction rules of a worker process
+
+    :param rules: serialised extraction rules of every site
+    :return: nothing
+    """
+    for data in rules:
+        _WORKER[data["name"]] = rules_from_dict(data)
+
+
+def _parse(page_source: str, name: str) -> List[Offer]:
+    """
+    Parses a page in a worker process
+
+    :param page_source: page source of a results page
+    :param name: name of the rules to parse it with
+    :return: the offers on the page
+    """
+    return _WORKER[name].extract(page_source)
+
+
+class ParsePool:
+    """
+    Process pool parsing page sources handed over by fetching threads
+
+    At most max_pending pages are in flight, so fetchers that outrun the
+    parse workers block in submit instead of piling up page sources in
+    memory. One pool can be shared by every browser of a sweep.
+    """
+
+    def __init__(
+        self,
+        rules: Union[None, ExtractionRules, Sequence[ExtractionRules]] = None,
+        workers: int = 0,
+        max_pending: int = 0,
+    ) -> None:
+        """
+        ParsePool constructor
+
+        :param rules: extraction rules, or the rules of every site whose
+            pages are parsed, defaults to the bundled rules
+        :param workers: parse processes, 0 for one per cpu
+        :param max_pending: pages submitted but not parsed yet before submit
+            blocks, 0 for twice the number of workers
+        """
+        if rules is None:
+            rules = [load_rules()]
+        elif isinstance(rules, ExtractionRules):
+            rules = [rules]
+        self.names = [each.name for each in rules]
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_start_worker,
+            initargs=tuple(each.to_dict() for each in rules),
+        )
+
+    def __enter__(self) -> "ParsePool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def submit(
+        self, page_source: str, rules: str = ""
+    ) -> "Future[List[Offer]]":
+        """
+        Queues a page for parsing, waiting for a free slot
+
+        :param page_source: page source of a results page
+        :param rules: name of the rules to parse it with, defaults to the
+            first rules of the pool
+        :return: future of the offers on the page
+        """
+        name = rules or self.names[0]
+        if name not in self.names:
+            raise ValueError(f"parse pool has no rules named {name!r}")
+        self.slots.acquire()  # pylint: disable=consider-using-with
+        try:
+            future = self.executor.submit(_parse, page_source, name)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def close(self) -> None:
+        """
+        Waits for queued pages and stops the workers
+
+        :return: nothing
+        """
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,162 @@
+"""Per-phase wall clock timing of arbitrage runs"""
+
+from contextlib import contextmanager
+import threading
+import time
+from typing import Dict, Iterator, List, Tuple
+
+
+class PhaseTimer:
+    """
+    Accumulates wall clock time spent in named phases
+
+    Phases timed inside a scope are also broken down by the scope's key,
+    e.g. the airport whose page is loading, and so are tallied events such
+    as retries. Phases timed inside another phase of the same thread are
+    nested, their time is part of the outer phase's.
+    """
+
+    def __init__(self) -> None:
+        """
+        PhaseTimer constructor
+        """
+        self.totals: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        # seconds of each phase spent outside of any other phase
+        self.top_level: Dict[str, float] = {}
+        # seconds per phase and events per tally of each scope key
+        self.scoped: Dict[str, Dict[str, float]] = {}
+        self.tallies: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Times the body of a with statement as one call of a phase
+
+        :param name: name of the phase
+        :return: nothing
+        """
+        depth = getattr(self.local, "depth", 0)
+        self.local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.local.depth = depth
+            self.add(name, time.perf_counter() - start, nested=depth > 0)
+
+    @contextmanager
+    def scope(self, key: str) -> Iterator[None]:
+        """
+        Breaks the phases and tallies of the calling thread down by a key
+        for the body of a with statement
+
+        :param key: key to break down by, e.g. an airport
+        :return: nothing
+        """
+        outer = getattr(self.local, "key", "")
+        self.local.key = key
+        try:
+            yield
+        finally:
+            self.local.key = outer
+
+    def add(self, name: str, seconds: float, nested: bool = False) -> None:
+        """
+        Records time spent in a phase
+
+        :param name: name of the phase
+        :param seconds: seconds spent
+        :param nested: whether the time was spent inside another phase
+        :return: nothing
+        """
+        key = getattr(self.local, "key", "")
+        with self.lock:
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+            if not nested:
+                self.top_level[name] = self.top_level.get(name, 0.0) + seconds
+            if key:
+                scoped = self.scoped.setdefault(key, {})
+                scoped[name] = scoped.get(name, 0.0) + seconds
+
+    def tally(self, name: str, count: int = 1) -> None:
+        """
+        Counts events, under the current scope key if there is one
+
+        :param name: name of the event, e.g. 'retries'
+        :param count: number of events
+        :return: nothing
+        """
+        key = getattr(self.local, "key", "")
+        with self.lock:
+            tallies = self.tallies.setdefault(key, {})
+            tallies[name] = tallies.get(name, 0) + count
+
+    def take_scoped(
+        self,
+    ) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Dict[str, int]]]:
+        """
+        Hands over the breakdown by scope key and starts a new one
+
+        :return: seconds per phase and events per tally of each key
+        """
+        with self.lock:
+            scoped, self.scoped = self.scoped, {}
+            tallies, self.tallies = self.tallies, {}
+        return scoped, tallies
+
+    def merge(self, other: "PhaseTimer") -> None:
+        """
+        Adds the timings of another timer, e.g. one per worker, without its
+        breakdown by scope key
+
+        :param other: timer to merge in
+        :return: nothing
+        """
+        with other.lock:
+            items = [
+                (name, seconds, other.counts[name])
+                for name, seconds in other.totals.items()
+            ]
+            top_level = list(other.top_level.items())
+        with self.lock:
+            for name, seconds, count in items:
+                self.totals[name] = self.totals.get(name, 0.0) + seconds
+                self.counts[name] = self.counts.get(name, 0) + count
+            for name, seconds in top_level:
+                self.top_level[name] = self.top_level.get(name, 0.0) + seconds
+
+    def report(self) -> str:
+        """
+        Table of phases, slowest first
+
+        Shares are of the time spent in top-level phases, so they add up to
+        100%: nested time counts only towards its outer phase, and phases
+        that only ever run nested have no share.
+
+        :return: the formatted report
+        """
+        with self.lock:
+            rows = sorted(
+                self.totals.items(), key=lambda item: item[1], reverse=True
+            )
+            grand_total = sum(self.top_level.values()) or 1.0
+            lines: List[str] = [
+                f"{'phase':<20} {'calls':>7} {'total s':>10} "
+                f"{'mean ms':>10} {'share':>7}"
+            ]
+            for name, seconds in rows:
+                count = self.counts[name]
+                share = (
+                    f"{self.top_level[name] / grand_total:>7.1%}"
+                    if name in self.top_level
+                    else f"{'-':>7}"
+                )
+                lines.append(
+                    f"{name:<20} {count:>7} {seconds:>10.3f} "
+                    f"{seconds / count * 1000:>10.1f} {share}"
+                )
+        return "\n".join(lines)
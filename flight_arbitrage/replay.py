@@ -0,0 +1,408 @@
+"""Record and replay of the result pages seen by a browser"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, IO, List, Optional, Union
+
+from flight_arbitrage._lazy import LazyObject
+from flight_arbitrage.sites import SiteAdapter, load_site
+from flight_arbitrage.snapshots import SnapshotStore
+
+if TYPE_CHECKING:
+    from lxml import html  # type: ignore
+    from selenium.common import exceptions
+
+    from flight_arbitrage.mock_site import SiteArchive
+else:  # pylint: disable=invalid-name
+    html = LazyObject("lxml.html")
+    exceptions = LazyObject("selenium.common.exceptions")
+
+EMPTY_PAGE = "<html><head></head><body></body></html>"
+
+
+class PageArchive:
+    """
+    Gzip compressed json lines file of url and page source records
+
+    Records are appended as they are made, so an archive can grow over
+    several runs, and the last record of a url is the one served on replay.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        PageArchive constructor, loads the pages already in the archive
+
+        :param path: archive file path, created on the first record
+        """
+        self.path = path
+        self.pages: Dict[str, str] = {}
+        self.file: Optional[IO[str]] = None
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            self.load()
+
+    def __contains__(self, url: object) -> bool:
+        return url in self.pages
+
+    def __len__(self) -> int:
+        return len(self.pages)
+
+    def __enter__(self) -> "PageArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def load(self) -> None:
+        """
+        Reads every record of the archive file
+
+        :return: nothing
+        """
+        with gzip.open(self.path, "rt", encoding="utf-8") as file:
+            try:
+                for line in file:
+                    record = json.loads(line)
+                    self.pages[record["url"]] = record["page_source"]
+            except (EOFError, ValueError):
+                # a run that crashed mid-write leaves a truncated last record
+                pass
+
+    def page(self, url: str) -> Optional[str]:
+        """
+        Recorded page source of a url
+
+        :param url: url that was loaded
+        :return: the page source, None if the url was never recorded
+        """
+        return self.pages.get(url)
+
+    def record(self, url: str, page_source: str) -> None:
+        """
+        Saves the page source of a url
+
+        :param url: url that was loaded
+        :param page_source: page source as rendered by the browser
+        :return: nothing
+        """
+        with self.lock:
+            if self.pages.get(url) == page_source:
+                return
+            self.pages[url] = page_source
+
+            if self.file is None:
+                self.file = gzip.open(  # pylint: disable=consider-using-with
+                    self.path, "at", encoding="utf-8"
+                )
+            self.file.write(
+                json.dumps(
+                    {
+                        "url": url,
+                        "recorded": time.time(),
+                        "page_source": page_source,
+                    }
+                )
+                + "\n"
+            )
+
+    def close(self) -> None:
+        """
+        Finishes the compressed stream of the records made so far
+
+        :return: nothing
+        """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+# anything with record(url, page_source) and page(url) works as an archive
+Archive = Union[PageArchive, SnapshotStore, "SiteArchive"]
+
+
+def open_archive(
+    path: str, sites: Optional[List[SiteAdapter]] = None
+) -> Archive:
+    """
+    Opens a page archive by its path
+
+    :param path: a '.gz' file for a PageArchive, otherwise the directory of a
+        SnapshotStore
+    :param sites: sites whose pages a SnapshotStore archives, defaults to
+        the default site
+    :return: the archive
+    """
+    if path.endswith(".gz"):
+        return PageArchive(path)
+    return SnapshotStore(path, sites=sites)
+
+
+def archived_airports(
+    archive: Archive, sites: Optional[List[SiteAdapter]] = None
+) -> List[str]:
+    """
+    Destination airports of the search pages in an archive
+
+    These are the candidates of the searches that recorded the archive, so
+    replays can run over them without downloading an airport list.
+
+    :param archive: page archive
+    :param sites: sites of the searches, defaults to the sites of a
+        SnapshotStore and to the default site otherwise
+    :return: the airports in the order their first page was recorded,
+        empty for archives that cannot be listed
+    """
+    if isinstance(archive, SnapshotStore):
+        names = {site.name for site in sites or archive.sites}
+        destinations = [
+            entry.key.destination
+            for entry in archive.entries()
+            if entry.key.site in names
+        ]
+    elif isinstance(archive, PageArchive):
+        adapters = sites or [load_site()]
+        routes = [
+            route
+            for url in archive.pages
+            for route in (site.route_of(url) for site in adapters)
+            if route is not None
+        ]
+        destinations = [route[1] for route in routes]
+    else:
+        return []
+    return list(dict.fromkeys(destinations))
+
+
+class RecordingBrowser:
+    """
+    Browser wrapper saving the rendered source of every page it loads
+
+    A page is saved whenever its source is read and, for pages parsed
+    element by element, right before the next page load or quit, so the
+    archive holds pages as the parsing code saw them. A source read before
+    the page's elements are looked up, e.g. a throttling check right after
+    the load, may predate its listings, so the page is saved again after
+    element lookups.
+    """
+
+    def __init__(self, browser: Any, archive: Archive) -> None:
+        """
+        RecordingBrowser constructor
+
+        :param browser: selenium webdriver to record
+        :param archive: archive to save pages to
+        """
+        self._browser = browser
+        self._archive = archive
+        self._url: Optional[str] = None
+        self._saved = False
+
+    def __getattr__(self, name: str) -> Any:
+        # the page may have rendered further by the time elements are found
+        if name.startswith("find_element"):
+            self._saved = False
+        return getattr(self._browser, name)
+
+    @property
+    def page_source(self) -> str:
+        """
+        Page source of the current page, saved to the archive
+
+        :return: the page source
+        """
+        source = self._browser.page_source
+        if self._url is not None:
+            self._archive.record(self._url, source)
+            self._saved = True
+        return source
+
+    def capture(self) -> None:
+        """
+        Saves the current page if its source was never read
+
+        :return: nothing
+        """
+        if self._url is None or self._saved:
+            return
+        try:
+            _ = self.page_source
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def get(self, url: str) -> None:
+        """
+        Saves the current page and loads the next one
+
+        :param url: url to load
+        :return: nothing
+        """
+        self.capture()
+        self._browser.get(url)
+        self._url = None if url.startswith("about:") else url
+        self._saved = False
+
+    def quit(self) -> None:
+        """
+        Saves the current page and closes the browser
+
+        :return: nothing
+        """
+        self.capture()
+        self._url = None
+        self._browser.quit()
+
+
+class ReplayElement:
+    """Stand-in for a selenium web element backed by an lxml node"""
+
+    def __init__(self, node: Any) -> None:
+        """
+        ReplayElement constructor
+
+        :param node: lxml html element
+        """
+        self.node = node
+
+    @property
+    def text(self) -> str:
+        """
+        Text of the element with whitespace collapsed, as selenium shows it
+
+        :return: the text
+        """
+        return " ".join(self.node.text_content().split())
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        """
+        Attribute of the element
+
+        :param name: attribute name
+        :return: the attribute value, None if missing
+        """
+        return self.node.get(name)
+
+    def find_elements_by_xpath(self, xpath: str) -> List["ReplayElement"]:
+        """
+        Elements matching an xpath relative to this element
+
+        :param xpath: xpath expression
+        :return: the matching elements
+        """
+        return [
+            ReplayElement(node)
+            for node in self.node.xpath(xpath)
+            if isinstance(node, html.HtmlElement)
+        ]
+
+    def find_element_by_xpath(self, xpath: str) -> "ReplayElement":
+        """
+        First element matching an xpath relative to this element
+
+        :param xpath: xpath expression
+        :return: the element
+        """
+        found = self.find_elements_by_xpath(xpath)
+        if not found:
+            raise exceptions.NoSuchElementException(
+                f"no element matches {xpath}"
+            )
+        return found[0]
+
+
+class ReplayBrowser:
+    """
+    Stand-in for a selenium webdriver serving pages from a page archive
+
+    Pages load instantly, so a replayed run only spends time on parsing and
+    evaluation. Urls that were never recorded load as an empty page and
+    are listed in misses, or raise a KeyError when strict.
+    """
+
+    def __init__(self, archive: Archive, strict: bool = False) -> None:
+        """
+        ReplayBrowser constructor
+
+        :param archive: archive to serve pages from
+        :param strict: raise on urls missing from the archive
+        """
+        self.archive = archive
+        self.strict = strict
+        self.current_url = "about:blank"
+        self.page_source = EMPTY_PAGE
+        self.misses: List[str] = []
+        self._document: Optional[ReplayElement] = None
+
+    def get(self, url: str) -> None:
+        """
+        Serves the recorded page of a url
+
+        :param url: url to load
+        :return: nothing
+        """
+        page = self.archive.page(url)
+        if page is None:
+            if url.startswith("about:"):
+                page = EMPTY_PAGE
+            elif self.strict:
+                raise KeyError(f"{url} is not in {self.archive.path}")
+            else:
+                self.misses.append(url)
+                page = EMPTY_PAGE
+
+        self.current_url = url
+        self.page_source = page
+        self._document = None
+
+    def document(self) -> ReplayElement:
+        """
+        Parsed tree of the current page, parsed on first lookup
+
+        :return: the root element
+        """
+        if self._document is None:
+            self._document = ReplayElement(html.fromstring(self.page_source))
+        return self._document
+
+    def find_elements_by_xpath(self, xpath: str) -> List[ReplayElement]:
+        """
+        Elements of the current page matching an xpath
+
+        :param xpath: xpath expression
+        :return: the matching elements
+        """
+        return self.document().find_elements_by_xpath(xpath)
+
+    def find_element_by_xpath(self, xpath: str) -> ReplayElement:
+        """
+        First element of the current page matching an xpath
+
+        :param xpath: xpath expression
+        :return: the element
+        """
+        return self.document().find_element_by_xpath(xpath)
+
+    def execute_script(self, *args: Any) -> None:
+        """
+        Scripts have nothing to run against in a replay
+
+        :return: nothing
+        """
+
+    def delete_all_cookies(self) -> None:
+        """
+        A replay has no cookies
+
+        :return: nothing
+        """
+
+    def quit(self) -> None:
+        """
+        Nothing to close, the archive belongs to the caller
+
+        :return: nothing
+        """
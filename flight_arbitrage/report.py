@@ -0,0 +1,330 @@
+"""Run reports: where the time of a search went, airport by airport"""
+
+import html
+import json
+import math
+import time
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from flight_arbitrage.limits import SearchProgress
+from flight_arbitrage.profiling import PhaseTimer
+
+if TYPE_CHECKING:
+    from flight_arbitrage.geography import FilterStats
+
+# phases spent getting a page into the browser and waiting for its listings
+LOAD_PHASES = ("page load", "tab switch")
+WAIT_PHASES = ("listings", "parse wait")
+
+PERCENTILES = (0.5, 0.9, 0.99)
+
+
+class AirportReport(NamedTuple):
+    """What the page of one candidate airport cost and yielded"""
+
+    airport: str
+    load_seconds: float
+    wait_seconds: float
+    listings: int
+    bad_count: int
+    retries: int
+    arbs: int
+    # listings a deep scan added after the first render, and the part of
+    # the wait it took
+    expanded: int = 0
+    scan_seconds: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        """
+        Time spent on the page
+
+        :return: load plus wait seconds
+        """
+        return self.load_seconds + self.wait_seconds
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    Nearest-rank percentile: the smallest value at least the given share of
+    the values are less than or equal to
+
+    :param values: sample values
+    :param share: percentile as a share, e.g. 0.95
+    :return: the percentile, 0.0 for no values
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # rounding keeps e.g. 0.07 * 100 from ranking as 8
+    rank = math.ceil(round(share * len(ordered), 9))
+    return ordered[min(len(ordered), max(1, rank)) - 1]
+
+
+class RunReport:
+    """
+    Per-airport load time, wait time, listings and arbitrages of a search
+
+    Created when a search starts, told about every evaluated airport and
+    finished with the phase timer of the search, whose breakdown by airport
+    scope gives the page timings and retries.
+
+    >>> flight.find_arbitrage(page_source=True)
+    >>> flight.report.write('run.html')
+    """
+
+    def __init__(
+        self,
+        route: Tuple[str, str, str],
+        site: str,
+        timer: Optional[PhaseTimer] = None,
+    ) -> None:
+        """
+        RunReport constructor
+
+        :param route: origin, destination and date searched
+        :param site: name of the site searched
+        :param timer: timer of the search, whose totals so far are left
+            out of the report
+        """
+        self.route = route
+        self.site = site
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+        self.progress: Optional[SearchProgress] = None
+        self.airports: List[AirportReport] = []
+        self.phases: Dict[str, Tuple[float, int]] = {}
+        # listings, unusable listings and arbitrages of evaluated airports
+        self.evaluations: Dict[str, Tuple[int, int, int]] = {}
+        # candidates the geographic filter kept and dropped, if one ran
+        self.geo_filter: Optional["FilterStats"] = None
+        self.baseline: Dict[str, Tuple[float, int]] = {}
+        if timer is not None:
+            with timer.lock:
+                self.baseline = {
+                    name: (seconds, timer.counts[name])
+                    for name, seconds in timer.totals.items()
+                }
+            timer.take_scoped()
+
+    def evaluated(
+        self, airport: str, listings: int, bad_count: int, arbs: int
+    ) -> None:
+        """
+        Records the evaluation of an airport's page
+
+        :param airport: candidate airport
+        :param listings: listings on the page
+        :param bad_count: listings without a price or layovers
+        :param arbs: arbitrages found on the page
+        :return: nothing
+        """
+        self.evaluations[airport] = (listings, bad_count, arbs)
+
+    def filtered(self, stats: "FilterStats") -> None:
+        """
+        Records what the geographic filter did to the candidates
+
+        :param stats: counts of the filter query of the search
+        :return: nothing
+        """
+        self.geo_filter = stats
+
+    def finish(
+        self, timer: PhaseTimer, progress: Optional[SearchProgress] = None
+    ) -> None:
+        """
+        Completes the report at the end of the search
+
+        :param timer: timer of the search
+        :param progress: how far the search got
+        :return: nothing
+        """
+        self.seconds = time.perf_counter() - self.started
+        self.progress = progress
+        scoped, tallies = timer.take_scoped()
+        with timer.lock:
+            for name, seconds in timer.totals.items():
+                before, calls = self.baseline.get(name, (0.0, 0))
+                if timer.counts[name] > calls:
+                    self.phases[name] = (
+                        seconds - before,
+                        timer.counts[name] - calls,
+                    )
+
+        airports = list(self.evaluations)
+        airports += [airport for airport in scoped if airport not in airports]
+        self.airports = []
+        for airport in airports:
+            phases = scoped.get(airport, {})
+            listings, bad_count, arbs = self.evaluations.get(
+                airport, (0, 0, 0)
+            )
+            self.airports.append(
+                AirportReport(
+                    airport,
+                    sum(phases.get(name, 0.0) for name in LOAD_PHASES),
+                    sum(phases.get(name, 0.0) for name in WAIT_PHASES),
+                    listings,
+                    bad_count,
+                    tallies.get(airport, {}).get("retries", 0),
+                    arbs,
+                    tallies.get(airport, {}).get("expanded", 0),
+                    phases.get("deep scan", 0.0),
+                )
+            )
+
+    def summary(self) -> dict:
+        """
+        Totals and percentiles over the airports of the search
+
+        :return: the summary, percentiles in milliseconds
+        """
+        summary = {
+            "airports": len(self.airports),
+            "seconds": round(self.seconds, 3),
+            "listings": sum(row.listings for row in self.airports),
+            "bad_count": sum(row.bad_count for row in self.airports),
+            "retries": sum(row.retries for row in self.airports),
+            "arbs": sum(row.arbs for row in self.airports),
+        }
+        if self.geo_filter is not None:
+            stats = self.geo_filter
+            summary["candidates"] = stats.candidates
+            summary["geo kept"] = stats.kept
+            summary["geo too close"] = stats.too_close
+            summary["geo off course"] = stats.off_course
+            summary["geo not indexed"] = stats.unknown
+        expanded = sum(row.expanded for row in self.airports)
+        if expanded or self.phases.get("deep scan"):
+            # coverage a deep scan bought and what it cost
+            scan_seconds = sum(row.scan_seconds for row in self.airports)
+            summary["expanded"] = expanded
+            summary["expanded share"] = round(
+                expanded / (summary["listings"] or 1), 3
+            )
+            summary["scan seconds"] = round(scan_seconds, 3)
+            summary["expanded per scan second"] = round(
+                expanded / scan_seconds if scan_seconds else 0.0, 1
+            )
+        for field in ("load", "wait"):
+            values = [
+                getattr(row, f"{field}_seconds") * 1000
+                for row in self.airports
+            ]
+            for share in PERCENTILES:
+                summary[f"{field} p{share * 100:.0f} ms"] = round(
+                    percentile(values, share), 1
+                )
+        return summary
+
+    def to_dict(self) -> dict:
+        """
+        Report in json form, slowest phases and airports first
+
+        :return: the report
+        """
+        # times are rounded before sorting, so the order holds for the
+        # times as written, ties keeping the order they were recorded in
+        phases = [
+            {"phase": name, "calls": calls, "seconds": round(seconds, 4)}
+            for name, (seconds, calls) in self.phases.items()
+        ]
+        airports = [
+            dict(
+                row._asdict(),
+                load_seconds=round(row.load_seconds, 4),
+                wait_seconds=round(row.wait_seconds, 4),
+                scan_seconds=round(row.scan_seconds, 4),
+            )
+            for row in self.airports
+        ]
+        return {
+            "route": list(self.route),
+            "site": self.site,
+            "progress": (
+                self.progress._asdict() if self.progress is not None else None
+            ),
+            "summary": self.summary(),
+            "phases": sorted(phases, key=lambda phase: -phase["seconds"]),
+            "airports": sorted(
+                airports,
+                key=lambda row: -(row["load_seconds"] + row["wait_seconds"]),
+            ),
+        }
+
+    def to_html(self) -> str:
+        """
+        Report as an html section with one table per part
+
+        :return: html fragment
+        """
+        report = self.to_dict()
+        title = " ".join(self.route) + f" on {self.site}"
+        return (
+            f"<section><h2>{html.escape(title)}</h2>"
+            + html_table([report["summary"]])
+            + html_table(report["phases"])
+            + html_table(report["airports"])
+            + "</section>"
+        )
+
+    def write(self, path: str) -> None:
+        """
+        Writes the report as html for '.html' paths and json otherwise
+
+        :param path: file path
+        :return: nothing
+        """
+        write_reports([self], path)
+
+
+def html_table(rows: List[dict]) -> str:
+    """
+    Html table with a header from the keys of the first row
+
+    :param rows: table rows
+    :return: html fragment, empty without rows
+    """
+    if not rows:
+        return ""
+    header = "".join(f"<th>{html.escape(str(key))}</th>" for key in rows[0])
+    body = "".join(
+        "<tr>"
+        + "".join(
+            f"<td>{html.escape(str(value))}</td>" for value in row.values()
+        )
+        + "</tr>"
+        for row in rows
+    )
+    return f"<table><tr>{header}</tr>{body}</table>"
+
+
+def write_reports(reports: Iterable[RunReport], path: str) -> None:
+    """
+    Writes run reports to one file, html for '.html' paths, else json
+
+    :param reports: reports of the searches of a run
+    :param path: file path
+    :return: nothing
+    """
+    reports = list(reports)
+    with open(path, "w") as file:
+        if path.endswith((".html", ".htm")):
+            file.write(
+                "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+                "<title>flight arbitrage run report</title></head><body>"
+                + "".join(report.to_html() for report in reports)
+                + "</body></html>\n"
+            )
+        else:
+            json.dump([report.to_dict() for report in reports], file, indent=2)
+            file.write("\n")
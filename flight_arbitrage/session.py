@@ -0,0 +1,266 @@
+"""Memory-bounded browser sessions for long arbitrage runs"""
+
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import psutil  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    psutil = None
+
+CLEAR_STORAGE = (
+    "try { window.localStorage.clear(); window.sessionStorage.clear(); }"
+    " catch (error) {}"
+)
+
+
+class HygienePolicy(NamedTuple):
+    """When to sample, reset and restart a browser session"""
+
+    # navigate to about:blank and clear cookies/storage/cache every N pages
+    reset_every: int = 20
+    # restart the browser once its process tree uses more than this, 0 never
+    restart_rss_mb: float = 1500.0
+    # sample memory every N pages, 0 never
+    sample_every: int = 1
+
+
+def process_tree_rss(pid: int) -> int:
+    """
+    Resident memory of a process and all of its descendants
+
+    :param pid: root process id, e.g. the webdriver service process
+    :return: bytes, 0 if the processes cannot be inspected
+    """
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return 0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total
+
+    return _proc_tree_rss(pid)
+
+
+def _proc_tree_rss(pid: int) -> int:
+    """
+    Linux /proc fallback of process_tree_rss when psutil is missing
+
+    :param pid: root process id
+    :return: bytes, 0 if /proc is not available
+    """
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status", "r") as file:
+                for line in file:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(
+                    f"/proc/{current}/task/{task}/children", "r"
+                ) as file:
+                    pending.extend(int(child) for child in file.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+def browser_rss(browser: Any) -> int:
+    """
+    Resident memory of a selenium browser and its driver
+
+    :param browser: selenium webdriver
+    :return: bytes, 0 if the browser process is unknown
+    """
+    service = getattr(browser, "service", None)
+    process = getattr(service, "process", None)
+    pid = getattr(process, "pid", None)
+    if not isinstance(pid, int):
+        return 0
+    return process_tree_rss(pid)
+
+
+class ManagedBrowser:
+    """
+    Browser wrapper that keeps a long-running session's memory bounded
+
+    Every attribute other than get is forwarded to the current browser, so
+    code written against a selenium webdriver keeps working unchanged.
+    Pages loaded some other way, e.g. in background tabs, go through load
+    so they count towards resets, restarts and memory samples too.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        policy: HygienePolicy = HygienePolicy(),
+        browser: Any = None,
+        sampler: Callable[[Any], int] = browser_rss,
+    ) -> None:
+        """
+        ManagedBrowser constructor
+
+        :param factory: opens a fresh browser
+        :param policy: when to sample, reset and restart
+        :param browser: already opened browser, opened with factory if None
+        :param sampler: returns the memory of a browser in bytes
+        """
+        self._browser = browser if browser is not None else factory()
+        self._factory = factory
+        self._policy = policy
+        self._sampler = sampler
+
+        self.pages = 0
+        self.resets = 0
+        self.restarts = 0
+        self.samples: List[Tuple[int, int]] = []
+        self._restart_due = False
+        # pages loaded when the cookies, storage and cache were last dropped
+        self._reset_at = 0
+
+    @property
+    def browser(self) -> Any:
+        """
+        The browser currently in use
+
+        :return: selenium webdriver
+        """
+        return self._browser
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._browser, name)
+
+    def get(self, url: str) -> None:
+        """
+        Loads a page after any reset or restart that is due
+
+        :param url: url to load
+        :return: nothing
+        """
+        self.load(url)
+
+    def load(
+        self, url: str, start: Optional[Callable[[str], None]] = None
+    ) -> None:
+        """
+        Loads a page, counting and sampling it; every page of the session
+        goes through here
+
+        Resets and restarts that are due are applied before pages loaded
+        into the current tab. Pages started elsewhere, e.g. in other tabs,
+        would be lost by them, so whoever starts those applies them through
+        upkeep once nothing else is loading.
+
+        :param url: url to load
+        :param start: starts loading the url somewhere other than the
+            current tab, e.g. in a new tab; the current tab loads it if None
+        :return: nothing
+        """
+        if start is not None:
+            start(url)
+        else:
+            self.upkeep()
+            self._browser.get(url)
+        self.pages += 1
+
+        if self._policy.sample_every and (
+            self.pages % self._policy.sample_every == 0
+        ):
+            self.sample()
+
+    def upkeep_due(self) -> bool:
+        """
+        Whether a reset or restart is due before the next page
+
+        :return: True if upkeep would reset or restart the browser
+        """
+        return self._restart_due or bool(
+            self._policy.reset_every
+            and self.pages - self._reset_at >= self._policy.reset_every
+        )
+
+    def upkeep(self) -> None:
+        """
+        Restarts or resets the browser if either is due
+
+        :return: nothing
+        """
+        if self._restart_due:
+            self.restart()
+        elif self.upkeep_due():
+            self.reset()
+
+    def sample(self) -> int:
+        """
+        Records the browser memory and flags a restart above the threshold
+
+        :return: bytes in use
+        """
+        rss = self._sampler(self._browser)
+        self.samples.append((self.pages, rss))
+        limit = self._policy.restart_rss_mb * 1024 * 1024
+        if limit and rss > limit:
+            self._restart_due = True
+        return rss
+
+    def reset(self) -> None:
+        """
+        Drops cookies, storage and cache, leaving the tab on about:blank
+
+        :return: nothing
+        """
+        # each step is best effort, not every driver supports all of them
+        for method, arguments in (
+            ("execute_script", (CLEAR_STORAGE,)),
+            ("delete_all_cookies", ()),
+            ("execute_cdp_cmd", ("Network.clearBrowserCache", {})),
+            ("get", ("about:blank",)),
+        ):
+            try:
+                getattr(self._browser, method)(*arguments)
+            except Exception:  # pylint: disable=broad-except
+                continue
+        self.resets += 1
+        self._reset_at = self.pages
+
+    def restart(self) -> None:
+        """
+        Replaces the browser with a fresh one
+
+        :return: nothing
+        """
+        try:
+            self._browser.quit()
+        except Exception:  # pylint: disable=broad-except
+            pass
+        self._browser = self._factory()
+        self._restart_due = False
+        self.restarts += 1
+        # a fresh browser has nothing to reset
+        self._reset_at = self.pages
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """
+        Memory and hygiene counters of the session
+
+        :return: pages, resets, restarts and peak/last memory in megabytes
+        """
+        rss = [sample for _, sample in self.samples]
+        return {
+            "pages": self.pages,
+            "resets": self.resets,
+            "restarts": self.restarts,
+            "peak_rss_mb": max(rss) / 1024 / 1024 if rss else None,
+            "last_rss_mb": rss[-1] / 1024 / 1024 if rss else None,
+        }
@@ -0,0 +1,219 @@
+"""Site adapters: how to search a flight site and read its results"""
+
+import json
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Pattern, Tuple
+from urllib.parse import urlsplit
+
+from flight_arbitrage.extraction import (
+    DEFAULT_RULES,
+    RULES_DIRECTORY,
+    ExtractionRules,
+    Offer,
+    rules_from_dict,
+)
+
+DEFAULT_SITE = DEFAULT_RULES
+
+# fields every search url template has to fill in
+URL_FIELDS = ("{origin}", "{destination}", "{date}")
+
+URL_FIELD = re.compile(r"\{(origin|destination|date)\}")
+
+# what a field may match: airports never hold a slash, dates may
+FIELD_TEXT = {
+    "origin": "[^/?&#]+?",
+    "destination": "[^/?&#]+?",
+    "date": "[^?&#]+?",
+}
+
+
+def route_pattern(url_template: str) -> Pattern:
+    """
+    Pattern finding the route in the search urls of a template
+
+    It spans the fields and the text between them, from the start of the
+    path segment or query parameter the first field is in to the end of
+    the one the last field is in, so it finds routes whatever the other
+    parameters are, and in paths without scheme and host.
+
+    :param url_template: search url with {origin}, {destination} and
+        {date} fields
+    :return: pattern with origin, destination and date groups
+    """
+    parts = URL_FIELD.split(url_template)
+    head = re.split(r"[/?&]", parts[0])[-1]
+    tail = re.split(r"[/?&#]", parts[-1])[0]
+    # a query value ends at the next parameter, a path segment at a slash
+    in_query = "?" in "".join(parts[:-1])
+    pattern = "(?:^|(?<=[?&]))" if "?" in parts[0] else "(?:^|(?<=/))"
+    pattern += re.escape(head)
+    for index in range(1, len(parts), 2):
+        literal = parts[index + 1] if index + 2 < len(parts) else tail
+        pattern += f"(?P<{parts[index]}>{FIELD_TEXT[parts[index]]})"
+        pattern += re.escape(literal)
+    return re.compile(pattern + ("(?=[&#]|$)" if in_query else "(?=[/?#]|$)"))
+
+
+class ReadyRule(NamedTuple):
+    """When a results page counts as rendered"""
+
+    # offer field a listing shows once rendered: price, stops or departure
+    field: str = "price"
+    # listings that have to show it
+    listings: int = 1
+
+
+def ready_rule(data: dict) -> ReadyRule:
+    """
+    Builds a readiness rule from the 'ready' mapping of site rules
+
+    :param data: mapping with optional field and listings keys
+    :return: the rule, with defaults for missing keys
+    """
+    try:
+        rule = ReadyRule(**data)
+    except TypeError as error:
+        raise ValueError(f"bad ready rule {data!r}") from error
+    if rule.field not in Offer._fields or rule.listings < 1:
+        raise ValueError(f"bad ready rule {data!r}")
+    return rule
+
+
+class SiteAdapter:
+    """
+    One flight search site: its search urls, readiness and page parsing
+
+    Adapters are described by a rules file that adds a 'search_url'
+    template and an optional 'ready' rule to the extraction rules, so
+    supporting another site needs a rules file rather than code.
+    """
+
+    def __init__(
+        self,
+        url_template: str,
+        rules: ExtractionRules,
+        readiness: ReadyRule = ReadyRule(),
+    ) -> None:
+        """
+        SiteAdapter constructor
+
+        :param url_template: one-way search url with {origin},
+            {destination} and {date} fields
+        :param rules: extraction rules of the results pages
+        :param readiness: when a results page counts as rendered
+        """
+        missing = [field for field in URL_FIELDS if field not in url_template]
+        if missing:
+            raise ValueError(
+                f"search url of {rules.name} is missing {', '.join(missing)}"
+            )
+        self.url_template = url_template
+        self.rules = rules
+        self.readiness = readiness
+        self.host = urlsplit(url_template).netloc
+        self.route_pattern = route_pattern(url_template)
+
+    def __repr__(self) -> str:
+        return f"SiteAdapter(name={self.name!r})"
+
+    @property
+    def name(self) -> str:
+        """
+        Name of the site, as given by its rules
+
+        :return: e.g. 'expedia'
+        """
+        return self.rules.name
+
+    def search_url(self, origin: str, destination: str, date: str) -> str:
+        """
+        Url of the one-way search results for a route
+
+        :param origin: airport the ticket flies from
+        :param destination: airport the ticket flies to
+        :param date: date of flight
+        :return: the search url
+        """
+        return self.url_template.format(
+            origin=origin, destination=destination, date=date
+        )
+
+    def route_of(self, url: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Route of one of the site's search urls
+
+        :param url: search url, or its path and query as a server sees it
+        :return: origin, destination and date, None for other urls
+        """
+        host = urlsplit(url).netloc
+        if host and host != self.host:
+            return None
+        match = self.route_pattern.search(url)
+        if match is None:
+            return None
+        return (
+            match.group("origin"),
+            match.group("destination"),
+            match.group("date"),
+        )
+
+    def ready(self, offers: List[Offer]) -> bool:
+        """
+        Whether a results page finished rendering its listings
+
+        :param offers: offers parsed from the page so far
+        :return: True once enough listings show the field of the site's
+            ready rule, by default once any listing shows a price
+        """
+        field = Offer._fields.index(self.readiness.field)
+        shown = sum(offer[field] is not None for offer in offers)
+        return shown >= self.readiness.listings
+
+    def extract(self, page_source: str) -> List[Offer]:
+        """
+        Parses every listing of a results page
+
+        :param page_source: html of a results page
+        :return: one offer per listing, with None for missing fields
+        """
+        return self.rules.extract(page_source)
+
+
+def site_from_dict(data: dict) -> SiteAdapter:
+    """
+    Builds a site adapter from its serialised form
+
+    :param data: extraction rules mapping with a 'search_url' key and an
+        optional 'ready' key
+    :return: the site adapter
+    """
+    if "search_url" not in data:
+        raise ValueError("site rules are missing the key 'search_url'")
+    return SiteAdapter(
+        data["search_url"],
+        rules_from_dict(data),
+        ready_rule(data.get("ready", {})),
+    )
+
+
+@lru_cache(maxsize=None)
+def load_site(site: str = "") -> SiteAdapter:
+    """
+    Loads a site adapter, once per process
+
+    :param site: name of a bundled site or path of a site rules json file,
+        defaults to the bundled expedia site
+    :return: the site adapter
+    """
+    site_file = (
+        Path(site)
+        if site.endswith(".json")
+        else RULES_DIRECTORY / f"{site or DEFAULT_SITE}.json"
+    )
+    if not site_file.exists():
+        raise ValueError(f"no site named {site!r}")
+    with open(site_file, "r") as file:
+        return site_from_dict(json.load(file))
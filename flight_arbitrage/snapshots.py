@@ -0,0 +1,435 @@
+"""Append-only store of compressed result page snapshots"""
+
+import gzip
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from flight_arbitrage.extraction import ExtractionRules, Offer, load_rules
+from flight_arbitrage.sites import DEFAULT_SITE, SiteAdapter, load_site
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on windows
+    fcntl = None  # type: ignore
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+CODEC_GZIP = 0
+CODEC_ZSTD = 1
+
+# site, origin, destination, date, timestamp, block offset, compressed
+# length, page length, codec
+INDEX_RECORD = struct.Struct("<16s8s8s16sdQIIB7x")
+
+# site, origin, destination and date of a page
+Route = Tuple[str, str, str, str]
+
+
+class SnapshotKey(NamedTuple):
+    """Route, time and site a results page was captured"""
+
+    origin: str
+    destination: str
+    date: str
+    timestamp: float
+    site: str = DEFAULT_SITE
+
+
+class SnapshotEntry(NamedTuple):
+    """Index record of one snapshot"""
+
+    key: SnapshotKey
+    offset: int
+    length: int
+    size: int
+    codec: int
+
+
+def route_of(url: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Route of a one-way search url of the default site
+
+    :param url: search url, as built by OneWay.search_url
+    :return: origin, destination and date, None for other urls
+    """
+    return load_site().route_of(url)
+
+
+def encode_field(value: str, width: int) -> bytes:
+    """
+    Fixed-width index field
+
+    :param value: field value
+    :param width: field width in bytes
+    :return: the utf-8 value, nul padded by struct
+    """
+    encoded = value.encode("utf-8")
+    if len(encoded) > width:
+        raise ValueError(f"{value!r} is longer than {width} bytes")
+    return encoded
+
+
+def decode_field(value: bytes) -> str:
+    """
+    Value of a fixed-width index field
+
+    :param value: nul padded bytes
+    :return: the field value
+    """
+    return value.rstrip(b"\0").decode("utf-8")
+
+
+class SnapshotStore:
+    """
+    Append-only snapshots keyed by (site, origin, destination, date,
+    timestamp)
+
+    Every page is compressed into its own block in pages.blocks and
+    described by a fixed-width record in pages.index. Both files are
+    memory-mapped for reading, so looking up and decompressing a single
+    page never touches the rest of the archive. Blocks are zstd compressed
+    when the zstandard package is installed and gzip compressed otherwise;
+    either kind reads back as long as its codec is available.
+
+    The store also serves as a page archive for RecordingBrowser and
+    ReplayBrowser, keyed by the site and route of the search url. Appends
+    from several processes are serialized with fcntl file locks; where
+    fcntl is missing, e.g. on windows, only the threads of one process are.
+    Lookups of the latest page re-check the index length, so they see
+    pages appended by other processes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        codec: Optional[int] = None,
+        level: int = 6,
+        sites: Optional[Sequence[SiteAdapter]] = None,
+    ) -> None:
+        """
+        SnapshotStore constructor
+
+        :param path: directory of the store, created if missing
+        :param codec: CODEC_ZSTD or CODEC_GZIP for new blocks, by default
+            zstd when available
+        :param level: compression level
+        :param sites: sites whose search urls are archived, defaults to the
+            default site
+        """
+        if codec is None:
+            codec = CODEC_ZSTD if zstandard is not None else CODEC_GZIP
+        if codec == CODEC_ZSTD and zstandard is None:
+            raise ValueError("zstd snapshots require the zstandard package")
+
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.codec = codec
+        self.level = level
+        self.blocks_path = os.path.join(path, "pages.blocks")
+        self.index_path = os.path.join(path, "pages.index")
+        self.sites = list(sites) if sites is not None else [load_site()]
+        self.lock = threading.Lock()
+
+        self._maps: Dict[str, mmap.mmap] = {}
+        self._latest: Dict[Route, SnapshotEntry] = {}
+        # number of index records _latest has seen
+        self._indexed = 0
+        self._digests: Dict[Route, bytes] = {}
+
+    def __enter__(self) -> "SnapshotStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.view(self.index_path)) // INDEX_RECORD.size
+
+    def __contains__(self, url: object) -> bool:
+        return isinstance(url, str) and self.page(url) is not None
+
+    def view(self, path: str) -> memoryview:
+        """
+        Read-only map of a store file, remapped once the file has grown
+
+        :param path: blocks or index file path
+        :return: a view of the mapped bytes, empty for a missing file
+        """
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return memoryview(b"")
+
+        current = self._maps.get(path)
+        if current is None or len(current) < size:
+            if not size:
+                return memoryview(b"")
+            with open(path, "rb") as file:
+                current = mmap.mmap(
+                    file.fileno(), size, access=mmap.ACCESS_READ
+                )
+            # an outgrown map is released with the last view into it
+            self._maps[path] = current
+        return memoryview(current)
+
+    def entries(self, start: int = 0) -> Iterator[SnapshotEntry]:
+        """
+        Every snapshot in the order it was appended
+
+        :param start: number of snapshots to skip
+        :return: iterator of index entries
+        """
+        index = self.view(self.index_path)
+        # a writer killed mid-append can leave a partial last record
+        complete = len(index) - len(index) % INDEX_RECORD.size
+        skipped = start * INDEX_RECORD.size
+        for record in INDEX_RECORD.iter_unpack(index[skipped:complete]):
+            site, origin, destination, date, timestamp = record[:5]
+            yield SnapshotEntry(
+                SnapshotKey(
+                    decode_field(origin),
+                    decode_field(destination),
+                    decode_field(date),
+                    timestamp,
+                    decode_field(site),
+                ),
+                *record[5:],
+            )
+
+    def find(
+        self,
+        origin: str = "",
+        destination: str = "",
+        date: str = "",
+        since: float = 0.0,
+        until: float = float("inf"),
+        site: str = "",
+    ) -> List[SnapshotEntry]:
+        """
+        Snapshots matching a route and time range
+
+        :param origin: origin airport, any if empty
+        :param destination: destination airport, any if empty
+        :param date: flight date, any if empty
+        :param since: earliest capture timestamp
+        :param until: latest capture timestamp
+        :param site: site name, any if empty
+        :return: matching entries in append order
+        """
+        return [
+            entry
+            for entry in self.entries()
+            if (not site or entry.key.site == site)
+            and (not origin or entry.key.origin == origin)
+            and (not destination or entry.key.destination == destination)
+            and (not date or entry.key.date == date)
+            and since <= entry.key.timestamp <= until
+        ]
+
+    def latest(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        site: str = DEFAULT_SITE,
+    ) -> Optional[SnapshotEntry]:
+        """
+        Most recent snapshot of a route
+
+        Only the records appended since the previous lookup, by this or
+        any other process, are read.
+
+        :param origin: origin airport
+        :param destination: destination airport
+        :param date: flight date
+        :param site: site name
+        :return: the entry, None if the route was never captured
+        """
+        with self.lock:
+            if self._indexed < len(self):
+                for entry in self.entries(self._indexed):
+                    self._indexed += 1
+                    key = entry.key
+                    route = (key.site, key.origin, key.destination, key.date)
+                    known = self._latest.get(route)
+                    if known is None or key.timestamp >= known.key.timestamp:
+                        self._latest[route] = entry
+            return self._latest.get((site, origin, destination, date))
+
+    def read(self, entry: SnapshotEntry) -> str:
+        """
+        Decompresses the page of one snapshot
+
+        :param entry: index entry
+        :return: the page source
+        """
+        start, end = entry.offset, entry.offset + entry.length
+        with self.view(self.blocks_path) as blocks:
+            block = bytes(blocks[start:end])
+        if entry.codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError(
+                    "zstd snapshots require the zstandard package"
+                )
+            data = zstandard.ZstdDecompressor().decompress(
+                block, max_output_size=entry.size
+            )
+        elif entry.codec == CODEC_GZIP:
+            data = gzip.decompress(block)
+        else:
+            raise ValueError(f"unknown snapshot codec {entry.codec}")
+        return data.decode("utf-8")
+
+    def offers(
+        self, entry: SnapshotEntry, rules: Optional[ExtractionRules] = None
+    ) -> List[Offer]:
+        """
+        Re-parses the page of one snapshot
+
+        :param entry: index entry
+        :param rules: extraction rules, defaults to the bundled rules
+        :return: the offers on the page
+        """
+        return (rules or load_rules()).extract(self.read(entry))
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compresses a page with the store codec
+
+        :param data: utf-8 page source
+        :return: the compressed block
+        """
+        if self.codec == CODEC_ZSTD:
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return gzip.compress(data, compresslevel=self.level)
+
+    def append(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        page_source: str,
+        timestamp: Optional[float] = None,
+        site: str = DEFAULT_SITE,
+    ) -> SnapshotEntry:
+        """
+        Adds a snapshot to the store
+
+        :param origin: origin airport
+        :param destination: destination airport
+        :param date: flight date
+        :param page_source: page source of the results page
+        :param timestamp: capture time, defaults to now
+        :param site: name of the site the page is from
+        :return: the index entry of the snapshot
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        fields = (
+            encode_field(site, 16),
+            encode_field(origin, 8),
+            encode_field(destination, 8),
+            encode_field(date, 16),
+        )
+        data = page_source.encode("utf-8")
+        block = self.compress(data)
+
+        with self.lock, open(self.index_path, "ab") as index:
+            # other processes append to the same store under the same lock
+            if fcntl is not None:
+                fcntl.flock(index, fcntl.LOCK_EX)
+            try:
+                with open(self.blocks_path, "ab") as blocks:
+                    offset = blocks.tell()
+                    blocks.write(block)
+                # the block is on disk before the record pointing at it
+                index.write(
+                    INDEX_RECORD.pack(
+                        *fields,
+                        timestamp,
+                        offset,
+                        len(block),
+                        len(data),
+                        self.codec,
+                    )
+                )
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(index, fcntl.LOCK_UN)
+
+        return SnapshotEntry(
+            SnapshotKey(origin, destination, date, timestamp, site),
+            offset,
+            len(block),
+            len(data),
+            self.codec,
+        )
+
+    def site_route(self, url: str) -> Optional[Route]:
+        """
+        Site and route of a search url
+
+        :param url: url that was loaded
+        :return: site name, origin, destination and date, None for urls
+            that are not one-way searches of the store's sites
+        """
+        for site in self.sites:
+            route = site.route_of(url)
+            if route is not None:
+                return (site.name, *route)
+        return None
+
+    def record(self, url: str, page_source: str) -> None:
+        """
+        Page archive interface: snapshots the page of a search url
+
+        Repeated reads of an unchanged page are stored once and urls that
+        are not one-way searches of the store's sites are ignored.
+
+        :param url: url that was loaded
+        :param page_source: page source as rendered by the browser
+        :return: nothing
+        """
+        route = self.site_route(url)
+        if route is None:
+            return
+        digest = hashlib.blake2b(page_source.encode("utf-8")).digest()
+        if self._digests.get(route) == digest:
+            return
+        self._digests[route] = digest
+        site, origin, destination, date = route
+        self.append(origin, destination, date, page_source, site=site)
+
+    def page(self, url: str) -> Optional[str]:
+        """
+        Page archive interface: latest page of a search url
+
+        :param url: url that was loaded
+        :return: the page source, None if the route was never captured
+        """
+        route = self.site_route(url)
+        entry = (
+            self.latest(*route[1:], route[0]) if route is not None else None
+        )
+        return self.read(entry) if entry is not None else None
+
+    def close(self) -> None:
+        """
+        Unmaps the store files
+
+        :return: nothing
+        """
+        for mapped in self._maps.values():
+            try:
+                mapped.close()
+            except BufferError:
+                # still viewed by a running entries() iteration
+                continue
+        self._maps = {}
@@ -0,0 +1,241 @@
+"""Hit-rate statistics that size the candidate airport list of a search"""
+
+import json
+import math
+import os
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+from flight_arbitrage.fingerprints import merge_json
+
+
+class CandidatePlan(NamedTuple):
+    """Candidates to search for one query and the ones left out"""
+
+    searched: List[str]
+    skipped: List[str]
+    # share of the expected arbitrage hits the searched candidates cover
+    expected_recall: float
+
+
+class YieldStats:
+    """
+    Per (origin, hub, candidate) search and hit counts from past runs
+
+    A candidate's hit rate is estimated as (hits + 1) / (searches + 2), so
+    candidates that keep producing nothing for a hub sink to the bottom.
+    Candidates without history are always searched. Each plan then adds
+    the most promising of the others until the searched ones cover
+    target_recall of the expected hits, plus the explore share of the rest
+    that has gone unsearched the longest, so skipped candidates are
+    rechecked and the list grows back when they start producing.
+    """
+
+    def __init__(
+        self,
+        path: str = "",
+        target_recall: float = 0.95,
+        explore: float = 0.1,
+    ) -> None:
+        """
+        YieldStats constructor, loads the saved statistics
+
+        :param path: json file path, statistics stay in memory if empty
+        :param target_recall: share of expected hits each plan must cover,
+            1.0 searches every candidate
+        :param explore: share of the skipped candidates searched anyway
+        """
+        if not 0.0 < target_recall <= 1.0:
+            raise ValueError("target recall must be in (0, 1]")
+
+        self.path = path
+        self.target_recall = target_recall
+        self.explore = explore
+        self.lock = threading.Lock()
+
+        # candidate key -> [searches, hits, run of the last search]
+        self.candidates: Dict[str, List[int]] = {}
+        self.runs: Dict[str, int] = {}
+        self.changes: Dict[str, List[int]] = {}
+        self.run_changes: Dict[str, int] = {}
+
+        self.pages_planned = 0
+        self.pages_skipped = 0
+
+        if path and os.path.exists(path):
+            with open(path, "r") as file:
+                content = file.read()
+            saved = json.loads(content) if content else {}
+            self.candidates = saved.get("candidates", {})
+            self.runs = saved.get("runs", {})
+
+    def __enter__(self) -> "YieldStats":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.save()
+
+    @staticmethod
+    def key(*fields: str) -> str:
+        """
+        Statistics key of a query or candidate
+
+        :param fields: origin and hub, and the candidate for a candidate key
+        :return: the key
+        """
+        return " ".join(fields)
+
+    def rate(self, origin: str, hub: str, candidate: str) -> float:
+        """
+        Estimated chance that a candidate produces arbitrage for a query
+
+        :param origin: airport the search starts from
+        :param hub: destination the hidden city tickets lay over at
+        :param candidate: final destination of the tickets searched
+        :return: the hit rate estimate
+        """
+        searches, hits, _ = self.candidates.get(
+            self.key(origin, hub, candidate), (0, 0, 0)
+        )
+        return (hits + 1.0) / (searches + 2.0)
+
+    def plan(
+        self, origin: str, hub: str, candidates: Iterable[str]
+    ) -> CandidatePlan:
+        """
+        Picks the candidates worth a page load for a query
+
+        :param origin: airport the search starts from
+        :param hub: destination the hidden city tickets lay over at
+        :param candidates: candidate final destinations, in search order
+        :return: the plan, searched candidates keep their order
+        """
+        candidates = list(candidates)
+        with self.lock:
+            rates = {
+                candidate: self.rate(origin, hub, candidate)
+                for candidate in candidates
+            }
+            total = sum(rates.values())
+
+            # candidates without any history are always searched
+            chosen: Set[str] = {
+                candidate
+                for candidate in candidates
+                if self.key(origin, hub, candidate) not in self.candidates
+            }
+            covered = sum(rates[candidate] for candidate in chosen)
+            for candidate in sorted(
+                candidates, key=lambda candidate: -rates[candidate]
+            ):
+                if covered >= self.target_recall * total:
+                    break
+                if candidate not in chosen:
+                    chosen.add(candidate)
+                    covered += rates[candidate]
+
+            rest = [
+                candidate
+                for candidate in candidates
+                if candidate not in chosen
+            ]
+            rest.sort(
+                key=lambda candidate: self.candidates.get(
+                    self.key(origin, hub, candidate), (0, 0, 0)
+                )[2]
+            )
+            chosen.update(rest[: math.ceil(self.explore * len(rest))])
+
+            searched = [c for c in candidates if c in chosen]
+            skipped = [c for c in candidates if c not in chosen]
+            self.pages_planned += len(searched)
+            self.pages_skipped += len(skipped)
+
+        return CandidatePlan(
+            searched,
+            skipped,
+            sum(rates[c] for c in searched) / total if total else 1.0,
+        )
+
+    def record(
+        self,
+        origin: str,
+        hub: str,
+        searched: Iterable[str],
+        hits: Iterable[str],
+    ) -> None:
+        """
+        Counts the outcome of a completed search
+
+        :param origin: airport the search starts from
+        :param hub: destination the hidden city tickets lay over at
+        :param searched: candidates whose pages were evaluated
+        :param hits: candidates that produced arbitrage
+        :return: nothing
+        """
+        hit_set = set(hits)
+        with self.lock:
+            query = self.key(origin, hub)
+            run = self.runs.get(query, 0) + 1
+            self.runs[query] = run
+            self.run_changes[query] = self.run_changes.get(query, 0) + 1
+
+            for candidate in searched:
+                key = self.key(origin, hub, candidate)
+                hit = int(candidate in hit_set)
+                entry = self.candidates.setdefault(key, [0, 0, 0])
+                entry[0] += 1
+                entry[1] += hit
+                entry[2] = run
+                change = self.changes.setdefault(key, [0, 0, 0])
+                change[0] += 1
+                change[1] += hit
+                change[2] = run
+
+    def changes_into(self, saved: dict) -> None:
+        """
+        Adds the counts recorded since the last save to saved statistics
+
+        Counts are added rather than replaced, so runs sharing a file all
+        count.
+
+        :param saved: statistics in the file
+        :return: nothing
+        """
+        candidates = saved.setdefault("candidates", {})
+        runs = saved.setdefault("runs", {})
+        for query, count in self.run_changes.items():
+            runs[query] = runs.get(query, 0) + count
+        for key, (searches, hits, run) in self.changes.items():
+            entry = candidates.setdefault(key, [0, 0, 0])
+            entry[0] += searches
+            entry[1] += hits
+            entry[2] = max(entry[2], run)
+
+    def save(self) -> None:
+        """
+        Adds the counts recorded since the last save to the file
+
+        :return: nothing
+        """
+        with self.lock:
+            if not self.path or not (self.changes or self.run_changes):
+                return
+            saved = merge_json(self.path, self.changes_into)
+            self.candidates = saved["candidates"]
+            self.runs = saved["runs"]
+            self.changes = {}
+            self.run_changes = {}
+
+    def report(self) -> str:
+        """
+        Page loads saved by the plans made so far
+
+        :return: one line summary
+        """
+        total = self.pages_planned + self.pages_skipped
+        share = self.pages_skipped / total if total else 0.0
+        return (
+            f"candidate pages searched: {self.pages_planned}, "
+            f"skipped: {self.pages_skipped} ({share:.0%} saved)"
+        )
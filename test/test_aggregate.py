@@ -0,0 +1,121 @@
+"""Unit test file for searching several flight sites at once"""
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flight_arbitrage.aggregate import fan_out, merge_arbs
+from flight_arbitrage.extraction import load_rules, rules_from_dict
+from flight_arbitrage.flight import FlightOptions
+from flight_arbitrage.mock_site import MockSite, SiteArchive, SiteConfig
+from flight_arbitrage.sites import SiteAdapter, load_site
+
+CANDIDATES = ["ATL", "BOS", "JFK", "LAX", "MIA", "SEA"]
+
+
+def other_site(name):
+    """
+    Site with the expedia pages behind another host
+
+    :param name: name of the site
+    :return: the site adapter
+    """
+    return SiteAdapter(
+        "https://other.example/Flights-Search?leg1=from:{origin},"
+        "to:{destination},departure:{date}TANYT",
+        rules_from_dict(dict(load_rules().to_dict(), name=name)),
+    )
+
+
+class TestAggregate(unittest.TestCase):
+    """Unit tests for the fan_out and merge_arbs functions"""
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_fan_out(self, mocked_search, mocked_tqdm):
+        """
+        Every site is searched and their arbitrages merge, tagged by site
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = CANDIDATES
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        with MockSite(SiteConfig(listings=40)) as site, patch("sys.stderr"):
+            results = list(
+                fan_out(
+                    "JFK",
+                    "DEN",
+                    "07/10/2021",
+                    [load_site(), other_site("other")],
+                    FlightOptions(archive=SiteArchive(site.url)),
+                    web_browser="replay",
+                    page_source=True,
+                )
+            )
+
+        self.assertEqual(
+            sorted(result.site for result in results), ["expedia", "other"]
+        )
+        self.assertTrue(all(result.error is None for result in results))
+        merged = merge_arbs(results)
+        self.assertTrue(merged)
+        self.assertEqual(
+            len(merged), sum(len(result.arbs) for result in results)
+        )
+        savings = [arb["savings"] for arb in merged]
+        self.assertEqual(savings, sorted(savings, reverse=True))
+        # the mock site serves the same pages to both hosts
+        by_site = {
+            result.site: [
+                {k: v for k, v in arb.items() if k != "provider"}
+                for arb in result.arbs
+            ]
+            for result in results
+        }
+        self.assertEqual(by_site["expedia"], by_site["other"])
+        self.assertEqual(
+            {arb["provider"] for arb in merged}, {"expedia", "other"}
+        )
+
+    @patch("flight_arbitrage.aggregate.OneWay")
+    def test_fan_out_slow_site(self, mocked_one_way):
+        """
+        Results of a fast site come out while a slow site is still running
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        released = threading.Event()
+
+        def search(*_, site, **__):
+            flight = MagicMock(progress=None)
+            if site.name == "slow":
+                flight.find_arbitrage.side_effect = lambda **_: (
+                    released.wait(5) and []
+                )
+            else:
+                flight.find_arbitrage.side_effect = Exception("blocked")
+            return flight
+
+        mocked_one_way.side_effect = search
+        results = fan_out(
+            "JFK", "DEN", "07/10/2021", [other_site("slow"), load_site()]
+        )
+
+        first = next(results)
+        self.assertFalse(released.is_set())
+        self.assertEqual(first.site, "expedia")
+        self.assertEqual(str(first.error), "blocked")
+        released.set()
+        second = next(results)
+        self.assertEqual(second.site, "slow")
+        self.assertEqual((second.arbs, second.error), ([], None))
+        self.assertEqual(list(results), [])
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,127 @@
+"""Unit test file for the airport metadata index"""
+
+import os
+import tempfile
+import unittest
+
+from flight_arbitrage.airports import (
+    Airport,
+    AirportIndex,
+    build_index,
+    rank_airports,
+    read_ourairports,
+)
+
+OURAIRPORTS = """\
+"id","ident","type","name","latitude_deg","longitude_deg","iso_country",\
+"municipality","iata_code"
+1,"KJFK","large_airport","John F Kennedy",40.6398,-73.7789,"US",\
+"New York","JFK"
+2,"KSLC","large_airport","Salt Lake City",40.7884,-111.978,"US",\
+"Salt Lake City","SLC"
+3,"KBOI","medium_airport","Boise Air Terminal",43.5644,-116.223,"US",\
+"Boise","BOI"
+4,"KXYZ","small_airport","Grass Strip",41.0,-100.0,"US","Nowhere","XYZ"
+5,"EDDM","large_airport","Munich",48.3538,11.7861,"DE","München","MUC"
+6,"KNOC","medium_airport","No Code",42.0,-90.0,"US","Somewhere",""
+"""
+
+
+class TestAirportIndex(unittest.TestCase):
+    """Unit tests for the AirportIndex class"""
+
+    def setUp(self):
+        """
+        Build an index in a temporary directory for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        source = os.path.join(self.directory.name, "airports.csv")
+        with open(source, "w", encoding="utf-8") as file:
+            file.write(OURAIRPORTS)
+        self.path = os.path.join(self.directory.name, "airports.idx")
+        self.airports = rank_airports(read_ourairports(source), ["SLC", "JFK"])
+        self.assertEqual(build_index(self.path, self.airports), 4)
+        self.index = AirportIndex(self.path)
+
+    def tearDown(self):
+        """
+        Close the index and remove the temporary directory
+
+        :return: nothing
+        """
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_lookup(self):
+        """
+        Codes are found by binary search and keep their metadata
+
+        :return: nothing
+        """
+        self.assertEqual(len(self.index), 4)
+        self.assertEqual(
+            self.index["jfk"],
+            Airport("JFK", "New York", "US", 40.6398, -73.7789, 2, True),
+        )
+        self.assertEqual(self.index["MUC"].city, "München")
+        self.assertFalse(self.index["BOI"].hub)
+        self.assertEqual(self.index["BOI"].rank, 0)
+        self.assertEqual(self.index["SLC"].rank, 1)
+
+        self.assertIsNone(self.index.get("XYZ"))
+        self.assertNotIn("AAA", self.index)
+        self.assertNotIn("ZZZ", self.index)
+        self.assertNotIn("É", self.index)
+        with self.assertRaises(KeyError):
+            _ = self.index["XYZ"]
+        self.assertEqual(self.index.unknown(["SLC", "XYZ", "MUC"]), ["XYZ"])
+        self.assertEqual(
+            [airport.code for airport in self.index],
+            ["BOI", "JFK", "MUC", "SLC"],
+        )
+
+    def test_prioritize(self):
+        """
+        Hubs go first, then ranked airports, then the rest in given order
+
+        :return: nothing
+        """
+        self.assertEqual(
+            self.index.prioritize(["XYZ", "BOI", "MUC", "JFK", "SLC"]),
+            ["SLC", "JFK", "MUC", "BOI", "XYZ"],
+        )
+
+    def test_columns(self):
+        """
+        Columns are numpy views over the mapped records
+
+        :return: nothing
+        """
+        columns = self.index.columns()
+        self.assertEqual(
+            list(columns["code"]), [b"BOI", b"JFK", b"MUC", b"SLC"]
+        )
+        self.assertAlmostEqual(columns["latitude"][3], 40.7884)
+        self.assertEqual(list(columns["rank"]), [0, 2, 0, 1])
+        self.assertFalse(columns.flags.owndata)
+
+    def test_invalid(self):
+        """
+        Files that are not an index are rejected
+
+        :return: nothing
+        """
+        with open(self.path, "wb") as file:
+            file.write(b"not an airport index")
+        with self.assertRaises(ValueError):
+            AirportIndex(self.path)
+        with self.assertRaises(ValueError):
+            build_index(self.path, [Airport("TOOLONG", "", "US", 0.0, 0.0)])
+
+
+if __name__ == "__main__":
+
+    unittest.main()
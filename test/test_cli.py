@@ -0,0 +1,476 @@
+"""Unit test file for the command-line runner"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.cli import Route, main, parse_args, read_routes
+from flight_arbitrage.extraction import load_rules
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import MockSite, SiteArchive
+from flight_arbitrage.replay import PageArchive
+from flight_arbitrage.report import RunReport
+
+ARB = {
+    "airport destination": "SLC",
+    "airport source": "JFK",
+    "base price": 300.0,
+    "this ticket price": 200.0,
+    "eval price": 300.0,
+    "this destination": "LAX",
+    "savings": 100.0,
+}
+
+
+class TestCli(unittest.TestCase):
+    """Unit tests for the command-line runner"""
+
+    def setUp(self):
+        """
+        Create a temporary directory with a routes file for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.routes = os.path.join(self.directory.name, "routes.txt")
+        with open(self.routes, "w") as file:
+            file.write("# origin destination date\n")
+            file.write("JFK SLC 07/10/2021\n\n")
+            file.write("JFK,ORD,07/11/2021\n")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_read_routes(self):
+        """
+        Routes are read with comma or whitespace separators
+
+        :return: nothing
+        """
+        self.assertEqual(
+            read_routes(self.routes),
+            [
+                Route("JFK", "SLC", "07/10/2021"),
+                Route("JFK", "ORD", "07/11/2021"),
+            ],
+        )
+
+        with open(self.routes, "a") as file:
+            file.write("JFK SLC\n")
+
+        with self.assertRaises(ValueError):
+            read_routes(self.routes)
+
+    def test_parse_args(self):
+        """
+        Defaults match the find_arbitrage defaults
+
+        :return: nothing
+        """
+        args = parse_args([self.routes])
+
+        self.assertEqual(args.workers, 1)
+        self.assertEqual(args.backend, "firefox")
+        self.assertEqual(args.format, "jsonl")
+        self.assertEqual(args.tries, 3)
+        self.assertFalse(args.page_source)
+        self.assertTrue(parse_args([self.routes, "--in-browser"]).page_source)
+        self.assertEqual(args.tabs, 0)
+
+        with self.assertRaises(SystemExit):
+            with patch("sys.stderr"):
+                parse_args([self.routes, "--workers", "0"])
+        with self.assertRaises(SystemExit):
+            with patch("sys.stderr"):
+                parse_args([self.routes, "--coalesce"])
+        with self.assertRaises(SystemExit):
+            with patch("sys.stderr"):
+                parse_args([self.routes, "--deep-scan", "3"])
+        self.assertEqual(
+            parse_args(
+                [self.routes, "--page-source", "--deep-scan", "3"]
+            ).deep_scan,
+            3,
+        )
+        with self.assertRaises(SystemExit):
+            with patch("sys.stderr"):
+                parse_args([self.routes, "--dataset-batch", "0"])
+        with self.assertRaises(SystemExit):
+            with patch("sys.stderr"):
+                parse_args([self.routes, "--identities", self.routes])
+
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main(self, mocked_one_way):
+        """
+        Every route is searched and streamed to the output
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.side_effect = [
+            [ARB],
+            Exception("browser crashed"),
+        ]
+        output = os.path.join(self.directory.name, "out.jsonl")
+        airports = os.path.join(self.directory.name, "airports.txt")
+
+        with patch("sys.stderr"):
+            status = main(
+                [
+                    self.routes,
+                    "--airports",
+                    airports,
+                    "--headless",
+                    "--output",
+                    output,
+                ]
+            )
+
+        self.assertEqual(status, 1)
+        with open(output, "r") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(rows, [dict(ARB, date="07/10/2021")])
+        mocked_one_way.return_value.find_arbitrage.assert_called_with(
+            override=True,
+            override_filename=airports,
+            web_browser="firefox",
+            driver="",
+            headless=True,
+            tries=3,
+            page_source=False,
+            deadline=0.0,
+            max_pages=0,
+        )
+
+    @patch("flight_arbitrage.cli.Flight.airports_to_search")
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_cache_and_profile(self, mocked_one_way, mocked_search):
+        """
+        The airport list is downloaded once and profiling writes stats
+
+        :param mocked_one_way: a mocked OneWay class
+        :param mocked_search: a mocked airports_to_search method
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = []
+        mocked_search.return_value = ["LAX", "ORD"]
+        cache = os.path.join(self.directory.name, "cache")
+        stats = os.path.join(self.directory.name, "run.prof")
+        output = os.path.join(self.directory.name, "out.csv")
+
+        for _ in range(2):
+            with patch("sys.stderr") as mocked_stderr:
+                status = main(
+                    [
+                        self.routes,
+                        "--cache-dir",
+                        cache,
+                        "--workers",
+                        "2",
+                        "--format",
+                        "csv",
+                        "--output",
+                        output,
+                        "--profile",
+                        stats,
+                    ]
+                )
+            self.assertEqual(status, 0)
+
+        self.assertEqual(mocked_search.call_count, 1)
+        with open(os.path.join(cache, "airports.txt"), "r") as file:
+            self.assertEqual(file.read(), "LAX\nORD\n")
+        self.assertTrue(os.path.exists(stats))
+        report = "".join(
+            call.args[0] for call in mocked_stderr.write.call_args_list
+        )
+        self.assertIn("per-phase timing", report)
+
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_profile_busy(self, mocked_one_way):
+        """
+        Routes that cannot be profiled are still searched
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = [ARB]
+        airports = os.path.join(self.directory.name, "airports.txt")
+        stats = os.path.join(self.directory.name, "run.prof")
+        output = os.path.join(self.directory.name, "out.jsonl")
+
+        with patch("sys.stderr"), patch(
+            "flight_arbitrage.cli.cProfile.Profile.enable",
+            side_effect=ValueError("Another profiling tool is already active"),
+        ):
+            status = main(
+                [
+                    self.routes,
+                    "--airports",
+                    airports,
+                    "--workers",
+                    "2",
+                    "--output",
+                    output,
+                    "--profile",
+                    stats,
+                ]
+            )
+
+        self.assertEqual(status, 0)
+        with open(output, "r") as file:
+            self.assertEqual(len(file.readlines()), 2)
+        self.assertFalse(os.path.exists(stats))
+
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_report(self, mocked_one_way):
+        """
+        The run reports of every route are written to one file
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = []
+        mocked_one_way.return_value.report = RunReport(
+            ("JFK", "SLC", "07/10/2021"), "expedia"
+        )
+        airports = os.path.join(self.directory.name, "airports.txt")
+        report = os.path.join(self.directory.name, "run.json")
+
+        with patch("sys.stderr"):
+            status = main(
+                [self.routes, "--airports", airports, "--report", report]
+            )
+
+        self.assertEqual(status, 0)
+        with open(report, "r") as file:
+            saved = json.load(file)
+        self.assertEqual(len(saved), 2)
+        self.assertEqual(saved[0]["site"], "expedia")
+
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_replay(self, mocked_one_way):
+        """
+        Replays use the replay browser and need an existing archive
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = []
+        archive = os.path.join(self.directory.name, "pages.jsonl.gz")
+        airports = os.path.join(self.directory.name, "airports.txt")
+        arguments = [self.routes, "--airports", airports, "--replay", archive]
+
+        with patch("sys.stderr"):
+            self.assertEqual(main(arguments), 2)
+            with self.assertRaises(SystemExit):
+                parse_args(arguments + ["--record", archive])
+
+        PageArchive(archive).record("url", "page")
+        self.assertEqual(main(arguments), 0)
+        self.assertEqual(
+            mocked_one_way.return_value.find_arbitrage.call_args[1][
+                "web_browser"
+            ],
+            "replay",
+        )
+        self.assertEqual(
+            mocked_one_way.call_args[0][3].archive.pages, {"url": "page"}
+        )
+
+    @patch("flight_arbitrage.cli.Flight.airports_to_search")
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_replay_airports(self, mocked_one_way, mocked_search):
+        """
+        Replays without an airport list use the archived pages' airports
+
+        :param mocked_one_way: a mocked OneWay class
+        :param mocked_search: a mocked airport list download
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = []
+        cache = os.path.join(self.directory.name, "cache")
+        archive = os.path.join(self.directory.name, "pages.jsonl.gz")
+        with PageArchive(archive) as pages:
+            flight = OneWay("JFK", "SLC", "07/10/2021")
+            for airport in ("SLC", "LAX", "SLC", "ORD"):
+                pages.record(flight.search_url(airport), "page")
+        arguments = [self.routes, "--replay", archive, "--cache-dir", cache]
+
+        self.assertEqual(main(arguments), 0)
+        mocked_search.assert_not_called()
+        used = mocked_one_way.return_value.find_arbitrage.call_args[1][
+            "override_filename"
+        ]
+        with open(used) as file:
+            self.assertEqual(file.read().split(), ["SLC", "LAX", "ORD"])
+
+        # a cached download is preferred, and still not refreshed
+        with open(os.path.join(cache, "airports.txt"), "w") as file:
+            file.write("DEN\n")
+        self.assertEqual(main(arguments + ["--refresh"]), 0)
+        mocked_search.assert_not_called()
+        self.assertEqual(
+            mocked_one_way.return_value.find_arbitrage.call_args[1][
+                "override_filename"
+            ],
+            os.path.join(cache, "airports.txt"),
+        )
+
+    def test_main_stdout(self):
+        """
+        Rows written to stdout are not mixed with progress messages
+
+        :return: nothing
+        """
+        archive = os.path.join(self.directory.name, "pages.jsonl.gz")
+        airports = os.path.join(self.directory.name, "airports.txt")
+        candidates = ["ATL", "BOS", "DEN", "LAX", "MIA", "ORD", "SEA", "SLC"]
+        with open(airports, "w") as file:
+            file.write("\n".join(candidates))
+        with MockSite() as site, PageArchive(archive) as pages:
+            fetched = SiteArchive(site.url)
+            for route in read_routes(self.routes):
+                flight = OneWay(*route)
+                for airport in candidates:
+                    url = flight.search_url(airport)
+                    pages.record(url, fetched.page(url))
+
+        completed = subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "flight_arbitrage.cli",
+                self.routes,
+                "--replay",
+                archive,
+                "--airports",
+                airports,
+                "--page-source",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+
+        rows = [json.loads(line) for line in completed.stdout.splitlines()]
+        self.assertTrue(rows)
+        self.assertTrue(all("savings" in row for row in rows))
+        self.assertIn("done with airport", completed.stderr)
+
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_airport_data(self, mocked_one_way):
+        """
+        Routes are validated against the airport index built from the data
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = []
+        airports = os.path.join(self.directory.name, "airports.txt")
+        with open(airports, "w") as file:
+            file.write("ORD\nJFK\n")
+        source = os.path.join(self.directory.name, "ourairports.csv")
+        with open(source, "w") as file:
+            file.write(
+                "type,latitude_deg,longitude_deg,iso_country,municipality,"
+                "iata_code\n"
+                "large_airport,40.6,-73.8,US,New York,JFK\n"
+                "large_airport,41.9,-87.9,US,Chicago,ORD\n"
+            )
+        arguments = [
+            self.routes,
+            "--airports",
+            airports,
+            "--cache-dir",
+            self.directory.name,
+            "--airport-data",
+            source,
+        ]
+
+        with patch("sys.stderr") as mocked_stderr:
+            self.assertEqual(main(arguments), 2)
+        self.assertIn("SLC", mocked_stderr.write.call_args_list[0][0][0])
+        mocked_one_way.assert_not_called()
+
+        with open(source, "a") as file:
+            file.write("large_airport,40.8,-112.0,US,Salt Lake City,SLC\n")
+        os.utime(source, (0, 2e9))
+        with patch("sys.stderr") as mocked_stderr:
+            self.assertEqual(main(arguments + ["--geo-filter"]), 0)
+            with self.assertRaises(SystemExit):
+                parse_args([self.routes, "--geo-filter"])
+        self.assertEqual(mocked_one_way.call_count, 2)
+        self.assertEqual(
+            mocked_one_way.call_args[0][3].geo_filter.max_angle, 90.0
+        )
+        self.assertIn(
+            "geographic filter", mocked_stderr.write.call_args_list[0][0][0]
+        )
+
+    @patch("flight_arbitrage.cli.OneWay")
+    def test_main_sites(self, mocked_one_way):
+        """
+        Every route is searched on every site and rows name their site
+
+        :param mocked_one_way: a mocked OneWay class
+        :return: nothing
+        """
+        mocked_one_way.return_value.find_arbitrage.return_value = [ARB]
+        output = os.path.join(self.directory.name, "out.jsonl")
+        airports = os.path.join(self.directory.name, "airports.txt")
+        other = os.path.join(self.directory.name, "other.json")
+        with open(other, "w") as file:
+            json.dump(
+                dict(
+                    load_rules().to_dict(),
+                    name="other",
+                    search_url="https://other.example/{origin}/{destination}"
+                    "/{date}",
+                ),
+                file,
+            )
+        arguments = [self.routes, "--airports", airports, "-o", output]
+
+        with patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                parse_args(arguments + ["--site", "nowhere"])
+            with self.assertRaises(SystemExit):
+                parse_args(arguments + ["--site", "expedia"] * 2)
+            status = main(
+                arguments
+                + ["--site", "expedia", "--site", other]
+                + ["--page-source", "--coalesce"]
+            )
+
+        self.assertEqual(status, 0)
+        self.assertEqual(mocked_one_way.call_count, 4)
+        self.assertEqual(
+            sorted(
+                call[1]["site"].name for call in mocked_one_way.call_args_list
+            ),
+            ["expedia", "expedia", "other", "other"],
+        )
+        self.assertIsNotNone(mocked_one_way.call_args[0][3].coalescer)
+        with open(output, "r") as file:
+            rows = [json.loads(line) for line in file]
+        self.assertEqual(
+            sorted(row["provider"] for row in rows),
+            ["expedia", "expedia", "other", "other"],
+        )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Unit test file for single-flight coalescing of page lookups"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.coalesce import SingleFlight
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import MockSite, SiteArchive, SiteConfig
+
+CANDIDATES = ["ATL", "BOS", "JFK", "LAX", "MIA", "SEA"]
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Unit tests for the SingleFlight class"""
+
+    def test_do(self):
+        """
+        Concurrent calls of a key wait for one call and share its result
+
+        :return: nothing
+        """
+        pages = SingleFlight()
+        started = threading.Event()
+        released = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            released.wait(5)
+            return ["offer"]
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            leader = executor.submit(pages.do, "JFK ORD", fetch)
+            started.wait(5)
+            followers = [
+                executor.submit(pages.do, "JFK ORD", fetch) for _ in range(3)
+            ]
+            other = pages.do("JFK SLC", lambda: ["other"])
+            while pages.shared < 3:
+                released.wait(0.01)
+            released.set()
+            results = [leader.result()] + [f.result() for f in followers]
+
+        self.assertEqual(results, [["offer"]] * 4)
+        self.assertEqual(other, ["other"])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((pages.runs, pages.shared), (2, 3))
+        self.assertEqual(pages.calls, {})
+        self.assertEqual(
+            pages.report(), "coalesced 3 of 5 page lookups, 2 pages loaded"
+        )
+
+        # finished calls are not shared without a ttl
+        pages.do("JFK ORD", fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_do_failure(self):
+        """
+        Failures reach the waiting callers and are never kept
+
+        :return: nothing
+        """
+        pages = SingleFlight(ttl=60)
+
+        def fail():
+            raise ValueError("page load failed")
+
+        with self.assertRaises(ValueError):
+            pages.do("JFK ORD", fail)
+        self.assertEqual(pages.do("JFK ORD", lambda: 1), 1)
+        self.assertEqual(pages.do("JFK ORD", lambda: 2), 1)
+        self.assertEqual((pages.runs, pages.shared), (2, 1))
+
+    def test_do_ttl(self):
+        """
+        Results are shared until their ttl ends
+
+        :return: nothing
+        """
+        pages = SingleFlight(ttl=10)
+        with patch("flight_arbitrage.coalesce.time.monotonic") as clock:
+            clock.return_value = 100.0
+            self.assertEqual(pages.do("JFK ORD", lambda: 1), 1)
+            clock.return_value = 109.0
+            self.assertEqual(pages.do("JFK ORD", lambda: 2), 1)
+            clock.return_value = 111.0
+            self.assertEqual(pages.do("JFK SLC", lambda: 3), 3)
+            self.assertNotIn("JFK ORD", pages.calls)
+            self.assertEqual(pages.do("JFK ORD", lambda: 4), 4)
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_concurrent_searches(self, mocked_search, mocked_tqdm):
+        """
+        Concurrent searches of a route load each page once
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = CANDIDATES
+        mocked_tqdm.side_effect = lambda airports: airports
+        pages = SingleFlight(ttl=60)
+
+        def search(archive, coalescer):
+            return OneWay(
+                "JFK",
+                "DEN",
+                "07/10/2021",
+                archive=archive,
+                coalescer=coalescer,
+            ).find_arbitrage(web_browser="replay", page_source=True)
+
+        with MockSite(SiteConfig(latency=0.02)) as site, patch("sys.stderr"):
+            archive = SiteArchive(site.url)
+            expected = search(archive, None)
+            served = site.served
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                runs = list(
+                    executor.map(lambda _: search(archive, pages), range(4))
+                )
+            coalesced = site.served - served
+
+        self.assertTrue(expected)
+        self.assertEqual(runs, [expected] * 4)
+        # the direct route page and every candidate but the origin
+        self.assertEqual(served, len(CANDIDATES))
+        self.assertEqual(coalesced, len(CANDIDATES))
+        self.assertEqual(pages.shared, 3 * len(CANDIDATES))
+
+
+if __name__ == "__main__":
+
+    unittest.main()
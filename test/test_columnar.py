@@ -0,0 +1,201 @@
+"""Unit test file for the columnar datasets"""
+
+from datetime import date, datetime, timezone
+from pathlib import Path
+from types import SimpleNamespace
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.columnar import ColumnarStore, open_dataset
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import MockSite, SiteArchive
+
+try:
+    import pyarrow.dataset  # type: ignore
+    import pyarrow.parquet  # type: ignore
+except ImportError:  # pragma: no cover
+    pyarrow = None  # pylint: disable=invalid-name
+
+DAY = datetime(2021, 7, 1, 12, tzinfo=timezone.utc).timestamp()
+
+FLIGHT = SimpleNamespace(
+    leaving_from="JFK",
+    going_to="DEN",
+    date="07/10/2021",
+    site=SimpleNamespace(name="expedia"),
+)
+
+OFFERS = [
+    Offer(120.0, ("DEN",), "7:00am"),
+    Offer(None, None, None),
+    Offer(310.5, ("ORD", "DEN"), "9:15pm"),
+]
+
+ARB = {
+    "airport destination": "DEN",
+    "airport source": "JFK",
+    "base price": 200.0,
+    "this ticket price": 120.0,
+    "eval price": 200.0,
+    "this destination": "SLC",
+    "savings": 80.0,
+}
+
+
+@unittest.skipIf(pyarrow is None, "needs pyarrow")
+class TestColumnarStore(unittest.TestCase):
+    """Unit tests for the ColumnarStore class"""
+
+    def setUp(self):
+        """
+        Creates a temporary dataset directory
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+
+    def tearDown(self):
+        """
+        Removes the temporary dataset directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_record(self):
+        """
+        Offers and arbitrages are stored with their route and scrape time
+
+        :return: nothing
+        """
+        with ColumnarStore(str(self.root), clock=lambda: DAY) as store:
+            store.record(FLIGHT, "SLC", OFFERS, [ARB])
+            store.record(FLIGHT, "BOS", [], [])
+        self.assertEqual(store.rows, {"offers": 3, "arbs": 1})
+
+        offers = open_dataset(str(self.root), "offers").to_table()
+        self.assertEqual(offers.column("price").to_pylist()[::2], [120, 310.5])
+        self.assertEqual(offers.column("stops").to_pylist()[1], None)
+        self.assertEqual(offers.column("stops").to_pylist()[2], ["ORD", "DEN"])
+
+        arbs = open_dataset(str(self.root)).to_table().to_pylist()
+        self.assertEqual(
+            arbs,
+            [
+                {
+                    "scraped_at": datetime.fromtimestamp(DAY, timezone.utc),
+                    "site": "expedia",
+                    "destination": "DEN",
+                    "travel_date": date(2021, 7, 10),
+                    "airport": "SLC",
+                    "base_price": 200.0,
+                    "ticket_price": 120.0,
+                    "eval_price": 200.0,
+                    "savings": 80.0,
+                    "day": "2021-07-01",
+                    "origin": "JFK",
+                }
+            ],
+        )
+        with self.assertRaises(ValueError):
+            open_dataset(str(self.root), "pages")
+
+    def test_partitions(self):
+        """
+        Each day and origin gets its own file, each batch a row group
+
+        :return: nothing
+        """
+        now = [DAY]
+        boston = SimpleNamespace(**dict(vars(FLIGHT), leaving_from="BOS"))
+        store = ColumnarStore(
+            str(self.root), batch_rows=2, clock=lambda: now[0]
+        )
+        store.record(FLIGHT, "SLC", OFFERS, [])
+        store.record(boston, "SLC", OFFERS[:1], [])
+        # a full batch is written at once, the rest waits in the buffer
+        files = sorted((self.root / "offers").rglob("*.parquet"))
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0].parent.name, "origin=JFK")
+
+        now[0] += 86400
+        store.record(FLIGHT, "SLC", OFFERS[:1], [])
+        # the first day is finished when the next one starts
+        first = open_dataset(str(self.root), "offers").to_table()
+        self.assertEqual(first.num_rows, 4)
+        self.assertEqual(
+            pyarrow.parquet.ParquetFile(files[0]).metadata.num_row_groups, 2
+        )
+        store.close()
+
+        dataset = open_dataset(str(self.root), "offers")
+        self.assertEqual(dataset.count_rows(), 5)
+        self.assertEqual(
+            dataset.count_rows(
+                filter=(pyarrow.dataset.field("day") == "2021-07-02")
+            ),
+            1,
+        )
+        self.assertEqual(
+            dataset.count_rows(
+                filter=(pyarrow.dataset.field("origin") == "BOS")
+            ),
+            1,
+        )
+
+        # a later run appends new files next to the earlier ones
+        with ColumnarStore(str(self.root), clock=lambda: DAY) as again:
+            again.record(FLIGHT, "SLC", OFFERS, [])
+        self.assertEqual(
+            open_dataset(str(self.root), "offers").count_rows(), 8
+        )
+
+        with self.assertRaises(ValueError):
+            ColumnarStore(str(self.root), batch_rows=0)
+
+    @patch("flight_arbitrage.hidden_city.tqdm", side_effect=lambda a: a)
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_find_arbitrage(self, mocked_search, _):
+        """
+        A search exports the offers of every page it evaluates
+
+        :param mocked_search: a mocked airports_to_search method
+        :return: nothing
+        """
+        mocked_search.return_value = ["ATL", "BOS", "LAX", "SEA"]
+        with MockSite() as site, patch("sys.stderr"):
+            with ColumnarStore(str(self.root)) as store:
+                flight = OneWay(
+                    "JFK",
+                    "DEN",
+                    "07/10/2099",
+                    archive=SiteArchive(site.url),
+                    dataset=store,
+                )
+                arbs = flight.find_arbitrage(
+                    web_browser="replay", page_source=True
+                )
+
+        offers = open_dataset(str(self.root), "offers").to_table()
+        self.assertEqual(
+            set(offers.column("airport").to_pylist()),
+            {"ATL", "BOS", "LAX", "SEA"},
+        )
+        self.assertEqual(
+            offers.num_rows,
+            sum(row.listings for row in flight.report.airports),
+        )
+        stored = open_dataset(str(self.root)).to_table()
+        self.assertEqual(
+            sorted(stored.column("savings").to_pylist()),
+            sorted(arb["savings"] for arb in arbs),
+        )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,248 @@
+"""Unit test file for the extraction rules"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from flight_arbitrage.extraction import (
+    ExtractionRules,
+    Offer,
+    load_rules,
+    rules_from_dict,
+)
+
+PAGE = """
+<html><body><ul>
+<li data-test-id="offer-listing">
+    <span data-test-id="departure-time">6:00am - 9:15am</span>
+    <div data-test-id="layovers">1 stop (1h 5m in SLC)</div>
+    <span class="uitk-lockup-price">$1,234</span>
+</li>
+<li data-test-id="offer-listing">
+    <span data-test-id="departure-time">7:30am - 1:05pm</span>
+    <div data-test-id="layovers">2 stops (ORD) (SLC)</div>
+    <span class="uitk-lockup-price">$58</span>
+</li>
+<li data-test-id="offer-listing">
+    <span class="uitk-lockup-price">$99</span>
+</li>
+</ul></body></html>
+"""
+
+
+class TestExtractionRules(unittest.TestCase):
+    """Unit tests for the ExtractionRules class"""
+
+    def setUp(self):
+        """
+        Load the bundled rules for use in each unit test
+
+        :return: nothing
+        """
+        self.rules = load_rules()
+
+    def test_load_rules_cached(self):
+        """
+        Rules are compiled once per process
+
+        :return: nothing
+        """
+        self.assertIs(load_rules(), self.rules)
+        self.assertEqual(self.rules.name, "expedia")
+        self.assertEqual(self.rules.version, 1)
+
+    def test_xpath(self):
+        """
+        Absolute xpath strings are exposed for selenium lookups
+
+        :return: nothing
+        """
+        self.assertEqual(
+            self.rules.xpath("offerings"),
+            '//li[@data-test-id="offer-listing"]',
+        )
+        self.assertEqual(
+            self.rules.xpath("price"), '//span[@class="uitk-lockup-price"]'
+        )
+
+    def test_parse_price(self):
+        """
+        Price text is reduced to its digits
+
+        :return: nothing
+        """
+        self.assertEqual(self.rules.parse_price("$58"), 58.0)
+        self.assertEqual(self.rules.parse_price("$1,234"), 1234.0)
+
+        with self.assertRaises(ValueError):
+            self.rules.parse_price("Sold out")
+
+    def test_parse_stops(self):
+        """
+        Layovers are read from the parentheses of the layover text
+
+        :return: nothing
+        """
+        self.assertEqual(
+            self.rules.parse_stops("2 stops (ORD) (SLC)"), ("ORD", "SLC")
+        )
+        self.assertEqual(self.rules.parse_stops("Nonstop"), ())
+
+    def test_parse_departure(self):
+        """
+        The departure is the text before the dash
+
+        :return: nothing
+        """
+        self.assertEqual(
+            self.rules.parse_departure("6:00am - 9:15am"), "6:00am"
+        )
+        self.assertEqual(self.rules.parse_departure("6:00am"), "6:00am")
+
+    def test_extract(self):
+        """
+        Every listing of a page is parsed in one pass
+
+        :return: nothing
+        """
+        offers = self.rules.extract(PAGE)
+
+        self.assertEqual(
+            offers,
+            [
+                Offer(1234.0, ("1h 5m in SLC",), "6:00am"),
+                Offer(58.0, ("ORD", "SLC"), "7:30am"),
+                Offer(99.0, None, None),
+            ],
+        )
+        self.assertEqual(self.rules.extract(""), [])
+        self.assertEqual(self.rules.extract("<html></html>"), [])
+
+        # listings read before the page loaded more are skipped
+        self.assertEqual(self.rules.extract(PAGE, start=2), offers[2:])
+        self.assertEqual(self.rules.extract(PAGE, start=3), [])
+
+    def test_expand_script(self):
+        """
+        The show more selector is optional and falls back to scrolling
+
+        :return: nothing
+        """
+        show_more = self.rules.selectors["show_more"]
+        self.assertIn(json.dumps(show_more), self.rules.expand_script)
+
+        data = json.loads(json.dumps(self.rules.to_dict()))
+        del data["selectors"]["show_more"]
+        self.assertIn(
+            "const showMore = null;", rules_from_dict(data).expand_script
+        )
+
+    def test_extract_script(self):
+        """
+        Field texts collected in the browser parse like the page source
+
+        :return: nothing
+        """
+        # fields are looked up relative to each listing
+        relative = {"xpath": "." + self.rules.xpath("layovers")}
+        self.assertIn(json.dumps(relative), self.rules.script)
+
+        result = json.dumps(
+            [
+                ["$1,234", "1 stop (1h 5m in SLC)", "6:00am - 9:15am"],
+                ["$58", "2 stops (ORD) (SLC)", "7:30am - 1:05pm"],
+                ["$99", None, None],
+            ]
+        )
+        self.assertEqual(
+            self.rules.extract_script(result), self.rules.extract(PAGE)
+        )
+        self.assertEqual(self.rules.extract_script(None), [])
+
+    def test_extract_html(self):
+        """
+        Listing html collected in the browser parses like the page source
+
+        :return: nothing
+        """
+        offerings = self.rules.selectors["offerings"]
+        self.assertIn(json.dumps(offerings), self.rules.html_script)
+
+        listings = PAGE.split("<ul>")[1].split("</ul>")[0]
+        self.assertEqual(
+            self.rules.extract_html(listings), self.rules.extract(PAGE)
+        )
+        self.assertEqual(self.rules.extract_html(""), [])
+        self.assertEqual(self.rules.extract_html(None), [])
+
+    def test_rules_from_file(self):
+        """
+        Selector changes only need a new rules file
+
+        :return: nothing
+        """
+        data = {
+            "name": "other",
+            "version": 2,
+            "selectors": {
+                "offerings": {"xpath": "//div[@class='offer']"},
+                "price": {"xpath": "//b"},
+                "layovers": {"xpath": "//i"},
+                "departure_time": {"xpath": "//em"},
+            },
+            "patterns": {
+                "price": "[^0-9]",
+                "stops": "\\((.*?)\\)",
+                "departure": "^([^-]*)",
+            },
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "other.json")
+            with open(path, "w") as file:
+                json.dump(data, file)
+
+            rules = load_rules(path)
+
+        self.assertEqual(rules.version, 2)
+        self.assertEqual(
+            rules.extract(
+                "<div class='offer'><b>$7</b><i>(DEN)</i><em>1am</em></div>"
+            ),
+            [Offer(7.0, ("DEN",), "1am")],
+        )
+
+    def test_rules_bad(self):
+        """
+        Incomplete rule sets are rejected
+
+        :return: nothing
+        """
+        with self.assertRaises(ValueError):
+            rules_from_dict({"name": "bad"})
+
+        with self.assertRaises(ValueError):
+            ExtractionRules(
+                "bad",
+                1,
+                {"offerings": {"xpath": "//li"}},
+                {"price": "", "stops": "", "departure": ""},
+            )
+
+        with self.assertRaises(ValueError):
+            ExtractionRules(
+                "bad",
+                1,
+                {
+                    "offerings": {"xpath": "//li"},
+                    "price": {"regex": "x"},
+                    "layovers": {"xpath": "//i"},
+                    "departure_time": {"xpath": "//em"},
+                },
+                {"price": "", "stops": "", "departure": ""},
+            )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
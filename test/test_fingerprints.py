@@ -0,0 +1,193 @@
+"""Unit test file for incremental sweeps with page fingerprints"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.fingerprints import (
+    FingerprintStore,
+    fingerprint,
+    page_key,
+)
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import listing
+from flight_arbitrage.replay import PageArchive
+
+
+class TestFingerprints(unittest.TestCase):
+    """Unit tests for fingerprints and the FingerprintStore class"""
+
+    def setUp(self):
+        """
+        Create a temporary directory for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "fingerprints.json")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_fingerprint(self):
+        """
+        Fingerprints ignore listing order but not prices or context
+
+        :return: nothing
+        """
+        offers = [
+            Offer(58.0, ("SLC",), "7:30am"),
+            Offer(None, None, None),
+        ]
+
+        self.assertEqual(fingerprint(offers), fingerprint(offers[::-1]))
+        self.assertNotEqual(
+            fingerprint(offers),
+            fingerprint([Offer(59.0, ("SLC",), "7:30am"), offers[1]]),
+        )
+        self.assertNotEqual(fingerprint(offers), fingerprint(offers, "base"))
+
+    def test_store(self):
+        """
+        Saved fingerprints merge with those of other runs
+
+        :return: nothing
+        """
+        with FingerprintStore(self.path) as store:
+            self.assertTrue(store.changed("a", "1"))
+            store.update({"a": "1", "b": "1"})
+            self.assertFalse(store.changed("a", "1"))
+
+        other = FingerprintStore(self.path)
+        with FingerprintStore(self.path) as store:
+            store.update({"b": "2"})
+        other.update({"c": "3"})
+        other.save()
+
+        self.assertEqual(
+            FingerprintStore(self.path).fingerprints,
+            {"a": "1", "b": "2", "c": "3"},
+        )
+
+    @staticmethod
+    def sweep(archive, store, hub="SLC"):
+        """
+        Searches JFK to a hub over the archived pages
+
+        :param archive: archive of the pages
+        :param store: fingerprint store of the sweep
+        :param hub: destination of the search
+        :return: the arbitrage destinations and the evaluated airports
+        """
+        flight = OneWay(
+            "JFK", hub, "07/10/2021", archive=archive, fingerprints=store
+        )
+        with patch("sys.stderr"), patch.object(
+            OneWay, "evaluate_offers", wraps=flight.evaluate_offers
+        ) as evaluations:
+            arbs = flight.find_arbitrage(
+                web_browser="replay", page_source=True
+            )
+        return [arb["this destination"] for arb in arbs], [
+            call[0][0] for call in evaluations.call_args_list
+        ]
+
+    def archive(self, airports):
+        """
+        Archives the direct pages of SLC and DEN and the candidate pages
+
+        :param airports: candidate airports
+        :return: the archive and a search whose urls it holds
+        """
+        archive = PageArchive(os.path.join(self.directory.name, "p.gz"))
+        search = OneWay("JFK", "SLC", "07/10/2021")
+        archive.record(search.search_url("SLC"), listing(100, "1 stop (DEN)"))
+        archive.record(search.search_url("DEN"), listing(100, "1 stop (SLC)"))
+        for airport in airports:
+            archive.record(
+                search.search_url(airport), listing(80, "1 stop (SLC)")
+            )
+        return archive, search
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_find_arbitrage_incremental(self, mocked_search, mocked_tqdm):
+        """
+        Only pages whose offers or direct fares changed are evaluated
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = ["LAX", "ORD", "SFO"]
+        mocked_tqdm.side_effect = lambda airports: airports
+        archive, search = self.archive(mocked_search.return_value)
+
+        with FingerprintStore(self.path) as store:
+            self.assertEqual(
+                self.sweep(archive, store), (["LAX", "ORD", "SFO"],) * 2
+            )
+            self.assertEqual(self.sweep(archive, store), ([], []))
+
+            archive.record(
+                search.search_url("ORD"), listing(70, "1 stop (SLC)")
+            )
+            self.assertEqual(self.sweep(archive, store), (["ORD"], ["ORD"]))
+
+            archive.record(
+                search.search_url("SLC"), listing(90, "1 stop (DEN)")
+            )
+            # the cheaper ORD fare saves the most
+            self.assertEqual(
+                self.sweep(archive, store),
+                (["ORD", "LAX", "SFO"], ["LAX", "ORD", "SFO"]),
+            )
+
+        self.assertEqual(
+            sorted(FingerprintStore(self.path).fingerprints),
+            [
+                page_key("JFK", "SLC", airport, "07/10/2021")
+                for airport in "LAX ORD SFO".split()
+            ],
+        )
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_find_arbitrage_hubs(self, mocked_search, mocked_tqdm):
+        """
+        Searches of several hubs from one origin keep their own fingerprints
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = ["LAX", "ORD"]
+        mocked_tqdm.side_effect = lambda airports: airports
+        archive, _ = self.archive(mocked_search.return_value)
+
+        with FingerprintStore(self.path) as store:
+            for hub in ("SLC", "DEN"):
+                self.assertEqual(
+                    self.sweep(archive, store, hub)[1], ["LAX", "ORD"]
+                )
+            for hub in ("SLC", "DEN"):
+                self.assertEqual(self.sweep(archive, store, hub)[1], [])
+
+        self.assertEqual(len(FingerprintStore(self.path)), 4)
+        self.assertNotEqual(
+            page_key("JFK", "SLC", "LAX", "07/10/2021"),
+            page_key("JFK", "DEN", "LAX", "07/10/2021"),
+        )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -1,9 +1,16 @@
 """Unit test file for the Flight class"""
 
+import json
 import unittest
 from unittest.mock import patch
 
-from flight_arbitrage.flight import Flight
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.flight import Flight, FlightOptions
+from flight_arbitrage.governor import THROTTLE_SCRIPT, THROTTLE_TEXT_LENGTH
+from flight_arbitrage.identities import Identity, IdentityBrowser, IdentityPool
+from flight_arbitrage.limits import DeepScan
+from flight_arbitrage.mock_site import listing
+from flight_arbitrage.session import HygienePolicy, ManagedBrowser
 
 
 class TestFlight(unittest.TestCase):
@@ -17,6 +24,22 @@ class TestFlight(unittest.TestCase):
         """
         self.flight = Flight("start_airport", "end_airport", "date")
 
+    def test_options(self):
+        """
+        Keyword options are set on top of the shared options
+
+        :return: nothing
+        """
+        shared = FlightOptions(tabs=2, warm=True)
+        flight = Flight("JFK", "SLC", "07/10/2021", shared, tabs=3)
+
+        self.assertEqual(flight.options, FlightOptions(tabs=3, warm=True))
+        self.assertEqual(shared.tabs, 2)
+        self.assertEqual(flight.site.name, "expedia")
+        self.assertIs(flight.rules, flight.site.rules)
+        with self.assertRaises(TypeError):
+            Flight("JFK", "SLC", "07/10/2021", tab=3)
+
     @patch("flight_arbitrage.flight.ChromeOptions")
     @patch("flight_arbitrage.flight.webdriver")
     def test_open_chrome(self, mocked_webdriver, mocked_options):
@@ -282,6 +305,242 @@ class TestFlight(unittest.TestCase):
         self.assertEqual(mocked_open.call_count, 2)
         self.assertEqual(result, expected_result)
 
+    def test_load(self):
+        """
+        Page loads go through the governor when one is set
+
+        :return: nothing
+        """
+        with patch.object(
+            self.flight, "browser", unittest.mock.Mock()
+        ) as mocked_browser:
+            self.flight.load("https://www.expedia.com/")
+
+            mocked_browser.get.assert_called_once_with(
+                "https://www.expedia.com/"
+            )
+
+            mocked_governor = unittest.mock.Mock()
+            mocked_browser.execute_script.return_value = "Access Denied\n"
+            options = FlightOptions(governor=mocked_governor)
+            with patch.object(self.flight, "options", options):
+                self.flight.load("https://www.expedia.com/")
+
+        mocked_governor.acquire.assert_called_once_with(
+            "https://www.expedia.com/"
+        )
+        mocked_governor.observe.assert_called_once_with(
+            "https://www.expedia.com/", True
+        )
+        self.assertEqual(mocked_browser.get.call_count, 2)
+        mocked_browser.execute_script.assert_called_once_with(
+            THROTTLE_SCRIPT, THROTTLE_TEXT_LENGTH
+        )
+
+    def test_read_offers(self):
+        """
+        In-browser extraction reads a page with a single script run
+
+        :return: nothing
+        """
+        flight = Flight("JFK", "SLC", "07/10/2021", in_browser=True)
+        flight.browser = unittest.mock.Mock()
+        flight.browser.execute_script.return_value = json.dumps(
+            [["$58", "1 stop (SLC)", "7:30am - 1:05pm"]]
+        )
+
+        self.assertEqual(
+            flight.read_offers(), [Offer(58.0, ("SLC",), "7:30am")]
+        )
+        flight.browser.execute_script.assert_called_once_with(
+            flight.rules.script
+        )
+        flight.browser.find_element_by_xpath.assert_not_called()
+        flight.browser.find_elements_by_xpath.assert_not_called()
+
+        # replayed pages have no browser to run the script in
+        flight.replaying = True
+        flight.browser.page_source = listing(99)
+        self.assertEqual(flight.read_offers(), [Offer(99.0, (), "7:30am")])
+        self.assertEqual(flight.browser.execute_script.call_count, 1)
+
+    @patch("flight_arbitrage.flight.time.sleep")
+    def test_expand_offers(self, mocked_sleep):
+        """
+        A deep scan reads only the listings each expansion adds
+
+        :param mocked_sleep: a mocked sleep function
+        :return: nothing
+        """
+        sizes = (2, 5, 6)
+        pages = ["".join(listing(n) for n in range(size)) for size in sizes]
+        browser = unittest.mock.Mock()
+        browser.page_source = pages[0]
+
+        def run_script(script, *args):
+            grown = pages.index(browser.page_source) + 1
+            if script == flight.rules.html_script:
+                # listings from the start on, the page is not sent whole
+                return "".join(
+                    listing(n) for n in range(args[0], sizes[grown - 1])
+                )
+            self.assertEqual((script, args), (flight.rules.expand_script, ()))
+            if grown == len(pages):
+                return False
+            browser.page_source = pages[grown]
+            return True
+
+        browser.execute_script.side_effect = run_script
+        flight = Flight(
+            "JFK", "SLC", "07/10/2021", deep_scan=DeepScan(rounds=5)
+        )
+        flight.browser = browser
+        first = flight.read_offers()
+
+        with patch.object(
+            flight.rules, "extract", wraps=flight.rules.extract
+        ) as extract:
+            offers = flight.expand_offers(first)
+
+        self.assertEqual([offer.price for offer in offers], list(range(6)))
+        extract.assert_not_called()
+        self.assertEqual(
+            [
+                call[0][1:]
+                for call in browser.execute_script.call_args_list
+                if call[0][0] == flight.rules.html_script
+            ],
+            [(2,), (5,)],
+        )
+        self.assertEqual(browser.execute_script.call_count, 5)
+        self.assertEqual(flight.timer.tallies, {"": {"expanded": 4}})
+        self.assertEqual(mocked_sleep.call_count, 2)
+
+        # the round budget bounds the scan, no budget reads the first render
+        browser.page_source = pages[0]
+        flight.options = flight.options._replace(deep_scan=DeepScan(rounds=1))
+        self.assertEqual(len(flight.expand_offers(first)), 5)
+        flight.options = flight.options._replace(deep_scan=None)
+        self.assertIs(flight.expand_offers(first), first)
+
+    def test_expand_offers_in_browser(self):
+        """
+        In-browser deep scans ask the listings script for new listings only
+
+        :return: nothing
+        """
+        browser = unittest.mock.Mock()
+        browser.execute_script.side_effect = [
+            True,
+            json.dumps([["$58", "1 stop (SLC)", "7:30am - 1:05pm"]]),
+            True,
+            "[]",
+        ]
+        flight = Flight(
+            "JFK",
+            "SLC",
+            "07/10/2021",
+            in_browser=True,
+            deep_scan=DeepScan(settle=0.0),
+        )
+        flight.browser = browser
+        first = [Offer(99.0, None, None)]
+
+        offers = flight.expand_offers(first)
+
+        self.assertEqual(offers, first + [Offer(58.0, ("SLC",), "7:30am")])
+        browser.execute_script.assert_any_call(flight.rules.script, 1)
+        browser.execute_script.assert_called_with(flight.rules.script, 2)
+
+    @patch("flight_arbitrage.flight.requests.get")
+    def test_airports_to_search_governor(self, mocked_get):
+        """
+        The airport list download is paced and observed by the governor
+
+        :param mocked_get: a mocked requests get function
+        :return: nothing
+        """
+        mocked_get.return_value.status_code = 429
+        mocked_governor = unittest.mock.Mock()
+
+        with self.assertRaises(ValueError):
+            self.flight.airports_to_search(governor=mocked_governor)
+
+        self.assertEqual(mocked_governor.acquire.call_count, 1)
+        mocked_governor.observe.assert_called_once_with(
+            mocked_get.call_args[0][0], True
+        )
+
+    @patch("flight_arbitrage.flight.Flight.open_firefox")
+    @patch("flight_arbitrage.flight.time")
+    def test_open_browser_hygiene(self, mocked_time, mocked_firefox):
+        """
+        With a hygiene policy the browser is wrapped and can be restarted
+
+        :param mocked_time: a mocked time module
+        :param mocked_firefox: a mocked open_firefox method
+        :return: nothing
+        """
+        browsers = [unittest.mock.Mock(), unittest.mock.Mock()]
+
+        def open_firefox(**_):
+            self.flight.browser = browsers.pop(0)
+
+        mocked_firefox.side_effect = open_firefox
+        self.flight.options = FlightOptions(
+            hygiene=HygienePolicy(sample_every=0)
+        )
+
+        self.flight.open_browser(web_browser="firefox", headless=True)
+        managed = self.flight.browser
+
+        self.assertIsInstance(managed, ManagedBrowser)
+        mocked_time.sleep.assert_called_once_with(2)
+
+        first = managed.browser
+        managed.restart()
+
+        self.assertIs(self.flight.browser, managed)
+        self.assertIsNot(managed.browser, first)
+        first.quit.assert_called_once_with()
+        self.assertEqual(mocked_firefox.call_count, 2)
+
+    @patch("flight_arbitrage.flight.FirefoxOptions")
+    @patch("flight_arbitrage.flight.webdriver")
+    @patch("flight_arbitrage.flight.time")
+    def test_open_browser_identities(
+        self, mocked_time, mocked_webdriver, mocked_options
+    ):
+        """
+        With an identity pool the browser opens with an identity's proxy
+
+        :param mocked_time: a mocked time module
+        :param mocked_webdriver: a mocked selenium webdriver object
+        :param mocked_options: a mocked function for Firefox driver options
+        :return: nothing
+        """
+        pool = IdentityPool(
+            [Identity("proxied", proxy="http://10.0.0.1:3128")]
+        )
+        self.flight.options = FlightOptions(identities=pool)
+
+        self.flight.open_browser(web_browser="firefox")
+
+        self.assertIsInstance(self.flight.browser, IdentityBrowser)
+        self.assertIs(
+            self.flight.browser.browser, mocked_webdriver.Firefox.return_value
+        )
+        mocked_options().set_preference.assert_any_call(
+            "network.proxy.http", "10.0.0.1"
+        )
+        mocked_time.sleep.assert_called_once_with(2)
+
+        self.flight.close_browser()
+        self.assertEqual(pool.in_use, {"proxied": 0})
+        with self.assertRaises(ValueError):
+            self.flight.open_browser(web_browser="safari")
+        self.assertEqual(pool.in_use, {"proxied": 0})
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,122 @@
+"""Unit test file for the geographic candidate filter"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.airports import Airport, AirportIndex, build_index
+from flight_arbitrage.geography import (
+    FilterStats,
+    GeoFilter,
+    bearing,
+    haversine,
+)
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.report import RunReport
+
+AIRPORTS = [
+    Airport("JFK", "New York", "US", 40.6398, -73.7789),
+    Airport("ORD", "Chicago", "US", 41.9786, -87.9048),
+    Airport("SLC", "Salt Lake City", "US", 40.7884, -111.978),
+    Airport("LAX", "Los Angeles", "US", 33.9425, -118.408, 2, True),
+    Airport("DEN", "Denver", "US", 39.8617, -104.673, 1),
+    Airport("BOS", "Boston", "US", 42.3643, -71.0052),
+    Airport("DTW", "Detroit", "US", 42.2124, -83.3534),
+    Airport("MUC", "Munich", "DE", 48.3538, 11.7861),
+]
+
+
+class TestGeography(unittest.TestCase):
+    """Unit tests for the great-circle helpers and the GeoFilter class"""
+
+    def setUp(self):
+        """
+        Build an airport index in a temporary directory for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(self.directory.name, "airports.idx")
+        build_index(path, AIRPORTS)
+        self.index = AirportIndex(path)
+
+    def tearDown(self):
+        """
+        Close the index and remove the temporary directory
+
+        :return: nothing
+        """
+        self.index.close()
+        self.directory.cleanup()
+
+    def test_great_circle(self):
+        """
+        Distances and bearings match known values
+
+        :return: nothing
+        """
+        self.assertAlmostEqual(
+            haversine(40.6398, -73.7789, 33.9425, -118.408), 3974, delta=5
+        )
+        self.assertAlmostEqual(haversine(0.0, 0.0, 0.0, 180.0), 20015, 0)
+        self.assertAlmostEqual(bearing(0.0, 0.0, 0.0, 10.0), 90.0)
+        self.assertAlmostEqual(bearing(0.0, 0.0, -10.0, 0.0), 180.0)
+        self.assertAlmostEqual(bearing(0.0, 0.0, 0.0, -10.0), 270.0)
+
+    def test_apply(self):
+        """
+        Candidates closer than the hub or off its direction are dropped
+
+        :return: nothing
+        """
+        geo_filter = GeoFilter(self.index)
+        candidates = ["BOS", "SLC", "DTW", "XYZ", "MUC", "LAX", "DEN"]
+
+        self.assertEqual(
+            geo_filter.apply("JFK", "ORD", candidates),
+            ["SLC", "XYZ", "LAX", "DEN"],
+        )
+        self.assertEqual(geo_filter.stats, FilterStats(7, 4, 2, 1, 1))
+
+        # unknown ends leave the candidates alone
+        self.assertEqual(geo_filter.apply("JFK", "XYZ", ["BOS"]), ["BOS"])
+        self.assertEqual(geo_filter.stats, FilterStats(8, 5, 2, 1, 1))
+        self.assertIn("kept 5 of 8", geo_filter.report())
+
+        wide = GeoFilter(self.index, max_angle=180.0, min_ratio=0.5)
+        self.assertIn("MUC", wide.apply("JFK", "ORD", candidates))
+        self.assertIn("DTW", wide.apply("JFK", "ORD", candidates))
+        self.assertNotIn("BOS", wide.apply("JFK", "ORD", candidates))
+
+    @patch("flight_arbitrage.hidden_city.OneWay.airport_list")
+    def test_candidate_airports(self, mocked_list):
+        """
+        Bounded searches visit hubs and the busiest candidates first
+
+        :return: nothing
+        """
+        mocked_list.return_value = ["BOS", "SLC", "DTW", "XYZ", "LAX", "DEN"]
+        flight = OneWay(
+            "JFK", "ORD", "07/10/2021", geo_filter=GeoFilter(self.index)
+        )
+
+        self.assertEqual(
+            flight.candidate_airports(False, "", bounded=False),
+            ["SLC", "XYZ", "LAX", "DEN"],
+        )
+        self.assertEqual(
+            flight.candidate_airports(False, "", bounded=True),
+            ["LAX", "DEN", "SLC", "XYZ"],
+        )
+
+        flight.report = RunReport(("JFK", "ORD", "07/10/2021"), "expedia")
+        flight.candidate_airports(False, "", bounded=False)
+        self.assertEqual(flight.report.geo_filter, FilterStats(6, 4, 2, 0, 1))
+        self.assertEqual(flight.report.summary()["geo too close"], 2)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,229 @@
+"""Unit test file for the request governor"""
+
+import os
+import tempfile
+import unittest
+
+from flight_arbitrage import governor as governor_module
+from flight_arbitrage.governor import (
+    DomainBudget,
+    RequestGovernor,
+    SharedTokenBucket,
+    TokenBucket,
+    default_governor,
+    domain_of,
+    looks_throttled,
+    set_default_governor,
+)
+
+
+class FakeClock:
+    """Clock that only moves when told to"""
+
+    def __init__(self):
+        """
+        FakeClock constructor
+
+        :return: nothing
+        """
+        self.now = 0.0
+
+    def __call__(self):
+        """
+        Current fake time
+
+        :return: seconds
+        """
+        return self.now
+
+    def sleep(self, seconds):
+        """
+        Advances the fake time instead of sleeping
+
+        :param seconds: seconds to advance
+        :return: nothing
+        """
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Unit tests for the token buckets"""
+
+    def test_reserve(self):
+        """
+        Requests beyond the burst wait for the refill
+
+        :return: nothing
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, burst=2.0, clock=clock)
+
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.5)
+        self.assertEqual(bucket.reserve(), 1.0)
+
+        clock.sleep(10)
+
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_adjust(self):
+        """
+        Adjusting changes the rate from its current value and draining
+        makes the next request wait
+
+        :return: nothing
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, burst=5.0, clock=clock)
+
+        self.assertEqual(bucket.adjust(lambda rate: rate * 4), 4.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.adjust(lambda rate: rate / 2, drain=True), 2.0)
+
+        self.assertEqual(bucket.reserve(), 0.5)
+
+    @unittest.skipIf(governor_module.fcntl is None, "needs fcntl")
+    def test_shared_bucket(self):
+        """
+        Two bucket objects on one file share their tokens and rate
+
+        :return: nothing
+        """
+        clock = FakeClock()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "example.com.json")
+            first = SharedTokenBucket(path, rate=1.0, burst=1.0, clock=clock)
+            second = SharedTokenBucket(path, rate=1.0, burst=1.0, clock=clock)
+
+            self.assertEqual(first.reserve(), 0.0)
+            self.assertEqual(second.reserve(), 1.0)
+
+            self.assertEqual(first.adjust(lambda rate: 4.0), 4.0)
+
+            self.assertEqual(second.rate, 4.0)
+            self.assertEqual(second.reserve(), 0.5)
+
+            clock.sleep(0.25)
+
+            self.assertEqual(first.reserve(), 0.5)
+
+            clock.sleep(10.0)
+
+            self.assertEqual(first.reserve(), 0.0)
+
+            # read-modify-write in one locked update of the shared file
+            self.assertEqual(first.adjust(lambda rate: rate / 2), 2.0)
+            self.assertEqual(second.adjust(lambda rate: rate / 2), 1.0)
+            self.assertEqual(first.rate, 1.0)
+            self.assertEqual(second.adjust(lambda rate: rate, drain=True), 1.0)
+            self.assertEqual(first.reserve(), 1.0)
+
+
+class TestRequestGovernor(unittest.TestCase):
+    """Unit tests for the RequestGovernor class"""
+
+    def setUp(self):
+        """
+        Create a governor with a fake clock for use in each unit test
+
+        :return: nothing
+        """
+        self.clock = FakeClock()
+        self.governor = RequestGovernor(
+            budgets={"expedia.com": DomainBudget(rate=1.0, burst=1.0)},
+            default_budget=DomainBudget(rate=10.0, burst=10.0),
+            sleep=self.clock.sleep,
+            clock=self.clock,
+        )
+        self.url = "https://www.expedia.com/Flights-Search?trip=oneway"
+
+    def test_domain_budgets(self):
+        """
+        Budgets apply to subdomains and fall back to the default
+
+        :return: nothing
+        """
+        self.assertEqual(domain_of(self.url), "www.expedia.com")
+        self.assertEqual(self.governor.budget("www.expedia.com").rate, 1.0)
+        self.assertEqual(self.governor.budget("en.wikipedia.org").rate, 10.0)
+
+    def test_acquire(self):
+        """
+        Requests to one domain are paced by its budget
+
+        :return: nothing
+        """
+        waits = [self.governor.acquire(self.url) for _ in range(3)]
+
+        self.assertEqual(waits, [0.0, 1.0, 1.0])
+        self.assertEqual(self.clock.now, 2.0)
+        self.assertEqual(
+            self.governor.acquire("https://en.wikipedia.org/wiki"), 0.0
+        )
+
+    def test_observe(self):
+        """
+        Throttling halves the rate, successes win it back gradually
+
+        :return: nothing
+        """
+        self.assertEqual(self.governor.observe(self.url, throttled=True), 0.5)
+        self.assertEqual(self.governor.observe(self.url, throttled=True), 0.25)
+        self.assertAlmostEqual(
+            self.governor.observe(self.url, throttled=False), 0.3
+        )
+        for _ in range(100):
+            self.governor.observe(self.url, throttled=False)
+
+        self.assertEqual(self.governor.rate(self.url), 1.0)
+
+        for _ in range(100):
+            self.governor.observe(self.url, throttled=True)
+
+        self.assertEqual(self.governor.rate(self.url), 0.05)
+
+    def test_looks_throttled(self):
+        """
+        Throttling is read from status codes and page content
+
+        :return: nothing
+        """
+        self.assertTrue(looks_throttled(status_code=429))
+        self.assertFalse(looks_throttled(status_code=200))
+        self.assertTrue(looks_throttled(page_source="<h1>Access Denied</h1>"))
+        self.assertFalse(looks_throttled(page_source="<li>$58</li>"))
+        self.assertFalse(looks_throttled(page_source=None))
+        self.assertTrue(
+            looks_throttled(page_source="<title>Bot or Not?</title>")
+        )
+        # captcha scripts and markup of a normal results page do not count
+        self.assertFalse(
+            looks_throttled(
+                page_source="<script src='https://www.google.com/recaptcha/"
+                "api.js'></script><script>var captcha = {};</script>"
+                "<!-- captcha --><div data-captcha='off'><li>$58</li></div>"
+            )
+        )
+
+    def test_default_governor(self):
+        """
+        The process-wide governor is created once and can be replaced
+
+        :return: nothing
+        """
+        set_default_governor(None)
+        shared = default_governor()
+
+        self.assertIs(default_governor(), shared)
+
+        set_default_governor(self.governor)
+
+        self.assertIs(default_governor(), self.governor)
+
+        set_default_governor(None)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -5,8 +5,22 @@ from unittest.mock import patch
 
 from selenium.common.exceptions import NoSuchElementException
 
+from flight_arbitrage.extraction import Offer
 from flight_arbitrage.hidden_city import OneWay
 
+PAGE = (
+    '<li data-test-id="offer-listing">'
+    '<span data-test-id="departure-time">7:30am - 1:05pm</span>'
+    '<div data-test-id="layovers">1 stop (end_airport)</div>'
+    '<span class="uitk-lockup-price">$58</span></li>'
+    '<li data-test-id="offer-listing">'
+    '<span data-test-id="departure-time">9:00am - 2:00pm</span>'
+    '<div data-test-id="layovers">1 stop (other_airport)</div>'
+    '<span class="uitk-lockup-price">$40</span></li>'
+    '<li data-test-id="offer-listing">'
+    '<span class="uitk-lockup-price">$99</span></li>'
+)
+
 
 class TestOneWay(unittest.TestCase):
     """Unit tests for the OneWay class"""
@@ -88,7 +102,7 @@ class TestOneWay(unittest.TestCase):
         :return:
         """
         base_object = unittest.mock.Mock()
-        base_object.find_element_by_xpath.side_effect = [
+        base_object.find_elements_by_xpath.side_effect = [
             NoSuchElementException(),
             ["element 1", "element 2"],
         ]
@@ -99,11 +113,11 @@ class TestOneWay(unittest.TestCase):
                 base_object, "context"
             )
             results.append(result)
-            base_object.find_element_by_xpath.assert_called_with("context")
+            base_object.find_elements_by_xpath.assert_called_with("context")
 
         self.assertTrue([] in results)
         self.assertTrue(["element 1", "element 2"] in results)
-        self.assertEqual(base_object.find_element_by_xpath.call_count, 2)
+        self.assertEqual(base_object.find_elements_by_xpath.call_count, 2)
 
     @patch("flight_arbitrage.hidden_city.time")
     @patch("flight_arbitrage.hidden_city.OneWay.retrieve_elements_by_xpath")
@@ -177,10 +191,8 @@ class TestOneWay(unittest.TestCase):
         departure_time = '//span[@data-test-id="departure-time"]'
         price = '//span[@class="uitk-lockup-price"]'
 
-        mocked_departure = unittest.mock.MagicMock()
-        mocked_departure.text.split().__getitem__.return_value = "location"
-        mocked_price = unittest.mock.MagicMock()
-        mocked_price.text.__getitem__.return_value = "58"
+        mocked_departure = unittest.mock.Mock(text="location - 9:15am")
+        mocked_price = unittest.mock.Mock(text="$58")
         mocked_rxpath_elements.side_effect = [
             ["element 1", "element 2", "element 3"]
         ]
@@ -253,13 +265,12 @@ class TestOneWay(unittest.TestCase):
         )
         mocked_generate.assert_called_once_with()
         mocked_search.assert_called_once_with(
-            override=False, override_filename="airports.txt"
+            override=False, override_filename="airports.txt", governor=None
         )
         mocked_cheapest.assert_called_once_with()
         mocked_tqdm.assert_called_once_with(["airport 1", "airport 2"])
         self.assertEqual(result, [])
 
-    @patch("flight_arbitrage.hidden_city.re")
     @patch("flight_arbitrage.hidden_city.time")
     @patch("flight_arbitrage.hidden_city.tqdm")
     @patch("flight_arbitrage.hidden_city.OneWay.retrieve_elements_by_xpath")
@@ -278,7 +289,6 @@ class TestOneWay(unittest.TestCase):
         mocked_rxpath_elements,
         mocked_tqdm,
         mocked_time,
-        mocked_re,
     ):
         """
 
@@ -290,7 +300,6 @@ class TestOneWay(unittest.TestCase):
         :param mocked_rxpath_elements:
         :param mocked_tqdm:
         :param mocked_time:
-        :param mocked_re:
         :return:
         """
         departure_time = '//span[@data-test-id="departure-time"]'
@@ -308,16 +317,13 @@ class TestOneWay(unittest.TestCase):
         ]  # base, departure_dict
         mocked_tqdm.return_value = mocked_search.return_value
 
-        mocked_new_searches = unittest.mock.MagicMock()
-        mocked_new_searches.text = "new search"
-        mocked_re.findall.return_value = ["stop 1", "stop 2", "end_airport"]
-        mocked_departure = unittest.mock.MagicMock()  # can handle slicing
-        mocked_departure.text.split().__getitem__.side_effect = [
-            "location",
-            "olympics",
-        ]
-        mocked_price = unittest.mock.MagicMock()  # can handle slicing
-        mocked_price.text.__getitem__.side_effect = ["99", "58", "58"]
+        mocked_new_searches = unittest.mock.Mock(
+            text="2 stops (stop 1) (stop 2) (end_airport)"
+        )
+        mocked_location = unittest.mock.Mock(text="location - 9:15am")
+        mocked_olympics = unittest.mock.Mock(text="olympics - 11:30am")
+        mocked_high_price = unittest.mock.Mock(text="$99")
+        mocked_price = unittest.mock.Mock(text="$58")
         mocked_rxpath_elements.side_effect = [
             [],
             ["element 1", "element 2", "element 3", "element 4", "element 5"],
@@ -328,14 +334,14 @@ class TestOneWay(unittest.TestCase):
             mocked_new_searches,
             "",
             mocked_new_searches,
-            mocked_price,
+            mocked_high_price,
             "",
             mocked_new_searches,
             mocked_price,
-            mocked_departure,
+            mocked_location,
             mocked_new_searches,
             mocked_price,
-            mocked_departure,
+            mocked_olympics,
             "",
         ]
         url = (
@@ -360,18 +366,18 @@ class TestOneWay(unittest.TestCase):
                 "airport source": "start_airport",
                 "base price": 100,
                 "this ticket price": 58.0,
-                "eval price": 60,
+                "eval price": 100,
                 "this destination": "airport_2",
-                "savings": 2.0,
+                "savings": 42.0,
             },
             {
                 "airport destination": "end_airport",
                 "airport source": "start_airport",
                 "base price": 100,
                 "this ticket price": 58.0,
-                "eval price": 100,
+                "eval price": 60,
                 "this destination": "airport_2",
-                "savings": 42.0,
+                "savings": 2.0,
             },
         ]
         self.assertEqual(result, expected_result)
@@ -381,7 +387,7 @@ class TestOneWay(unittest.TestCase):
         )
         mocked_generate.assert_called_once_with()
         mocked_search.assert_called_once_with(
-            override=False, override_filename="airports.txt"
+            override=False, override_filename="airports.txt", governor=None
         )
         mocked_cheapest.assert_called_once_with()
         mocked_tqdm.assert_called_once_with(
@@ -398,9 +404,6 @@ class TestOneWay(unittest.TestCase):
         mocked_time.sleep.assert_has_calls(calls, any_order=False)
         self.assertTrue(mocked_time.sleep.call_count, len(calls))
 
-        mocked_re.findall.assert_any_call(r"\(.*?\)", "new search")
-        self.assertTrue(mocked_re.findall.call_count, 4)
-
         mocked_rxpath_elements.assert_any_call(
             mocked_browser, '//li[@data-test-id="offer-listing"]'
         )
@@ -425,6 +428,128 @@ class TestOneWay(unittest.TestCase):
 
         mocked_browser.quit.assert_called_once_with()
 
+    @patch("flight_arbitrage.hidden_city.time")
+    def test_page_offers(self, mocked_time):
+        """
+        Listings are parsed from the page source, retrying while empty
+
+        :param mocked_time: a mocked time module
+        :return: nothing
+        """
+        mocked_browser = unittest.mock.Mock()
+        type(mocked_browser).page_source = unittest.mock.PropertyMock(
+            side_effect=["", "", PAGE]
+        )
+
+        with patch.object(self.flight, "browser", mocked_browser):
+            offers = self.flight.page_offers()
+
+        self.assertEqual(len(offers), 3)
+        self.assertEqual(offers[0], Offer(58.0, ("end_airport",), "7:30am"))
+        self.assertEqual(mocked_time.sleep.call_count, 2)
+
+    @patch("flight_arbitrage.hidden_city.OneWay.page_offers")
+    def test_cheapest_page_flight(self, mocked_offers):
+        """
+        The first complete listing is the base price
+
+        :param mocked_offers: a mocked page_offers method
+        :return: nothing
+        """
+        mocked_offers.return_value = [
+            Offer(99.0, None, None),
+            Offer(58.0, ("end_airport",), "7:30am"),
+        ]
+
+        result = self.flight.cheapest_page_flight()
+
+        self.assertEqual(result, (58.0, {"7:30am": {58.0}}))
+
+        mocked_offers.return_value = [Offer(99.0, None, None)]
+
+        result = self.flight.cheapest_page_flight()
+
+        self.assertEqual(result, (-1.0, {}))
+
+    @patch("flight_arbitrage.hidden_city.time")
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.cheapest_page_flight")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    @patch("flight_arbitrage.hidden_city.OneWay.generate_browser")
+    @patch("flight_arbitrage.hidden_city.OneWay.open_browser")
+    def test_find_arbitrage_page_source(
+        self,
+        mocked_open,
+        mocked_generate,
+        mocked_search,
+        mocked_cheapest,
+        mocked_tqdm,
+        mocked_time,
+    ):
+        """
+        Whole-page parsing gives the same arbitrage entries
+
+        :param mocked_open: a mocked open_browser method
+        :param mocked_generate: a mocked generate_browser method
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_cheapest: a mocked cheapest_page_flight method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :param mocked_time: a mocked time module
+        :return: nothing
+        """
+        mocked_search.return_value = ["start_airport", "airport_2"]
+        mocked_cheapest.return_value = (100.0, {"7:30am": {60.0}})
+        mocked_tqdm.return_value = mocked_search.return_value
+
+        with patch.object(
+            self.flight, "browser", unittest.mock.Mock(page_source=PAGE)
+        ) as mocked_browser:
+            result = self.flight.find_arbitrage(page_source=True)
+
+        self.assertEqual(
+            result,
+            [
+                {
+                    "airport destination": "end_airport",
+                    "airport source": "start_airport",
+                    "base price": 100.0,
+                    "this ticket price": 58.0,
+                    "eval price": 60.0,
+                    "this destination": "airport_2",
+                    "savings": 2.0,
+                }
+            ],
+        )
+        mocked_cheapest.assert_called_once_with(tries=3)
+        mocked_open.assert_called_once_with(
+            web_browser="firefox", driver="", headless=False
+        )
+        mocked_generate.assert_called_once_with()
+        self.assertEqual(mocked_browser.get.call_count, 1)
+        mocked_browser.quit.assert_called_once_with()
+        mocked_time.sleep.assert_called_with(2)
+
+    def test_evaluate_offers(self):
+        """
+        Incomplete listings are counted as bad
+
+        :return: nothing
+        """
+        offers = [
+            Offer(58.0, ("end_airport",), None),
+            Offer(40.0, ("other_airport",), "9:00am"),
+            Offer(99.0, None, None),
+            Offer(None, ("end_airport",), "9:00am"),
+        ]
+
+        arbs, lowest_ticket, bad_count = self.flight.evaluate_offers(
+            "airport_2", offers, 100.0, {}
+        )
+
+        self.assertEqual(arbs, [])
+        self.assertEqual(lowest_ticket, [40.0])
+        self.assertEqual(bad_count, 2)
+
 
 if __name__ == "__main__":
 
@@ -0,0 +1,273 @@
+"""Unit test file for the identity pool"""
+
+import json
+import os
+from tempfile import TemporaryDirectory
+import unittest
+from unittest.mock import Mock, patch
+
+from flight_arbitrage import identities
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.identities import (
+    Identity,
+    IdentityPool,
+    fetch,
+    load_identities,
+    read_jar,
+    save_jar,
+)
+from flight_arbitrage.mock_site import (
+    MockProxy,
+    MockSite,
+    ProxyConfig,
+    SiteArchive,
+)
+
+FAST = Identity("fast", proxy="http://10.0.0.1:3128", user_agent="agent/1")
+SLOW = Identity("slow", proxy="http://10.0.0.2:3128")
+DIRECT = Identity("direct")
+
+OK_PAGE = "<html><body>results</body></html>"
+THROTTLED_PAGE = "<html><body>Too many requests</body></html>"
+
+
+class TestIdentityPool(unittest.TestCase):
+    """Unit tests for the identity pool and its sessions"""
+
+    def setUp(self):
+        """
+        Creates a temporary directory and a pool on a fake clock
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = TemporaryDirectory()
+        self.now = [0.0]
+        self.pool = IdentityPool(
+            [FAST, SLOW, DIRECT], cooldown=10.0, clock=lambda: self.now[0]
+        )
+
+    def tearDown(self):
+        """
+        Removes the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_load_identities(self):
+        """
+        Identities are read from json, unknown keys are rejected
+
+        :return: nothing
+        """
+        path = os.path.join(self.directory.name, "identities.json")
+        with open(path, "w") as file:
+            json.dump(
+                [
+                    {"proxy": "http://10.0.0.1:3128", "user_agent": "a"},
+                    {"name": "home", "cookies": "home.json"},
+                    {},
+                ],
+                file,
+            )
+        self.assertEqual(
+            load_identities(path),
+            [
+                Identity("http://10.0.0.1:3128", "http://10.0.0.1:3128", "a"),
+                Identity("home", cookies="home.json"),
+                Identity("direct 3"),
+            ],
+        )
+
+        for entries in (
+            [],
+            {"name": "home"},
+            [{"proxy": "a", "port": 1}],
+            [{}, {"name": "direct 1"}],
+        ):
+            with open(path, "w") as file:
+                json.dump(entries, file)
+            with self.assertRaises(ValueError):
+                load_identities(path)
+
+    def test_acquire(self):
+        """
+        Busy, failing and slow identities are handed out last
+
+        :return: nothing
+        """
+        first = self.pool.acquire()
+        second = self.pool.acquire()
+        self.assertNotEqual(first, second)
+
+        self.pool.observe(FAST, 0.5, True)
+        self.pool.observe(SLOW, 20.0, True)
+        self.pool.observe(DIRECT, 0.5, False)
+        self.assertGreater(self.pool.score(FAST), self.pool.score(SLOW))
+        self.assertEqual(self.pool.health["fast"].latency, 0.5)
+        for identity in (first, second):
+            self.pool.release(identity)
+
+        # the throttled identity sits out its cooldown, the fast one takes
+        # sessions until sharing it makes it worse than the slow one
+        self.assertEqual(
+            [self.pool.acquire() for _ in range(5)], [FAST] * 4 + [SLOW]
+        )
+        self.now[0] = 10.0
+        self.assertTrue(self.pool.available(DIRECT))
+
+        # every strike in a row doubles the cooldown
+        self.pool.observe(DIRECT, 0.5, False)
+        self.assertEqual(self.pool.health["direct"].blocked_until, 30.0)
+        self.pool.observe(DIRECT, 0.5, True)
+        self.assertEqual(self.pool.health["direct"].strikes, 0)
+
+        # with every identity benched, the one back soonest is used
+        self.pool.observe(FAST, 0.5, False)
+        self.pool.observe(SLOW, 0.5, False)
+        self.assertEqual(self.pool.acquire(), FAST)
+        self.assertIn("cooling down", self.pool.report())
+
+    def test_should_switch(self):
+        """
+        Sessions leave benched identities and ones far behind an idle one
+
+        :return: nothing
+        """
+        self.assertFalse(self.pool.should_switch(FAST))
+        self.pool.observe(FAST, 0.5, False)
+        self.assertTrue(self.pool.should_switch(FAST))
+
+        self.pool.observe(SLOW, 30.0, True)
+        self.assertTrue(self.pool.should_switch(SLOW))
+        self.pool.acquire()  # takes direct, the only healthy idle one
+        self.assertFalse(self.pool.should_switch(SLOW))
+
+        single = IdentityPool([DIRECT])
+        single.observe(DIRECT, 0.5, False)
+        self.assertFalse(single.should_switch(DIRECT))
+
+    def test_browser_options(self):
+        """
+        Proxies and user agents become chrome switches and firefox prefs
+
+        :return: nothing
+        """
+        self.assertEqual(
+            identities.chrome_arguments(FAST),
+            ["--proxy-server=http://10.0.0.1:3128", "--user-agent=agent/1"],
+        )
+        self.assertEqual(identities.chrome_arguments(DIRECT), [])
+
+        preferences = identities.firefox_preferences(FAST)
+        self.assertEqual(preferences["general.useragent.override"], "agent/1")
+        self.assertEqual(preferences["network.proxy.ssl"], "10.0.0.1")
+        self.assertEqual(preferences["network.proxy.http_port"], 3128)
+
+        socks = identities.firefox_preferences(
+            Identity("s", proxy="socks5://h:1080")
+        )
+        self.assertEqual(socks["network.proxy.socks_version"], 5)
+        self.assertNotIn("network.proxy.http", socks)
+        with self.assertRaises(ValueError):
+            identities.firefox_preferences(Identity("bad", proxy="http://h"))
+
+    def test_identity_browser(self):
+        """
+        Sessions report every page, switch after throttling, keep cookies
+
+        :return: nothing
+        """
+        jar = os.path.join(self.directory.name, "jar.json")
+        save_jar(jar, [{"name": "sid", "value": "1", "domain": ".site.com"}])
+        pool = IdentityPool(
+            [Identity("a", cookies=jar), Identity("b")],
+            clock=lambda: self.now[0],
+        )
+        browsers = []
+
+        def factory(identity):
+            browser = Mock(identity=identity)
+            browser.execute_script.return_value = OK_PAGE
+            browser.get_cookies.return_value = [
+                {"name": "seen", "value": "2", "domain": "www.site.com"}
+            ]
+            browsers.append(browser)
+            return browser
+
+        session = identities.IdentityBrowser(pool, factory)
+        self.assertEqual(session.identity.name, "a")
+        session.get("https://www.site.com/search?page=1")
+        session.get("https://www.site.com/search?page=2")
+        browsers[0].add_cookie.assert_called_once_with(
+            {"name": "sid", "value": "1", "domain": ".site.com"}
+        )
+
+        browsers[0].execute_script.return_value = THROTTLED_PAGE
+        session.get("https://www.site.com/search?page=3")
+        self.assertEqual(pool.health["a"].failures, 1)
+        session.get("https://www.site.com/search?page=4")
+        self.assertEqual(session.identity.name, "b")
+        self.assertIs(session.browser, browsers[1])
+        browsers[0].quit.assert_called_once_with()
+        self.assertEqual(
+            sorted(cookie["name"] for cookie in read_jar(jar)), ["seen", "sid"]
+        )
+
+        session.quit()
+        browsers[1].quit.assert_called_once_with()
+        self.assertEqual(pool.in_use, {"a": 0, "b": 0})
+        self.assertEqual(pool.switches, 1)
+
+        failing = Mock(side_effect=OSError("no driver"))
+        with self.assertRaises(OSError):
+            identities.IdentityBrowser(pool, failing)
+        self.assertEqual(pool.in_use, {"a": 0, "b": 0})
+
+    @patch("flight_arbitrage.hidden_city.tqdm", side_effect=lambda a: a)
+    @patch(
+        "flight_arbitrage.hidden_city.OneWay.airports_to_search",
+        return_value=["ATL", "BOS", "LAX", "MIA", "SEA", "ORD"],
+    )
+    def test_proxies(self, *_):
+        """
+        Searches through local proxy stand-ins route around a blocked one
+
+        :return: nothing
+        """
+        with MockSite() as site, MockProxy() as good, MockProxy(
+            ProxyConfig(blocked=True)
+        ) as blocked, patch("sys.stderr"):
+            pool = IdentityPool(
+                [
+                    Identity("blocked", proxy=blocked.url, user_agent="b/1"),
+                    Identity("good", proxy=good.url, user_agent="g/1"),
+                ]
+            )
+            self.assertEqual(fetch(pool, site.url).status_code, 429)
+            self.assertEqual(fetch(pool, site.url).status_code, 404)
+
+            flight = OneWay(
+                "JFK",
+                "DEN",
+                "07/10/2099",
+                archive=SiteArchive(site.url, identities=pool),
+            )
+            arbs = flight.find_arbitrage(
+                web_browser="replay", page_source=True
+            )
+            direct = OneWay(
+                "JFK", "DEN", "07/10/2099", archive=SiteArchive(site.url)
+            ).find_arbitrage(web_browser="replay", page_source=True)
+
+        self.assertEqual(arbs, direct)
+        self.assertEqual(blocked.forwarded, 1)
+        self.assertEqual(pool.health["blocked"].failures, 1)
+        self.assertEqual(set(good.user_agents), {"g/1"})
+        self.assertEqual(good.forwarded, pool.health["good"].pages)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,136 @@
+"""Unit test file for the MultiLeg and RoundTrip classes"""
+
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.itineraries import MultiLeg, RoundTrip
+from flight_arbitrage.legs import Leg, LegCache
+
+# offers of each leg page: base fares of A->B and B->A, and hidden city
+# tickets through B and A
+LEG_PAGES = {
+    Leg("A", "B", "d1"): [Offer(100.0, (), "8:00am")],
+    Leg("B", "A", "d2"): [Offer(90.0, (), "6:00pm")],
+    Leg("A", "C", "d1"): [Offer(70.0, ("B",), "8:00am")],
+    Leg("A", "D", "d1"): [Offer(120.0, ("B",), "8:00am")],
+    Leg("B", "C", "d2"): [Offer(80.0, ("X",), "6:00pm")],
+    Leg("B", "D", "d2"): [Offer(60.0, ("A",), "7:00pm")],
+}
+
+
+class TestMultiLeg(unittest.TestCase):
+    """Unit tests for the MultiLeg and RoundTrip classes"""
+
+    def setUp(self):
+        """
+        Create a round trip reading leg pages from LEG_PAGES
+
+        :return: nothing
+        """
+        self.fetched = []
+
+        def fetch(leg):
+            self.fetched.append(leg)
+            return LEG_PAGES.get(leg, [])
+
+        self.trip = RoundTrip("A", "B", "d1", "d2", cache=LegCache(fetch))
+
+    def test_legs(self):
+        """
+        A round trip is an outbound and a return leg
+
+        :return: nothing
+        """
+        self.assertEqual(
+            self.trip.legs, [Leg("A", "B", "d1"), Leg("B", "A", "d2")]
+        )
+        self.assertEqual(
+            (self.trip.leaving_from, self.trip.going_to), ("A", "B")
+        )
+        with self.assertRaises(ValueError):
+            MultiLeg([])
+
+    def test_leg_options(self):
+        """
+        Only cheaper tickets through the leg destination are options
+
+        :return: nothing
+        """
+        options = self.trip.leg_options(
+            Leg("A", "B", "d1"), ["A", "B", "C", "D"]
+        )
+
+        self.assertEqual(
+            [(option.ticket_destination, option.price) for option in options],
+            [("B", 100.0), ("C", 70.0)],
+        )
+        self.assertEqual(options[1].savings, 30.0)
+        self.assertEqual(self.trip.leg_options(Leg("A", "Z", "d1"), []), [])
+
+    @patch("flight_arbitrage.itineraries.OneWay.open_browser")
+    @patch("flight_arbitrage.itineraries.OneWay.airports_to_search")
+    def test_find_arbitrage(self, mocked_airports, mocked_open):
+        """
+        Every distinct leg is scraped once and pairings are ranked
+
+        :return: nothing
+        """
+        mocked_airports.return_value = ["A", "B", "C", "D"]
+        self.trip.browser = mocked_open.return_value
+
+        itineraries = self.trip.find_arbitrage(headless=True)
+
+        self.assertEqual(len(self.fetched), len(set(self.fetched)))
+        self.assertEqual(len(self.fetched), 6)
+        self.assertEqual(
+            [itinerary["savings"] for itinerary in itineraries],
+            [60.0, 30.0, 30.0],
+        )
+        best = itineraries[0]
+        self.assertTrue(best["complete"])
+        self.assertEqual(
+            [leg["this destination"] for leg in best["legs"]], ["C", "D"]
+        )
+        self.assertEqual(best["base price"], 190.0)
+        self.assertEqual(best["total price"], 130.0)
+        self.trip.browser.quit.assert_called_once_with()
+
+        with self.assertRaises(ValueError):
+            self.trip.find_arbitrage(page_source=False)
+
+    @patch("flight_arbitrage.itineraries.OneWay.open_browser")
+    @patch("flight_arbitrage.itineraries.OneWay.airports_to_search")
+    def test_incomplete_leg(self, mocked_airports, mocked_open):
+        """
+        A leg without a direct fare is flagged, the other legs still pair
+
+        :return: nothing
+        """
+        mocked_airports.return_value = ["A", "B", "C", "D"]
+        trip = MultiLeg(
+            [("A", "B", "d1"), ("B", "Z", "d2")],
+            cache=LegCache(lambda leg: LEG_PAGES.get(leg, [])),
+        )
+        trip.browser = mocked_open.return_value
+
+        itineraries = trip.find_arbitrage(headless=True)
+
+        self.assertEqual(len(itineraries), 1)
+        itinerary = itineraries[0]
+        self.assertFalse(itinerary["complete"])
+        self.assertEqual(itinerary["savings"], 30.0)
+        self.assertEqual(itinerary["total price"], 70.0)
+        self.assertEqual(
+            [
+                (leg["this destination"], leg["complete"])
+                for leg in itinerary["legs"]
+            ],
+            [("C", True), (None, False)],
+        )
+        self.assertIsNone(itinerary["legs"][1]["this ticket price"])
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,95 @@
+"""Unit test file for the deferred imports"""
+
+import json
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage._lazy import LazyObject
+
+
+class TestLazyObject(unittest.TestCase):
+    """Unit tests for the LazyObject class"""
+
+    def test_module(self):
+        """
+        Module attributes resolve on first access
+
+        :return: nothing
+        """
+        lazy_json = LazyObject("json")
+
+        self.assertEqual(repr(lazy_json), "<lazy json>")
+        self.assertIs(lazy_json.dumps, json.dumps)
+
+    def test_attribute(self):
+        """
+        Attribute stand-ins can be called like the real object
+
+        :return: nothing
+        """
+        lazy_decoder = LazyObject("json", "JSONDecoder")
+
+        self.assertEqual(repr(lazy_decoder), "<lazy json.JSONDecoder>")
+        self.assertEqual(lazy_decoder().decode("[1]"), [1])
+
+    def test_patch(self):
+        """
+        Attributes of the target can be patched through the stand-in
+
+        :return: nothing
+        """
+        lazy_json = LazyObject("json")
+        original = json.dumps
+
+        with patch.object(lazy_json, "dumps") as mocked_dumps:
+            self.assertIs(json.dumps, mocked_dumps)
+
+        self.assertIs(json.dumps, original)
+
+    def test_package_import_is_light(self):
+        """
+        Importing the arbitrage code does not load the browser stack
+
+        :return: nothing
+        """
+        check = (
+            "import sys, flight_arbitrage.hidden_city, flight_arbitrage.cli\n"
+            "print([m for m in ('selenium', 'requests', 'bs4', 'tqdm', "
+            "'lxml', 'numpy', 'http.server') if m in sys.modules])"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", check],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+
+        self.assertEqual(completed.stdout.strip(), "[]")
+
+    def test_search_import_skips_collaborators(self):
+        """
+        Importing a search does not load the optional collaborators of one
+
+        :return: nothing
+        """
+        check = (
+            "import sys, flight_arbitrage.hidden_city\n"
+            "print([m for m in ('coalesce', 'columnar', 'geography', "
+            "'identities', 'pipeline', 'replay', 'session', 'yields') "
+            "if 'flight_arbitrage.' + m in sys.modules])"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", check],
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+
+        self.assertEqual(completed.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,42 @@
+"""Unit test file for the leg cache"""
+
+import unittest
+
+from flight_arbitrage.extraction import Offer
+from flight_arbitrage.legs import Leg, LegCache
+
+
+class TestLegCache(unittest.TestCase):
+    """Unit tests for the LegCache class"""
+
+    def test_fetch_once(self):
+        """
+        Every distinct leg is fetched once and then served from the cache
+
+        :return: nothing
+        """
+        fetched = []
+
+        def fetch(leg):
+            fetched.append(leg)
+            return [Offer(100.0, (), leg.date)]
+
+        cache = LegCache(fetch)
+        outbound = Leg("JFK", "SLC", "07/10/2021")
+        inbound = Leg("SLC", "JFK", "07/17/2021")
+
+        self.assertEqual(
+            cache.offers(outbound), [Offer(100.0, (), "07/10/2021")]
+        )
+        cache.offers(outbound)
+        cache.offers(inbound)
+
+        self.assertEqual(fetched, [outbound, inbound])
+        self.assertEqual((cache.fetches, cache.hits), (2, 1))
+        self.assertEqual(len(cache), 2)
+        self.assertIn(Leg("JFK", "SLC", "07/10/2021"), cache)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
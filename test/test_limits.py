@@ -0,0 +1,112 @@
+"""Unit test file for deadline and page budget bounded searches"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.limits import SearchLimits, SearchProgress
+from flight_arbitrage.mock_site import listing
+from flight_arbitrage.replay import PageArchive
+from flight_arbitrage.yields import YieldStats
+
+
+class TestSearchLimits(unittest.TestCase):
+    """Unit tests for the SearchLimits class"""
+
+    def test_page_budget(self):
+        """
+        Items are handed out until the budget is spent
+
+        :return: nothing
+        """
+        limits = SearchLimits(max_pages=2)
+        self.assertTrue(limits.bounded)
+        self.assertEqual(list(limits.take("abcd")), ["a", "b"])
+        self.assertEqual(
+            limits.progress(4), SearchProgress(4, 2, "page budget")
+        )
+        self.assertFalse(limits.progress(4).complete)
+        self.assertEqual(limits.progress(4).share, 0.5)
+
+        unbounded = SearchLimits()
+        self.assertFalse(unbounded.bounded)
+        self.assertEqual(list(unbounded.take("abcd")), list("abcd"))
+        self.assertTrue(unbounded.progress(4).complete)
+        self.assertEqual(SearchProgress(0, 0).share, 1.0)
+
+    @patch("flight_arbitrage.limits.time.monotonic")
+    def test_deadline(self, mocked_monotonic):
+        """
+        Nothing is handed out once the deadline has passed
+
+        :param mocked_monotonic: a mocked monotonic clock
+        :return: nothing
+        """
+        mocked_monotonic.return_value = 100.0
+        limits = SearchLimits(deadline=5.0)
+
+        taken = []
+        for item in limits.take("abcd"):
+            taken.append(item)
+            mocked_monotonic.return_value += 3.0
+        self.assertEqual(taken, ["a", "b"])
+        self.assertEqual(limits.stopped, "deadline")
+        self.assertTrue(limits.reached())
+
+
+class TestBoundedSearch(unittest.TestCase):
+    """Unit tests for find_arbitrage with a deadline or page budget"""
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_find_arbitrage(self, mocked_search, mocked_tqdm):
+        """
+        Bounded searches return the arbitrage of the pages they loaded
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = ["JFK", "LAX", "ORD", "SFO"]
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        # pylint: disable=consider-using-with
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        archive = PageArchive(os.path.join(directory.name, "pages.gz"))
+        search = OneWay("JFK", "SLC", "07/10/2021")
+        archive.record(search.search_url("SLC"), listing(100, "Nonstop"))
+        for airport in mocked_search.return_value:
+            archive.record(
+                search.search_url(airport), listing(80, "1 stop (SLC)")
+            )
+
+        yields = YieldStats()
+        yields.record("JFK", "SLC", ["LAX", "ORD", "SFO"], ["SFO"])
+        yields.record("JFK", "SLC", ["LAX", "ORD", "SFO"], ["SFO", "ORD"])
+
+        def run(**kwargs):
+            flight = OneWay(
+                "JFK", "SLC", "07/10/2021", archive=archive, **kwargs
+            )
+            with patch("sys.stderr"):
+                arbs = flight.find_arbitrage(
+                    web_browser="replay", page_source=True, max_pages=2
+                )
+            return [arb["this destination"] for arb in arbs], flight.progress
+
+        self.assertEqual(
+            run(), (["LAX", "ORD"], SearchProgress(3, 2, "page budget"))
+        )
+        # the best candidates go first when their hit rates are known
+        self.assertEqual(
+            run(yields=yields),
+            (["ORD", "SFO"], SearchProgress(3, 2, "page budget")),
+        )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
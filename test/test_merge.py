@@ -0,0 +1,180 @@
+"""Unit and differential test file for the merging of arbitrage results"""
+
+import itertools
+from pathlib import Path
+import random
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.cli import main
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.merge import merge_arbs
+from flight_arbitrage.mock_site import MockSite, SiteArchive
+from flight_arbitrage.replay import PageArchive
+
+ROUTES = [
+    ("JFK", "DEN", "07/10/2099"),
+    ("BOS", "ORD", "07/10/2099"),
+    ("LAX", "ATL", "07/11/2099"),
+    ("SEA", "DFW", "07/12/2099"),
+]
+
+CANDIDATES = ["ATL", "BOS", "DEN", "JFK", "LAX", "MIA", "ORD", "SEA", "SLC"]
+
+
+def arb(destination, ticket, savings, provider=""):
+    """
+    Builds an arbitrage record
+
+    :param destination: final destination of the ticket
+    :param ticket: price of the ticket
+    :param savings: savings against the direct fare
+    :param provider: site the ticket was found on, if several
+    :return: the record
+    """
+    record = {
+        "airport destination": "DEN",
+        "airport source": "JFK",
+        "base price": ticket + savings,
+        "this ticket price": ticket,
+        "eval price": ticket + savings,
+        "this destination": destination,
+        "savings": savings,
+    }
+    if provider:
+        record["provider"] = provider
+    return record
+
+
+class TestMerge(unittest.TestCase):
+    """Unit tests for merge_arbs and serial against parallel sweeps"""
+
+    def setUp(self):
+        """
+        Records the pages of every route and candidate of a mock site
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.archive = str(self.root / "pages.jsonl.gz")
+        self.routes = str(self.root / "routes.txt")
+        self.root.joinpath("routes.txt").write_text(
+            "\n".join(" ".join(route) for route in ROUTES) + "\n"
+        )
+
+        with MockSite() as site, PageArchive(self.archive) as pages:
+            fetched = SiteArchive(site.url)
+            for origin, destination, date in ROUTES:
+                flight = OneWay(origin, destination, date)
+                for airport in CANDIDATES + [destination]:
+                    url = flight.search_url(airport)
+                    pages.record(url, fetched.page(url))
+
+    def tearDown(self):
+        """
+        Removes the recorded pages and outputs
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_merge_arbs(self):
+        """
+        Merges drop pages evaluated again, keep flights at equal fares and
+        do not depend on the order of partials
+
+        :return: nothing
+        """
+        partials = [
+            [arb("SLC", 80.0, 20.0), arb("SLC", 80.0, 20.0)],
+            [arb("ATL", 80.0, 20.0), arb("LAX", 90.0, 10.0)],
+            [],
+            [arb("SLC", 80.0, 20.0), arb("SLC", 80.0, 20.0)],
+            [arb("SLC", 85.0, 20.0), arb("SLC", 80.0, 20.0)],
+            [arb("MIA", 80.0, 20.0, "other"), arb("MIA", 80.0, 20.0)],
+        ]
+        merged = merge_arbs(partials)
+
+        self.assertEqual(
+            [
+                (row["this destination"], row["this ticket price"])
+                for row in merged
+            ],
+            [
+                ("ATL", 80.0),
+                ("MIA", 80.0),
+                ("SLC", 80.0),
+                ("SLC", 80.0),
+                ("MIA", 80.0),
+                ("SLC", 85.0),
+                ("LAX", 90.0),
+            ],
+        )
+        self.assertEqual(merged[4]["provider"], "other")
+        for order in itertools.permutations(partials):
+            self.assertEqual(
+                merge_arbs(list(reversed(part)) for part in order), merged
+            )
+
+    def sweep(self, workers, candidates, *options):
+        """
+        Runs the command-line sweep over the recorded pages
+
+        :param workers: parallel searches
+        :param candidates: candidate airports in the order to search them
+        :param options: further command-line options
+        :return: the output rows, as written
+        """
+        airports = self.root / f"airports-{workers}.txt"
+        airports.write_text("\n".join(candidates))
+        output = self.root / f"arbs-{workers}.jsonl"
+        arguments = [
+            self.routes,
+            "--replay",
+            self.archive,
+            "--airports",
+            str(airports),
+            "--page-source",
+            "--workers",
+            str(workers),
+            "--output",
+            str(output),
+            "--ordered",
+        ]
+        with patch("sys.stderr"):
+            self.assertEqual(main(arguments + list(options)), 0)
+        return output.read_text().splitlines()
+
+    def test_differential(self):
+        """
+        Parallel sweeps write exactly what a serial sweep writes
+
+        Every sweep replays the same recorded pages, with more workers,
+        shared pages, parse workers and candidates in another order each
+        time, so only scheduling differs.
+
+        :return: nothing
+        """
+        serial = self.sweep(1, CANDIDATES)
+        self.assertTrue(serial)
+
+        for workers, options in (
+            (2, ()),
+            (4, ("--coalesce",)),
+            (8, ("--coalesce", "--parse-workers", "2")),
+        ):
+            shuffled = list(CANDIDATES)
+            random.Random(workers).shuffle(shuffled)
+            self.assertEqual(
+                self.sweep(workers, shuffled, *options),
+                serial,
+                f"{workers} workers with {options}",
+            )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
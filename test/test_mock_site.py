@@ -0,0 +1,101 @@
+"""Unit test file for the mock flight search site"""
+
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.extraction import load_rules
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import (
+    THROTTLED_PAGE,
+    MockSite,
+    SiteArchive,
+    SiteConfig,
+    clock,
+    results_page,
+)
+
+CANDIDATES = ["ATL", "BOS", "JFK", "LAX", "MIA", "SEA"]
+
+
+class TestMockSite(unittest.TestCase):
+    """Unit tests for the MockSite and SiteArchive classes"""
+
+    def test_results_page(self):
+        """
+        Pages are reproducible and parse into offers
+
+        :return: nothing
+        """
+        config = SiteConfig(listings=20, seed=3)
+        page = results_page("JFK", "LAX", "07/10/2021", config)
+        self.assertEqual(
+            page, results_page("JFK", "LAX", "07/10/2021", config)
+        )
+        self.assertNotEqual(
+            page, results_page("JFK", "SFO", "07/10/2021", config)
+        )
+
+        offers = load_rules().extract(page)
+        self.assertTrue(10 <= len(offers) <= 20)
+        self.assertTrue(all(offer.price for offer in offers))
+        self.assertTrue(any(offer.stops for offer in offers))
+        self.assertEqual(clock(0), "12:00am")
+        self.assertEqual(clock(13 * 60 + 5), "1:05pm")
+
+    def test_site_archive(self):
+        """
+        Search urls are served over http, failures as throttle pages
+
+        :return: nothing
+        """
+        search = OneWay("JFK", "SLC", "07/10/2021")
+        with MockSite(SiteConfig(seed=1)) as site:
+            archive = SiteArchive(site.url)
+            self.assertEqual(
+                archive.page(search.search_url("LAX")),
+                results_page("JFK", "LAX", "07/10/2021", site.config),
+            )
+            self.assertIn("Not found", archive.page("https://a.b/other"))
+
+        with MockSite(SiteConfig(failure_rate=1.0)) as site:
+            archive = SiteArchive(site.url)
+            self.assertEqual(
+                archive.page(search.search_url("LAX")), THROTTLED_PAGE
+            )
+            self.assertEqual((site.served, site.failed), (1, 1))
+
+        self.assertEqual(archive.errors, 1)
+        self.assertEqual(len(archive.latencies), 1)
+        # the site is gone, so nothing can be fetched
+        self.assertIsNone(archive.page(search.search_url("LAX")))
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_find_arbitrage(self, mocked_search, mocked_tqdm):
+        """
+        Searches run against the site without a browser
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = CANDIDATES
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        with MockSite(SiteConfig(listings=40)) as site, patch("sys.stderr"):
+            runs = [
+                OneWay(
+                    "JFK", "DEN", "07/10/2021", archive=SiteArchive(site.url)
+                ).find_arbitrage(web_browser="replay", page_source=True)
+                for _ in range(2)
+            ]
+            served = site.served
+
+        self.assertTrue(runs[0])
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(served, 2 * len(CANDIDATES))
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,278 @@
+"""Unit test file for the watchlist price monitor"""
+
+from datetime import datetime
+import io
+import json
+from pathlib import Path
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.cli import Route
+from flight_arbitrage.flight import FlightOptions
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import MockSite, SiteArchive
+from flight_arbitrage.monitor import (
+    AlertState,
+    Monitor,
+    Schedule,
+    Watch,
+    days_left,
+    main,
+    parse_args,
+    recheck_interval,
+    reschedule,
+    write_jsonl,
+)
+from flight_arbitrage.replay import PageArchive
+
+CANDIDATES = ["ATL", "BOS", "JFK", "LAX", "MIA", "SEA"]
+
+NOW = datetime(2021, 7, 1, 12).timestamp()
+
+
+class TestMonitor(unittest.TestCase):
+    """Unit tests for the monitor module"""
+
+    def setUp(self):
+        """
+        Creates a temporary directory for state and alert files
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """
+        Removes the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_recheck_interval(self):
+        """
+        Routes near departure or with moving fares are checked sooner
+
+        :return: nothing
+        """
+        schedule = Schedule(min_interval=60, max_interval=3600)
+        self.assertEqual(days_left("07/10/2021", NOW), 9.0)
+        self.assertEqual(days_left("06/30/2021", NOW), -1.0)
+
+        self.assertEqual(recheck_interval(schedule, 90, 0.0), 3600)
+        self.assertEqual(recheck_interval(schedule, 15, 0.0), 1800)
+        self.assertEqual(recheck_interval(schedule, 15, 0.1), 900)
+        self.assertEqual(recheck_interval(schedule, 0, 0.0), 60)
+        self.assertEqual(recheck_interval(schedule, 90, 100.0), 60)
+
+    def test_reschedule(self):
+        """
+        Fare changes feed the volatility of a route
+
+        :return: nothing
+        """
+        schedule = Schedule(min_interval=60, max_interval=3600)
+        watch = Watch(Route("JFK", "DEN", "07/31/2021"))
+
+        watch = reschedule(watch, schedule, 100.0, NOW)
+        self.assertEqual(watch.fare, 100.0)
+        self.assertEqual(watch.volatility, 0.0)
+        self.assertEqual(watch.due, NOW + 3600)
+
+        watch = reschedule(watch, schedule, 120.0, NOW)
+        self.assertAlmostEqual(watch.volatility, 0.1)
+        self.assertEqual(watch.due, NOW + 1800)
+        self.assertEqual(watch.checks, 2)
+
+        # a check without a direct fare keeps the last known one
+        watch = reschedule(watch, schedule, -1.0, NOW)
+        self.assertEqual(watch.fare, 120.0)
+        self.assertAlmostEqual(watch.volatility, 0.1)
+
+    def test_alert_state(self):
+        """
+        Only new and improved arbitrages are reported, across restarts
+
+        :return: nothing
+        """
+        path = str(Path(self.directory.name) / "state.json")
+        route = Route("JFK", "DEN", "07/10/2021")
+        arbs = [
+            {"this destination": "SLC", "savings": 40},
+            {"this destination": "SEA", "savings": 25},
+        ]
+
+        state = AlertState(path, min_improvement=5)
+        self.assertEqual(state.fresh(route, "expedia", arbs), arbs)
+        self.assertEqual(state.fresh(route, "expedia", arbs), [])
+        self.assertEqual(state.fresh(route, "othersite", arbs), arbs)
+
+        restarted = AlertState(path, min_improvement=5)
+        improved = [
+            {"this destination": "SLC", "savings": 43},
+            {"this destination": "SEA", "savings": 31},
+        ]
+        self.assertEqual(
+            restarted.fresh(route, "expedia", improved), improved[1:]
+        )
+        with open(path, "r") as file:
+            saved = json.load(file)
+        self.assertEqual(saved["JFK DEN 07/10/2021 SEA"], 31)
+        self.assertEqual(saved["JFK DEN 07/10/2021 SLC"], 40)
+
+    def test_write_jsonl(self):
+        """
+        Alerts are appended one per line
+
+        :return: nothing
+        """
+        path = str(Path(self.directory.name) / "alerts.jsonl")
+        write_jsonl(path, [{"savings": 1}])
+        write_jsonl(path, [{"savings": 2}, {"savings": 3}])
+        with open(path, "r") as file:
+            lines = [json.loads(line) for line in file]
+        self.assertEqual([line["savings"] for line in lines], [1, 2, 3])
+
+    def test_write_jsonl_stdout(self):
+        """
+        Alerts written to stdout are not mixed with progress messages
+
+        :return: nothing
+        """
+        root = Path(self.directory.name)
+        archive = str(root / "pages.jsonl.gz")
+        routes = [("JFK", "DEN", "07/10/2099"), ("BOS", "ORD", "07/10/2099")]
+        with MockSite() as site, PageArchive(archive) as pages:
+            fetched = SiteArchive(site.url)
+            for route in routes:
+                flight = OneWay(*route)
+                for airport in CANDIDATES + [route[1]]:
+                    url = flight.search_url(airport)
+                    pages.record(url, fetched.page(url))
+        root.joinpath("watch.txt").write_text(
+            "".join(" ".join(route) + "\n" for route in routes)
+        )
+        root.joinpath("airports.txt").write_text("\n".join(CANDIDATES))
+
+        arguments = [
+            str(root / "watch.txt"),
+            "--replay",
+            archive,
+            "--airports",
+            str(root / "airports.txt"),
+            "--page-source",
+            "--alerts",
+            "-",
+            "--checks",
+            "2",
+        ]
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout, patch(
+            "sys.stderr", new_callable=io.StringIO
+        ) as stderr:
+            self.assertEqual(main(arguments), 0)
+
+        alerts = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertTrue(alerts)
+        self.assertTrue(all("savings" in alert for alert in alerts))
+        self.assertIn("done with airport", stderr.getvalue())
+
+    def test_search_fare(self):
+        """
+        A search that finds no direct fare does not report the last one
+
+        :return: nothing
+        """
+        monitor = Monitor([], [], AlertState())
+        monitor.flight = OneWay("JFK", "DEN", "07/10/2099", warm=True)
+        monitor.flight.fare = 120.0
+        with patch.object(OneWay, "find_arbitrage", return_value=[]):
+            self.assertEqual(
+                monitor.search(Route("BOS", "ORD", "07/10/2099")), ([], None)
+            )
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_run(self, mocked_search, mocked_tqdm):
+        """
+        Checks reuse one browser and report each arbitrage once
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = CANDIDATES
+        mocked_tqdm.side_effect = lambda airports: airports
+        routes = [
+            Route("JFK", "DEN", "07/10/2099"),
+            Route("BOS", "ORD", "07/10/2099"),
+        ]
+        batches = []
+
+        with MockSite() as site, patch("sys.stderr"):
+            monitor = Monitor(
+                routes,
+                [batches.append],
+                AlertState(),
+                schedule=Schedule(min_interval=0.0, max_interval=0.0),
+                flight_options=FlightOptions(archive=SiteArchive(site.url)),
+                search_options={"web_browser": "replay", "page_source": True},
+            )
+            with monitor:
+                self.assertEqual(monitor.run(checks=2), 2)
+                browser = monitor.flight.browser
+                self.assertEqual(monitor.run(checks=4), 4)
+                self.assertIs(monitor.flight.browser, browser)
+            self.assertIsNone(monitor.flight)
+
+        alerts = [alert for batch in batches for alert in batch]
+        self.assertTrue(alerts)
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(monitor.alerts, len(alerts))
+        self.assertEqual(
+            {(alert["origin"], alert["destination"]) for alert in alerts},
+            {route[:2] for route in routes},
+        )
+        self.assertEqual({alert["site"] for alert in alerts}, {"expedia"})
+        self.assertEqual([watch.checks for watch in monitor.watches], [3, 3])
+
+    def test_run_departed(self):
+        """
+        Routes whose date has passed are dropped from the watchlist
+
+        :return: nothing
+        """
+        monitor = Monitor(
+            [Route("JFK", "DEN", "07/10/2021")], [], AlertState()
+        )
+        self.assertEqual(monitor.run(), 0)
+        self.assertEqual(monitor.watches, [])
+
+    def test_parse_args(self):
+        """
+        Inconsistent schedules are rejected
+
+        :return: nothing
+        """
+        args = parse_args(["watch.txt", "--min-interval", "60"])
+        self.assertEqual(args.site.name, "expedia")
+        self.assertEqual(args.alerts, "alerts.jsonl")
+        with patch("sys.stderr"):
+            with self.assertRaises(SystemExit):
+                parse_args(
+                    [
+                        "watch.txt",
+                        "--min-interval",
+                        "60",
+                        "--max-interval",
+                        "1",
+                    ]
+                )
+            with self.assertRaises(SystemExit):
+                parse_args(["watch.txt", "--fingerprints", "fp.json"])
+
+
+if __name__ == "__main__":
+
+    unittest.main()
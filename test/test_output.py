@@ -0,0 +1,117 @@
+"""Unit test file for the result writers"""
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from flight_arbitrage.output import (
+    CsvWriter,
+    JsonlWriter,
+    ParquetWriter,
+    RowWriter,
+    open_writer,
+)
+
+try:
+    import pyarrow.parquet  # type: ignore
+except ImportError:  # pragma: no cover
+    pyarrow = None  # pylint: disable=invalid-name
+
+ROWS = [
+    {"this destination": "LAX", "savings": 100.0},
+    {"this destination": "ORD", "savings": 5.0},
+]
+
+
+class TestOutput(unittest.TestCase):
+    """Unit tests for the result writers"""
+
+    def setUp(self):
+        """
+        Create a temporary directory for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_jsonl(self):
+        """
+        Batches are appended as json lines
+
+        :return: nothing
+        """
+        path = os.path.join(self.directory.name, "out.jsonl")
+        with open_writer("jsonl", path) as writer:
+            self.assertIsInstance(writer, JsonlWriter)
+            writer.write(ROWS[:1])
+            writer.write([])
+            writer.write(ROWS[1:])
+
+        with open(path, "r") as file:
+            self.assertEqual([json.loads(line) for line in file], ROWS)
+
+    def test_csv(self):
+        """
+        The header is written once
+
+        :return: nothing
+        """
+        path = os.path.join(self.directory.name, "out.csv")
+        with CsvWriter(path) as writer:
+            writer.write([])
+            writer.write(ROWS[:1])
+            writer.write(ROWS[1:])
+
+        with open(path, "r") as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(
+            [row["this destination"] for row in rows], ["LAX", "ORD"]
+        )
+
+    def test_bad_format(self):
+        """
+        Unknown formats, writers without a format and parquet to stdout
+        are rejected
+
+        :return: nothing
+        """
+        with self.assertRaises(ValueError):
+            open_writer("xml")
+
+        with self.assertRaises(TypeError):
+            RowWriter()  # pylint: disable=abstract-class-instantiated
+
+        with self.assertRaises(ValueError):
+            ParquetWriter("-")
+
+    @unittest.skipIf(pyarrow is None, "needs pyarrow")
+    def test_parquet(self):
+        """
+        Each batch becomes a row group
+
+        :return: nothing
+        """
+        path = os.path.join(self.directory.name, "out.parquet")
+        with open_writer("parquet", path) as writer:
+            writer.write(ROWS[:1])
+            writer.write(ROWS[1:])
+
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        self.assertEqual(parquet_file.read().to_pylist(), ROWS)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
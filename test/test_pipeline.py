@@ -0,0 +1,136 @@
+"""Unit test file for the process-pool parsing pipeline"""
+
+import os
+import pickle
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.extraction import Offer, load_rules, rules_from_dict
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import listing
+from flight_arbitrage.pipeline import ParsePool
+from flight_arbitrage.replay import PageArchive
+
+
+class TestParsePool(unittest.TestCase):
+    """Unit tests for the ParsePool class"""
+
+    def test_rules_pickle(self):
+        """
+        Extraction rules travel to worker processes in serialised form
+
+        :return: nothing
+        """
+        rules = load_rules()
+        copy = pickle.loads(pickle.dumps(rules))
+
+        self.assertEqual(copy.to_dict(), rules.to_dict())
+        page = "<ul>" + listing(58, "1 stop (SLC)") + "</ul>"
+        self.assertEqual(copy.extract(page), rules.extract(page))
+
+    def test_submit(self):
+        """
+        Pages parse in worker processes like they do in process
+
+        :return: nothing
+        """
+        pages = [
+            "<ul>" + listing(price, "1 stop (SLC)") + "</ul>"
+            for price in range(20)
+        ]
+
+        with ParsePool(workers=2, max_pending=3) as pool:
+            futures = [pool.submit(page) for page in pages]
+            offers = [future.result() for future in futures]
+
+        self.assertEqual(pool.max_pending, 3)
+        self.assertEqual(
+            offers,
+            [[Offer(float(price), ("SLC",), "7:30am")] for price in range(20)],
+        )
+
+    def test_submit_rules(self):
+        """
+        One pool parses the pages of several sites, each with its rules
+
+        :return: nothing
+        """
+        other = rules_from_dict(
+            dict(
+                load_rules().to_dict(),
+                name="other",
+                patterns={
+                    "price": "[^0-9]",
+                    "stops": "\\((.*?)\\)",
+                    "departure": "^(.*)",
+                },
+            )
+        )
+        page = "<ul>" + listing(58, "1 stop (SLC)") + "</ul>"
+
+        with ParsePool([load_rules(), other], workers=1) as pool:
+            default = pool.submit(page).result()
+            parsed = pool.submit(page, "other").result()
+            with self.assertRaises(ValueError):
+                pool.submit(page, "missing")
+
+        self.assertEqual(default, [Offer(58.0, ("SLC",), "7:30am")])
+        self.assertEqual(parsed, [Offer(58.0, ("SLC",), "7:30am - 3:00pm")])
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_find_arbitrage_pipelined(self, mocked_search, mocked_tqdm):
+        """
+        Pipelined parsing finds the same arbitrage, in airport order
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        airports = [f"A{number}" for number in range(8)]
+        mocked_search.return_value = ["JFK"] + airports
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        with tempfile.TemporaryDirectory() as directory:
+            archive = PageArchive(os.path.join(directory, "pages.jsonl.gz"))
+            search = OneWay("JFK", "SLC", "07/10/2021")
+            archive.record(
+                search.search_url("SLC"), listing(100, "1 stop (SLC)")
+            )
+            for number, airport in enumerate(airports):
+                archive.record(
+                    search.search_url(airport),
+                    listing(
+                        50 + number,
+                        "1 stop (SLC)" if number % 2 else "1 stop (ORD)",
+                    ),
+                )
+
+            serial = OneWay("JFK", "SLC", "07/10/2021", archive=archive)
+            expected = serial.find_arbitrage(
+                web_browser="replay", page_source=True
+            )
+            with ParsePool(workers=2, max_pending=2) as pool:
+                pipelined = OneWay(
+                    "JFK",
+                    "SLC",
+                    "07/10/2021",
+                    archive=archive,
+                    parse_pool=pool,
+                )
+                result = pipelined.find_arbitrage(
+                    web_browser="replay", page_source=True
+                )
+
+        self.assertEqual(result, expected)
+        self.assertEqual(
+            [arb["this destination"] for arb in result],
+            ["A1", "A3", "A5", "A7"],
+        )
+        self.assertIn("parse wait", pipelined.timer.totals)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,110 @@
+"""Unit test file for the phase timer"""
+
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.profiling import PhaseTimer
+
+
+class TestPhaseTimer(unittest.TestCase):
+    """Unit tests for the PhaseTimer class"""
+
+    @patch("flight_arbitrage.profiling.time.perf_counter")
+    def test_phase(self, mocked_counter):
+        """
+        Phases accumulate time and calls, even when they raise
+
+        :param mocked_counter: a mocked performance counter
+        :return: nothing
+        """
+        mocked_counter.side_effect = [0.0, 2.0, 5.0, 6.0]
+        timer = PhaseTimer()
+
+        with timer.phase("page load"):
+            pass
+        with self.assertRaises(ValueError):
+            with timer.phase("page load"):
+                raise ValueError()
+
+        self.assertEqual(timer.totals, {"page load": 3.0})
+        self.assertEqual(timer.counts, {"page load": 2})
+
+    def test_merge_and_report(self):
+        """
+        Worker timers merge into one report, slowest phase first
+
+        :return: nothing
+        """
+        timer = PhaseTimer()
+        timer.add("listings", 1.0)
+        worker = PhaseTimer()
+        worker.add("listings", 1.0)
+        worker.add("page load", 6.0)
+
+        timer.merge(worker)
+
+        self.assertEqual(timer.totals, {"listings": 2.0, "page load": 6.0})
+        self.assertEqual(timer.counts, {"listings": 2, "page load": 1})
+        lines = timer.report().splitlines()
+        self.assertTrue(lines[1].startswith("page load"))
+        self.assertIn("75.0%", lines[1])
+
+    @patch("flight_arbitrage.profiling.time.perf_counter")
+    def test_nested_report(self, mocked_counter):
+        """
+        Nested phases count once towards the shares, in their outer phase
+
+        :param mocked_counter: a mocked perf_counter
+        :return: nothing
+        """
+        mocked_counter.side_effect = [0.0, 1.0, 3.0, 4.0, 4.0, 4.0, 8.0, 12.0]
+        timer = PhaseTimer()
+        with timer.phase("page"):
+            with timer.phase("listings"):
+                pass
+        with timer.phase("page"):
+            pass
+        with timer.phase("parse"):
+            pass
+
+        self.assertEqual(
+            timer.totals, {"page": 4.0, "listings": 2.0, "parse": 4.0}
+        )
+        lines = timer.report().splitlines()
+        self.assertTrue(lines[1].endswith("50.0%"))
+        self.assertTrue(lines[2].endswith("50.0%"))
+        self.assertTrue(lines[3].startswith("listings"))
+        self.assertTrue(lines[3].endswith("-"))
+
+    def test_scope(self):
+        """
+        Phases and tallies inside a scope are broken down by its key
+
+        :return: nothing
+        """
+        timer = PhaseTimer()
+        with timer.scope("SLC"):
+            timer.add("page load", 2.0)
+            timer.tally("retries")
+            with timer.scope("ORD"):
+                timer.add("page load", 1.0)
+            timer.add("listings", 0.5)
+        timer.add("page load", 4.0)
+        timer.tally("retries")
+
+        self.assertEqual(timer.totals["page load"], 7.0)
+        scoped, tallies = timer.take_scoped()
+        self.assertEqual(
+            scoped,
+            {
+                "SLC": {"page load": 2.0, "listings": 0.5},
+                "ORD": {"page load": 1.0},
+            },
+        )
+        self.assertEqual(tallies, {"SLC": {"retries": 1}, "": {"retries": 1}})
+        self.assertEqual(timer.take_scoped(), ({}, {}))
+
+
+if __name__ == "__main__":
+
+    unittest.main()
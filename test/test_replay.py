@@ -0,0 +1,335 @@
+"""Unit test file for recording and replaying result pages"""
+
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from lxml import html
+from selenium.common.exceptions import NoSuchElementException
+
+from flight_arbitrage.governor import THROTTLE_SCRIPT, RequestGovernor
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import listing
+from flight_arbitrage.replay import (
+    EMPTY_PAGE,
+    PageArchive,
+    RecordingBrowser,
+    ReplayBrowser,
+    ReplayElement,
+)
+
+# result pages of the one-way searches from start_airport
+PAGES = {
+    "end_airport": listing(100, arrival="1:05pm"),
+    "airport_2": listing(58, "1 stop (end_airport)")
+    + listing(40, "1 stop (other_airport)", "9:00am", "2:00pm"),
+}
+
+
+class FakeBrowser:
+    """Selenium webdriver stand-in rendering PAGES"""
+
+    def __init__(self):
+        """
+        FakeBrowser constructor
+
+        :return: nothing
+        """
+        self.urls = []
+        self.quit_count = 0
+
+    def get(self, url):
+        """
+        Loads a url
+
+        :param url: url to load
+        :return: nothing
+        """
+        self.urls.append(url)
+
+    @property
+    def page_source(self):
+        """
+        Page of the destination in the last url
+
+        :return: the page source
+        """
+        for destination, page in PAGES.items():
+            if f"to:{destination}," in self.urls[-1]:
+                return f"<html><body><ul>{page}</ul></body></html>"
+        return EMPTY_PAGE
+
+    def quit(self):
+        """
+        Closes the browser
+
+        :return: nothing
+        """
+        self.quit_count += 1
+
+
+class RenderingBrowser(FakeBrowser):
+    """FakeBrowser whose listings only render once they are looked up"""
+
+    def __init__(self):
+        """
+        RenderingBrowser constructor
+
+        :return: nothing
+        """
+        super().__init__()
+        self.rendered = False
+
+    def get(self, url):
+        """
+        Loads a url, its listings not rendered yet
+
+        :param url: url to load
+        :return: nothing
+        """
+        super().get(url)
+        self.rendered = False
+
+    @property
+    def page_source(self):
+        """
+        Page of the destination in the last url, once rendered
+
+        :return: the page source
+        """
+        if not self.rendered:
+            return "<html><body>loading</body></html>"
+        return super().page_source
+
+    def execute_script(self, script, *args):
+        """
+        Title and visible text of the page, the governor's throttling check
+
+        :param script: script source
+        :param args: script arguments
+        :return: the text
+        """
+        assert script == THROTTLE_SCRIPT and args
+        return "\n" + html.fromstring(self.page_source).text_content()
+
+    def find_elements_by_xpath(self, xpath):
+        """
+        Renders the page and looks up elements in it
+
+        :param xpath: xpath of the elements
+        :return: the elements
+        """
+        self.rendered = True
+        return [
+            ReplayElement(node)
+            for node in html.fromstring(self.page_source).xpath(xpath)
+        ]
+
+
+class TestReplay(unittest.TestCase):
+    """Unit tests for PageArchive, RecordingBrowser and ReplayBrowser"""
+
+    def setUp(self):
+        """
+        Create a temporary archive path for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "pages.jsonl.gz")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_archive(self):
+        """
+        Records survive a reopen, the last record of a url wins
+
+        :return: nothing
+        """
+        with PageArchive(self.path) as archive:
+            archive.record("url 1", "first")
+            archive.record("url 1", "second")
+            archive.record("url 2", "other")
+        with PageArchive(self.path) as archive:
+            archive.record("url 3", "appended")
+
+        archive = PageArchive(self.path)
+        self.assertEqual(len(archive), 3)
+        self.assertEqual(archive.page("url 1"), "second")
+        self.assertEqual(archive.page("url 3"), "appended")
+        self.assertIsNone(archive.page("url 4"))
+
+    def test_archive_truncated(self):
+        """
+        A truncated archive keeps its complete records
+
+        :return: nothing
+        """
+        with PageArchive(self.path) as archive:
+            archive.record("url 1", "first")
+        with open(self.path, "rb") as file:
+            data = file.read()
+        with open(self.path, "wb") as file:
+            file.write(data + gzip.compress(b'{"url": "url 2", "pa')[:-8])
+
+        self.assertEqual(PageArchive(self.path).pages, {"url 1": "first"})
+
+    def test_recording_browser(self):
+        """
+        Pages are saved when read, or before the next load if never read
+
+        :return: nothing
+        """
+        archive = PageArchive(self.path)
+        fake = FakeBrowser()
+        browser = RecordingBrowser(fake, archive)
+
+        browser.get("to:end_airport,")
+        browser.get("to:airport_2,")
+        self.assertIn("$58", browser.page_source)
+        browser.get("about:blank")
+        browser.quit()
+
+        self.assertEqual(
+            sorted(archive.pages), ["to:airport_2,", "to:end_airport,"]
+        )
+        self.assertIn("$100", archive.page("to:end_airport,"))
+        self.assertEqual(fake.quit_count, 1)
+        self.assertEqual(browser.urls, fake.urls)
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_record_with_governor(self, mocked_search, mocked_tqdm):
+        """
+        Pages read for throttling before they render are saved rendered
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = ["start_airport", "airport_2"]
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        def open_fake(flight, **_):
+            flight.browser = RenderingBrowser()
+
+        with PageArchive(self.path) as archive, patch(
+            "flight_arbitrage.flight.Flight.open_firefox", open_fake
+        ), patch("flight_arbitrage.hidden_city.time"), patch(
+            "flight_arbitrage.flight.time"
+        ), patch(
+            "sys.stderr"
+        ):
+            flight = OneWay(
+                "start_airport",
+                "end_airport",
+                "date",
+                archive=archive,
+                governor=RequestGovernor(sleep=lambda seconds: None),
+            )
+            arbs = flight.find_arbitrage()
+
+        self.assertEqual(
+            [arb["this destination"] for arb in arbs], ["airport_2"]
+        )
+        self.assertIn("$58", archive.page(flight.search_url("airport_2")))
+        self.assertIn("$100", archive.page(flight.search_url("end_airport")))
+
+    def test_replay_browser(self):
+        """
+        Archived pages are served with selenium-like element lookups
+
+        :return: nothing
+        """
+        archive = PageArchive(self.path)
+        archive.record("url", "<ul>" + PAGES["airport_2"] + "</ul>")
+        browser = ReplayBrowser(archive)
+
+        browser.get("url")
+        listings = browser.find_elements_by_xpath(
+            "//li[@data-test-id='offer-listing']"
+        )
+        self.assertEqual(len(listings), 2)
+        self.assertEqual(
+            listings[1]
+            .find_element_by_xpath(".//div[@data-test-id='layovers']")
+            .text,
+            "1 stop (other_airport)",
+        )
+        with self.assertRaises(NoSuchElementException):
+            browser.find_element_by_xpath("//table")
+
+        browser.get("missing")
+        self.assertEqual(browser.page_source, EMPTY_PAGE)
+        self.assertEqual(browser.misses, ["missing"])
+        with self.assertRaises(KeyError):
+            ReplayBrowser(archive, strict=True).get("missing")
+
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    def test_record_then_replay(self, mocked_search, mocked_tqdm):
+        """
+        A replayed run finds the recorded arbitrage without waiting
+
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = ["start_airport", "airport_2", "empty"]
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        def open_fake(flight, **_):
+            flight.browser = FakeBrowser()
+
+        with PageArchive(self.path) as archive, patch(
+            "flight_arbitrage.flight.Flight.open_firefox", open_fake
+        ), patch("flight_arbitrage.hidden_city.time"), patch(
+            "flight_arbitrage.flight.time"
+        ):
+            recorded = OneWay(
+                "start_airport", "end_airport", "date", archive=archive
+            ).find_arbitrage(page_source=True)
+
+        with PageArchive(self.path) as archive, patch(
+            "flight_arbitrage.hidden_city.time"
+        ) as mocked_time, patch(
+            "flight_arbitrage.flight.time"
+        ) as mocked_flight_time:
+            flight = OneWay(
+                "start_airport", "end_airport", "date", archive=archive
+            )
+            replayed = flight.find_arbitrage(
+                web_browser="replay", page_source=True
+            )
+
+        # pages parsed element by element replay the same
+        with PageArchive(self.path) as archive, patch(
+            "flight_arbitrage.hidden_city.time"
+        ), patch("flight_arbitrage.flight.time"):
+            elements = OneWay(
+                "start_airport", "end_airport", "date", archive=archive
+            ).find_arbitrage(web_browser="replay")
+
+        self.assertEqual(len(archive), 3)
+        self.assertEqual(replayed, recorded)
+        self.assertEqual(elements, recorded)
+        self.assertEqual(
+            [arb["this destination"] for arb in replayed], ["airport_2"]
+        )
+        self.assertEqual(flight.browser.misses, [])
+        mocked_time.sleep.assert_not_called()
+        mocked_flight_time.sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,211 @@
+"""Unit test file for the run reports"""
+
+import json
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import MockSite, SiteArchive, SiteConfig
+from flight_arbitrage.profiling import PhaseTimer
+from flight_arbitrage.report import (
+    AirportReport,
+    RunReport,
+    percentile,
+    write_reports,
+)
+
+CANDIDATES = ["ATL", "BOS", "JFK", "LAX", "MIA", "SEA"]
+
+
+class TestRunReport(unittest.TestCase):
+    """Unit tests for the RunReport class"""
+
+    @staticmethod
+    def search(config, tries=3):
+        """
+        Searches JFK to DEN on a mock site
+
+        :param config: mock site behaviour
+        :param tries: number of tries to wait for listings
+        :return: the flight and its arbitrages
+        """
+        with MockSite(config) as site, patch("sys.stderr"), patch(
+            "flight_arbitrage.hidden_city.tqdm", side_effect=lambda a: a
+        ), patch(
+            "flight_arbitrage.hidden_city.OneWay.airports_to_search",
+            return_value=CANDIDATES,
+        ):
+            flight = OneWay(
+                "JFK", "DEN", "07/10/2021", archive=SiteArchive(site.url)
+            )
+            arbs = flight.find_arbitrage(
+                web_browser="replay", page_source=True, tries=tries
+            )
+        return flight, arbs
+
+    def test_find_arbitrage(self):
+        """
+        Every page loaded gets a row, evaluated ones with their yield
+
+        :return: nothing
+        """
+        flight, arbs = self.search(SiteConfig())
+        report = flight.report
+        rows = {row.airport: row for row in report.airports}
+
+        self.assertEqual(set(rows), set(CANDIDATES) - {"JFK"})
+        self.assertEqual(sum(row.arbs for row in rows.values()), len(arbs))
+        self.assertTrue(all(row.listings for row in rows.values()))
+        self.assertTrue(all(row.load_seconds > 0 for row in rows.values()))
+        self.assertEqual(report.progress, flight.progress)
+
+        summary = report.summary()
+        self.assertEqual(summary["airports"], len(rows))
+        self.assertEqual(summary["retries"], 0)
+        self.assertEqual(summary["arbs"], len(arbs))
+        self.assertIn("load p90 ms", summary)
+        phases = [phase["phase"] for phase in report.to_dict()["phases"]]
+        self.assertIn("page load", phases)
+        self.assertIn("open browser", phases)
+
+    def test_retries(self):
+        """
+        Pages without listings count their retries
+
+        :return: nothing
+        """
+        flight, arbs = self.search(SiteConfig(failure_rate=1.0), tries=2)
+
+        self.assertEqual(arbs, [])
+        self.assertEqual({row.retries for row in flight.report.airports}, {2})
+        self.assertEqual({row.listings for row in flight.report.airports}, {0})
+
+    def test_timer_baseline(self):
+        """
+        A report leaves out what its timer recorded before the search
+
+        :return: nothing
+        """
+        timer = PhaseTimer()
+        timer.add("page load", 5.0)
+        with timer.scope("ORD"):
+            timer.add("page load", 1.0)
+        report = RunReport(("JFK", "DEN", "07/10/2021"), "expedia", timer)
+
+        with timer.scope("SLC"):
+            timer.add("page load", 0.5)
+            timer.add("parse wait", 0.25)
+            timer.tally("retries")
+        report.evaluated("SLC", 30, 2, 1)
+        report.finish(timer)
+
+        self.assertEqual(report.phases["page load"], (0.5, 1))
+        self.assertEqual(len(report.airports), 1)
+        row = report.airports[0]
+        self.assertEqual(
+            (row.airport, row.load_seconds, row.wait_seconds),
+            ("SLC", 0.5, 0.25),
+        )
+        self.assertEqual(
+            (row.listings, row.bad_count, row.retries), (30, 2, 1)
+        )
+
+    def test_deep_scan(self):
+        """
+        Deep scans report the listings they added and what they cost
+
+        :return: nothing
+        """
+        timer = PhaseTimer()
+        report = RunReport(("JFK", "DEN", "07/10/2021"), "expedia", timer)
+        with timer.scope("SLC"):
+            timer.add("listings", 3.0)
+            timer.add("deep scan", 2.0)
+            timer.tally("expanded", 10)
+        report.evaluated("SLC", 40, 0, 2)
+        report.evaluated("ORD", 10, 0, 0)
+        report.finish(timer)
+
+        rows = {row.airport: row for row in report.airports}
+        self.assertEqual(
+            (rows["SLC"].expanded, rows["SLC"].scan_seconds), (10, 2.0)
+        )
+        self.assertEqual(
+            (rows["ORD"].expanded, rows["ORD"].scan_seconds), (0, 0.0)
+        )
+        summary = report.summary()
+        self.assertEqual(summary["expanded"], 10)
+        self.assertEqual(summary["expanded share"], 0.2)
+        self.assertEqual(summary["scan seconds"], 2.0)
+        self.assertEqual(summary["expanded per scan second"], 5.0)
+
+    def test_write_reports(self):
+        """
+        Reports are written as json or html depending on the path
+
+        :return: nothing
+        """
+        flight, _ = self.search(SiteConfig())
+
+        with tempfile.NamedTemporaryFile("r", suffix=".json") as file:
+            write_reports([flight.report, flight.report], file.name)
+            saved = json.load(file)
+        with tempfile.NamedTemporaryFile("r", suffix=".html") as file:
+            flight.report.write(file.name)
+            page = file.read()
+
+        self.assertEqual(len(saved), 2)
+        self.assertEqual(saved[0]["route"], ["JFK", "DEN", "07/10/2021"])
+        seconds = [
+            row["load_seconds"] + row["wait_seconds"]
+            for row in saved[0]["airports"]
+        ]
+        self.assertEqual(seconds, sorted(seconds, reverse=True))
+        self.assertTrue(page.startswith("<!DOCTYPE html>"))
+        self.assertIn("<h2>JFK DEN 07/10/2021 on expedia</h2>", page)
+        self.assertIn("<th>bad_count</th>", page)
+
+    def test_to_dict_order(self):
+        """
+        Airports and phases are sorted on their times as written
+
+        :return: nothing
+        """
+        report = RunReport(("JFK", "DEN", "07/10/2021"), "expedia")
+        report.airports = [
+            AirportReport("SLC", 0.10004, 0.00004, 1, 0, 0, 0),
+            AirportReport("ORD", 0.10006, 0.0, 1, 0, 0, 0),
+            AirportReport("ATL", 0.1, 0.0, 1, 0, 0, 0),
+        ]
+        report.phases = {"listings": (0.00004, 2), "page load": (0.00006, 2)}
+        saved = report.to_dict()
+
+        self.assertEqual(
+            [row["airport"] for row in saved["airports"]],
+            ["ORD", "SLC", "ATL"],
+        )
+        self.assertEqual(
+            [phase["phase"] for phase in saved["phases"]],
+            ["page load", "listings"],
+        )
+
+    def test_percentile(self):
+        """
+        Nearest-rank percentiles, 0.0 without values
+
+        :return: nothing
+        """
+        self.assertEqual(percentile([], 0.5), 0.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0, 4.0], 0.5), 2.0)
+        self.assertEqual(percentile([3.0, 1.0, 2.0, 4.0], 0.99), 4.0)
+        self.assertEqual(percentile([2.0, 1.0], 0.5), 1.0)
+        self.assertEqual(percentile([1.0], 0.0), 1.0)
+        hundred = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(hundred, 0.99), 99.0)
+        self.assertEqual(percentile(hundred, 0.07), 7.0)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
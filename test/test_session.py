@@ -0,0 +1,211 @@
+"""Unit test file for the managed browser sessions"""
+
+import os
+import unittest
+from unittest.mock import Mock, patch
+
+from flight_arbitrage import session
+from flight_arbitrage.session import (
+    HygienePolicy,
+    ManagedBrowser,
+    browser_rss,
+    process_tree_rss,
+)
+
+MEGABYTE = 1024 * 1024
+
+
+class TestManagedBrowser(unittest.TestCase):
+    """Unit tests for the ManagedBrowser class"""
+
+    def setUp(self):
+        """
+        Create a browser factory handing out mocked browsers
+
+        :return: nothing
+        """
+        self.browsers = []
+
+        def factory():
+            browser = Mock(name=f"browser {len(self.browsers)}")
+            self.browsers.append(browser)
+            return browser
+
+        self.factory = factory
+
+    def test_forwarding(self):
+        """
+        The loop sees a normal browser
+
+        :return: nothing
+        """
+        managed = ManagedBrowser(self.factory, HygienePolicy(sample_every=0))
+        self.browsers[0].page_source = "<html></html>"
+
+        managed.get("https://www.expedia.com/")
+        managed.find_element_by_xpath("//li")
+
+        self.assertEqual(managed.page_source, "<html></html>")
+        self.browsers[0].get.assert_called_once_with(
+            "https://www.expedia.com/"
+        )
+        self.browsers[0].find_element_by_xpath.assert_called_once_with("//li")
+
+    def test_reset(self):
+        """
+        Storage, cookies and cache are cleared every reset_every pages
+
+        :return: nothing
+        """
+        managed = ManagedBrowser(
+            self.factory, HygienePolicy(reset_every=2, sample_every=0)
+        )
+        browser = self.browsers[0]
+        browser.execute_cdp_cmd.side_effect = AttributeError()
+
+        for page in range(5):
+            managed.get(f"page {page}")
+
+        self.assertEqual(managed.resets, 2)
+        self.assertEqual(browser.delete_all_cookies.call_count, 2)
+        self.assertEqual(browser.execute_script.call_count, 2)
+        self.assertEqual(
+            [call.args[0] for call in browser.get.call_args_list],
+            [
+                "page 0",
+                "page 1",
+                "about:blank",
+                "page 2",
+                "page 3",
+                "about:blank",
+                "page 4",
+            ],
+        )
+
+    def test_load(self):
+        """
+        Pages loaded outside get count too, due resets wait for a get or
+        upkeep
+
+        :return: nothing
+        """
+        managed = ManagedBrowser(
+            self.factory,
+            HygienePolicy(reset_every=2),
+            sampler=Mock(return_value=0),
+        )
+        browser = self.browsers[0]
+        start = Mock()
+
+        for page in range(3):
+            managed.load(f"tab {page}", start)
+
+        self.assertEqual(start.call_count, 3)
+        self.assertEqual(managed.pages, 3)
+        self.assertEqual(len(managed.samples), 3)
+        self.assertEqual(managed.resets, 0)
+        browser.get.assert_not_called()
+
+        self.assertTrue(managed.upkeep_due())
+
+        managed.get("page")
+        self.assertEqual(managed.resets, 1)
+        self.assertEqual(
+            [call.args[0] for call in browser.get.call_args_list],
+            ["about:blank", "page"],
+        )
+        self.assertFalse(managed.upkeep_due())
+
+        managed.load("tab 3", start)
+        managed.upkeep()
+        self.assertEqual(managed.resets, 2)
+        self.assertFalse(managed.upkeep_due())
+
+    def test_restart_then_reset(self):
+        """
+        A restarted browser is not reset before reset_every more pages
+
+        :return: nothing
+        """
+        sampler = Mock(side_effect=[300 * MEGABYTE] + [0] * 4)
+        managed = ManagedBrowser(
+            self.factory,
+            HygienePolicy(reset_every=2, restart_rss_mb=200),
+            sampler=sampler,
+        )
+
+        for page in range(5):
+            managed.get(f"page {page}")
+
+        self.assertEqual((managed.restarts, managed.resets), (1, 1))
+        self.assertEqual(
+            [call.args[0] for call in self.browsers[1].get.call_args_list],
+            ["page 1", "page 2", "about:blank", "page 3", "page 4"],
+        )
+
+    def test_restart(self):
+        """
+        A browser above the memory threshold is replaced before the next page
+
+        :return: nothing
+        """
+        sampler = Mock(side_effect=[100 * MEGABYTE, 300 * MEGABYTE, 50])
+        managed = ManagedBrowser(
+            self.factory,
+            HygienePolicy(reset_every=0, restart_rss_mb=200),
+            sampler=sampler,
+        )
+
+        for page in range(3):
+            managed.get(f"page {page}")
+
+        self.assertEqual(len(self.browsers), 2)
+        self.assertFalse(managed.upkeep_due())
+        self.browsers[0].quit.assert_called_once_with()
+        self.browsers[1].get.assert_called_once_with("page 2")
+        self.assertIs(managed.browser, self.browsers[1])
+        self.assertEqual(
+            managed.stats(),
+            {
+                "pages": 3,
+                "resets": 0,
+                "restarts": 1,
+                "peak_rss_mb": 300.0,
+                "last_rss_mb": 50 / MEGABYTE,
+            },
+        )
+
+    def test_browser_rss(self):
+        """
+        Memory is read from the driver service process tree
+
+        :return: nothing
+        """
+        self.assertEqual(browser_rss(Mock(spec=[])), 0)
+
+        browser = Mock()
+        browser.service.process.pid = os.getpid()
+
+        with patch.object(session, "process_tree_rss") as mocked_rss:
+            mocked_rss.return_value = 5
+
+            self.assertEqual(browser_rss(browser), 5)
+
+        mocked_rss.assert_called_once_with(os.getpid())
+
+    @unittest.skipUnless(os.path.exists("/proc/self/status"), "needs /proc")
+    def test_process_tree_rss(self):
+        """
+        The current process uses some memory
+
+        :return: nothing
+        """
+        self.assertGreater(process_tree_rss(os.getpid()), 0)
+
+        with patch.object(session, "psutil", None):
+            self.assertGreater(process_tree_rss(os.getpid()), 0)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
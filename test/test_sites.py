@@ -0,0 +1,130 @@
+"""Unit test file for the flight site adapters"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from flight_arbitrage.extraction import Offer, load_rules
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.sites import load_site, site_from_dict
+
+EXPEDIA_URL = (
+    "https://www.expedia.com/Flights-Search?trip=oneway&leg1="
+    "from:JFK,to:LAX,departure:07/10/2021"
+    "TANYT&passengers=adults:1,children:0,seniors:0,infantinlap:Y"
+    "&options=cabinclass%3Aeconomy&mode=search"
+)
+
+
+class TestSites(unittest.TestCase):
+    """Unit tests for the SiteAdapter class"""
+
+    def test_expedia(self):
+        """
+        The bundled site builds the expedia search urls
+
+        :return: nothing
+        """
+        site = load_site()
+
+        self.assertEqual(site.name, "expedia")
+        self.assertIs(site, load_site())
+        self.assertEqual(load_site("expedia").url_template, site.url_template)
+        self.assertEqual(
+            site.search_url("JFK", "LAX", "07/10/2021"), EXPEDIA_URL
+        )
+        self.assertEqual(
+            OneWay("JFK", "SLC", "07/10/2021").search_url("LAX"), EXPEDIA_URL
+        )
+        with self.assertRaises(ValueError):
+            load_site("nowhere")
+
+    def test_route_of(self):
+        """
+        Routes are read back from the search urls of their own site only
+
+        :return: nothing
+        """
+        site = load_site()
+        other = site_from_dict(
+            dict(
+                load_rules().to_dict(),
+                name="other",
+                search_url="https://other.example/{origin}/{destination}"
+                "?d={date}",
+            )
+        )
+        route = ("JFK", "LAX", "07/10/2021")
+
+        self.assertEqual(site.route_of(EXPEDIA_URL), route)
+        self.assertEqual(site.route_of(EXPEDIA_URL[24:]), route)
+        self.assertIsNone(site.route_of("about:blank"))
+        self.assertIsNone(site.route_of(other.search_url(*route)))
+        self.assertEqual(other.route_of(other.search_url(*route)), route)
+        self.assertEqual(other.route_of("/JFK/LAX?d=07/10/2021&x=1"), route)
+        self.assertIsNone(other.route_of(EXPEDIA_URL))
+
+    def test_ready(self):
+        """
+        Pages are ready once enough listings show the field of the site rule
+
+        :return: nothing
+        """
+        site = load_site()
+        self.assertFalse(site.ready([]))
+        self.assertFalse(site.ready([Offer(None, (), "7:30am")]))
+        self.assertTrue(
+            site.ready([Offer(None, (), None), Offer(9.0, (), None)])
+        )
+
+        rules = dict(
+            load_rules().to_dict(),
+            search_url=site.url_template,
+            ready={"field": "departure", "listings": 2},
+        )
+        departures = site_from_dict(rules)
+        self.assertFalse(departures.ready([Offer(9.0, (), "7:30am")]))
+        self.assertTrue(
+            departures.ready([Offer(None, (), "7:30am"), Offer(None, (), "")])
+        )
+        for ready in ({"field": "airline"}, {"listings": 0}, {"wait": 1}):
+            rules["ready"] = ready
+            with self.assertRaises(ValueError):
+                site_from_dict(rules)
+
+    def test_site_file(self):
+        """
+        Another site only needs a rules file with a search url
+
+        :return: nothing
+        """
+        data = dict(
+            load_rules().to_dict(),
+            name="other",
+            search_url="https://other.example/{origin}/{destination}?d={date}",
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "other.json")
+            with open(path, "w") as file:
+                json.dump(data, file)
+
+            site = load_site(path)
+
+        self.assertEqual(site.name, "other")
+        self.assertEqual(
+            OneWay("JFK", "SLC", "07/10/2021", site=site).search_url("LAX"),
+            "https://other.example/JFK/LAX?d=07/10/2021",
+        )
+
+        data["search_url"] = "https://other.example/{origin}"
+        with self.assertRaises(ValueError):
+            site_from_dict(data)
+        del data["search_url"]
+        with self.assertRaises(ValueError):
+            site_from_dict(data)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
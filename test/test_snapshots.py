@@ -0,0 +1,217 @@
+"""Unit test file for the page snapshot store"""
+
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage import snapshots
+from flight_arbitrage.extraction import Offer, load_rules
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import listing
+from flight_arbitrage.replay import (
+    ReplayBrowser,
+    archived_airports,
+    open_archive,
+)
+from flight_arbitrage.sites import load_site, site_from_dict
+from flight_arbitrage.snapshots import (
+    CODEC_GZIP,
+    CODEC_ZSTD,
+    INDEX_RECORD,
+    SnapshotKey,
+    SnapshotStore,
+    route_of,
+)
+
+PAGE = f"<ul>{listing(58, '1 stop (SLC)', arrival='1:05pm')}</ul>"
+
+
+class TestSnapshotStore(unittest.TestCase):
+    """Unit tests for the SnapshotStore class"""
+
+    def setUp(self):
+        """
+        Create a temporary store directory for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "snapshots")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_append_and_read(self):
+        """
+        Snapshots are found by route and time and read back one by one
+
+        :return: nothing
+        """
+        with SnapshotStore(self.path, codec=CODEC_GZIP) as store:
+            first = store.append("JFK", "LAX", "07/10/2021", "old", 1.0)
+            self.assertEqual(store.read(first), "old")
+            store.append("JFK", "LAX", "07/10/2021", PAGE, 2.0)
+            store.append("JFK", "ORD", "07/10/2021", "other", 3.0)
+
+        store = SnapshotStore(self.path)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(
+            [entry.key for entry in store.find(destination="LAX")],
+            [
+                SnapshotKey("JFK", "LAX", "07/10/2021", 1.0),
+                SnapshotKey("JFK", "LAX", "07/10/2021", 2.0),
+            ],
+        )
+        self.assertEqual(len(store.find(since=2.0)), 2)
+        latest = store.latest("JFK", "LAX", "07/10/2021")
+        self.assertEqual(store.read(latest), PAGE)
+        self.assertEqual(
+            store.offers(latest), [Offer(58.0, ("SLC",), "7:30am")]
+        )
+        self.assertIsNone(store.latest("JFK", "SFO", "07/10/2021"))
+        store.close()
+
+    def test_without_file_locks(self):
+        """
+        Stores append and read back where fcntl is missing
+
+        :return: nothing
+        """
+        with patch.object(snapshots, "fcntl", None):
+            with SnapshotStore(self.path) as store:
+                entry = store.append("JFK", "LAX", "07/10/2021", PAGE, 1.0)
+                store.append("JFK", "ORD", "07/10/2021", "other", 2.0)
+                self.assertEqual(store.read(entry), PAGE)
+            self.assertEqual(len(SnapshotStore(self.path)), 2)
+
+    def test_growth_and_partial_record(self):
+        """
+        Reads see later appends and skip a partially written record
+
+        :return: nothing
+        """
+        store = SnapshotStore(self.path, codec=CODEC_GZIP)
+        for number in range(50):
+            entry = store.append("JFK", f"A{number}", "d", f"page {number}")
+            self.assertEqual(store.read(entry), f"page {number}")
+
+        with open(store.index_path, "ab") as index:
+            index.write(b"\0" * (INDEX_RECORD.size // 2))
+
+        self.assertEqual(len(list(store.entries())), 50)
+        store.close()
+
+    def test_archive_interface(self):
+        """
+        Search urls are snapshotted once per distinct page and replayed
+
+        :return: nothing
+        """
+        url = OneWay("JFK", "LAX", "07/10/2021").search_url("LAX")
+        self.assertEqual(route_of(url), ("JFK", "LAX", "07/10/2021"))
+        self.assertIsNone(route_of("about:blank"))
+
+        store = open_archive(self.path)
+        self.assertIsInstance(store, SnapshotStore)
+        store.record(url, PAGE)
+        store.record(url, PAGE)
+        store.record("about:blank", "")
+
+        self.assertEqual(len(store), 1)
+        self.assertIn(url, store)
+        browser = ReplayBrowser(store)
+        browser.get(url)
+        self.assertEqual(browser.page_source, PAGE)
+
+    def test_sites(self):
+        """
+        Pages of several sites are kept apart, other sites are not archived
+
+        :return: nothing
+        """
+        route = ("JFK", "LAX", "07/10/2021")
+        rules = load_rules().to_dict()
+        rules["name"] = "other"
+        rules["search_url"] = (
+            "https://other.example/search?from={origin}&to={destination}"
+            "&on={date}"
+        )
+        other = site_from_dict(rules)
+        expedia_url = load_site().search_url(*route)
+        other_url = other.search_url(*route)
+
+        SnapshotStore(self.path).record(other_url, "ignored")
+        store = SnapshotStore(self.path, sites=[load_site(), other])
+        self.assertEqual(len(store), 0)
+        store.record(expedia_url, PAGE)
+        store.record(other_url, "other")
+
+        self.assertEqual(store.page(expedia_url), PAGE)
+        self.assertEqual(store.page(other_url), "other")
+        self.assertEqual(
+            [entry.key.site for entry in store.find(*route)],
+            ["expedia", "other"],
+        )
+        self.assertEqual(len(store.find(site="other")), 1)
+        self.assertEqual(archived_airports(store), ["LAX"])
+        self.assertEqual(archived_airports(SnapshotStore(self.path)), ["LAX"])
+        self.assertEqual(
+            archived_airports(SnapshotStore(self.path, sites=[other])),
+            ["LAX"],
+        )
+        self.assertEqual(
+            archived_airports(SnapshotStore(self.path), [load_site()]),
+            ["LAX"],
+        )
+        self.assertEqual(archived_airports(store, [other]), ["LAX"])
+        self.assertIsNone(SnapshotStore(self.path).latest(*route, "nowhere"))
+
+    def test_appends_of_other_stores(self):
+        """
+        Latest pages include pages appended through other store instances
+
+        :return: nothing
+        """
+        reader = SnapshotStore(self.path, codec=CODEC_GZIP)
+        writer = SnapshotStore(self.path, codec=CODEC_GZIP)
+        self.assertIsNone(reader.latest("JFK", "LAX", "07/10/2021"))
+
+        writer.append("JFK", "LAX", "07/10/2021", "first", 1.0)
+        self.assertEqual(
+            reader.read(reader.latest("JFK", "LAX", "07/10/2021")), "first"
+        )
+        writer.append("JFK", "LAX", "07/10/2021", "second", 2.0)
+        writer.append("JFK", "LAX", "07/10/2021", "stale", 0.5)
+        self.assertEqual(
+            reader.read(reader.latest("JFK", "LAX", "07/10/2021")), "second"
+        )
+        reader.close()
+        writer.close()
+
+    def test_codecs(self):
+        """
+        Zstd needs the zstandard package, field widths are checked
+
+        :return: nothing
+        """
+        with patch.object(snapshots, "zstandard", None):
+            with self.assertRaises(ValueError):
+                SnapshotStore(self.path, codec=CODEC_ZSTD)
+            self.assertEqual(SnapshotStore(self.path).codec, CODEC_GZIP)
+
+        with self.assertRaises(ValueError):
+            SnapshotStore(self.path, codec=CODEC_GZIP).append(
+                "JFK", "LAX", "a date much too long", PAGE
+            )
+
+
+if __name__ == "__main__":
+
+    unittest.main()
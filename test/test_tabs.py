@@ -0,0 +1,234 @@
+"""Unit test file for pipelined page loads in browser tabs"""
+
+from types import SimpleNamespace
+import unittest
+from unittest.mock import patch
+
+from flight_arbitrage.hidden_city import OneWay
+from flight_arbitrage.mock_site import SiteConfig, results_page
+from flight_arbitrage.session import HygienePolicy, ManagedBrowser
+from flight_arbitrage.snapshots import route_of
+from flight_arbitrage.tabs import OPEN_TAB_SCRIPT, TabPipeline
+
+CANDIDATES = ["ATL", "BOS", "JFK", "LAX", "MIA", "SEA"]
+
+
+class TabBrowser:
+    """Fake webdriver whose tabs show mock site results pages"""
+
+    def __init__(self):
+        """
+        TabBrowser constructor
+        """
+        self.tabs = {"home": "about:blank"}
+        self.current_window_handle = "home"
+        self.switch_to = SimpleNamespace(window=self.switch_window)
+        self.opened = 0
+        self.peak = 1
+        self.loads = []
+
+    @property
+    def window_handles(self):
+        """
+        Handles of the open tabs
+
+        :return: the handles
+        """
+        return list(self.tabs)
+
+    @property
+    def page_source(self):
+        """
+        Results page of the url of the current tab
+
+        :return: the page source
+        """
+        route = route_of(self.tabs[self.current_window_handle])
+        if route is None:
+            return "<html></html>"
+        return results_page(*route, SiteConfig(listings=40))
+
+    def switch_window(self, handle):
+        """
+        Makes a tab the current one
+
+        :param handle: window handle of the tab
+        :return: nothing
+        """
+        if handle not in self.tabs:
+            raise KeyError(handle)
+        self.current_window_handle = handle
+
+    def get(self, url):
+        """
+        Loads a url in the current tab
+
+        :param url: url to load
+        :return: nothing
+        """
+        self.loads.append(url)
+        self.tabs[self.current_window_handle] = url
+
+    def execute_script(self, script, *args):
+        """
+        Opens a tab, the only script the pipeline runs
+
+        :param script: script source
+        :param args: script arguments
+        :return: nothing
+        """
+        assert script == OPEN_TAB_SCRIPT
+        self.opened += 1
+        self.loads.append(args[0])
+        self.tabs[f"tab{self.opened}"] = args[0]
+        self.peak = max(self.peak, len(self.tabs))
+
+    def close(self):
+        """
+        Closes the current tab
+
+        :return: nothing
+        """
+        del self.tabs[self.current_window_handle]
+
+    def quit(self):
+        """
+        Nothing to quit
+
+        :return: nothing
+        """
+
+
+class TestTabPipeline(unittest.TestCase):
+    """Unit tests for the TabPipeline class"""
+
+    def test_rotate(self):
+        """
+        Tabs are read in order while up to `tabs` more pages load
+
+        :return: nothing
+        """
+        browser = TabBrowser()
+        tabs = TabPipeline(browser, 2)
+        urls = [f"https://a.b/{number}" for number in range(5)]
+
+        read = []
+        for number in tabs.rotate(
+            (number, url) for number, url in enumerate(urls)
+        ):
+            read.append((number, browser.tabs[browser.current_window_handle]))
+
+        self.assertEqual(read, list(enumerate(urls)))
+        # the first tab, the one read and two loading
+        self.assertEqual(browser.peak, 4)
+        self.assertEqual(browser.tabs, {"home": "about:blank"})
+        self.assertEqual(browser.current_window_handle, "home")
+
+        # tabs left unread are closed when the caller stops early
+        for _ in tabs.rotate((url, url) for url in urls):
+            break
+        self.assertEqual(browser.tabs, {"home": "about:blank"})
+        with self.assertRaises(ValueError):
+            TabPipeline(browser, 0)
+
+    @staticmethod
+    def rotate_session(policy, urls):
+        """
+        Reads every url through the tabs of a memory-bounded session
+
+        :param policy: when the session resets and restarts
+        :param urls: urls to read
+        :return: the session, its browsers, the items and urls read, and
+            the number of tabs open at every upkeep
+        """
+        browsers = []
+        open_tabs = []
+
+        def factory():
+            browsers.append(TabBrowser())
+            return browsers[-1]
+
+        session = ManagedBrowser(
+            factory, policy, sampler=lambda browser: len(browser.loads) * 2**20
+        )
+        upkeep = session.upkeep
+
+        def counted_upkeep():
+            open_tabs.append(len(session.window_handles))
+            upkeep()
+
+        session.upkeep = counted_upkeep
+        tabs = TabPipeline(session, 2, session=session)
+        read = [
+            (number, session.tabs[session.current_window_handle])
+            for number in tabs.rotate(
+                (number, url) for number, url in enumerate(urls)
+            )
+        ]
+        return session, browsers, read, open_tabs
+
+    def test_rotate_upkeep(self):
+        """
+        Due resets and restarts run once the tabs loading have been read
+
+        :return: nothing
+        """
+        urls = [f"https://a.b/{number}" for number in range(8)]
+        for policy in (
+            HygienePolicy(reset_every=3, restart_rss_mb=0),
+            HygienePolicy(reset_every=0, restart_rss_mb=1),
+        ):
+            session, browsers, read, open_tabs = self.rotate_session(
+                policy, urls
+            )
+
+            self.assertEqual(read, list(enumerate(urls)))
+            self.assertEqual(session.pages, len(urls))
+            self.assertEqual(session.restarts, len(browsers) - 1)
+            self.assertTrue(session.resets + session.restarts)
+            # only the first tab is open whenever the session is kept up
+            self.assertEqual(set(open_tabs), {1})
+            self.assertEqual(session.tabs, {"home": "about:blank"})
+
+    @patch("flight_arbitrage.flight.time.sleep")
+    @patch("flight_arbitrage.hidden_city.time.sleep")
+    @patch("flight_arbitrage.hidden_city.tqdm")
+    @patch("flight_arbitrage.hidden_city.OneWay.airports_to_search")
+    @patch("flight_arbitrage.flight.webdriver")
+    def test_find_arbitrage(
+        self, mocked_webdriver, mocked_search, mocked_tqdm, *_
+    ):
+        """
+        Tabbed searches find what one page at a time finds
+
+        :param mocked_webdriver: a mocked selenium webdriver module
+        :param mocked_search: a mocked airports_to_search method
+        :param mocked_tqdm: a mocked tqdm progress bar
+        :return: nothing
+        """
+        mocked_search.return_value = CANDIDATES
+        mocked_tqdm.side_effect = lambda airports: airports
+
+        runs = []
+        for tabs, hygiene in ((0, None), (3, None), (3, HygienePolicy())):
+            browser = TabBrowser()
+            mocked_webdriver.Firefox.return_value = browser
+            flight = OneWay(
+                "JFK", "DEN", "07/10/2021", tabs=tabs, hygiene=hygiene
+            )
+            with patch("sys.stderr"):
+                runs.append(flight.find_arbitrage(page_source=True))
+
+        self.assertTrue(runs[0])
+        self.assertEqual(runs[0], runs[1])
+        self.assertEqual(runs[0], runs[2])
+        # the direct route page and every tab count towards the session
+        self.assertEqual(flight.browser.pages, len(CANDIDATES))
+        self.assertEqual(browser.opened, len(CANDIDATES) - 1)
+        self.assertEqual(browser.peak, 5)
+        self.assertIn("tab switch", flight.timer.totals)
+
+
+if __name__ == "__main__":
+
+    unittest.main()
@@ -0,0 +1,105 @@
+"""Unit test file for the candidate yield statistics"""
+
+import os
+import tempfile
+import unittest
+
+from flight_arbitrage.yields import YieldStats
+
+CANDIDATES = [f"A{number}" for number in range(10)]
+
+
+class TestYieldStats(unittest.TestCase):
+    """Unit tests for the YieldStats class"""
+
+    def setUp(self):
+        """
+        Create a temporary directory for each unit test
+
+        :return: nothing
+        """
+        # pylint: disable=consider-using-with
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "yields.json")
+
+    def tearDown(self):
+        """
+        Remove the temporary directory
+
+        :return: nothing
+        """
+        self.directory.cleanup()
+
+    def test_plan(self):
+        """
+        Candidates that never hit are dropped, unseen ones always searched
+
+        :return: nothing
+        """
+        stats = YieldStats(target_recall=0.8, explore=0.0)
+        self.assertEqual(
+            stats.plan("JFK", "SLC", CANDIDATES).searched, CANDIDATES
+        )
+
+        for _ in range(20):
+            stats.record("JFK", "SLC", CANDIDATES, ["A3", "A7"])
+        plan = stats.plan("JFK", "SLC", CANDIDATES + ["NEW"])
+
+        self.assertEqual(plan.searched, ["A3", "A7", "NEW"])
+        self.assertEqual(len(plan.skipped), 8)
+        self.assertGreaterEqual(plan.expected_recall, 0.8)
+        self.assertEqual(stats.pages_skipped, 8)
+        self.assertIn("skipped: 8", stats.report())
+        self.assertEqual(
+            YieldStats(target_recall=1.0)
+            .plan("JFK", "SLC", CANDIDATES)
+            .skipped,
+            [],
+        )
+        with self.assertRaises(ValueError):
+            YieldStats(target_recall=0.0)
+
+    def test_explore(self):
+        """
+        Skipped candidates are rechecked, longest unsearched first
+
+        :return: nothing
+        """
+        stats = YieldStats(target_recall=0.5, explore=0.1)
+        for _ in range(20):
+            stats.record("JFK", "SLC", CANDIDATES, ["A0"])
+        stats.record("JFK", "SLC", ["A0", "A1", "A2"], ["A0"])
+
+        plan = stats.plan("JFK", "SLC", CANDIDATES)
+        self.assertEqual(plan.searched, ["A0", "A3"])
+
+        # a recheck that hits moves the candidate ahead of the others
+        stats.record("JFK", "SLC", ["A0", "A3"], ["A0", "A3"])
+        stats.record("JFK", "SLC", ["A0", "A3"], ["A0", "A3"])
+        self.assertGreater(
+            stats.rate("JFK", "SLC", "A3"), stats.rate("JFK", "SLC", "A4")
+        )
+        stats.target_recall = 0.8
+        self.assertIn("A3", stats.plan("JFK", "SLC", CANDIDATES).searched)
+
+    def test_save(self):
+        """
+        Counts of runs sharing a file add up
+
+        :return: nothing
+        """
+        first = YieldStats(self.path)
+        with YieldStats(self.path) as second:
+            second.record("JFK", "SLC", ["A0"], ["A0"])
+        first.record("JFK", "SLC", ["A0", "A1"], [])
+        first.save()
+
+        saved = YieldStats(self.path)
+        self.assertEqual(saved.runs, {"JFK SLC": 2})
+        self.assertEqual(saved.candidates["JFK SLC A0"][:2], [2, 1])
+        self.assertEqual(saved.candidates["JFK SLC A1"][:2], [1, 0])
+
+
+if __name__ == "__main__":
+
+    unittest.main()